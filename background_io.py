@@ -0,0 +1,189 @@
+import re
+import time
+import queue
+import threading
+
+# ============================================================================
+# BACKGROUND SHEETS WRITER
+# ============================================================================
+
+_STOP = object()
+
+
+class OutputWriteError(Exception):
+    """Raised when queued Sheets writes were given up on"""
+
+    def __init__(self, failures):
+        self.failures = list(failures)
+        details = ', '.join(f"{description} ({error})" for description, error in self.failures)
+        super().__init__(f"{len(self.failures)} write(s) failed: {details}")
+
+
+class BackgroundSheetsWriter:
+    def __init__(self, sheets, max_pending=32, max_attempts=5, base_delay=1.0, max_delay=30.0):
+        """
+        Run Control_Panel status updates and output writes on a worker thread
+
+        Args:
+            sheets: SchoolSchedulerGoogleSheets (or compatible) backend
+            max_pending: Bound on queued jobs; producers block when full
+            max_attempts: Attempts per write before giving up
+            base_delay: First retry delay in seconds (doubled each attempt)
+            max_delay: Upper bound on a single retry delay
+        """
+        self.sheets = sheets
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        # Guards _tail_status: the cells of a status job that is still the
+        # last thing queued, so further updates can be merged into it
+        self._status_lock = threading.Lock()
+        self._tail_status = None
+        self._closed = False
+        self.errors = []
+        self._reported_errors = 0
+
+        self._thread = threading.Thread(target=self._run, name='sheets-writer', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Producer API (main thread) - mirrors SchoolSchedulerGoogleSheets
+    # ------------------------------------------------------------------
+
+    def update_status(self, status, last_run=None, solve_time=None, quality=None):
+        """Queue a status update; back-to-back updates only write the latest value per cell"""
+        cells = self.sheets.status_cells(status, last_run, solve_time, quality)
+        with self._status_lock:
+            if self._tail_status is not None:
+                self._tail_status.update(cells)
+                return
+            self._tail_status = dict(cells)
+            self._queue.put(("status", self._write_status, (self._tail_status,), {}))
+
+    def submit(self, description, fn, *args, **kwargs):
+        """Queue an arbitrary write; blocks only when the queue is full"""
+        self._put((description, fn, args, kwargs))
+
+    def write_teacher_schedules(self, schedules_data):
+        self.submit("teacher schedules", self.sheets.write_teacher_schedules, schedules_data, raise_on_error=True)
+
+    def write_class_schedules(self, schedules_data):
+        self.submit("class schedules", self.sheets.write_class_schedules, schedules_data, raise_on_error=True)
+
+    def write_teacher_schedules_grid(self, schedules_data):
+        self.submit("teacher schedules grid", self.sheets.write_teacher_schedules_grid, schedules_data,
+                    raise_on_error=True)
+
+    def write_class_schedules_grid(self, schedules_data):
+        self.submit("class schedules grid", self.sheets.write_class_schedules_grid, schedules_data,
+                    raise_on_error=True)
+
+    def flush(self, timeout=None):
+        """
+        Block until everything queued so far (including status) is written
+
+        Returns:
+            List of (description, error) for writes given up on since the
+            previous flush; a timeout is reported as a failed 'flush'
+        """
+        if self._closed:
+            return []
+        done = threading.Event()
+        self.submit('flush', done.set)
+        failures = [] if done.wait(timeout) else [('flush', TimeoutError(f"writes still pending after {timeout}s"))]
+        # Read after the flush job ran, so every earlier job has reported
+        new_errors = self.errors[self._reported_errors:]
+        self._reported_errors += len(new_errors)
+        return new_errors + failures
+
+    def close(self, timeout=None):
+        """Flush and stop the worker thread; returns the flush failures"""
+        if self._closed:
+            return []
+        failures = self.flush(timeout)
+        self._closed = True
+        self._put(_STOP)
+        self._thread.join(timeout)
+        return failures
+
+    # ------------------------------------------------------------------
+    # Worker thread
+    # ------------------------------------------------------------------
+
+    def _put(self, job):
+        with self._status_lock:
+            # Status updates made after this job must not be merged ahead of it
+            self._tail_status = None
+            self._queue.put(job)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                description, fn, args, kwargs = job
+                self._with_retry(description, fn, *args, **kwargs)
+            finally:
+                self._queue.task_done()
+
+    def _write_status(self, cells):
+        with self._status_lock:
+            # Once taken off the queue the job no longer accepts updates
+            if cells is self._tail_status:
+                self._tail_status = None
+            cells = dict(cells)
+        self.sheets.write_status_cells(cells, raise_on_error=True)
+
+    def _with_retry(self, description, fn, *args, **kwargs):
+        delay = self.base_delay
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    print(f"❌ Giving up on {description} after {attempt} attempts: {e}")
+                    self.errors.append((description, e))
+                    return None
+                print(f"⚠️ {description} failed (attempt {attempt}/{self.max_attempts}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_delay)
+
+# ============================================================================
+# SOLVER PROGRESS STREAMING
+# ============================================================================
+
+class SolverProgressReporter:
+    _SOLUTION_LINE = re.compile(r'^#(\d+)\s')
+
+    def __init__(self, status_sink, min_interval=2.0):
+        """
+        CP-SAT log callback that streams progress into Control_Panel
+
+        Args:
+            status_sink: Object with update_status (usually a BackgroundSheetsWriter)
+            min_interval: Minimum seconds between status updates
+        """
+        self.status_sink = status_sink
+        self.min_interval = min_interval
+        self.solutions_found = 0
+        self._start = time.time()
+        self._last_report = 0.0
+
+    def __call__(self, line):
+        match = self._SOLUTION_LINE.match(line)
+        if match:
+            self.solutions_found = int(match.group(1))
+
+        now = time.time()
+        if now - self._last_report < self.min_interval and not match:
+            return
+        self._last_report = now
+
+        elapsed = now - self._start
+        if self.solutions_found:
+            self.status_sink.update_status(f"Solving... {elapsed:.0f}s, {self.solutions_found} solution(s) found")
+        else:
+            self.status_sink.update_status(f"Solving... {elapsed:.0f}s, searching for first solution")
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# ============================================================================
+# MANIFEST
+# ============================================================================
+
+def load_manifest(path):
+    """
+    Read a batch manifest
+
+    Either a JSON list (or {"schools": [...]}) of entries, or a text file with
+    one spreadsheet name / local instance path per line ('#' starts a comment).
+    Entries are dicts with 'spreadsheet' or 'input', plus optional 'name',
+    'out' (solved instance file for local inputs) and 'max_time_in_seconds'.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    if text.lstrip().startswith(('[', '{')):
+        raw = json.loads(text)
+        raw = raw.get('schools', []) if isinstance(raw, dict) else raw
+    else:
+        raw = [line.strip() for line in text.splitlines() if line.strip() and not line.strip().startswith('#')]
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    return [normalize_entry(entry, base_dir) for entry in raw]
+
+
+def normalize_entry(entry, base_dir='.'):
+    """Turn a manifest line or dict into {'name', 'spreadsheet' | 'input', ...}"""
+    if isinstance(entry, str):
+        entry = {'input': entry} if entry.endswith('.json') else {'spreadsheet': entry}
+    entry = dict(entry)
+
+    if 'input' in entry:
+        entry['input'] = os.path.join(base_dir, entry['input'])
+        if entry.get('out'):
+            entry['out'] = os.path.join(base_dir, entry['out'])
+        entry.setdefault('name', os.path.splitext(os.path.basename(entry['input']))[0])
+    elif 'spreadsheet' in entry:
+        entry.setdefault('name', entry['spreadsheet'])
+    else:
+        raise ValueError(f"Manifest entry needs 'spreadsheet' or 'input': {entry}")
+    return entry
+
+# ============================================================================
+# RESOURCE BUDGET
+# ============================================================================
+
+def plan_cpu_budget(school_count, cpu_budget=None, max_processes=None):
+    """
+    Split a CPU budget between concurrent solves
+
+    Returns:
+        (processes, workers_per_solve) - processes * workers_per_solve never
+        exceeds the budget and every solve gets at least one CP-SAT worker
+    """
+    cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+    processes = max(1, min(school_count, cpu_budget, max_processes or cpu_budget))
+    return processes, max(1, cpu_budget // processes)
+
+
+def batch_solver_profile(workers_per_solve, max_time=None):
+    """Default solver profile with the per-solve worker share (and time limit)"""
+    from international_highschool_scheduler import DEFAULT_SOLVER_PROFILE
+
+    profile = dict(DEFAULT_SOLVER_PROFILE)
+    profile['num_workers'] = workers_per_solve
+    if max_time is not None:
+        profile['max_time_in_seconds'] = float(max_time)
+    return profile
+
+# ============================================================================
+# WORKER PROCESS
+# ============================================================================
+
+_worker_state = {}
+
+
+def _init_worker(credentials_file, read_per_minute, write_per_minute):
+    """Give this process its share of the service account quota"""
+    from sheets_client import configure_shared_rate_limiter
+
+    configure_shared_rate_limiter(read_per_minute, write_per_minute)
+    _worker_state['credentials_file'] = credentials_file
+    _worker_state['credentials'] = None
+
+
+def _worker_credentials():
+    # Loaded once per process and reused for every spreadsheet it solves
+    if _worker_state.get('credentials') is None:
+        from international_highschool_scheduler import load_service_account_credentials
+        _worker_state['credentials'] = load_service_account_credentials(_worker_state['credentials_file'])
+    return _worker_state['credentials']
+
+
+def _make_scheduler(entry, cache_dir, solver_profile):
+    if 'input' in entry:
+        from local_instance import LocalInstanceSheets, make_offline_scheduler
+
+        sheets = LocalInstanceSheets(entry['input'])
+        return sheets, make_offline_scheduler(sheets, cache_dir, solver_profile)
+
+    from international_highschool_scheduler import GoogleSheetsScheduler, SchoolSchedulerGoogleSheets
+
+    sheets = SchoolSchedulerGoogleSheets(_worker_state.get('credentials_file'), entry['spreadsheet'],
+                                         credentials=_worker_credentials())
+    return sheets, GoogleSheetsScheduler(None, entry['spreadsheet'], cache_dir=cache_dir,
+                                         solver_profile=solver_profile, sheets=sheets)
+
+
+def solve_school(entry, cache_dir, solver_profile, use_cache=True):
+    """Solve one manifest entry and return its report row (never raises)"""
+    start = time.time()
+    row = {
+        'school': entry['name'],
+        'source': entry.get('spreadsheet') or entry.get('input'),
+        'success': False,
+        'status': None,
+        'quality': None,
+        'solve_time': None,
+        'error': None,
+        'quota_used': None
+    }
+
+    profile = dict(solver_profile)
+    if entry.get('max_time_in_seconds') is not None:
+        profile['max_time_in_seconds'] = float(entry['max_time_in_seconds'])
+
+    statuses = []
+    scheduler = None
+    try:
+        sheets, scheduler = _make_scheduler(entry, cache_dir, profile)
+        scheduler.status_listeners.append(statuses.append)
+        row['success'] = bool(scheduler.run_solver(use_cache=use_cache))
+
+        row['quality'] = scheduler.last_quality
+        row['solve_time'] = scheduler.last_solve_time
+        if row['success'] and entry.get('out') and hasattr(sheets, 'save'):
+            sheets.save(entry['out'])
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        if scheduler is not None:
+            scheduler.close()
+            if scheduler.last_quota_summary:
+                row['quota_used'] = scheduler.last_quota_summary['quota_used']
+
+    row['status'] = statuses[-1] if statuses else ('Error' if row['error'] else None)
+    row['wall_seconds'] = round(time.time() - start, 3)
+    return row
+
+# ============================================================================
+# BATCH
+# ============================================================================
+
+def run_batch(entries, credentials_file=None, cpu_budget=None, max_processes=None, cache_dir=None,
+              max_time=None, use_cache=True, read_per_minute=None, write_per_minute=None):
+    """
+    Solve many schools concurrently on a process pool
+
+    Args:
+        entries: Normalized manifest entries (see load_manifest)
+        credentials_file: Service account JSON for spreadsheet entries
+        cpu_budget: Total CP-SAT workers across all concurrent solves (default: all CPUs)
+        max_processes: Upper bound on concurrent solves
+        cache_dir: Solution cache shared by every school
+        max_time: Per-school solver time limit (entries may override)
+        read_per_minute / write_per_minute: Service account quota (default
+            the Sheets per-user limits), split evenly between the worker processes
+
+    Returns:
+        Consolidated report dict with one row per school (manifest order)
+    """
+    from international_highschool_scheduler import DEFAULT_CACHE_DIR
+    from sheets_client import DEFAULT_READ_REQUESTS_PER_MINUTE, DEFAULT_WRITE_REQUESTS_PER_MINUTE
+
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    read_per_minute = read_per_minute or DEFAULT_READ_REQUESTS_PER_MINUTE
+    write_per_minute = write_per_minute or DEFAULT_WRITE_REQUESTS_PER_MINUTE
+    processes, workers_per_solve = plan_cpu_budget(len(entries), cpu_budget, max_processes)
+    profile = batch_solver_profile(workers_per_solve, max_time)
+    started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    start = time.time()
+
+    print(f"🏫 Solving {len(entries)} schools: {processes} at a time, {workers_per_solve} CP-SAT worker(s) each")
+
+    rows = [None] * len(entries)
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(credentials_file, read_per_minute / processes, write_per_minute / processes)
+    ) as pool:
+        futures = {
+            pool.submit(solve_school, entry, cache_dir, profile, use_cache): i
+            for i, entry in enumerate(entries)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                rows[i] = future.result()
+            except Exception as e:
+                # The worker process itself died (solve_school catches everything else)
+                rows[i] = {'school': entries[i]['name'], 'success': False, 'status': 'Error',
+                           'error': f"{type(e).__name__}: {e}"}
+            icon = "✅" if rows[i]['success'] else "❌"
+            print(f"{icon} {rows[i]['school']}: {rows[i]['status']}")
+
+    succeeded = sum(1 for row in rows if row['success'])
+    return {
+        'started_at': started_at,
+        'wall_seconds': round(time.time() - start, 3),
+        'cpu_budget': processes * workers_per_solve,
+        'processes': processes,
+        'workers_per_solve': workers_per_solve,
+        'succeeded': succeeded,
+        'failed': len(rows) - succeeded,
+        'schools': rows
+    }
+
+
+def format_batch_report(report):
+    """Plain-text table of a run_batch report"""
+    lines = [f"{'School':<24} {'Result':<8} {'Quality':<9} {'Solve(s)':>9} {'Wall(s)':>8}  Status"]
+    for row in report['schools']:
+        solve_time = row.get('solve_time')
+        lines.append(
+            f"{row['school'][:24]:<24} {'ok' if row['success'] else 'FAILED':<8} {row.get('quality') or '-':<9} "
+            f"{(f'{solve_time:.1f}' if solve_time is not None else '-'):>9} {row.get('wall_seconds') or 0:>8.1f}  "
+            f"{row.get('error') or row.get('status') or ''}"
+        )
+    lines.append(
+        f"{report['succeeded']}/{len(report['schools'])} succeeded in {report['wall_seconds']:.1f}s "
+        f"({report['processes']} processes x {report['workers_per_solve']} workers)"
+    )
+    return "\n".join(lines)
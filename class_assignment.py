@@ -0,0 +1,170 @@
+from ortools.graph.python import max_flow
+
+# ============================================================================
+# EQUITABLE CLASS COLOURING
+# ============================================================================
+
+# Lessons are edges between a (group, day) row and a (day, period) slot; the
+# classes of a team are the colours. A colouring that is equitable on every
+# row, every slot and every group gives each lesson a class such that
+#   - a slot never sees the same class twice (rows per slot <= classes),
+#   - a row never repeats a class on a day (lessons per row <= classes),
+#   - a group sees every class exactly lessons / classes times.
+# Row and group sets form a laminar family on one side of a bipartite graph,
+# so each colour class can be cut out with one feasible-flow computation.
+
+
+def _feasible_flow(node_count, arcs):
+    """
+    Integral flow within [low, high] on every arc (a circulation: no source or sink)
+
+    Args:
+        arcs: List of (tail, head, low, high)
+
+    Returns:
+        Flow per arc, or None when no feasible flow exists
+    """
+    smf = max_flow.SimpleMaxFlow()
+    super_source, super_sink = node_count, node_count + 1
+    excess = [0] * node_count
+    for tail, head, low, high in arcs:
+        smf.add_arc_with_capacity(tail, head, high - low)
+        excess[head] += low
+        excess[tail] -= low
+
+    demand = 0
+    for node, amount in enumerate(excess):
+        if amount > 0:
+            smf.add_arc_with_capacity(super_source, node, amount)
+            demand += amount
+        elif amount < 0:
+            smf.add_arc_with_capacity(node, super_sink, -amount)
+
+    if demand and (smf.solve(super_source, super_sink) != smf.OPTIMAL or smf.optimal_flow() != demand):
+        return None
+    return [(smf.flow(i) if demand else 0) + low for i, (_, _, low, _) in enumerate(arcs)]
+
+
+def equitable_class_colouring(lessons, class_count):
+    """
+    Give every lesson a class index in range(class_count)
+
+    Args:
+        lessons: List of (group, day, period) - one entry per lesson of one team
+        class_count: Classes in the team
+
+    Returns:
+        List of class indices aligned with `lessons`
+
+    Raises:
+        ValueError: If a slot or a (group, day) row has more lessons than
+            there are classes, or a group's lesson count is not a multiple
+            of the class count
+    """
+    groups = sorted({group for group, _, _ in lessons}, key=str)
+    rows = sorted({(group, day) for group, day, _ in lessons}, key=str)
+    slots = sorted({(day, period) for _, day, period in lessons}, key=str)
+    group_index = {group: i for i, group in enumerate(groups)}
+    row_index = {row: len(groups) + i for i, row in enumerate(rows)}
+    slot_index = {slot: len(groups) + len(rows) + i for i, slot in enumerate(slots)}
+    source = len(groups) + len(rows) + len(slots)
+    sink = source + 1
+
+    degree = {}
+    for group, day, period in lessons:
+        for key in (('group', group), ('row', (group, day)), ('slot', (day, period))):
+            degree[key] = degree.get(key, 0) + 1
+    for (kind, key), count in degree.items():
+        if kind == 'group' and count % class_count:
+            raise ValueError(f"{key} has {count} lessons, not a multiple of {class_count} classes")
+        if kind != 'group' and count > class_count:
+            raise ValueError(f"{kind} {key} has {count} lessons for {class_count} classes")
+
+    colours = [None] * len(lessons)
+    remaining = list(range(len(lessons)))
+    for colour in range(class_count):
+        k = class_count - colour
+
+        def bounds(key):
+            count = degree.get(key, 0)
+            return count // k, -(-count // k)
+
+        arcs = []
+        for group in groups:
+            arcs.append((source, group_index[group], *bounds(('group', group))))
+        for row in rows:
+            arcs.append((group_index[row[0]], row_index[row], *bounds(('row', row))))
+        lesson_arcs = len(arcs)
+        for i in remaining:
+            group, day, period = lessons[i]
+            arcs.append((row_index[(group, day)], slot_index[(day, period)], 0, 1))
+        for slot in slots:
+            arcs.append((slot_index[slot], sink, *bounds(('slot', slot))))
+        arcs.append((sink, source, 0, len(lessons)))
+
+        flow = _feasible_flow(sink + 1, arcs)
+        if flow is None:
+            # Cannot happen for valid degrees: the uniform 1/k split is a fractional solution
+            raise ValueError(f"No equitable split for class {colour}")
+
+        chosen = [i for n, i in enumerate(remaining) if flow[lesson_arcs + n]]
+        for i in chosen:
+            group, day, period = lessons[i]
+            colours[i] = colour
+            for key in (('group', group), ('row', (group, day)), ('slot', (day, period))):
+                degree[key] -= 1
+        chosen = set(chosen)
+        remaining = [i for i in remaining if i not in chosen]
+
+    return colours
+
+# ============================================================================
+# TEAM-AGGREGATED SOLUTIONS
+# ============================================================================
+
+def assign_classes(solver, built, data):
+    """
+    Concrete teacher/class assignment for a solved team-aggregated model
+
+    Core and literacy lessons are coloured team by team with
+    equitable_class_colouring; at a team's PE slots the PE teachers take the
+    team's classes in order, each as many as its solved count.
+
+    Returns:
+        {teacher: {class: {day: {period: 0/1}}}} in the shape of the
+        'classes' formulation's teacher_class_assignment (plain ints)
+    """
+    DAYS = data['DAYS']
+    TEACHING_PERIODS = data['TEACHING_PERIODS']
+    TEAMS = data['TEAMS']
+    team_teaching = built['team_teaching']
+    pe_class_count = built['pe_class_count']
+
+    assignment = {
+        teacher: {
+            class_name: {day: {period: 0 for period in TEACHING_PERIODS[day]} for day in DAYS}
+            for class_name in data['CLASSES']
+        }
+        for teacher in data['ALL_TEACHERS']
+    }
+
+    for team_num, team_classes in TEAMS.items():
+        lessons = [
+            (teacher, day, period)
+            for teacher, teams in team_teaching.items() if team_num in teams
+            for day in DAYS
+            for period in TEACHING_PERIODS[day]
+            if solver.Value(teams[team_num][day][period])
+        ]
+        for (teacher, day, period), colour in zip(lessons, equitable_class_colouring(lessons, len(team_classes))):
+            assignment[teacher][team_classes[colour]][day][period] = 1
+
+        for day in DAYS:
+            for period in TEACHING_PERIODS[day]:
+                next_class = 0
+                for pe_teacher, teams in pe_class_count.items():
+                    for _ in range(solver.Value(teams[team_num][day][period])):
+                        assignment[pe_teacher][team_classes[next_class]][day][period] = 1
+                        next_class += 1
+
+    return assignment
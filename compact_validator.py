@@ -0,0 +1,513 @@
+import numpy as np
+
+from school_instance import school_instance
+from international_highschool_scheduler import DEFAULT_RULES, MAX_INTENSIVE_IN_A_ROW, consecutive_runs
+
+# ============================================================================
+# VECTORIZED SCHEDULE VALIDATION
+# ============================================================================
+
+# validate_compact checks a compact schedule (solution_store's arrays) against
+# the model's rules with whole-array NumPy operations: per-slot and per-day
+# counts are matrix products and bincounts over the lesson triples, and Python
+# only runs for the violations found. The lookup tables it needs depend on the
+# school alone and are built once per SchoolInstance.
+#
+# It is the project's only rule set: validate_sheet_schedules runs it on
+# convert_solution_to_sheets_format's dicts, and by default it checks what
+# the model posts, so every solver result passes. strict=True adds the
+# README rules the model does not post: team meetings and a literacy
+# teacher's advisories on non-consecutive days, electives on different days
+# with no PE lessons (the model lets a team's PE block overlap one), Elective
+# only in the school-wide elective periods (the model lets a teacher show
+# Elective in any other free period) and at most one discipline meeting per
+# period.
+
+_tables = {}
+
+
+def _violation(rule, message, **location):
+    return {'rule': rule, 'message': message, 'location': location}
+
+
+def _slot_location(tables, s):
+    day, period = tables['slots'][s]
+    return {'day': day, 'period': int(period)}
+
+
+def instance_tables(instance):
+    """
+    Index arrays for validating schedules of one school (cached per instance)
+
+    Args:
+        instance: SchoolInstance
+
+    Returns:
+        Dict of entity lists, masks and one-hot matrices over teachers (T),
+        classes (C), teams (K), subjects (J), all slots (S, lunch included)
+        and days (D)
+    """
+    cached = _tables.get(id(instance))
+    if cached is not None and cached[0] is instance:
+        return cached[1]
+
+    teachers = list(instance.teachers.values())
+    teams = [instance.teams[team_num] for team_num in instance.team_numbers]
+    slots = [(day, period) for day in instance.days for period in instance.all_periods[day]]
+    subjects = list(instance.core_subjects) + ['Literacy', 'PE']
+    teacher_pos = {teacher.name: t for t, teacher in enumerate(teachers)}
+    team_pos = {team.number: k for k, team in enumerate(teams)}
+    T, C, K, J = len(teachers), len(instance.classes), len(teams), len(subjects)
+
+    day_of = np.array([instance.days.index(day) for day, _ in slots], dtype=np.intp)
+    teaching_slot = np.array([slot in instance.slot_index for slot in slots])
+    period_of = np.array([instance.period_numbers.index(period) if teaching else -1
+                          for (_, period), teaching in zip(slots, teaching_slot)], dtype=np.intp)
+    class_team = np.array([team_pos[instance.class_team[name]] for name in instance.classes], dtype=np.intp)
+    kind = np.array([teacher.kind for teacher in teachers])
+    subject_of = np.array([subjects.index(teacher.subject) if teacher.subject in subjects else -1
+                           for teacher in teachers], dtype=np.intp)
+
+    # Which classes each teacher may teach (PE teachers: all)
+    eligible = np.zeros((T, C), dtype=bool)
+    eligible[kind == 'pe'] = True
+    for t, teacher in enumerate(teachers):
+        if teacher.kind != 'pe':
+            served = [team_pos[team_num] for team_num in teacher.teams if team_num in team_pos]
+            eligible[t] = np.isin(class_team, served)
+
+    # Team membership: core teachers hold the meetings, core and literacy
+    # teachers the advisories
+    meeting_members = np.zeros((T, K), dtype=np.int32)
+    advisory_members = np.zeros((T, K), dtype=np.int32)
+    for k, team in enumerate(teams):
+        for name in team.core_teachers:
+            meeting_members[teacher_pos[name], k] = 1
+            advisory_members[teacher_pos[name], k] = 1
+        if team.literacy_teacher in teacher_pos:
+            advisory_members[teacher_pos[team.literacy_teacher], k] = 1
+
+    # Subjects each class must take (the weekly count comes with the rules)
+    class_subjects = np.zeros((C, J), dtype=bool)
+    for c, name in enumerate(instance.classes):
+        team = teams[class_team[c]]
+        for j, subject in enumerate(subjects[:-1]):
+            class_subjects[c, j] = subject in team.teachers
+        class_subjects[c, -1] = bool(instance.pe_teachers)
+
+    # Runs of MAX_INTENSIVE_IN_A_ROW + 1 consecutive teaching periods
+    slot_pos = {slot: s for s, slot in enumerate(slots)}
+    windows = [
+        [slot_pos[(day, period)] for period in run[i:i + MAX_INTENSIVE_IN_A_ROW + 1]]
+        for day in instance.days
+        for run in consecutive_runs(instance.teaching_periods[day])
+        for i in range(len(run) - MAX_INTENSIVE_IN_A_ROW)
+    ]
+
+    tables = {
+        'teachers': [teacher.name for teacher in teachers],
+        'teacher_pos': teacher_pos,
+        'classes': list(instance.classes),
+        'class_pos': dict(instance.class_index),
+        'teams': [team.number for team in teams],
+        'team_size': np.array([len(team.classes) for team in teams]),
+        'subjects': subjects,
+        'slots': slots,
+        'slot_pos': slot_pos,
+        'days': list(instance.days),
+        'day_matrix': (day_of[:, None] == np.arange(len(instance.days))).astype(np.int32),
+        'period_matrix': (period_of[:, None] == np.arange(len(instance.period_numbers))).astype(np.int32),
+        'day_of': day_of,
+        'teaching_slot': teaching_slot,
+        'class_team': class_team,
+        'team_matrix': (class_team[:, None] == np.arange(K)).astype(np.int32),
+        'kind': kind,
+        'subject_of': subject_of,
+        'subject_matrix': ((subject_of[:, None] == np.arange(J)) & (kind != 'pe')[:, None]).astype(np.int32),
+        'eligible': eligible,
+        'meeting_members': meeting_members,
+        'advisory_members': advisory_members,
+        'class_subjects': class_subjects,
+        'windows': np.array(windows, dtype=np.intp).reshape(-1, MAX_INTENSIVE_IN_A_ROW + 1)
+    }
+    if len(_tables) >= 8:
+        _tables.pop(next(iter(_tables)))
+    _tables[id(instance)] = (instance, tables)
+    return tables
+
+
+def compact_from_schedules(teacher_schedules, class_schedules, data):
+    """
+    Compact schedule for convert_solution_to_sheets_format's dicts
+
+    Lessons come from the teachers' class lists (an Elective entry's class
+    is display only); the class schedules' teachers are kept as
+    'class_assignments' so validate_compact can check both sides agree.
+
+    Returns:
+        Dict shaped like solution_store.extract_compact_solution's
+    """
+    instance = school_instance(data)
+    tables = instance_tables(instance)
+    classes, slots = tables['classes'], tables['slots']
+    codes = instance.activity_codes
+    class_pos = tables['class_pos']
+    # A teacher without a schedule is left out (validate_compact reports it)
+    teachers = [teacher for teacher in tables['teachers'] if teacher in teacher_schedules]
+
+    activity = np.full((len(teachers), len(slots)), -1, dtype=np.int8)
+    assignments = []
+    for t, teacher in enumerate(teachers):
+        schedule = teacher_schedules[teacher]
+        for s, (day, period) in enumerate(slots):
+            info = schedule.get(day, {}).get(period)
+            if info is None:
+                continue
+            activity[t, s] = codes.get(info.get('activity'), -1)
+            if info.get('activity') != 'Elective':
+                assignments.extend((t, class_pos[name], s) for name in info.get('classes', []) if name in class_pos)
+
+    listed = {teacher: t for t, teacher in enumerate(teachers)}
+    class_assignments = []
+    for c, name in enumerate(classes):
+        schedule = class_schedules.get(name) or {}
+        for s, (day, period) in enumerate(slots):
+            teacher = schedule.get(day, {}).get(period, {}).get('teacher')
+            if teacher in listed:
+                class_assignments.append((listed[teacher], c, s))
+
+    return {
+        'teachers': teachers,
+        'classes': classes,
+        'slots': slots,
+        'activities': list(instance.activities),
+        'activity': activity,
+        'assignments': np.array(assignments, dtype=np.int16).reshape(-1, 3),
+        'class_assignments': np.array(class_assignments, dtype=np.int16).reshape(-1, 3)
+    }
+
+
+def validate_compact(compact, data, strict=False):
+    """
+    Check a compact schedule against every scheduling rule
+
+    Entities are matched by name, so the compact schedule may list teachers,
+    classes, slots and activities in any order.
+
+    Args:
+        compact: Dict from extract_compact_solution or compact_from_schedules
+        data: Model data the schedule was solved from
+        strict: Also check the README rules the model does not enforce
+            (see the module comment)
+
+    Returns:
+        List of {'rule', 'message', 'location'} dicts (empty when the
+        schedule is valid); location holds the teacher, class, team,
+        subject, day and period the violation concerns
+    """
+    instance = school_instance(data)
+    tables = instance_tables(instance)
+    rules = dict(DEFAULT_RULES, **(data.get('RULES') or {}))
+    code = instance.activity_codes
+    teachers, classes, teams, subjects, slots, days = (
+        tables['teachers'], tables['classes'], tables['teams'], tables['subjects'], tables['slots'], tables['days'])
+    T, C, S = len(teachers), len(classes), len(slots)
+    kind, teaching_slot, day_matrix = tables['kind'], tables['teaching_slot'], tables['day_matrix']
+    is_pe, is_core = kind == 'pe', kind == 'core'
+    violations = []
+
+    def where(s):
+        return _slot_location(tables, s)
+
+    # --- Map the compact entities onto the instance ------------------------
+    t_map = np.array([tables['teacher_pos'].get(name, -1) for name in compact['teachers']], dtype=np.intp)
+    c_map = np.array([tables['class_pos'].get(name, -1) for name in compact['classes']], dtype=np.intp)
+    s_map = np.array([tables['slot_pos'].get(tuple(slot), -1) for slot in compact['slots']], dtype=np.intp)
+    # The trailing -1 maps an unset cell (-1) to "no activity"
+    a_map = np.array([code.get(name, -1) for name in compact['activities']] + [-1], dtype=np.int16)
+
+    activity = np.full((T, S), -1, dtype=np.int16)
+    rows, columns = np.flatnonzero(t_map >= 0), np.flatnonzero(s_map >= 0)
+    source = np.asarray(compact['activity'], dtype=np.intp)
+    activity[np.ix_(t_map[rows], s_map[columns])] = a_map[source[np.ix_(rows, columns)]]
+    listed = np.zeros(T, dtype=bool)
+    listed[t_map[rows]] = True
+
+    def lesson_triples(array):
+        triples = np.asarray(array, dtype=np.intp).reshape(-1, 3)
+        t, c, s = t_map[triples[:, 0]], c_map[triples[:, 1]], s_map[triples[:, 2]]
+        known = (t >= 0) & (c >= 0) & (s >= 0)
+        return t[known], c[known], s[known]
+
+    lt, lc, ls = lesson_triples(compact['assignments'])
+    pe_lesson = is_pe[lt]
+
+    # --- Teachers: entries, lunch, one prep a day --------------------------
+    for t in np.flatnonzero(~listed):
+        violations.append(_violation('missing', f"No schedule for teacher {teachers[t]}", teacher=teachers[t]))
+    for t, s in np.argwhere((activity == -1) & listed[:, None]):
+        day, period = slots[s]
+        violations.append(_violation('missing', f"{teachers[t]} has no entry for {day} P{period}",
+                                     teacher=teachers[t], **where(s)))
+
+    assigned = activity >= 0
+    for t, s in np.argwhere(assigned & ~teaching_slot & (activity != code['Lunch'])):
+        day, period = slots[s]
+        violations.append(_violation('lunch', f"{teachers[t]} is not at lunch on {day} P{period}",
+                                     teacher=teachers[t], **where(s)))
+    for t, s in np.argwhere(teaching_slot & (activity == code['Lunch'])):
+        day, period = slots[s]
+        violations.append(_violation('lunch', f"{teachers[t]} has lunch outside the lunch period on {day} P{period}",
+                                     teacher=teachers[t], **where(s)))
+
+    preps = ((activity == code['Prep']) & teaching_slot).astype(np.int32) @ day_matrix
+    for t, d in np.argwhere((preps != 1) & listed[:, None]):
+        violations.append(_violation('daily_prep', f"{teachers[t]} has {preps[t, d]} prep periods on {days[d]}",
+                                     teacher=teachers[t], day=days[d]))
+
+    # --- Lessons: who teaches whom, when -----------------------------------
+    taught = np.bincount(lt * S + ls, minlength=T * S).reshape(T, S)
+    teaching = taught > 0
+    for t, s in np.argwhere(~is_pe[:, None] & (taught > 1)):
+        day, period = slots[s]
+        violations.append(_violation('teacher_overlap', f"{teachers[t]} teaches {taught[t, s]} classes on {day} P{period}",
+                                     teacher=teachers[t], **where(s)))
+    for t, s in np.argwhere(is_pe[:, None] & (taught > rules['max_classes_per_pe_teacher'])):
+        day, period = slots[s]
+        violations.append(_violation(
+            'pe_classes', f"{teachers[t]} has {taught[t, s]} classes on {day} P{period} "
+                          f"(at most {rules['max_classes_per_pe_teacher']})", teacher=teachers[t], **where(s)))
+
+    class_load = np.bincount(lc * S + ls, minlength=C * S).reshape(C, S)
+    for c, s in np.argwhere(class_load > 1):
+        day, period = slots[s]
+        violations.append(_violation('class_overlap', f"{classes[c]} has {class_load[c, s]} teachers on {day} P{period}",
+                                     **{'class': classes[c]}, **where(s)))
+
+    def lesson_violations(rule, mask, message):
+        # message is formatted with teacher, name (the class), day, period and activity
+        for t, c, s in zip(lt[mask], lc[mask], ls[mask]):
+            day, period = slots[s]
+            current = instance.activities[activity[t, s]] if activity[t, s] >= 0 else 'missing entry'
+            text = message.format(teacher=teachers[t], name=classes[c], day=day, period=period,
+                                  team=teams[tables['class_team'][c]], activity=current)
+            violations.append(_violation(rule, text, teacher=teachers[t], **{'class': classes[c]}, **where(s)))
+
+    lesson_violations('lunch', ~teaching_slot[ls], "{teacher} teaches {name} during lunch on {day} P{period}")
+    lesson_violations('consistency', teaching_slot[ls] & (activity[lt, ls] != code['Extra Prep']),
+                      "{teacher} teaches {name} on {day} P{period} during their {activity}")
+    lesson_violations('teacher_team', ~tables['eligible'][lt, lc], "{teacher} may not teach {name} (team {team})")
+
+    if 'class_assignments' in compact:
+        # Both sides of the converted schedules list the same lessons
+        lessons = np.zeros((T, C, S), dtype=bool)
+        lessons[lt, lc, ls] = True
+        listed_lessons = np.zeros((T, C, S), dtype=bool)
+        listed_lessons[lesson_triples(compact['class_assignments'])] = True
+        for side, mask in (("the class lists {teacher} but the teacher does not", listed_lessons & ~lessons),
+                           ("{teacher} teaches the class but the class does not list them", lessons & ~listed_lessons)):
+            for t, c, s in np.argwhere(mask):
+                day, period = slots[s]
+                violations.append(_violation(
+                    'consistency', f"{classes[c]} on {day} P{period}: " + side.format(teacher=teachers[t]),
+                    teacher=teachers[t], **{'class': classes[c]}, **where(s)))
+
+    # --- Classes: weekly subject counts, no same-day repeats ---------------
+    J = len(subjects)
+    lesson_subject = np.where(pe_lesson, J - 1, tables['subject_of'][lt])
+    counted = lesson_subject >= 0
+    weekly = np.bincount(lc[counted] * J + lesson_subject[counted], minlength=C * J).reshape(C, J)
+    required = np.array([rules['core_periods_per_week']] * (J - 2) +
+                        [rules['literacy_periods_per_week'], rules['pe_periods_per_week']])
+    for c, j in np.argwhere(tables['class_subjects'] & (weekly != required)):
+        violations.append(_violation(
+            'weekly_subject', f"{classes[c]} has {weekly[c, j]} {subjects[j]} periods (expected {required[j]})",
+            **{'class': classes[c]}, subject=subjects[j]))
+
+    D = len(days)
+    academic = counted & ~pe_lesson
+    daily = np.bincount((lc[academic] * J + lesson_subject[academic]) * D + tables['day_of'][ls[academic]],
+                        minlength=C * J * D).reshape(C, J, D)
+    for c, j, d in np.argwhere(daily > 1):
+        violations.append(_violation('no_repeat', f"{classes[c]} has {subjects[j]} {daily[c, j, d]} times on {days[d]}",
+                                     **{'class': classes[c]}, subject=subjects[j], day=days[d]))
+
+    # --- PE: whole teams, gym capacity, teacher loads ----------------------
+    team_matrix, team_size = tables['team_matrix'], tables['team_size']
+    class_pe = np.bincount(lc[pe_lesson] * S + ls[pe_lesson], minlength=C * S).reshape(C, S) > 0
+    team_pe_classes = team_matrix.T @ class_pe.astype(np.int32)
+    team_pe = team_pe_classes > 0
+    for k, s in np.argwhere(team_pe & (team_pe_classes < team_size[:, None])):
+        day, period = slots[s]
+        violations.append(_violation(
+            'pe_team', f"Only {team_pe_classes[k, s]} of team {teams[k]}'s {team_size[k]} classes have PE on {day} P{period}",
+            team=teams[k], **where(s)))
+    pe_teams = team_pe.sum(axis=0)
+    for s in np.flatnonzero(pe_teams > rules['pe_teams_per_period']):
+        day, period = slots[s]
+        violations.append(_violation(
+            'pe_capacity', f"{pe_teams[s]} teams have PE on {day} P{period} (at most {rules['pe_teams_per_period']})",
+            **where(s)))
+    pe_load = taught.sum(axis=1)
+    for t in np.flatnonzero(is_pe & ((pe_load < rules['pe_load_min']) | (pe_load > rules['pe_load_max']))):
+        violations.append(_violation(
+            'pe_load', f"{teachers[t]} teaches {pe_load[t]} PE periods "
+                       f"(expected {rules['pe_load_min']}-{rules['pe_load_max']})", teacher=teachers[t]))
+
+    # --- Team meetings and advisories --------------------------------------
+    def team_events(name, members):
+        """(team x slot) events all member teachers attend, and the teachers out of step"""
+        attending = (activity == code[name]).astype(np.int32)
+        held = (members.T @ attending == members.sum(axis=0)[:, None]) & (members.sum(axis=0) > 0)[:, None]
+        expected = members @ held.astype(np.int32) > 0
+        return attending > 0, held & teaching_slot, expected
+
+    def team_event_violations(rule, label, held, per_week):
+        per_day = held.astype(np.int32) @ day_matrix
+        counts = held.sum(axis=1)
+        for k in np.flatnonzero(counts != per_week):
+            violations.append(_violation(rule, f"Team {teams[k]} has {counts[k]} {label}s (expected {per_week})",
+                                         team=teams[k]))
+        for k, d in np.argwhere(per_day > 1):
+            violations.append(_violation(rule, f"Team {teams[k]} has {per_day[k, d]} {label}s on {days[d]}",
+                                         team=teams[k], day=days[d]))
+        return per_day
+
+    def out_of_step(rule, label, attending, expected):
+        for t, s in np.argwhere(~is_pe[:, None] & (attending != expected)):
+            day, period = slots[s]
+            state = "is in" if attending[t, s] else "misses"
+            violations.append(_violation(rule, f"{teachers[t]} {state} a {label} on {day} P{period}",
+                                         teacher=teachers[t], **where(s)))
+
+    in_meeting, meeting, expected = team_events('Team_Meeting', tables['meeting_members'])
+    out_of_step('team_meeting', 'team meeting', in_meeting, expected)
+    meeting_days = team_event_violations('team_meeting', 'team meeting', meeting, rules['team_meetings_per_week'])
+    for k, s in np.argwhere(meeting & ~team_pe):
+        day, period = slots[s]
+        violations.append(_violation('team_meeting', f"Team {teams[k]} meets on {day} P{period} without PE",
+                                     team=teams[k], **where(s)))
+
+    in_advisory, advisory, expected = team_events('Advisory', tables['advisory_members'])
+    out_of_step('advisory', 'team advisory', in_advisory, expected)
+    team_event_violations('advisory', 'advisory', advisory, rules['advisory_periods_per_week'])
+    per_period = advisory.astype(np.int32) @ tables['period_matrix']
+    for k, p in np.argwhere(per_period > 1):
+        violations.append(_violation(
+            'advisory', f"Team {teams[k]} has {per_period[k, p]} advisories in period {instance.period_numbers[p]}",
+            team=teams[k], period=int(instance.period_numbers[p])))
+    literacy = kind == 'literacy'
+    advisories = in_advisory.sum(axis=1)
+    for t in np.flatnonzero(literacy & (advisories != rules['advisory_periods_per_week'])):
+        violations.append(_violation(
+            'advisory', f"{teachers[t]} has {advisories[t]} advisories (expected {rules['advisory_periods_per_week']})",
+            teacher=teachers[t]))
+    lesson_violations('advisory', ~pe_lesson & advisory[tables['class_team'][lc], ls],
+                      "{name} has {teacher} during its advisory on {day} P{period}")
+
+    # --- Discipline meetings -----------------------------------------------
+    in_discipline = activity == code['Discipline_Meeting']
+    subject_matrix = tables['subject_matrix'][:, :-1] * (is_core | literacy)[:, None]
+    attending = subject_matrix.T @ in_discipline.astype(np.int32)
+    members = subject_matrix.sum(axis=0)
+    held = (attending == members[:, None]) & (members > 0)[:, None] & teaching_slot
+    out_of_step('discipline', 'discipline meeting', in_discipline, subject_matrix @ held.astype(np.int32) > 0)
+    for j in np.flatnonzero((members > 0) & (held.sum(axis=1) != 1)):
+        violations.append(_violation(
+            'discipline', f"{subjects[j]} has {held[j].sum()} discipline meetings (expected 1)", subject=subjects[j]))
+    discipline_counts = in_discipline.sum(axis=1)
+    for t in np.flatnonzero((is_core | literacy) & (discipline_counts != 1)):
+        violations.append(_violation(
+            'discipline', f"{teachers[t]} has {discipline_counts[t]} discipline meetings (expected 1)",
+            teacher=teachers[t]))
+
+    # --- PE teachers: prep or Extra Prep, Extra Prep in meetings/electives -
+    in_elective = activity == code['Elective']
+    non_pe = np.flatnonzero(~is_pe)
+    elective_count = in_elective[non_pe].sum(axis=0)
+    elective = (elective_count == len(non_pe)) & (len(non_pe) > 0) & teaching_slot
+    pe_allowed = np.isin(activity, [code['Extra Prep'], code['Prep'], code['Lunch'], -1])
+    busy = (meeting.any(axis=0) | elective)[None, :] & (activity == code['Prep'])
+    for t, s in np.argwhere(is_pe[:, None] & ~pe_allowed):
+        day, period = slots[s]
+        violations.append(_violation(
+            'pe_activity', f"{teachers[t]} has {instance.activities[activity[t, s]]} on {day} P{period}",
+            teacher=teachers[t], **where(s)))
+    for t, s in np.argwhere(is_pe[:, None] & busy):
+        day, period = slots[s]
+        violations.append(_violation(
+            'pe_activity', f"{teachers[t]} has Prep during a team meeting or elective on {day} P{period}",
+            teacher=teachers[t], **where(s)))
+
+    # --- Electives ---------------------------------------------------------
+    if elective.sum() != rules['elective_periods_per_week']:
+        violations.append(_violation(
+            'electives', f"{elective.sum()} elective periods (expected {rules['elective_periods_per_week']})"))
+    lesson_violations('electives', elective[ls] & (strict | ~pe_lesson),
+                      "{name} has {teacher} during the elective on {day} P{period}")
+
+    # --- No more than MAX_INTENSIVE_IN_A_ROW intensive periods in a row ----
+    windows = tables['windows']
+    intensive = teaching | in_advisory | in_elective
+    for t, w in np.argwhere(intensive[:, windows].all(axis=2)):
+        first, last = slots[windows[w][0]], slots[windows[w][-1]]
+        violations.append(_violation(
+            'intensive', f"{teachers[t]} has {windows.shape[1]} intensive periods in a row on "
+                         f"{first[0]} P{first[1]}-P{last[1]}", teacher=teachers[t], **where(windows[w][0])))
+
+    if strict:
+        # Team meetings and a literacy teacher's advisories on non-consecutive days
+        for k, d in np.argwhere((meeting_days[:, :-1] > 0) & (meeting_days[:, 1:] > 0)):
+            violations.append(_violation(
+                'meeting_days', f"Team {teams[k]} meets on {days[d]} and {days[d + 1]}", team=teams[k], day=days[d]))
+        advisory_days = in_advisory.astype(np.int32) @ day_matrix
+        for t, d in np.argwhere(literacy[:, None] & (advisory_days[:, :-1] > 0) & (advisory_days[:, 1:] > 0)):
+            violations.append(_violation(
+                'advisory_days', f"{teachers[t]} has advisory on {days[d]} and {days[d + 1]}",
+                teacher=teachers[t], day=days[d]))
+        # Electives on different days
+        per_day = elective.astype(np.int32) @ day_matrix
+        for d in np.flatnonzero(per_day > 1):
+            violations.append(_violation('electives', f"{per_day[d]} elective periods on {days[d]}", day=days[d]))
+        # Elective entries only in the school-wide elective periods
+        for s in np.flatnonzero((elective_count > 0) & ~elective):
+            day, period = slots[s]
+            missing = [teachers[t] for t in non_pe if not in_elective[t, s]]
+            violations.append(_violation(
+                'elective_sync', f"Elective on {day} P{period} is not school-wide (missing {', '.join(missing)})",
+                **where(s)))
+        # At most one discipline meeting per period
+        meetings = held.sum(axis=0)
+        for s in np.flatnonzero(meetings > 1):
+            day, period = slots[s]
+            violations.append(_violation(
+                'discipline_overlap', f"{meetings[s]} discipline meetings on {day} P{period}", **where(s)))
+
+    return violations
+
+
+def validate_sheet_schedules(teacher_schedules, class_schedules, data, strict=False):
+    """
+    validate_compact for convert_solution_to_sheets_format's dicts
+
+    The class schedules must also have an entry for every slot, with Lunch
+    in the lunch periods; the lessons themselves come from the teachers.
+    """
+    instance = school_instance(data)
+    violations = []
+    for class_name in instance.classes:
+        schedule = class_schedules.get(class_name)
+        if schedule is None:
+            violations.append(_violation('missing', f"No schedule for class {class_name}", **{'class': class_name}))
+            continue
+        for day in instance.days:
+            for period in instance.all_periods[day]:
+                info = schedule.get(day, {}).get(period)
+                if info is None:
+                    violations.append(_violation('missing', f"{class_name} has no entry for {day} P{period}",
+                                                 **{'class': class_name}, day=day, period=period))
+                elif period not in instance.teaching_periods[day] and info.get('subject') != 'Lunch':
+                    violations.append(_violation('lunch', f"{class_name} is not at lunch on {day} P{period}",
+                                                 **{'class': class_name}, day=day, period=period))
+    compact = compact_from_schedules(teacher_schedules, class_schedules, data)
+    return violations + validate_compact(compact, data, strict)
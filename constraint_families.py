@@ -0,0 +1,578 @@
+import copy
+
+from ortools.sat.python import cp_model
+
+from international_highschool_scheduler import (
+    MAX_INTENSIVE_IN_A_ROW, add_rule_constraint, consecutive_runs, windowed_periods, pattern_flags
+)
+
+# ============================================================================
+# CONSTRAINT FAMILIES
+# ============================================================================
+
+# The scheduler builds the variables once (GoogleSheetsScheduler.build_model_context):
+# the time grid's team and school slots, the activities, the lessons, the
+# teaching flags, the discipline slots and the advisory channels, with the
+# domains static_domains pre-fixes. Every rule on top of them is one family
+# here: a function that reads a ModelContext and posts that rule's
+# constraints on ctx.model. build_scheduling_model calls them in
+# CONSTRAINT_FAMILIES order, so switching one off leaves exactly that rule
+# out; the tests call them one at a time on a clone of a shared context.
+
+# Families on the time grid (team meetings, PE, advisories and electives
+# as team / school slots); build_time_grid posts them
+GRID_FAMILIES = ('pe_periods', 'meeting_slots', 'advisory_slots', 'pe_capacity', 'elective_count')
+
+# Families on the full model, in posting order
+MODEL_FAMILIES = (
+    'teaching_activity', 'class_capacity', 'no_repeat', 'core_subjects', 'literacy', 'pe_coverage',
+    'pe_class_load', 'team_meetings', 'discipline', 'advisory', 'electives', 'event_timelines', 'pe_load',
+    'daily_patterns'
+)
+
+CONSTRAINT_FAMILIES = GRID_FAMILIES + MODEL_FAMILIES
+
+
+class ModelContext:
+    """
+    Variables and lookups of a model under construction
+
+    build_time_grid and GoogleSheetsScheduler.build_model_context set the
+    attributes: the model, the rules and their recorded constraints, the
+    indexed instance, the variable arrays and the flags of the formulation
+    and event encoding. families lists the families posted so far.
+    """
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def clone(self):
+        """Context for a copy of the model: families added later go to the copy only"""
+        clone = copy.copy(self)
+        # Variables are model indices, so they are valid in the copy as well
+        clone.model = type(self.model)()
+        clone.model.Proto().CopyFrom(self.model.Proto())
+        clone.model.rebuild_var_and_constant_map()
+        clone.rule_constraints = {name: list(constraints) for name, constraints in self.rule_constraints.items()}
+        return clone
+
+    def built(self):
+        """The build_scheduling_model dict"""
+        return {
+            'model': self.model,
+            'teacher_activity': self.teacher_activity,
+            'teacher_class_assignment': self.teacher_class_assignment,
+            'team_meeting_schedule': self.team_meeting_schedule,
+            'team_pe_schedule': self.team_pe_schedule,
+            'team_advisory_schedule': self.team_advisory_schedule,
+            'discipline_schedule': self.discipline_schedule,
+            'elective_schedule': self.elective_schedule,
+            'rules': self.rules,
+            'rule_constraints': self.rule_constraints,
+            'formulation': self.formulation,
+            'event_encoding': self.event_encoding,
+            'families': self.families,
+            'team_teaching': self.team_teaching,
+            'pe_class_count': self.pe_class_count,
+            'teacher_teaching': self.teacher_teaching
+        }
+
+
+def select_families(families, known=CONSTRAINT_FAMILIES):
+    """
+    Validated family names, in posting order
+
+    Args:
+        families: Iterable of family names, or None for all of them
+        known: The families to choose from
+
+    Returns:
+        Tuple of the selected names of known, in its order
+    """
+    if families is None:
+        return tuple(known)
+    families = set(families)
+    unknown = sorted(families - set(CONSTRAINT_FAMILIES))
+    if unknown:
+        raise ValueError(f"Unknown constraint families: {', '.join(unknown)} "
+                         f"(expected some of {', '.join(CONSTRAINT_FAMILIES)})")
+    return tuple(family for family in known if family in families)
+
+
+def add_families(ctx, families):
+    """Post the given families (names from CONSTRAINT_FAMILIES) on ctx.model, in posting order"""
+    for family in select_families(families):
+        if family in ctx.families:
+            raise ValueError(f"Constraint family '{family}' is already posted")
+        FAMILY_BUILDERS[family](ctx)
+        ctx.families += (family,)
+
+# ============================================================================
+# TIME GRID FAMILIES
+# ============================================================================
+
+def _weekly(ctx, schedule):
+    return [schedule[day][period] for day in ctx.DAYS for period in ctx.TEACHING_PERIODS[day]]
+
+
+def add_pe_periods(ctx):
+    """Each team gets exactly 3 PE periods per week"""
+    for team_num in ctx.team_numbers:
+        add_rule_constraint(ctx.model, ctx.rule_constraints, ctx.rules, 'pe_periods_per_week',
+                            _weekly(ctx, ctx.team_pe_schedule[team_num]), '==')
+
+
+def add_meeting_slots(ctx):
+    """Each team has exactly 2 team meetings per week, on different days and only during its PE"""
+    model = ctx.model
+    for team_num in ctx.team_numbers:
+        meetings = ctx.team_meeting_schedule[team_num]
+        add_rule_constraint(model, ctx.rule_constraints, ctx.rules, 'team_meetings_per_week',
+                            _weekly(ctx, meetings), '==')
+        for day in ctx.DAYS:
+            model.Add(sum(meetings[day].values()) <= 1)
+            for period in ctx.TEACHING_PERIODS[day]:
+                model.Add(meetings[day][period] <= ctx.team_pe_schedule[team_num][day][period])
+
+
+def add_advisory_slots(ctx):
+    """
+    Each team gets exactly 2 advisory periods per week; its advisory slots
+    pair days with period numbers one to one
+    """
+    model = ctx.model
+    period_numbers = sorted({period for day in ctx.DAYS for period in ctx.TEACHING_PERIODS[day]})
+    for team_num in ctx.team_numbers:
+        advisory = ctx.team_advisory_schedule[team_num]
+        add_rule_constraint(model, ctx.rule_constraints, ctx.rules, 'advisory_periods_per_week',
+                            _weekly(ctx, advisory), '==')
+        for day in ctx.DAYS:
+            model.Add(sum(advisory[day].values()) <= 1)
+        for period in period_numbers:
+            model.Add(sum(advisory[day][period] for day in ctx.DAYS if period in ctx.TEACHING_PERIODS[day]) <= 1)
+
+
+def add_pe_capacity(ctx):
+    """Only so many teams can have PE at a time (gym / PE staff capacity)"""
+    for day in ctx.DAYS:
+        for period in ctx.TEACHING_PERIODS[day]:
+            add_rule_constraint(ctx.model, ctx.rule_constraints, ctx.rules, 'pe_teams_per_period',
+                                [ctx.team_pe_schedule[team_num][day][period] for team_num in ctx.team_numbers], '<=')
+
+
+def add_elective_count(ctx):
+    """Exactly 2 elective periods per week for the whole school"""
+    add_rule_constraint(ctx.model, ctx.rule_constraints, ctx.rules, 'elective_periods_per_week',
+                        _weekly(ctx, ctx.elective_schedule), '==')
+
+# ============================================================================
+# MODEL FAMILIES
+# ============================================================================
+
+def add_teaching_activity(ctx):
+    """A teacher with a class in a slot has the Extra Prep activity (intervals: the timelines)"""
+    if ctx.intervals:
+        return
+    for t in range(len(ctx.ALL_TEACHERS)):
+        for s in range(len(ctx.SLOTS)):
+            ctx.model.Add(ctx.activity[t, s] == ctx.CODE['Extra Prep']).OnlyEnforceIf(ctx.teaching[t, s])
+
+
+def add_class_capacity(ctx):
+    """
+    One teacher per class per period (intervals: the class timelines). A
+    core or literacy teacher's single class at a time comes with their
+    teaching flag, which is the sum of their lessons.
+
+    team_counts: at most one teacher per class of a team, none while the
+    team has PE (the PE teachers have every class)
+    """
+    model = ctx.model
+    if not ctx.aggregated:
+        for c in (range(len(ctx.CLASSES)) if not ctx.intervals else []):
+            for s in range(len(ctx.SLOTS)):
+                model.Add(cp_model.LinearExpr.Sum(list(ctx.assign[ctx.class_rows[c], c, s])) <= 1)
+        return
+    for k, team_num in enumerate(ctx.team_numbers):
+        team_size = len(ctx.TEAMS[team_num])
+        rows = ctx.team_rows[k]
+        for s in range(len(ctx.SLOTS)):
+            team_lessons = cp_model.LinearExpr.Sum(list(ctx.lessons[rows, k, s]))
+            model.Add(team_lessons <= team_size)
+            model.Add(team_lessons == 0).OnlyEnforceIf(ctx.team_pe[k, s])
+
+
+def add_no_repeat(ctx):
+    """
+    No repeat classes same day (except PE); team_counts: a teacher sees at
+    most every class of the team once a day
+    """
+    model = ctx.model
+    if not ctx.aggregated:
+        for t, teacher in enumerate(ctx.ALL_TEACHERS):
+            if ctx.teachers[teacher].kind != 'pe':
+                for day in ctx.DAYS:
+                    slots = ctx.day_slots[day]
+                    for c in ctx.eligible_rows[t]:
+                        model.Add(cp_model.LinearExpr.Sum(list(ctx.assign[t, c, slots])) <= 1)
+        return
+    for k, team_num in enumerate(ctx.team_numbers):
+        team_size = len(ctx.TEAMS[team_num])
+        for t in ctx.team_rows[k]:
+            for day in ctx.DAYS:
+                model.Add(cp_model.LinearExpr.Sum(list(ctx.lessons[t, k, ctx.day_slots[day]])) <= team_size)
+
+
+def add_core_subjects(ctx):
+    """Each core teacher teaches each of their team's classes exactly 4 times per week"""
+    model = ctx.model
+    for team in ctx.instance.teams.values():
+        for teacher in team.core_teachers:
+            t = ctx.teachers[teacher].index
+            if not ctx.aggregated:
+                for class_name in team.classes:
+                    add_rule_constraint(model, ctx.rule_constraints, ctx.rules, 'core_periods_per_week',
+                                        list(ctx.assign[t, ctx.class_index[class_name]]), '==')
+            elif teacher in ctx.team_teaching and team.number in ctx.team_teaching[teacher]:
+                # Core periods x team classes lessons to the team per week
+                weekly = list(ctx.lessons[t, team.index])
+                model.Add(cp_model.LinearExpr.Sum(weekly) == ctx.rules['core_periods_per_week'] * len(team.classes))
+
+
+def add_literacy(ctx):
+    """
+    Each literacy teacher teaches every class of the teams they serve exactly
+    2 times per week; the once-a-day limit is no_repeat. Literacy teachers
+    never have team meetings: Team_Meeting is not in their activity domain.
+    """
+    model = ctx.model
+    if not ctx.aggregated:
+        for literacy_teacher, assigned_classes in ctx.instance.literacy_classes.items():
+            t = ctx.teachers[literacy_teacher].index
+            for class_name in assigned_classes:
+                add_rule_constraint(model, ctx.rule_constraints, ctx.rules, 'literacy_periods_per_week',
+                                    list(ctx.assign[t, ctx.class_index[class_name]]), '==')
+        return
+    for literacy_teacher in ctx.instance.teacher_names('literacy'):
+        for team_num in ctx.team_teaching.get(literacy_teacher, {}):
+            team = ctx.instance.teams[team_num]
+            weekly = list(ctx.lessons[ctx.teachers[literacy_teacher].index, team.index])
+            model.Add(cp_model.LinearExpr.Sum(weekly) == ctx.rules['literacy_periods_per_week'] * len(team.classes))
+
+
+def add_pe_coverage(ctx):
+    """
+    A class has exactly one PE teacher when its team has PE and none
+    otherwise; team_counts: the PE teachers cover exactly the team's classes
+    """
+    model = ctx.model
+    if not ctx.aggregated:
+        for c in range(len(ctx.CLASSES)):
+            for s in range(len(ctx.SLOTS)):
+                model.Add(cp_model.LinearExpr.Sum(list(ctx.assign[ctx.pe_rows, c, s])) ==
+                          ctx.team_pe[ctx.class_team[c], s])
+        return
+    for k, team_num in enumerate(ctx.team_numbers):
+        for s in range(len(ctx.SLOTS)):
+            counts = list(ctx.pe_count[:, k, s])
+            model.Add(cp_model.LinearExpr.Sum(counts) == len(ctx.TEAMS[team_num])).OnlyEnforceIf(ctx.team_pe[k, s])
+            for count in counts:
+                model.Add(count == 0).OnlyEnforceIf(ctx.team_pe[k, s].Not())
+
+
+def add_pe_class_load(ctx):
+    """PE teachers can teach up to 2 classes at once"""
+    for p, t in enumerate(ctx.pe_rows):
+        for s in range(len(ctx.SLOTS)):
+            class_assignments = list(ctx.assign[t, :, s]) if not ctx.aggregated else list(ctx.pe_count[p, :, s])
+            add_rule_constraint(ctx.model, ctx.rule_constraints, ctx.rules, 'max_classes_per_pe_teacher',
+                                class_assignments, '<=')
+
+
+def add_team_meetings(ctx):
+    """
+    Core teachers (not literacy teachers) have a team meeting exactly when
+    their team has one, 2 a week; PE teachers get Extra Prep during every
+    team meeting (intervals: the timelines)
+    """
+    if ctx.intervals:
+        return
+    model, activity, CODE = ctx.model, ctx.activity, ctx.CODE
+    for teacher in ctx.instance.teacher_names('core'):
+        t = ctx.teachers[teacher].index
+        weekly_team_meetings = []
+        for s, (day, period) in enumerate(ctx.SLOTS):
+            is_team_meeting = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_team_meeting')
+            model.Add(activity[t, s] == CODE['Team_Meeting']).OnlyEnforceIf(is_team_meeting)
+            model.Add(activity[t, s] != CODE['Team_Meeting']).OnlyEnforceIf(is_team_meeting.Not())
+            weekly_team_meetings.append(is_team_meeting)
+        add_rule_constraint(model, ctx.rule_constraints, ctx.rules, 'team_meetings_per_week',
+                            weekly_team_meetings, '==')
+
+    for team in ctx.instance.teams.values():
+        core_rows = [ctx.teachers[teacher].index for teacher in team.core_teachers]
+        for s in range(len(ctx.SLOTS)):
+            for t in core_rows:
+                model.Add(activity[t, s] == CODE['Team_Meeting']).OnlyEnforceIf(ctx.meeting[team.index, s])
+                model.Add(activity[t, s] != CODE['Team_Meeting']).OnlyEnforceIf(ctx.meeting[team.index, s].Not())
+
+    for k in range(len(ctx.team_numbers)):
+        for s in range(len(ctx.SLOTS)):
+            for t in ctx.pe_rows:
+                model.Add(activity[t, s] == CODE['Extra Prep']).OnlyEnforceIf(ctx.meeting[k, s])
+
+
+def add_discipline(ctx):
+    """
+    Each subject (core subjects and Literacy) has exactly 1 discipline
+    meeting per week, never while one of its teachers teaches, and all its
+    teachers attend; every core and literacy teacher has exactly one a week
+    (intervals: attendance is on the timelines)
+    """
+    model, activity, CODE = ctx.model, ctx.activity, ctx.CODE
+    for subject, schedule in ctx.discipline_schedule.items():
+        weekly_discipline = [schedule[day][period] for day, period in ctx.SLOTS]
+        model.Add(cp_model.LinearExpr.Sum(weekly_discipline) == 1)
+    if ctx.intervals:
+        return
+
+    for subject, rows in ctx.subject_rows.items():
+        for s, (day, period) in enumerate(ctx.SLOTS):
+            discipline = ctx.discipline_schedule[subject][day][period]
+            teachers_teaching = list(ctx.teaching[rows, s])
+
+            # any_teacher_teaching = True if ANY teacher is teaching
+            any_teacher_teaching = model.NewBoolVar(f'{subject}_any_teacher_teaching_{day}_P{period}')
+            model.AddBoolOr(teachers_teaching).OnlyEnforceIf(any_teacher_teaching)
+            model.AddBoolAnd([var.Not() for var in teachers_teaching]).OnlyEnforceIf(any_teacher_teaching.Not())
+
+            # Discipline meeting CANNOT happen when any teacher is teaching
+            model.Add(discipline == 0).OnlyEnforceIf(any_teacher_teaching)
+            for t in rows:
+                model.Add(activity[t, s] == CODE['Discipline_Meeting']).OnlyEnforceIf(discipline)
+
+    for teacher in ctx.ALL_TEACHERS:
+        if ctx.teachers[teacher].kind not in ('core', 'literacy'):
+            continue
+        t = ctx.teachers[teacher].index
+        weekly_discipline = []
+        for s, (day, period) in enumerate(ctx.SLOTS):
+            is_discipline = model.NewBoolVar(f'{teacher}_{day}_P{period}_discipline_exactly_one')
+            model.Add(activity[t, s] == CODE['Discipline_Meeting']).OnlyEnforceIf(is_discipline)
+            model.Add(activity[t, s] != CODE['Discipline_Meeting']).OnlyEnforceIf(is_discipline.Not())
+            weekly_discipline.append(is_discipline)
+        model.Add(cp_model.LinearExpr.Sum(weekly_discipline) == 1)
+
+
+def add_advisory(ctx):
+    """
+    A teacher's Advisory activity is their advisory channel; a literacy
+    teacher has the weekly advisory count too, so the teams they serve hold
+    their advisories in the same slots; while a team has advisory none of
+    its classes has a lesson with a core or literacy teacher (intervals: the
+    activity and the class blocking are the timelines)
+    """
+    model, activity, CODE = ctx.model, ctx.activity, ctx.CODE
+    if not ctx.intervals:
+        for t, teacher in enumerate(ctx.ALL_TEACHERS):
+            for s, (day, period) in enumerate(ctx.SLOTS):
+                in_advisory = ctx.teacher_advisory[teacher][day].get(period)
+                if in_advisory is None:
+                    # No advisory teams (PE teachers): Advisory is not in the domain
+                    break
+                model.Add(activity[t, s] == CODE['Advisory']).OnlyEnforceIf(in_advisory)
+                model.Add(activity[t, s] != CODE['Advisory']).OnlyEnforceIf(in_advisory.Not())
+
+    for literacy_teacher in ctx.instance.literacy_classes:
+        weekly_advisory = [var for day in ctx.DAYS for var in ctx.teacher_advisory[literacy_teacher][day].values()]
+        add_rule_constraint(model, ctx.rule_constraints, ctx.rules, 'advisory_periods_per_week', weekly_advisory, '==')
+
+    # One constraint per class slot (team_counts: per team slot)
+    variables = ctx.lessons if ctx.aggregated else ctx.assign
+    for k, team_num in enumerate(ctx.team_numbers if not ctx.intervals else []):
+        if ctx.aggregated:
+            blocked = [(ctx.team_rows[k], k)]
+        else:
+            blocked = [(ctx.class_core_rows[ctx.class_index[name]], ctx.class_index[name])
+                       for name in ctx.TEAMS[team_num]]
+        for rows, column in blocked:
+            for s in range(len(ctx.SLOTS)):
+                model.Add(cp_model.LinearExpr.Sum(list(variables[rows, column, s])) == 0
+                          ).OnlyEnforceIf(ctx.advisory[k, s])
+
+
+def add_electives(ctx):
+    """
+    When the school has an elective every core and literacy teacher has
+    Elective and every PE teacher Extra Prep (intervals: the timelines)
+    """
+    if ctx.intervals:
+        return
+    elective_codes = [ctx.CODE['Extra Prep'] if ctx.teachers[teacher].kind == 'pe' else ctx.CODE['Elective']
+                      for teacher in ctx.ALL_TEACHERS]
+    for s in range(len(ctx.SLOTS)):
+        for t, code in enumerate(elective_codes):
+            ctx.model.Add(ctx.activity[t, s] == code).OnlyEnforceIf(ctx.elective[s])
+
+
+def add_event_timelines(ctx):
+    """
+    Intervals encoding: every teaching slot is one unit on a week-long
+    timeline. Each event a teacher or class can be busy with - a lesson, a
+    prep, a team or discipline meeting, an advisory, an elective - is an
+    optional unit interval whose presence is the event's slot literal.
+    One AddNoOverlap per teacher and per class replaces the reified
+    implications, and the activity is the code of the (single) present
+    event; teaching and idle slots are Extra Prep.
+    """
+    if not ctx.intervals:
+        return
+    model, SLOTS, CODE, teachers = ctx.model, ctx.SLOTS, ctx.CODE, ctx.teachers
+    instance = ctx.instance
+
+    def unit(literal, s, label):
+        day, period = SLOTS[s]
+        return model.NewOptionalFixedSizeIntervalVar(s, 1, literal, f'{label}_{day}_P{period}_interval')
+
+    # Core teachers attend their teams' meetings; core and literacy
+    # teachers attend their subject's discipline meeting
+    meeting_teams = {
+        name: [team_num for team_num in record.teams if team_num in instance.teams]
+        for name, record in teachers.items() if record.kind == 'core' and record.subject in ctx.CORE_SUBJECTS
+    }
+
+    for t, teacher in enumerate(ctx.ALL_TEACHERS):
+        timeline = []
+        for s, (day, period) in enumerate(SLOTS):
+            is_prep = ctx.teacher_prep[teacher][day][period]
+            events = [(CODE['Prep'], is_prep, 'prep')]
+            if teachers[teacher].kind == 'pe':
+                # PE teachers keep teaching through electives and the
+                # meetings held during PE, but get no prep then; their
+                # lessons stay off the timeline so they can overlap an
+                # elective, and rule out the prep directly
+                events.append((None, ctx.elective[s], 'elective'))
+                for k in range(len(ctx.team_numbers)):
+                    model.AddImplication(ctx.meeting[k, s], is_prep.Not())
+                model.AddImplication(ctx.teaching[t, s], is_prep.Not())
+            else:
+                events.append((CODE['Extra Prep'], ctx.teaching[t, s], 'teaching'))
+                events.append((CODE['Elective'], ctx.elective[s], 'elective'))
+                events.extend(
+                    (CODE['Team_Meeting'], ctx.meeting[instance.teams[team_num].index, s], f'team_{team_num}_meeting')
+                    for team_num in meeting_teams.get(teacher, []))
+                subject = teachers[teacher].subject
+                if subject in ctx.discipline_schedule:
+                    events.append((CODE['Discipline_Meeting'], ctx.discipline_schedule[subject][day][period],
+                                   f'{subject}_discipline'))
+                if period in ctx.teacher_advisory[teacher][day]:
+                    events.append((CODE['Advisory'], ctx.teacher_advisory[teacher][day][period], 'advisory'))
+            timeline.extend(unit(literal, s, f'{teacher}_{label}') for _, literal, label in events)
+            model.Add(ctx.activity[t, s] == sum(code * literal for code, literal, _ in events if code))
+        model.AddNoOverlap(timeline)
+
+    # Class timelines: a lesson with a core or literacy teacher and the
+    # team's advisory. A PE lesson takes the class's slot as well (the
+    # one-teacher row below); PE blocks stay off the timeline, since
+    # the Boolean encoding lets them share a slot with an advisory or
+    # an elective. team_counts has no class variables: its team
+    # capacity constraints cover lessons and the teacher timelines
+    # keep a team's teachers out of lessons during its advisory.
+    for k, team_num in enumerate(ctx.team_numbers if not ctx.aggregated else []):
+        for class_name in ctx.TEAMS[team_num]:
+            c = ctx.class_index[class_name]
+            timeline = []
+            for s, (day, period) in enumerate(SLOTS):
+                lesson = model.NewBoolVar(f'{class_name}_has_lesson_{day}_P{period}')
+                model.Add(lesson == cp_model.LinearExpr.Sum(list(ctx.assign[ctx.class_core_rows[c], c, s])))
+                model.Add(lesson + cp_model.LinearExpr.Sum(list(ctx.assign[ctx.pe_rows, c, s])) <= 1)
+                timeline.append(unit(lesson, s, f'{class_name}_lesson'))
+                timeline.append(unit(ctx.advisory[k, s], s, f'{class_name}_advisory'))
+            model.AddNoOverlap(timeline)
+
+
+def add_pe_load(ctx):
+    """Each PE teacher teaches 15-25 class periods per week"""
+    for p, t in enumerate(ctx.pe_rows):
+        weekly_teaching = list((ctx.pe_count[p] if ctx.aggregated else ctx.assign[t]).ravel())
+        add_rule_constraint(ctx.model, ctx.rule_constraints, ctx.rules, 'pe_load_min', weekly_teaching, '>=')
+        add_rule_constraint(ctx.model, ctx.rule_constraints, ctx.rules, 'pe_load_max', weekly_teaching, '<=')
+
+
+def add_daily_patterns(ctx):
+    """
+    One prep per day and no more than MAX_INTENSIVE_IN_A_ROW intensive
+    periods in a row: each teaching slot gets prep / intensive flags read off
+    the activity and teaching variables. In team_counts the flags of a
+    teacher-day must match one of the precomputed legal day patterns; the
+    classes model keeps the prep count and the run windows as linear
+    constraints, since the pattern table made it far slower to solve.
+    """
+    model, activity, CODE, SLOTS = ctx.model, ctx.activity, ctx.CODE, ctx.SLOTS
+    for t, teacher in enumerate(ctx.ALL_TEACHERS):
+        has_elective = CODE['Elective'] in ctx.domains['activities'][teacher]
+        for day in ctx.DAYS:
+            windowed = windowed_periods(ctx.TEACHING_PERIODS[day])
+            prep_flags = []
+            intensive_flags = []
+            for s in ctx.day_slots[day]:
+                period = SLOTS[s][1]
+                if ctx.intervals:
+                    is_prep = ctx.teacher_prep[teacher][day][period]
+                else:
+                    is_prep = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_prep')
+                    model.Add(activity[t, s] == CODE['Prep']).OnlyEnforceIf(is_prep)
+                    model.Add(activity[t, s] != CODE['Prep']).OnlyEnforceIf(is_prep.Not())
+                prep_flags.append(is_prep)
+                if period not in windowed:
+                    continue
+
+                # Intensive: teaching, advisory (from the advisory channel) or elective
+                flags = [ctx.teaching[t, s]]
+                if not ctx.intervals and has_elective:
+                    is_elective = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_elective')
+                    model.Add(activity[t, s] == CODE['Elective']).OnlyEnforceIf(is_elective)
+                    model.Add(activity[t, s] != CODE['Elective']).OnlyEnforceIf(is_elective.Not())
+                    flags.append(is_elective)
+                elif ctx.teachers[teacher].kind != 'pe':
+                    flags.append(ctx.elective[s])
+                is_intensive = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_intensive')
+                if period in ctx.teacher_advisory[teacher][day]:
+                    flags.append(ctx.teacher_advisory[teacher][day][period])
+                model.AddBoolOr(flags).OnlyEnforceIf(is_intensive)
+                model.AddBoolAnd([flag.Not() for flag in flags]).OnlyEnforceIf(is_intensive.Not())
+                intensive_flags.append(is_intensive)
+
+            if ctx.aggregated:
+                model.AddAllowedAssignments(prep_flags + intensive_flags,
+                                            pattern_flags(tuple(ctx.TEACHING_PERIODS[day])))
+                continue
+            model.Add(sum(prep_flags) == 1)
+            intensive = dict(zip(windowed, intensive_flags))
+            for run in consecutive_runs(windowed):
+                for i in range(len(run) - MAX_INTENSIVE_IN_A_ROW):
+                    model.Add(sum(intensive[period] for period in run[i:i + MAX_INTENSIVE_IN_A_ROW + 1])
+                              <= MAX_INTENSIVE_IN_A_ROW)
+
+
+FAMILY_BUILDERS = {
+    'pe_periods': add_pe_periods,
+    'meeting_slots': add_meeting_slots,
+    'advisory_slots': add_advisory_slots,
+    'pe_capacity': add_pe_capacity,
+    'elective_count': add_elective_count,
+    'teaching_activity': add_teaching_activity,
+    'class_capacity': add_class_capacity,
+    'no_repeat': add_no_repeat,
+    'core_subjects': add_core_subjects,
+    'literacy': add_literacy,
+    'pe_coverage': add_pe_coverage,
+    'pe_class_load': add_pe_class_load,
+    'team_meetings': add_team_meetings,
+    'discipline': add_discipline,
+    'advisory': add_advisory,
+    'electives': add_electives,
+    'event_timelines': add_event_timelines,
+    'pe_load': add_pe_load,
+    'daily_patterns': add_daily_patterns
+}
@@ -0,0 +1,610 @@
+import random
+import time
+
+from international_highschool_scheduler import (
+    DEFAULT_RULES, MAX_INTENSIVE_IN_A_ROW, consecutive_runs, is_constant, windowed_periods
+)
+from day_decomposition import SolvedValues, teacher_roles
+
+# ============================================================================
+# GREEDY CONSTRUCTIVE TIMETABLE
+# ============================================================================
+
+# A timetable is built in the order the model's structure depends on itself:
+#   1. school-wide electives,
+#   2. team PE blocks (and the PE teachers' classes), team meetings inside them,
+#   3. advisories (teams sharing a literacy teacher share them), then one
+#      discipline meeting per subject,
+#   4. core and literacy lessons, one team at a time, as a min-cost flow
+#      teacher -> teacher-day -> teacher-run -> team slot, whose capacities
+#      keep a slot free for the prep and respect the intensive-run limit,
+#   5. preps, picked to break intensive runs, and swap repairs for any run
+#      still too long.
+# Each pass is randomised; passes repeat until one has no issues or the
+# attempt / time budget runs out, and the best pass is kept. The result
+# seeds CP-SAT through AddHint (see timetable_hints).
+
+DEFAULT_ATTEMPTS = 40
+DEFAULT_TIME_BUDGET = 0.5
+
+# Discipline slots tried against the lesson flows before settling for the first
+MAX_DISCIPLINE_CHECKS = 8
+
+
+def _intensive_room(run):
+    """Most intensive periods a run can hold (no more than MAX_INTENSIVE_IN_A_ROW in a row)"""
+    return len(run) - len(run) // (MAX_INTENSIVE_IN_A_ROW + 1)
+
+
+class _Attempt:
+    """One randomised construction pass"""
+
+    def __init__(self, data, roles, rules, rng):
+        self.data = data
+        self.roles = roles
+        self.rules = rules
+        self.rng = rng
+        self.days = data['DAYS']
+        self.periods = data['TEACHING_PERIODS']
+        self.slots = [(day, period) for day in self.days for period in self.periods[day]]
+        self.team_numbers = sorted(data['TEAMS'])
+        self.size = {team_num: len(classes) for team_num, classes in data['TEAMS'].items()}
+        self.windows = {
+            day: [run[i:i + MAX_INTENSIVE_IN_A_ROW + 1]
+                  for run in consecutive_runs(periods) for i in range(len(run) - MAX_INTENSIVE_IN_A_ROW)]
+            for day, periods in self.periods.items()
+        }
+
+        # busy[teacher][slot]: fixed activity (meeting, advisory, elective, ...)
+        self.busy = {teacher: {} for teacher in data['ALL_TEACHERS']}
+        self.teaching = {teacher: set() for teacher in data['ALL_TEACHERS']}
+        self.prep = {teacher: {} for teacher in data['ALL_TEACHERS']}
+        self.electives = set()
+        self.team_pe = {team_num: set() for team_num in self.team_numbers}
+        self.meetings = {team_num: set() for team_num in self.team_numbers}
+        self.advisory = {team_num: set() for team_num in self.team_numbers}
+        self.discipline = {}
+        self.lessons = {
+            (teacher, team_num): set()
+            for teacher, role in roles.items() for team_num in role['teams']
+        }
+        self.pe_counts = {
+            (pe_teacher, team_num): {} for pe_teacher in data['PE_TEACHERS'] for team_num in self.team_numbers
+        }
+        self.issues = []
+
+    # ------------------------------------------------------------------
+    # Slot bookkeeping
+    # ------------------------------------------------------------------
+
+    def blocked(self, team_num, slot):
+        """The team has no lessons in the slot"""
+        return slot in self.electives or slot in self.team_pe[team_num] or slot in self.advisory[team_num]
+
+    def free(self, teacher, slot):
+        return slot not in self.busy[teacher] and slot not in self.teaching[teacher]
+
+    def intensive(self, teacher, slot):
+        return slot in self.teaching[teacher] or self.busy[teacher].get(slot) in ('Advisory', 'Elective')
+
+    def lesson_slot(self, teacher, slot):
+        return any(not self.blocked(team_num, slot) for team_num in self.roles[teacher]['teams'])
+
+    def structure_excess(self, team_num, day):
+        """Blocked slots beyond what the day needs so no teacher teaches more than once per class"""
+        needed = len(self.periods[day]) - (self.size[team_num] + 1)
+        return sum(1 for period in self.periods[day] if self.blocked(team_num, (day, period))) - needed
+
+    def day_room(self, teacher, day):
+        """Lessons the teacher can still take on a day, leaving a free slot for the prep"""
+        free = [period for period in self.periods[day] if self.free(teacher, (day, period))]
+        lesson_free = [period for period in free if self.lesson_slot(teacher, (day, period))]
+        spare = len(free) > len(lesson_free)
+        return max(len(lesson_free) - (0 if spare else 1), 0)
+
+    def run_room(self, teacher, day, run):
+        return max(_intensive_room(run) - sum(1 for period in run if self.intensive(teacher, (day, period))), 0)
+
+    def overfull_windows(self, teacher, day):
+        return [window for window in self.windows[day]
+                if all(self.intensive(teacher, (day, period)) for period in window)]
+
+    # ------------------------------------------------------------------
+    # 1. Electives
+    # ------------------------------------------------------------------
+
+    def place_electives(self):
+        days = sorted(self.days, key=lambda day: (-len(self.periods[day]), self.rng.random()))
+        for i in range(self.rules['elective_periods_per_week']):
+            day = days[i % len(days)]
+            open_periods = [period for period in self.periods[day] if (day, period) not in self.electives]
+            if not open_periods:
+                self.issues.append(f"No period left for an elective on {day}")
+                continue
+            # Electives are intensive: keep them out of the runs the limit applies to
+            short = [period for period in open_periods if period not in windowed_periods(self.periods[day])]
+            slot = (day, self.rng.choice(short or open_periods))
+            self.electives.add(slot)
+            for teacher, role in self.roles.items():
+                self.busy[teacher][slot] = 'Extra Prep' if role['pe'] else 'Elective'
+
+    # ------------------------------------------------------------------
+    # 2. PE blocks and team meetings
+    # ------------------------------------------------------------------
+
+    def place_pe(self):
+        pe_teachers = self.data['PE_TEACHERS']
+        pe_capacity = len(pe_teachers) * self.rules['max_classes_per_pe_teacher']
+        teams_in_slot = {}
+        teams = list(self.team_numbers)
+        self.rng.shuffle(teams)
+
+        for team_num in teams:
+            if self.size[team_num] > pe_capacity:
+                self.issues.append(f"Team {team_num} has more classes than the PE teachers can take")
+            for _ in range(self.rules['pe_periods_per_week']):
+                best = None
+                for slot in self.slots:
+                    day, period = slot
+                    if (slot in self.electives or slot in self.team_pe[team_num]
+                            or teams_in_slot.get(slot, 0) >= self.rules['pe_teams_per_period']):
+                        continue
+                    pe_day = [p for p in self.periods[day] if teams_in_slot.get((day, p))]
+                    # PE teachers keep a prep and the run limit
+                    if len(pe_day) + 1 >= len(self.periods[day]) or any(
+                            all(p in pe_day or p == period for p in window) for window in self.windows[day]):
+                        continue
+                    score = (
+                        any(s[0] == day for s in self.team_pe[team_num]),
+                        self.structure_excess(team_num, day),
+                        period not in windowed_periods(self.periods[day]),
+                        len(pe_day),
+                        self.rng.random()
+                    )
+                    if best is None or score < best[0]:
+                        best = (score, slot)
+                if best is None:
+                    self.issues.append(f"No PE slot left for team {team_num}")
+                    continue
+                slot = best[1]
+                self.team_pe[team_num].add(slot)
+                teams_in_slot[slot] = teams_in_slot.get(slot, 0) + 1
+                self.split_pe_classes(team_num, slot)
+
+        self.place_meetings()
+
+    def split_pe_classes(self, team_num, slot):
+        """Share the team's classes among the PE teachers, least loaded first"""
+        day, _ = slot
+        remaining = self.size[team_num]
+        order = sorted(
+            self.data['PE_TEACHERS'],
+            key=lambda pe: (not self.free(pe, slot),
+                            sum(sum(counts.values()) for (p, _), counts in self.pe_counts.items() if p == pe),
+                            self.rng.random())
+        )
+        for pe_teacher in order:
+            if not remaining or not self.free(pe_teacher, slot):
+                continue
+            count = min(remaining, self.rules['max_classes_per_pe_teacher'])
+            self.pe_counts[(pe_teacher, team_num)][slot] = count
+            self.teaching[pe_teacher].add(slot)
+            remaining -= count
+        if remaining:
+            self.issues.append(f"Team {team_num} PE on {day} P{slot[1]} is {remaining} class(es) short")
+
+    def place_meetings(self):
+        for team_num in self.team_numbers:
+            pe_slots = sorted(self.team_pe[team_num])
+            self.rng.shuffle(pe_slots)
+            days = set()
+            for slot in pe_slots:
+                if len(self.meetings[team_num]) == self.rules['team_meetings_per_week']:
+                    break
+                if slot[0] in days:
+                    continue
+                days.add(slot[0])
+                self.meetings[team_num].add(slot)
+                for teacher, role in self.roles.items():
+                    if team_num in role['meeting_teams']:
+                        self.busy[teacher][slot] = 'Team_Meeting'
+                for pe_teacher in self.data['PE_TEACHERS']:
+                    if self.free(pe_teacher, slot):
+                        self.busy[pe_teacher][slot] = 'Extra Prep'
+            if len(self.meetings[team_num]) < self.rules['team_meetings_per_week']:
+                self.issues.append(f"Team {team_num} has PE on too few days for its meetings")
+
+    # ------------------------------------------------------------------
+    # 3. Advisories and discipline meetings
+    # ------------------------------------------------------------------
+
+    def advisory_groups(self):
+        """Teams linked by a shared literacy teacher hold advisory together"""
+        group_of = {team_num: {team_num} for team_num in self.team_numbers}
+        for role in self.roles.values():
+            if role['literacy'] and role['teams']:
+                merged = set().union(*(group_of[team_num] for team_num in role['teams']))
+                for team_num in merged:
+                    group_of[team_num] = merged
+        groups = []
+        for group in group_of.values():
+            if group not in groups:
+                groups.append(group)
+        return [sorted(group) for group in groups]
+
+    def place_advisories(self):
+        for group in self.advisory_groups():
+            members = [t for t, role in self.roles.items() if set(role['advisory_teams']) & set(group)]
+            days, periods = set(), set()
+            for _ in range(self.rules['advisory_periods_per_week']):
+                best = None
+                for slot in self.slots:
+                    day, period = slot
+                    if day in days or period in periods or slot in self.electives:
+                        continue
+                    if any(slot in self.team_pe[team_num] for team_num in group):
+                        continue
+                    if not all(self.free(teacher, slot) for teacher in members):
+                        continue
+                    score = (
+                        max(self.structure_excess(team_num, day) for team_num in group),
+                        period in windowed_periods(self.periods[day]),
+                        self.rng.random()
+                    )
+                    if best is None or score < best[0]:
+                        best = (score, slot)
+                if best is None:
+                    self.issues.append(f"No advisory slot left for teams {group}")
+                    continue
+                slot = best[1]
+                days.add(slot[0])
+                periods.add(slot[1])
+                for team_num in group:
+                    self.advisory[team_num].add(slot)
+                for teacher in members:
+                    self.busy[teacher][slot] = 'Advisory'
+
+    def place_discipline(self):
+        """One meeting per subject, in a slot that still leaves every team's lessons a feasible flow"""
+        subjects = list(self.data['CORE_SUBJECTS']) + ['Literacy']
+        for subject in subjects:
+            members = [t for t, role in self.roles.items() if subject in role['subjects']]
+            if not members:
+                continue
+            teams = {team_num for teacher in members for team_num in self.roles[teacher]['teams']}
+            groups = [group for group in self.advisory_groups() if teams & set(group)]
+            candidates = [slot for slot in self.slots if all(self.free(teacher, slot) for teacher in members)]
+            if not candidates:
+                self.issues.append(f"No common free slot for the {subject} discipline meeting")
+                continue
+            # Prefer slots where few members would miss a lesson slot and days with few meetings yet
+            candidates.sort(key=lambda slot: (
+                sum(1 for teacher in members if self.lesson_slot(teacher, slot)),
+                sum(1 for other in self.discipline.values() if other[0] == slot[0]),
+                slot[1] not in windowed_periods(self.periods[slot[0]]),
+                self.rng.random()
+            ))
+            chosen = candidates[0]
+            for slot in candidates[:MAX_DISCIPLINE_CHECKS]:
+                for teacher in members:
+                    self.busy[teacher][slot] = 'Discipline_Meeting'
+                feasible = all(self.lesson_flow(group, commit=False) for group in groups)
+                for teacher in members:
+                    del self.busy[teacher][slot]
+                if feasible:
+                    chosen = slot
+                    break
+            self.discipline[subject] = chosen
+            for teacher in members:
+                self.busy[teacher][chosen] = 'Discipline_Meeting'
+
+    # ------------------------------------------------------------------
+    # 4. Lessons
+    # ------------------------------------------------------------------
+
+    def place_lessons(self):
+        for group in self.advisory_groups():
+            if not self.lesson_flow(group):
+                self.issues.append(f"Teams {group}: some lessons unplaced")
+        for (teacher, team_num), slots in self.lessons.items():
+            for day in self.days:
+                if sum(1 for slot in slots if slot[0] == day) > self.size[team_num]:
+                    self.issues.append(f"{teacher} sees a class of team {team_num} twice on {day}")
+
+    def lesson_flow(self, group, commit=True):
+        """
+        Place the core and literacy lessons of teams sharing a literacy teacher
+
+        Min-cost flow source -> teacher -> day -> run -> period -> team slot
+        -> team -> sink. Teacher-period nodes keep a literacy teacher in one
+        slot at a time; team arcs carry exactly the team's lessons, so when
+        every lesson fits each team gets its own literacy share.
+
+        Returns:
+            True when every lesson fits; with commit the lessons placed are
+            recorded either way
+        """
+        from ortools.graph.python import min_cost_flow
+
+        smcf = min_cost_flow.SimpleMinCostFlow()
+        nodes = {}
+
+        def node(key):
+            return nodes.setdefault(key, len(nodes))
+
+        def arc(tail, head, capacity, cost=0):
+            return smcf.add_arc_with_capacity_and_unit_cost(node(tail), node(head), capacity, cost)
+
+        lesson_arcs = []
+        team_demand = {team_num: 0 for team_num in group}
+        for teacher, role in self.roles.items():
+            teams = [team_num for team_num in role['teams'] if team_num in team_demand]
+            if not teams:
+                continue
+            rule = 'literacy_periods_per_week' if role['literacy'] else 'core_periods_per_week'
+            for team_num in teams:
+                team_demand[team_num] += self.rules[rule] * self.size[team_num]
+            arc('source', teacher, sum(self.rules[rule] * self.size[team_num] for team_num in teams))
+            size = sum(self.size[team_num] for team_num in teams)
+            for day in self.days:
+                arc(teacher, (teacher, day), min(size, self.day_room(teacher, day)))
+                for run in consecutive_runs(self.periods[day]):
+                    arc((teacher, day), (teacher, day, run[0]), self.run_room(teacher, day, run))
+                    for period in run:
+                        slot = (day, period)
+                        if not self.free(teacher, slot):
+                            continue
+                        arc((teacher, day, run[0]), (teacher, slot), 1)
+                        for team_num in teams:
+                            if not self.blocked(team_num, slot):
+                                lesson_arcs.append(
+                                    (arc((teacher, slot), (team_num, slot), 1, self.rng.randint(0, 9)), teacher, team_num, slot))
+        for team_num in group:
+            for slot in self.slots:
+                if not self.blocked(team_num, slot):
+                    arc((team_num, slot), team_num, self.size[team_num])
+            arc(team_num, 'sink', team_demand[team_num])
+
+        demand = sum(team_demand.values())
+        smcf.set_node_supply(node('source'), demand)
+        smcf.set_node_supply(node('sink'), -demand)
+        if smcf.solve_max_flow_with_min_cost() != smcf.OPTIMAL:
+            return False
+        if commit:
+            for index, teacher, team_num, slot in lesson_arcs:
+                if smcf.flow(index):
+                    self.lessons[(teacher, team_num)].add(slot)
+                    self.teaching[teacher].add(slot)
+        return smcf.maximum_flow() == demand
+
+    # ------------------------------------------------------------------
+    # 5. Preps and repairs
+    # ------------------------------------------------------------------
+
+    def place_preps(self):
+        for teacher in self.data['ALL_TEACHERS']:
+            for day in self.days:
+                free = [period for period in self.periods[day] if self.free(teacher, (day, period))]
+                if not free:
+                    self.issues.append(f"{teacher} has no free period for a prep on {day}")
+                    continue
+                overfull = self.overfull_windows(teacher, day)
+                self.prep[teacher][day] = max(free, key=lambda period: (
+                    sum(1 for window in overfull if period in window), self.rng.random()))
+
+    def idle(self, teacher, slot):
+        return self.free(teacher, slot) and self.prep[teacher].get(slot[0]) != slot[1]
+
+    def repair_runs(self):
+        """Swap a lesson out of an overfull run with a teammate who is idle there"""
+        for teacher, role in self.roles.items():
+            if role['pe']:
+                continue
+            for day in self.days:
+                overfull = self.overfull_windows(teacher, day)
+                while overfull and self.swap_out(teacher, day, overfull[0]):
+                    overfull = self.overfull_windows(teacher, day)
+                if overfull:
+                    self.issues.append(
+                        f"{teacher} has more than {MAX_INTENSIVE_IN_A_ROW} intensive periods in a row on {day}")
+
+    def swap_out(self, teacher, day, window):
+        for period in window:
+            slot = (day, period)
+            team_num = next((t for t in self.roles[teacher]['teams'] if slot in self.lessons[(teacher, t)]), None)
+            if team_num is None:
+                continue
+            for other_period in self.periods[day]:
+                other = (day, other_period)
+                if not self.idle(teacher, other) or self.blocked(team_num, other):
+                    continue
+                for mate in self.data['ALL_TEACHERS']:
+                    if (mate == teacher or (mate, team_num) not in self.lessons
+                            or other not in self.lessons[(mate, team_num)] or not self.idle(mate, slot)):
+                        continue
+                    self.move(teacher, team_num, slot, other)
+                    self.move(mate, team_num, other, slot)
+                    if not self.overfull_windows(teacher, day) and not self.overfull_windows(mate, day):
+                        return True
+                    self.move(mate, team_num, slot, other)
+                    self.move(teacher, team_num, other, slot)
+        return False
+
+    def move(self, teacher, team_num, from_slot, to_slot):
+        self.lessons[(teacher, team_num)].remove(from_slot)
+        self.teaching[teacher].remove(from_slot)
+        self.lessons[(teacher, team_num)].add(to_slot)
+        self.teaching[teacher].add(to_slot)
+
+    # ------------------------------------------------------------------
+
+    def run(self):
+        self.place_electives()
+        self.place_pe()
+        self.place_advisories()
+        self.place_discipline()
+        self.place_lessons()
+        self.place_preps()
+        self.repair_runs()
+        return self
+
+    def timetable(self):
+        ACTIVITIES = self.data['ACTIVITIES']
+        activity = {}
+        for teacher in self.data['ALL_TEACHERS']:
+            activity[teacher] = {}
+            for day in self.days:
+                activity[teacher][day] = {}
+                for period in self.data['ALL_PERIODS'][day]:
+                    slot = (day, period)
+                    if period not in self.periods[day]:
+                        name = 'Lunch'
+                    elif slot in self.busy[teacher]:
+                        name = self.busy[teacher][slot]
+                    elif self.prep[teacher].get(day) == period:
+                        name = 'Prep'
+                    else:
+                        name = 'Extra Prep'
+                    activity[teacher][day][period] = ACTIVITIES.index(name)
+        return {
+            'electives': set(self.electives),
+            'team_pe': self.team_pe,
+            'meetings': self.meetings,
+            'advisory': self.advisory,
+            'discipline': self.discipline,
+            'lessons': self.lessons,
+            'pe_counts': self.pe_counts,
+            'activity': activity,
+            'issues': list(self.issues)
+        }
+
+
+def construct_timetable(data, seed=0, max_attempts=DEFAULT_ATTEMPTS, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Greedy timetable for the converted data, for use as solver hints
+
+    Args:
+        data: Output of convert_sheets_data_to_model_format
+        seed: Seed of the first pass; pass i uses seed + i
+        max_attempts: Randomised passes at most
+        time_budget: Seconds after which no new pass starts
+
+    Returns:
+        Timetable dict ('electives', 'team_pe', 'meetings', 'advisory',
+        'discipline', 'lessons', 'pe_counts', 'activity') with 'issues'
+        (empty when every rule the heuristic checks holds), 'attempts' and
+        'seconds'
+    """
+    start = time.perf_counter()
+    rules = dict(DEFAULT_RULES, **(data.get('RULES') or {}))
+    roles = teacher_roles(data)
+
+    best = None
+    attempts = 0
+    while attempts < max_attempts:
+        attempt = _Attempt(data, roles, rules, random.Random(seed + attempts)).run()
+        attempts += 1
+        if best is None or len(attempt.issues) < len(best.issues):
+            best = attempt
+        if not best.issues or time.perf_counter() - start > time_budget:
+            break
+
+    timetable = best.timetable()
+    timetable['attempts'] = attempts
+    timetable['seconds'] = time.perf_counter() - start
+    return timetable
+
+# ============================================================================
+# SOLUTIONS AND HINTS
+# ============================================================================
+
+def _slot_values(data, slots):
+    """{day: {period: 0/1}} over the teaching periods for a set of slots"""
+    return {day: {period: int((day, period) in slots) for period in data['TEACHING_PERIODS'][day]}
+            for day in data['DAYS']}
+
+
+def _team_counts(data, timetable):
+    """team_teaching / pe_class_count values in the team-aggregated model's shape"""
+    TEACHING_PERIODS = data['TEACHING_PERIODS']
+    team_teaching = {}
+    for (teacher, team_num), slots in timetable['lessons'].items():
+        team_teaching.setdefault(teacher, {})[team_num] = _slot_values(data, slots)
+    pe_class_count = {}
+    for (pe_teacher, team_num), counts in timetable['pe_counts'].items():
+        pe_class_count.setdefault(pe_teacher, {})[team_num] = {
+            day: {period: counts.get((day, period), 0) for period in TEACHING_PERIODS[day]} for day in data['DAYS']
+        }
+    return {'team_teaching': team_teaching, 'pe_class_count': pe_class_count}
+
+
+def timetable_solution(data, timetable):
+    """
+    Solution dict for a timetable, shaped like solve_built_model's
+
+    Classes are assigned with class_assignment.assign_classes, so a timetable
+    with unplaced lessons may raise ValueError.
+    """
+    from class_assignment import assign_classes
+
+    return {
+        'solver': SolvedValues(),
+        'teacher_activity': timetable['activity'],
+        'teacher_class_assignment': assign_classes(SolvedValues(), _team_counts(data, timetable), data),
+        'team_advisory_schedule': {
+            team_num: _slot_values(data, slots) for team_num, slots in timetable['advisory'].items()
+        },
+        'elective_schedule': _slot_values(data, timetable['electives'])
+    }
+
+
+def timetable_hints(built, data, timetable):
+    """
+    (variable, value) hints for a model from build_scheduling_model
+
+    Covers the team, elective and discipline schedules, every activity and
+    the lesson variables of the model's formulation, except the pre-fixed
+    constants. Class-level hints are
+    left out when the timetable's lessons cannot be split into classes.
+    """
+    hints = []
+
+    def add(variables, values):
+        for day, day_vars in variables.items():
+            for period, var in day_vars.items():
+                if not is_constant(var):
+                    hints.append((var, values[day][period]))
+
+    for team_num, slots in timetable['team_pe'].items():
+        add(built['team_pe_schedule'][team_num], _slot_values(data, slots))
+        add(built['team_meeting_schedule'][team_num], _slot_values(data, timetable['meetings'][team_num]))
+        add(built['team_advisory_schedule'][team_num], _slot_values(data, timetable['advisory'][team_num]))
+    add(built['elective_schedule'], _slot_values(data, timetable['electives']))
+    for subject, schedule in built['discipline_schedule'].items():
+        slot = timetable['discipline'].get(subject)
+        add(schedule, _slot_values(data, {slot} if slot else set()))
+    for teacher, days in built['teacher_activity'].items():
+        add(days, timetable['activity'][teacher])
+
+    counts = _team_counts(data, timetable)
+    if built.get('formulation') == 'team_counts':
+        for family in ('team_teaching', 'pe_class_count'):
+            for teacher, teams in built[family].items():
+                for team_num, days in teams.items():
+                    add(days, counts[family][teacher][team_num])
+    else:
+        try:
+            assignment = timetable_solution(data, timetable)['teacher_class_assignment']
+        except ValueError:
+            return hints
+        for teacher, classes in built['teacher_class_assignment'].items():
+            for class_name, days in classes.items():
+                add(days, assignment[teacher][class_name])
+    return hints
+
+
+def hint_acceptance(solver, hints):
+    """Share of hinted variables that kept their hinted value in the solution"""
+    if not hints:
+        return None
+    return sum(1 for var, value in hints if solver.Value(var) == value) / len(hints)
@@ -0,0 +1,680 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from international_highschool_scheduler import (
+    DEFAULT_RULES, DEFAULT_SOLVER_PROFILE, MAX_INTENSIVE_IN_A_ROW, consecutive_runs, literacy_team_map,
+    pattern_flags, windowed_periods
+)
+
+# ============================================================================
+# DAY-LEVEL DECOMPOSITION
+# ============================================================================
+
+# Stage one (the week plan) decides, for every day, how many periods of each
+# activity every teacher and team gets:
+#   ('lessons', teacher, team)  lessons of a core/literacy teacher with a team
+#   ('pe', team)                PE periods of a team
+#   ('meeting', team)           team meeting held (0/1)
+#   ('advisory', team, period)  team advisory in that period (0/1)
+#   ('electives',)              school-wide elective periods
+#   ('discipline', subject)     discipline meeting held (0/1)
+#   ('pe_load', pe_teacher)     class-periods taught by a PE teacher
+# Weekly counts and cross-day rules (one meeting/advisory a day, advisories
+# at different period numbers) live here, plus per-day capacity cuts.
+# Stage two fills in each day's timetable from its plan; days are solved
+# independently. Every plan entry is imposed through an assumption literal,
+# so a day that fails reports the entries that conflict and stage one gets a
+# cut forbidding just that combination.
+
+# Rounds of (plan, daily solves) before giving up
+DEFAULT_MAX_ROUNDS = 20
+
+
+class SolvedValues:
+    """Solver stand-in for an assembled solution: values are stored directly"""
+
+    def Value(self, value):
+        return value
+
+
+def teacher_roles(data):
+    """
+    What each teacher takes part in
+
+    Returns:
+        {teacher: {'teams': teams taught (core and literacy lessons),
+        'meeting_teams', 'advisory_teams', 'subjects' (discipline meetings),
+        'literacy': bool, 'pe': bool}}
+    """
+    TEACHERS = data['TEACHERS']
+    roles = {
+        teacher: {'teams': [], 'meeting_teams': [], 'advisory_teams': [], 'subjects': [],
+                  'literacy': False, 'pe': teacher in data['PE_TEACHERS']}
+        for teacher in data['ALL_TEACHERS']
+    }
+    for team_key in sorted(TEACHERS, key=lambda key: int(key.split('_')[1])):
+        team_num = int(team_key.split('_')[1])
+        if team_num not in data['TEAMS']:
+            continue
+        for subject, teacher in TEACHERS[team_key].items():
+            if subject != 'Literacy' and subject not in data['CORE_SUBJECTS']:
+                continue
+            role = roles[teacher]
+            if subject not in role['subjects']:
+                role['subjects'].append(subject)
+            role['advisory_teams'].append(team_num)
+            if subject != 'Literacy':
+                role['teams'].append(team_num)
+                role['meeting_teams'].append(team_num)
+    for teacher, teams in literacy_team_map(TEACHERS).items():
+        roles[teacher]['teams'] = [team_num for team_num in teams if team_num in data['TEAMS']]
+        roles[teacher]['literacy'] = True
+    return roles
+
+
+def intensive_capacity(periods):
+    """Most intensive periods a teacher can have in a day (no more than MAX_INTENSIVE_IN_A_ROW in a row)"""
+    window = MAX_INTENSIVE_IN_A_ROW + 1
+    return sum(len(run) - len(run) // window for run in consecutive_runs(periods))
+
+
+def day_signature(data, day):
+    """Days with the same period structure accept the same plans"""
+    return tuple(data['ALL_PERIODS'][day]), tuple(data['TEACHING_PERIODS'][day])
+
+# ============================================================================
+# STAGE ONE: WEEK PLAN
+# ============================================================================
+
+def build_week_plan(data, roles, rules):
+    """
+    CP-SAT model of the per-day activity counts
+
+    Returns:
+        (model, day_vars) with day_vars[day] = {plan key: variable}
+    """
+    from ortools.sat.python import cp_model
+
+    DAYS = data['DAYS']
+    TEACHING_PERIODS = data['TEACHING_PERIODS']
+    TEAMS = data['TEAMS']
+    team_numbers = sorted(TEAMS)
+    subjects = data['CORE_SUBJECTS'] + ['Literacy']
+    max_classes = rules['max_classes_per_pe_teacher']
+
+    model = cp_model.CpModel()
+    day_vars = {}
+    union_advisory = {}
+    for day in DAYS:
+        periods = TEACHING_PERIODS[day]
+        day_vars[day] = v = {}
+        for teacher, role in roles.items():
+            for team_num in role['teams']:
+                v[('lessons', teacher, team_num)] = model.NewIntVar(
+                    0, len(TEAMS[team_num]), f'{teacher}_team_{team_num}_lessons_{day}')
+        for team_num in team_numbers:
+            v[('pe', team_num)] = model.NewIntVar(0, len(periods), f'team_{team_num}_pe_{day}')
+            v[('meeting', team_num)] = model.NewBoolVar(f'team_{team_num}_meeting_{day}')
+            for period in periods:
+                v[('advisory', team_num, period)] = model.NewBoolVar(f'team_{team_num}_advisory_{day}_P{period}')
+        v[('electives',)] = model.NewIntVar(0, len(periods), f'electives_{day}')
+        for subject in subjects:
+            v[('discipline', subject)] = model.NewBoolVar(f'{subject}_discipline_{day}')
+        for pe_teacher in data['PE_TEACHERS']:
+            v[('pe_load', pe_teacher)] = model.NewIntVar(0, max_classes * len(periods), f'{pe_teacher}_load_{day}')
+
+        # A teacher of several teams is in advisory whenever any of them is
+        for teacher, role in roles.items():
+            if len(role['advisory_teams']) > 1:
+                for period in periods:
+                    team_vars = [v[('advisory', t, period)] for t in role['advisory_teams']]
+                    union = model.NewBoolVar(f'{teacher}_advisory_{day}_P{period}')
+                    for var in team_vars:
+                        model.Add(union >= var)
+                    model.Add(union <= sum(team_vars))
+                    union_advisory[(teacher, day, period)] = union
+
+    def week(key):
+        return sum(day_vars[day][key] for day in DAYS)
+
+    def advisory_count(teacher, day):
+        role = roles[teacher]
+        if len(role['advisory_teams']) > 1:
+            return sum(union_advisory[(teacher, day, period)] for period in TEACHING_PERIODS[day])
+        return sum(day_vars[day][('advisory', t, period)]
+                   for t in role['advisory_teams'] for period in TEACHING_PERIODS[day])
+
+    # Weekly counts
+    for teacher, role in roles.items():
+        per_class = rules['literacy_periods_per_week'] if role['literacy'] else rules['core_periods_per_week']
+        for team_num in role['teams']:
+            model.Add(week(('lessons', teacher, team_num)) == per_class * len(TEAMS[team_num]))
+        if role['literacy']:
+            model.Add(sum(advisory_count(teacher, day) for day in DAYS) == rules['advisory_periods_per_week'])
+    for team_num in team_numbers:
+        model.Add(week(('pe', team_num)) == rules['pe_periods_per_week'])
+        model.Add(week(('meeting', team_num)) == rules['team_meetings_per_week'])
+        advisories = [var for day in DAYS for key, var in day_vars[day].items() if key[:2] == ('advisory', team_num)]
+        model.Add(sum(advisories) == rules['advisory_periods_per_week'])
+        # Advisories fall on different period numbers, at most one a day
+        for period in sorted({p for day in DAYS for p in TEACHING_PERIODS[day]}):
+            model.Add(sum(day_vars[day][('advisory', team_num, period)]
+                          for day in DAYS if period in TEACHING_PERIODS[day]) <= 1)
+        for day in DAYS:
+            model.Add(sum(day_vars[day][('advisory', team_num, p)] for p in TEACHING_PERIODS[day]) <= 1)
+    model.Add(week(('electives',)) == rules['elective_periods_per_week'])
+    for subject in subjects:
+        model.Add(week(('discipline', subject)) == 1)
+    for pe_teacher in data['PE_TEACHERS']:
+        model.Add(week(('pe_load', pe_teacher)) >= rules['pe_load_min'])
+        model.Add(week(('pe_load', pe_teacher)) <= rules['pe_load_max'])
+
+    # Per-day capacity cuts: every plan violating these has no daily timetable
+    for day in DAYS:
+        v = day_vars[day]
+        periods = TEACHING_PERIODS[day]
+        electives = v[('electives',)]
+        capacity = intensive_capacity(periods)
+        for team_num in team_numbers:
+            size = len(TEAMS[team_num])
+            lessons = [var for key, var in v.items() if key[0] == 'lessons' and key[2] == team_num]
+            team_advisory = sum(v[('advisory', team_num, p)] for p in periods)
+            model.Add(v[('meeting', team_num)] <= v[('pe', team_num)])
+            model.Add(v[('pe', team_num)] + team_advisory + electives <= len(periods))
+            model.Add(sum(lessons) + size * (v[('pe', team_num)] + team_advisory + electives) <= size * len(periods))
+        for teacher, role in roles.items():
+            if role['pe']:
+                continue
+            teaching = sum(v[('lessons', teacher, t)] for t in role['teams'])
+            meetings = sum(v[('meeting', t)] for t in role['meeting_teams'])
+            discipline = sum(v[('discipline', s)] for s in role['subjects'])
+            advisory = advisory_count(teacher, day)
+            model.Add(teaching + 1 + meetings + discipline + advisory + electives <= len(periods))
+            model.Add(teaching + advisory + electives <= capacity)
+        pe_teams = sum(v[('pe', t)] for t in team_numbers)
+        model.Add(pe_teams <= rules['pe_teams_per_period'] * (len(periods) - electives))
+        model.Add(sum(v[('pe_load', pe)] for pe in data['PE_TEACHERS']) ==
+                  sum(len(TEAMS[t]) * v[('pe', t)] for t in team_numbers))
+        for pe_teacher in data['PE_TEACHERS']:
+            model.Add(v[('pe_load', pe_teacher)] <= max_classes * (len(periods) - 1 - electives))
+            model.Add(v[('pe_load', pe_teacher)] <= max_classes * capacity)
+
+    return model, day_vars
+
+
+def add_day_cut(model, day_vars, plan, days):
+    """No-good: none of `days` may get all the `plan` entries ({key: value}) again"""
+    for day in days:
+        differs = []
+        for key, value in plan.items():
+            var = day_vars[day][key]
+            flag = model.NewBoolVar('')
+            model.Add(var != value).OnlyEnforceIf(flag)
+            differs.append(flag)
+        model.AddBoolOr(differs)
+
+# ============================================================================
+# STAGE TWO: DAILY TIMETABLES
+# ============================================================================
+
+def build_day_model(data, day, plan, roles, rules):
+    """
+    CP-SAT model of one day's timetable that realises `plan`
+
+    Returns:
+        Dict with the model, the 'activity', 'lessons', 'pe_counts' and
+        'electives' variables needed by read_day, and the 'assumptions'
+        ({plan key: literal}) that impose the plan
+    """
+    from ortools.sat.python import cp_model
+
+    ACTIVITIES = data['ACTIVITIES']
+    TEAMS = data['TEAMS']
+    team_numbers = sorted(TEAMS)
+    periods = data['TEACHING_PERIODS'][day]
+    subjects = data['CORE_SUBJECTS'] + ['Literacy']
+    model = cp_model.CpModel()
+
+    activity = {
+        teacher: {
+            period: model.NewIntVar(0, len(ACTIVITIES) - 1, f'{teacher}_{day}_P{period}_activity')
+            for period in data['ALL_PERIODS'][day]
+        }
+        for teacher in data['ALL_TEACHERS']
+    }
+    for teacher in data['ALL_TEACHERS']:
+        for period, var in activity[teacher].items():
+            if period in periods:
+                model.Add(var != ACTIVITIES.index('Lunch'))
+            else:
+                model.Add(var == ACTIVITIES.index('Lunch'))
+
+    flags = {}
+
+    def is_activity(teacher, period, name):
+        if (teacher, period, name) not in flags:
+            flag = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_{name}')
+            model.Add(activity[teacher][period] == ACTIVITIES.index(name)).OnlyEnforceIf(flag)
+            model.Add(activity[teacher][period] != ACTIVITIES.index(name)).OnlyEnforceIf(flag.Not())
+            flags[(teacher, period, name)] = flag
+        return flags[(teacher, period, name)]
+
+    def slot_vars(label):
+        return {period: model.NewBoolVar(f'{label}_{day}_P{period}') for period in periods}
+
+    assumptions = {}
+
+    def impose(key, terms):
+        """sum(terms) == plan[key] while the key's assumption holds"""
+        assumptions[key] = model.NewBoolVar(f'plan_{"_".join(map(str, key))}')
+        model.Add(sum(terms) == plan[key]).OnlyEnforceIf(assumptions[key])
+
+    team_pe = {team_num: slot_vars(f'team_{team_num}_pe') for team_num in team_numbers}
+    team_meeting = {team_num: slot_vars(f'team_{team_num}_meeting') for team_num in team_numbers}
+    advisory = {team_num: slot_vars(f'team_{team_num}_advisory') for team_num in team_numbers}
+    electives = slot_vars('school_elective')
+    discipline = {subject: slot_vars(f'{subject}_discipline') for subject in subjects}
+    lessons = {
+        (teacher, team_num): slot_vars(f'{teacher}_teaches_team_{team_num}')
+        for teacher, role in roles.items() for team_num in role['teams']
+    }
+    pe_counts = {
+        (pe_teacher, team_num): {
+            period: model.NewIntVar(0, len(TEAMS[team_num]), f'{pe_teacher}_classes_of_team_{team_num}_{day}_P{period}')
+            for period in periods
+        }
+        for pe_teacher in data['PE_TEACHERS'] for team_num in team_numbers
+    }
+
+    teaching = {}
+    for teacher, role in roles.items():
+        teaching[teacher] = {}
+        for period in periods:
+            if role['pe']:
+                counts = [slot[period] for (pe, _), slot in pe_counts.items() if pe == teacher]
+                var = model.NewBoolVar(f'{teacher}_is_teaching_{day}_P{period}')
+                model.Add(sum(counts) >= 1).OnlyEnforceIf(var)
+                model.Add(sum(counts) == 0).OnlyEnforceIf(var.Not())
+            else:
+                taught = [lessons[(teacher, t)][period] for t in role['teams']]
+                if len(taught) == 1:
+                    var = taught[0]
+                else:
+                    var = model.NewBoolVar(f'{teacher}_is_teaching_{day}_P{period}')
+                    model.Add(sum(taught) == var)
+            model.Add(activity[teacher][period] == ACTIVITIES.index('Extra Prep')).OnlyEnforceIf(var)
+            teaching[teacher][period] = var
+
+    for period in periods:
+        # Teams: no more lessons than classes, none during PE, advisory or electives
+        for team_num in team_numbers:
+            taught = [slot[period] for (_, t), slot in lessons.items() if t == team_num]
+            model.Add(sum(taught) <= len(TEAMS[team_num]))
+            model.Add(sum(taught) == 0).OnlyEnforceIf(team_pe[team_num][period])
+            model.Add(sum(taught) == 0).OnlyEnforceIf(advisory[team_num][period])
+            model.Add(team_pe[team_num][period] + advisory[team_num][period] + electives[period] <= 1)
+
+            # PE: the PE teachers between them take every class of the team
+            counts = [slot[period] for (_, t), slot in pe_counts.items() if t == team_num]
+            model.Add(sum(counts) == len(TEAMS[team_num]) * team_pe[team_num][period])
+            model.Add(team_meeting[team_num][period] <= team_pe[team_num][period])
+        model.Add(sum(team_pe[t][period] for t in team_numbers) <= rules['pe_teams_per_period'])
+
+        for teacher, role in roles.items():
+            if role['pe']:
+                model.Add(sum(slot[period] for (pe, _), slot in pe_counts.items() if pe == teacher)
+                          <= rules['max_classes_per_pe_teacher'])
+                for name in ('Team_Meeting', 'Discipline_Meeting', 'Advisory', 'Elective'):
+                    model.Add(activity[teacher][period] != ACTIVITIES.index(name))
+                # PE teachers have Extra Prep during meetings and electives
+                for blocker in [team_meeting[t][period] for t in team_numbers] + [electives[period]]:
+                    model.Add(activity[teacher][period] == ACTIVITIES.index('Extra Prep')).OnlyEnforceIf(blocker)
+                continue
+
+            # Meetings, advisory, discipline and electives follow the team/school slots
+            model.Add(is_activity(teacher, period, 'Team_Meeting') ==
+                      sum(team_meeting[t][period] for t in role['meeting_teams']))
+            model.Add(is_activity(teacher, period, 'Discipline_Meeting') ==
+                      sum(discipline[s][period] for s in role['subjects']))
+            model.Add(is_activity(teacher, period, 'Elective') == electives[period])
+            in_advisory = is_activity(teacher, period, 'Advisory')
+            for team_num in role['advisory_teams']:
+                model.Add(in_advisory >= advisory[team_num][period])
+            model.Add(in_advisory <= sum(advisory[t][period] for t in role['advisory_teams']))
+
+    # The plan
+    for (teacher, team_num), slots in lessons.items():
+        impose(('lessons', teacher, team_num), slots.values())
+    for team_num in team_numbers:
+        impose(('pe', team_num), team_pe[team_num].values())
+        impose(('meeting', team_num), team_meeting[team_num].values())
+        for period in periods:
+            impose(('advisory', team_num, period), [advisory[team_num][period]])
+    impose(('electives',), electives.values())
+    for subject in subjects:
+        impose(('discipline', subject), discipline[subject].values())
+    for pe_teacher in data['PE_TEACHERS']:
+        impose(('pe_load', pe_teacher),
+               [slot[period] for (pe, _), slot in pe_counts.items() if pe == pe_teacher for period in periods])
+    model.AddAssumptions(list(assumptions.values()))
+
+    # One prep and no more than MAX_INTENSIVE_IN_A_ROW intensive periods in a row
+    patterns = pattern_flags(tuple(periods))
+    for teacher, role in roles.items():
+        intensive = []
+        for period in windowed_periods(periods):
+            if role['pe']:
+                intensive.append(teaching[teacher][period])
+            else:
+                # Teaching, advisory and electives are distinct activities, so at most one holds
+                flag = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_intensive')
+                model.Add(flag == teaching[teacher][period] + is_activity(teacher, period, 'Advisory') + electives[period])
+                intensive.append(flag)
+        model.AddAllowedAssignments([is_activity(teacher, period, 'Prep') for period in periods] + intensive, patterns)
+
+    return {
+        'model': model,
+        'activity': activity,
+        'lessons': lessons,
+        'pe_counts': pe_counts,
+        'electives': electives,
+        'assumptions': assumptions
+    }
+
+
+def read_day(solver, day_built):
+    """Plain-int values of a solved day model"""
+    return {
+        'activity': {teacher: {period: solver.Value(var) for period, var in slots.items()}
+                     for teacher, slots in day_built['activity'].items()},
+        'lessons': {key: {period: solver.Value(var) for period, var in slots.items()}
+                    for key, slots in day_built['lessons'].items()},
+        'pe_counts': {key: {period: solver.Value(var) for period, var in slots.items()}
+                      for key, slots in day_built['pe_counts'].items()},
+        'electives': {period: solver.Value(var) for period, var in day_built['electives'].items()}
+    }
+
+
+def plan_from_hints(data, roles, day, hints):
+    """
+    Week plan entries for one day read off a past solution (hints as from
+    SolutionStore.find_hints), for hinting the first round's week plan
+    """
+    ACTIVITIES = data['ACTIVITIES']
+    periods = data['TEACHING_PERIODS'][day]
+    assignments = hints.get('teacher_class_assignment', set())
+    activity_hints = hints.get('teacher_activity', {})
+    hinted = set(hints.get('teachers', []))
+
+    def taught(teacher, classes, period):
+        return any((teacher, class_name, day, period) in assignments for class_name in classes)
+
+    def doing(teachers, period, name):
+        return any(activity_hints.get((teacher, day, period)) == ACTIVITIES.index(name) for teacher in teachers)
+
+    core = [teacher for teacher, role in roles.items() if not role['pe']]
+    plan = {}
+    for teacher, role in roles.items():
+        if teacher not in hinted:
+            continue
+        for team_num in role['teams']:
+            plan[('lessons', teacher, team_num)] = sum(
+                (teacher, class_name, day, period) in assignments
+                for class_name in data['TEAMS'][team_num] for period in periods)
+        if role['pe']:
+            plan[('pe_load', teacher)] = sum(
+                (teacher, class_name, day, period) in assignments
+                for class_name in data['CLASSES'] for period in periods)
+    for team_num, classes in data['TEAMS'].items():
+        plan[('pe', team_num)] = sum(
+            any(taught(pe_teacher, classes, period) for pe_teacher in data['PE_TEACHERS']) for period in periods)
+        members = [teacher for teacher in core if team_num in roles[teacher]['meeting_teams']]
+        plan[('meeting', team_num)] = int(any(doing(members, period, 'Team_Meeting') for period in periods))
+        for period in periods:
+            plan[('advisory', team_num, period)] = int(doing(members, period, 'Advisory'))
+    plan[('electives',)] = sum(doing(core, period, 'Elective') for period in periods)
+    for subject in data['CORE_SUBJECTS'] + ['Literacy']:
+        members = [teacher for teacher in core if subject in roles[teacher]['subjects']]
+        plan[('discipline', subject)] = int(any(doing(members, period, 'Discipline_Meeting') for period in periods))
+    return plan
+
+
+def hint_day(day_built, data, day, hints):
+    """
+    Hint a day model from a past solution (hints as from SolutionStore.find_hints)
+
+    Lessons and PE class counts are derived from the hinted class assignments
+    of the hinted teachers; anything the hints do not cover is left free.
+    """
+    model = day_built['model']
+    for teacher, slots in day_built['activity'].items():
+        for period, var in slots.items():
+            value = hints.get('teacher_activity', {}).get((teacher, day, period))
+            if value is not None:
+                model.AddHint(var, value)
+
+    hinted = set(hints.get('teachers', []))
+    assignments = hints.get('teacher_class_assignment', set())
+    for key in ('lessons', 'pe_counts'):
+        for (teacher, team_num), slots in day_built[key].items():
+            if teacher not in hinted:
+                continue
+            for period, var in slots.items():
+                count = sum((teacher, class_name, day, period) in assignments for class_name in data['TEAMS'][team_num])
+                model.AddHint(var, min(count, 1) if key == 'lessons' else count)
+
+
+def run_solve(solver, model, active_solvers=None, is_cancelled=None):
+    """
+    solver.Solve(model), registered in active_solvers while it runs so a
+    canceller can StopSearch it; returns UNKNOWN without solving once
+    is_cancelled() holds
+    """
+    from ortools.sat.python import cp_model
+
+    if active_solvers is None:
+        return solver.Solve(model)
+    active_solvers.add(solver)
+    try:
+        # Registered before the check, so a cancel either sees the solver or is seen here
+        if is_cancelled and is_cancelled():
+            return cp_model.UNKNOWN
+        return solver.Solve(model)
+    finally:
+        active_solvers.discard(solver)
+
+
+def solve_day(day_built, solver_profile, active_solvers=None, is_cancelled=None):
+    """
+    Solve one day model
+
+    Returns:
+        (status name, values or None, conflict) where conflict lists the plan
+        keys whose assumptions are enough for infeasibility (every key when
+        the solve timed out)
+    """
+    from ortools.sat.python import cp_model
+
+    solver = cp_model.CpSolver()
+    for param, value in solver_profile.items():
+        setattr(solver.parameters, param, value)
+    status = run_solve(solver, day_built['model'], active_solvers, is_cancelled)
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return solver.StatusName(status), read_day(solver, day_built), None
+
+    assumptions = day_built['assumptions']
+    conflict = list(assumptions)
+    if status == cp_model.INFEASIBLE:
+        core = set(solver.SufficientAssumptionsForInfeasibility())
+        conflict = [key for key, literal in assumptions.items() if literal.Index() in core] or conflict
+    return solver.StatusName(status), None, conflict
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def assemble_week(data, roles, plans, days):
+    """
+    Join solved days into a solution dict shaped like solve_built_model's
+
+    Values are plain ints read through SolvedValues, so the result works with
+    convert_solution_to_sheets_format and extract_compact_solution.
+    """
+    from class_assignment import assign_classes
+
+    DAYS = data['DAYS']
+    TEACHING_PERIODS = data['TEACHING_PERIODS']
+    team_numbers = sorted(data['TEAMS'])
+
+    def slots(values_of):
+        return {day: {period: values_of(day, period) for period in TEACHING_PERIODS[day]} for day in DAYS}
+
+    team_teaching = {
+        teacher: {
+            team_num: slots(lambda day, period: days[day]['lessons'].get((teacher, team_num), {}).get(period, 0))
+            for team_num in role['teams']
+        }
+        for teacher, role in roles.items() if role['teams']
+    }
+    pe_class_count = {
+        pe_teacher: {
+            team_num: slots(lambda day, period: days[day]['pe_counts'].get((pe_teacher, team_num), {}).get(period, 0))
+            for team_num in team_numbers
+        }
+        for pe_teacher in data['PE_TEACHERS']
+    }
+    solved = {'team_teaching': team_teaching, 'pe_class_count': pe_class_count}
+
+    return {
+        'solver': SolvedValues(),
+        'teacher_activity': {teacher: {day: days[day]['activity'][teacher] for day in DAYS}
+                             for teacher in data['ALL_TEACHERS']},
+        'teacher_class_assignment': assign_classes(SolvedValues(), solved, data),
+        'team_advisory_schedule': {
+            team_num: slots(lambda day, period: plans[day][('advisory', team_num, period)])
+            for team_num in team_numbers
+        },
+        'elective_schedule': {day: days[day]['electives'] for day in DAYS}
+    }
+
+
+def solve_by_days(data, solver_profile=None, max_rounds=DEFAULT_MAX_ROUNDS, hints=None, progress_callback=None,
+                  active_solvers=None, is_cancelled=None):
+    """
+    Two-stage solve: week plan, then the daily timetables in parallel
+
+    Every round solves the week plan, then solves the days whose plan has
+    not been solved before on a thread pool (CP-SAT releases the GIL). A day
+    that is infeasible - or runs out of time - forbids its plan on every
+    day with the same period structure and the next round re-plans. The
+    decomposition is a heuristic: it may miss schedules the full model finds.
+
+    Args:
+        data: Output of convert_sheets_data_to_model_format
+        solver_profile: Total time limit and CP-SAT workers, shared out
+            between the daily solves
+        hints: Past solution from SolutionStore.find_hints; hints the first
+            week plan and every day model
+        progress_callback: Receives the week plan's CP-SAT log lines and a
+            summary line per round (the parallel day solves are not logged)
+        active_solvers: Set the running CP-SAT solvers are kept in, so
+            GoogleSheetsScheduler.cancel() can stop them
+        is_cancelled: Callable; once it returns True no further solve starts
+
+    Returns:
+        Solution dict like solve_built_model's (plus 'rounds'), or None
+    """
+    from ortools.sat.python import cp_model
+    from batch_runner import plan_cpu_budget
+
+    profile = dict(solver_profile or DEFAULT_SOLVER_PROFILE)
+    profile['log_search_progress'] = False
+    max_time = profile.pop('max_time_in_seconds', 300.0)
+    cpu_budget = profile.pop('num_workers', 0) or os.cpu_count() or 1
+    rules = data.get('RULES') or DEFAULT_RULES
+    roles = teacher_roles(data)
+    DAYS = data['DAYS']
+
+    start = time.time()
+    master, day_vars = build_week_plan(data, roles, rules)
+    if hints:
+        for day in DAYS:
+            for key, value in plan_from_hints(data, roles, day, hints).items():
+                if key in day_vars[day]:
+                    master.AddHint(day_vars[day][key], value)
+    solved_days = {}
+    plans = None
+    for round_number in range(1, max_rounds + 1):
+        remaining = max_time - (time.time() - start)
+        if remaining <= 0:
+            break
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = remaining
+        solver.parameters.num_workers = cpu_budget
+        if progress_callback:
+            solver.log_callback = progress_callback
+            solver.parameters.log_search_progress = True
+            solver.parameters.log_to_stdout = False
+        if plans:
+            master.ClearHints()
+            for day in DAYS:
+                for key, value in plans[day].items():
+                    master.AddHint(day_vars[day][key], value)
+        status = run_solve(solver, master, active_solvers, is_cancelled)
+        if is_cancelled and is_cancelled():
+            print(f"⏹ Day-by-day solve cancelled in round {round_number}")
+            return None
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            print(f"❌ Week plan: {solver.StatusName(status)} in round {round_number}")
+            return None
+        plans = {day: {key: solver.Value(var) for key, var in day_vars[day].items()} for day in DAYS}
+
+        def plan_key(day):
+            return day_signature(data, day), tuple(sorted(plans[day].items(), key=repr))
+
+        pending = {plan_key(day): day for day in DAYS if plan_key(day) not in solved_days}
+        threads, workers = plan_cpu_budget(len(pending), cpu_budget)
+        day_profile = dict(profile, num_workers=workers,
+                           max_time_in_seconds=max(1.0, max_time - (time.time() - start)))
+        built = {key: build_day_model(data, day, plans[day], roles, rules) for key, day in pending.items()}
+        if hints:
+            for key, day in pending.items():
+                hint_day(built[key], data, day, hints)
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = dict(zip(built, pool.map(
+                lambda key: solve_day(built[key], day_profile, active_solvers, is_cancelled), built)))
+        if is_cancelled and is_cancelled():
+            print(f"⏹ Day-by-day solve cancelled in round {round_number}")
+            return None
+
+        failed = []
+        for key, (status_name, values, conflict) in results.items():
+            if values is None:
+                failed.append((pending[key], status_name, conflict))
+            else:
+                solved_days[key] = values
+        summary = (f"Round {round_number}: {len(pending) - len(failed)} of {len(pending)} day(s) solved"
+                   + ''.join(f", {day} {status} ({len(conflict)} plan entries)" for day, status, conflict in failed))
+        print(f"📅 {summary}")
+        if progress_callback:
+            progress_callback(summary)
+        if not failed:
+            solution = assemble_week(data, roles, plans, {day: solved_days[plan_key(day)] for day in DAYS})
+            solution.update({
+                'status': cp_model.FEASIBLE,
+                'model': None,
+                'data': data,
+                'solve_time': time.time() - start,
+                'quality': 'Feasible',
+                'rounds': round_number
+            })
+            print(f"✅ Day-by-day solution found in {solution['solve_time']:.2f} seconds ({round_number} round(s))")
+            return solution
+
+        for day, _, conflict in failed:
+            same_structure = [d for d in DAYS if day_signature(data, d) == day_signature(data, day)]
+            add_day_cut(master, day_vars, {key: plans[day][key] for key in conflict}, same_structure)
+
+    print("❌ No day-by-day solution found")
+    return None
@@ -0,0 +1,212 @@
+import os
+import time
+import itertools
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+# ============================================================================
+# CONFIGURATIONS
+# ============================================================================
+
+def ablation_configurations(families=None, pairs=False):
+    """
+    Constraint family configurations to solve
+
+    Args:
+        families: Families to switch off (default: every family)
+        pairs: Also switch off every pair of them
+
+    Returns:
+        List of (name, families switched off): the full model ('all'), then
+        one configuration per family and, with pairs, per pair
+    """
+    from constraint_families import select_families
+
+    families = select_families(families)
+    configurations = [('all', ())]
+    configurations += [(f'-{family}', (family,)) for family in families]
+    if pairs:
+        configurations += [(f'-{first} -{second}', (first, second))
+                           for first, second in itertools.combinations(families, 2)]
+    return configurations
+
+
+def active_families(base, families=None):
+    """
+    Families that post something on a base context
+
+    Some families only apply to one formulation or event encoding
+    (event_timelines to intervals, team_meetings to booleans, ...);
+    switching one of the others off would solve the full model again.
+    """
+    from constraint_families import FAMILY_BUILDERS, select_families
+
+    probe = base.clone()
+    active = []
+    for family in select_families(families):
+        proto = probe.model.Proto()
+        size = (len(proto.variables), len(proto.constraints))
+        FAMILY_BUILDERS[family](probe)
+        if (len(proto.variables), len(proto.constraints)) != size:
+            active.append(family)
+    return active
+
+
+def model_size(model):
+    """Variables, Booleans, constraints and proto size of a CpModel"""
+    proto = model.Proto()
+    return {
+        'variables': len(proto.variables),
+        'booleans': sum(1 for var in proto.variables if list(var.domain) == [0, 1]),
+        'constraints': len(proto.constraints),
+        'proto_mb': round(proto.ByteSize() / 1e6, 2)
+    }
+
+# ============================================================================
+# SOLVING
+# ============================================================================
+
+def _solve(model, profile, seed, hinted):
+    """One timed solve; the first solution's wall time comes from a callback"""
+    from ortools.sat.python import cp_model
+
+    class FirstSolution(cp_model.CpSolverSolutionCallback):
+        def __init__(self):
+            super().__init__()
+            self.seconds = None
+
+        def on_solution_callback(self):
+            if self.seconds is None:
+                self.seconds = self.WallTime()
+
+    solver = cp_model.CpSolver()
+    for param, value in profile.items():
+        setattr(solver.parameters, param, value)
+    solver.parameters.random_seed = seed
+    if hinted:
+        # As in solve_built_model: presolve must keep the hinted solution
+        solver.parameters.keep_all_feasible_solutions_in_presolve = True
+    first = FirstSolution()
+    start = time.perf_counter()
+    status = solver.Solve(model, first)
+    return {
+        'status': solver.StatusName(status),
+        'first_solution_seconds': first.seconds,
+        'optimal_seconds': solver.WallTime() if status == cp_model.OPTIMAL else None,
+        'solve_seconds': time.perf_counter() - start,
+        'conflicts': solver.NumConflicts()
+    }
+
+
+def _median(values):
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def run_ablation(scheduler, data, families=None, pairs=False, max_time=30.0, cpu_budget=None, workers=None,
+                 repeat=1, greedy_hints=False):
+    """
+    Solve the instance with each constraint family switched off in turn
+
+    The variables are built once (build_model_context); every configuration
+    clones them and posts the families it keeps. Models are built
+    sequentially and solved on a thread pool, since CP-SAT releases the GIL
+    while solving.
+
+    Args:
+        scheduler: GoogleSheetsScheduler whose formulation, event encoding
+            and variable naming are used
+        data: Output of convert_sheets_data_to_model_format
+        families: Families to switch off (default: every family); those
+            that post nothing in the scheduler's formulation and event
+            encoding are skipped
+        pairs: Also switch off every pair of them
+        max_time: Solver time limit per solve
+        cpu_budget: Total CP-SAT workers across concurrent solves
+        workers: CP-SAT workers per solve (default: the budget split
+            between the solves, see plan_cpu_budget)
+        repeat: Solves per configuration, with random seeds 0..repeat-1
+        greedy_hints: Hint every configuration with the greedy timetable
+
+    Returns:
+        One row per configuration: families switched off, model size, build
+        time, and the median time to the first solution, to OPTIMAL (for this
+        satisfaction model, proven feasibility) and to the end of the solve
+    """
+    from batch_runner import plan_cpu_budget
+    from constraint_families import CONSTRAINT_FAMILIES, add_families, select_families
+
+    base = scheduler.build_model_context(data, families=())
+    active = active_families(base, families)
+    configurations = ablation_configurations(active, pairs)
+    hints = []
+    if greedy_hints:
+        from constructive_heuristic import construct_timetable, timetable_hints
+
+        hints = timetable_hints(base.built(), data, construct_timetable(data))
+
+    rows, models = [], []
+    for name, off in configurations:
+        start = time.perf_counter()
+        context = base.clone()
+        add_families(context, [family for family in CONSTRAINT_FAMILIES if family not in off])
+        for var, value in hints:
+            context.model.AddHint(var, value)
+        rows.append({'configuration': name, 'off': list(off), **model_size(context.model),
+                     'build_seconds': round(time.perf_counter() - start, 3)})
+        models.append(context.model)
+
+    jobs = [(i, seed) for i in range(len(models)) for seed in range(repeat)]
+    if workers:
+        threads = max(1, min(len(jobs), (cpu_budget or os.cpu_count() or 1) // workers))
+    else:
+        threads, workers = plan_cpu_budget(len(jobs), cpu_budget)
+    profile = {'max_time_in_seconds': float(max_time), 'num_workers': workers}
+    skipped = [family for family in select_families(families) if family not in active]
+    if skipped:
+        print(f"⏭️ Not posted in this formulation / encoding: {', '.join(skipped)}")
+    print(f"🧪 Solving {len(configurations)} configuration(s) x {repeat}: "
+          f"{threads} at a time, {workers} worker(s) each")
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [(i, pool.submit(_solve, models[i], profile, seed, bool(hints))) for i, seed in jobs]
+        runs = [[] for _ in models]
+        for i, future in futures:
+            runs[i].append(future.result())
+
+    for row, results in zip(rows, runs):
+        statuses = [result['status'] for result in results]
+        row.update({
+            'runs': len(results),
+            'solved': sum(1 for result in results if result['first_solution_seconds'] is not None),
+            'infeasible': statuses.count('INFEASIBLE'),
+            'statuses': statuses,
+            'first_solution_seconds': _median(result['first_solution_seconds'] for result in results),
+            'optimal_seconds': _median(result['optimal_seconds'] for result in results),
+            'solve_seconds': _median(result['solve_seconds'] for result in results),
+            'conflicts': _median(result['conflicts'] for result in results)
+        })
+    return rows
+
+
+def format_ablation(rows):
+    """
+    Plain-text table of run_ablation rows
+
+    'vs all' is the median solve time relative to the full model: a family
+    whose removal gives a small ratio is one that makes the model hard.
+    """
+    def seconds(value):
+        return f'{value:.2f}' if value is not None else '-'
+
+    full = next((row['solve_seconds'] for row in rows if row['configuration'] == 'all'), None)
+    lines = [f"{'Configuration':<36} {'Vars':>7} {'Cons':>7} {'Solved':>7} {'First(s)':>9} {'Optimal(s)':>11} "
+             f"{'Solve(s)':>9} {'vs all':>7}"]
+    for row in rows:
+        ratio = f"{row['solve_seconds'] / full:.2f}" if full and row['solve_seconds'] is not None else '-'
+        lines.append(
+            f"{row['configuration'][:36]:<36} {row['variables']:>7} {row['constraints']:>7} "
+            f"{row['solved']:>3}/{row['runs']:<3} {seconds(row['first_solution_seconds']):>9} "
+            f"{seconds(row['optimal_seconds']):>11} {seconds(row['solve_seconds']):>9} {ratio:>7}"
+        )
+    return "\n".join(lines)
@@ -1,42 +1,490 @@
 import os
-import gspread
-from google.oauth2.service_account import Credentials
-from ortools.sat.python import cp_model
+import asyncio
+import hashlib
+import json
 import time
+import itertools
+from functools import lru_cache
 from datetime import datetime
-from dotenv import load_dotenv
+from solution_cache import SolutionCache, compute_input_fingerprint, file_fingerprint
+from background_io import BackgroundSheetsWriter, SolverProgressReporter, OutputWriteError
+from school_instance import school_instance
+
+# gspread, google-auth, OR-Tools, NumPy (solution_store) and dotenv are imported
+# inside the code paths that need them so offline commands start quickly
+
+# Bump when the model or output format changes in a way the source hash
+# alone would not capture (e.g. a behaviour change in a dependency)
+SCHEDULER_VERSION = "1.1.0"
+# Source files hashed into the code version: every module that shapes the
+# converted data, the built model or the published solution. Sheets I/O and
+# the caches themselves (solution_cache, model_cache, ...) are left out
+MODEL_SOURCES = ('international_highschool_scheduler.py', 'school_instance.py', 'constraint_families.py',
+                 'day_decomposition.py', 'constructive_heuristic.py', 'class_assignment.py')
+
+# CP-SAT parameters used by solve_scheduling_model; part of the cache fingerprint
+DEFAULT_SOLVER_PROFILE = {
+    'max_time_in_seconds': 300.0,
+    'log_search_progress': True
+}
+
+DEFAULT_CACHE_DIR = '.scheduler_cache'
+
+# Output sheets run_solver can publish: name -> (writer method, schedules kind)
+OUTPUT_WRITERS = {
+    'teacher_grid': ('write_teacher_schedules_grid', 'teacher'),
+    'class_grid': ('write_class_schedules_grid', 'class'),
+    'teacher_list': ('write_teacher_schedules', 'teacher'),
+    'class_list': ('write_class_schedules', 'class')
+}
+
+# The class grid is available but not published by default
+DEFAULT_OUTPUTS = ('teacher_grid',)
+
+# ============================================================================
+# SCHEDULING RULES
+# ============================================================================
+
+# Numeric rules of the model: name -> (School_Config parameter, default)
+RULE_PARAMETERS = {
+    'core_periods_per_week': ('Core Periods per Week', 4),
+    'literacy_periods_per_week': ('Literacy Periods per Week', 2),
+    'pe_periods_per_week': ('PE Periods per Week', 3),
+    'team_meetings_per_week': ('Team Meetings per Week', 2),
+    'advisory_periods_per_week': ('Advisory Periods per Week', 2),
+    'elective_periods_per_week': ('Elective Periods per Week', 2),
+    'pe_load_min': ('PE Load Min', 15),
+    'pe_load_max': ('PE Load Max', 25),
+    'max_classes_per_pe_teacher': ('Max Classes per PE Teacher', 2),
+    'pe_teams_per_period': ('PE Teams per Period', 1)
+}
+
+DEFAULT_RULES = {name: default for name, (_, default) in RULE_PARAMETERS.items()}
+
+RULE_SENSES = ('==', '>=', '<=')
+
+# Teaching, advisory and electives count as intensive; no teacher gets more
+# than this many intensive periods in a row between breaks (lunch, day end)
+MAX_INTENSIVE_IN_A_ROW = 3
+
+# Kinds of teaching slot in a teacher's daily pattern
+SLOT_OTHER, SLOT_PREP, SLOT_INTENSIVE = 0, 1, 2
+
+# Teams assumed for the speculative time grid when School_Config has no 'Total Teams'
+DEFAULT_TEAM_NUMBERS = [1, 2, 3, 4]
+
+# Model formulations: 'classes' decides every teacher/class/slot directly;
+# 'team_counts' decides teacher/team/slot and assigns classes after solving
+FORMULATIONS = ('classes', 'team_counts')
+DEFAULT_FORMULATION = 'classes'
+
+# Event encodings: 'booleans' ties every meeting, PE block, advisory and
+# elective slot to the teachers' activities with reified implications;
+# 'intervals' makes them optional interval variables on a slot timeline,
+# with one AddNoOverlap per teacher and per class
+EVENT_ENCODINGS = ('booleans', 'intervals')
+DEFAULT_EVENT_ENCODING = 'booleans'
+
+# Entries of a built model holding {key: ... {key: variable}} families
+MODEL_VARIABLE_FAMILIES = (
+    'teacher_activity', 'teacher_class_assignment', 'team_meeting_schedule', 'team_pe_schedule',
+    'team_advisory_schedule', 'discipline_schedule', 'elective_schedule', 'team_teaching',
+    'pe_class_count', 'teacher_teaching'
+)
+
+
+def make_rules(overrides=None):
+    """DEFAULT_RULES with overrides applied; every value must be a non-negative integer"""
+    rules = dict(DEFAULT_RULES)
+    for name, value in (overrides or {}).items():
+        if name not in RULE_PARAMETERS:
+            raise ValueError(f"Unknown rule '{name}' (expected one of {', '.join(RULE_PARAMETERS)})")
+        try:
+            number = int(str(value).strip())
+        except ValueError:
+            raise ValueError(f"Rule '{name}' must be an integer, got {value!r}")
+        if number < 0:
+            raise ValueError(f"Rule '{name}' must not be negative, got {number}")
+        rules[name] = number
+    return rules
+
+
+def parse_rules(config):
+    """Rules from School_Config values (missing or blank parameters keep their defaults)"""
+    return make_rules({
+        name: config[parameter]
+        for name, (parameter, _) in RULE_PARAMETERS.items()
+        if str(config.get(parameter, '')).strip() != ''
+    })
+
+
+def add_rule_constraint(model, rule_constraints, rules, name, terms, sense):
+    """Post sum(terms) <sense> rules[name] and record it so its bound can be edited in a proto copy"""
+    from ortools.sat.python import cp_model
+
+    total = cp_model.LinearExpr.Sum(list(terms))
+    value = rules[name]
+    if sense == '==':
+        constraint = model.Add(total == value)
+    elif sense == '>=':
+        constraint = model.Add(total >= value)
+    else:
+        constraint = model.Add(total <= value)
+    rule_constraints.setdefault(name, []).append((constraint, sense))
+    return constraint
+
+
+def set_rule_bounds(proto, rule_constraints, rules):
+    """Rewrite the right-hand side of every recorded rule constraint in a CpModelProto"""
+    int_min, int_max = -(2 ** 63), 2 ** 63 - 1
+    for name, constraints in rule_constraints.items():
+        if name not in rules:
+            continue
+        value = int(rules[name])
+        domain = {'==': [value, value], '>=': [value, int_max], '<=': [int_min, value]}
+        for constraint, sense in constraints:
+            ct = proto.constraints[constraint.Index()]
+            if ct.WhichOneof('constraint') == 'linear':
+                ct.linear.domain[:] = domain[sense]
+
+
+def team_numbers_from_config(config):
+    """Team numbers 1..'Total Teams' (None when the parameter is missing or blank)"""
+    total = str(config.get('Total Teams', '')).strip()
+    return list(range(1, int(total) + 1)) if total.isdigit() else None
+
+
+def literacy_team_map(TEACHERS):
+    """literacy teacher -> [team numbers served], in team order"""
+    served = {}
+    for team_key in sorted(TEACHERS, key=lambda key: int(key.split('_')[1])):
+        teacher = TEACHERS[team_key].get('Literacy')
+        if teacher:
+            served.setdefault(teacher, []).append(int(team_key.split('_')[1]))
+    return served
+
+
+def static_domains(data):
+    """
+    Values the converted data fixes before any constraint is posted
+
+    Args:
+        data: Output of convert_sheets_data_to_model_format
+
+    Returns:
+        Dict with 'teacher_teams' (non-PE teacher -> teams they teach),
+        'advisory_teams' (core/literacy teacher -> teams whose advisory they
+        attend), 'eligible_classes' (teacher -> classes they may teach, in
+        class order; PE teachers may teach every class) and 'activities' (teacher -> the
+        activity codes possible in a teaching period)
+    """
+    instance = school_instance(data)
+    ACTIVITIES = data['ACTIVITIES']
+
+    teacher_teams = {}
+    advisory_teams = {}
+    for name, teacher in instance.teachers.items():
+        if teacher.kind not in ('core', 'literacy'):
+            continue
+        teams = [team_num for team_num in teacher.teams if team_num in instance.teams]
+        teacher_teams[name] = teams
+        if teacher.kind == 'literacy' or teacher.subject in instance.core_subjects:
+            advisory_teams[name] = teams
+
+    eligible_classes = {}
+    activities = {}
+    for name, teacher in instance.teachers.items():
+        if teacher.kind == 'pe':
+            # PE teachers teach (Extra Prep) or prep; meetings, advisories and
+            # electives are for the team teachers
+            eligible_classes[name] = list(instance.classes)
+            allowed = ['Extra Prep', 'Prep']
+        else:
+            teams = teacher_teams.get(name, [])
+            eligible_classes[name] = [class_name for class_name in instance.classes
+                                      if instance.class_team[class_name] in teams]
+            allowed = [activity for activity in ACTIVITIES if activity != 'Lunch']
+            if teacher.kind == 'literacy':
+                allowed.remove('Team_Meeting')
+            if name not in advisory_teams:
+                allowed.remove('Advisory')
+        activities[name] = [instance.activity_codes[activity] for activity in allowed]
+
+    return {
+        'teacher_teams': teacher_teams,
+        'advisory_teams': advisory_teams,
+        'eligible_classes': eligible_classes,
+        'activities': activities
+    }
+
+
+@lru_cache(maxsize=None)
+def anonymous_model_class():
+    """
+    CpModel subclass that creates every variable without a name
+
+    Names are only stored in the proto for debugging; in anonymous-variable
+    mode variable_names() resolves them from the built model's families.
+    """
+    from ortools.sat.python import cp_model
+
+    class AnonymousCpModel(cp_model.CpModel):
+        def new_bool_var(self, name):
+            return super().new_bool_var('')
+
+        def new_int_var(self, lb, ub, name):
+            return super().new_int_var(lb, ub, '')
+
+        def new_int_var_from_domain(self, domain, name):
+            return super().new_int_var_from_domain(domain, '')
+
+        def new_optional_fixed_size_interval_var(self, start, size, is_present, name):
+            return super().new_optional_fixed_size_interval_var(start, size, is_present, '')
+
+        NewBoolVar = new_bool_var
+        NewIntVar = new_int_var
+        NewIntVarFromDomain = new_int_var_from_domain
+        NewOptionalFixedSizeIntervalVar = new_optional_fixed_size_interval_var
+
+    return AnonymousCpModel
+
+
+def variable_names(built):
+    """
+    {proto index: name} for the variables of a built model's families
+
+    The side-table of anonymous-variable mode, made only when diagnostics
+    need names (e.g. 'teacher_activity[Math_T1][Monday][2]'). Constants and
+    auxiliary variables (reified flags, channels) have no entry.
+    """
+    names = {}
+
+    def walk(tree, path):
+        for key, value in tree.items():
+            if isinstance(value, dict):
+                walk(value, f'{path}[{key}]')
+            elif value.Index() not in names and not is_constant(value):
+                names[value.Index()] = f'{path}[{key}]'
+
+    for family in MODEL_VARIABLE_FAMILIES:
+        if built.get(family) is not None:
+            walk(built[family], family)
+    return names
+
+
+def is_constant(var):
+    """True for a variable whose domain is a single value (pre-fixed by static_domains)"""
+    domain = var.Proto().domain
+    return len(domain) == 2 and domain[0] == domain[1]
+
+
+def consecutive_runs(periods):
+    """Split sorted period numbers into runs without a gap (e.g. lunch): [1,2,4,5] -> [[1,2],[4,5]]"""
+    runs = []
+    for period in periods:
+        if runs and period == runs[-1][-1] + 1:
+            runs[-1].append(period)
+        else:
+            runs.append([period])
+    return runs
+
+
+@lru_cache(maxsize=None)
+def legal_day_patterns(teaching_periods, max_in_a_row=MAX_INTENSIVE_IN_A_ROW):
+    """
+    Every legal day for one teacher, as tuples of slot kinds over `teaching_periods`
+
+    A legal day has exactly one prep and no more than `max_in_a_row`
+    intensive periods (teaching, advisory, elective) in a row between breaks.
+    Cached, so each day shape is enumerated once per process.
+
+    Args:
+        teaching_periods: Tuple of the day's teaching period numbers
+    """
+    index = {period: i for i, period in enumerate(teaching_periods)}
+    window = max_in_a_row + 1
+    windows = [
+        [index[period] for period in run[i:i + window]]
+        for run in consecutive_runs(teaching_periods)
+        for i in range(len(run) - window + 1)
+    ]
+    return tuple(
+        pattern
+        for pattern in itertools.product((SLOT_OTHER, SLOT_PREP, SLOT_INTENSIVE), repeat=len(teaching_periods))
+        if pattern.count(SLOT_PREP) == 1
+        and not any(all(pattern[i] == SLOT_INTENSIVE for i in slots) for slots in windows)
+    )
+
+
+def windowed_periods(teaching_periods):
+    """Teaching periods in runs long enough for the intensive limit to bite"""
+    return [
+        period for run in consecutive_runs(teaching_periods)
+        if len(run) > MAX_INTENSIVE_IN_A_ROW for period in run
+    ]
+
+
+@lru_cache(maxsize=None)
+def pattern_flags(teaching_periods):
+    """
+    Legal day patterns as rows for a table constraint
+
+    Each row holds a prep flag for every teaching period, then an intensive
+    flag for every period of windowed_periods().
+    """
+    windowed = [teaching_periods.index(period) for period in windowed_periods(teaching_periods)]
+    return tuple(sorted({
+        tuple(int(kind == SLOT_PREP) for kind in pattern) + tuple(int(pattern[i] == SLOT_INTENSIVE) for i in windowed)
+        for pattern in legal_day_patterns(teaching_periods)
+    }))
+
+
+def get_code_version():
+    """Version string combining SCHEDULER_VERSION and a hash of the model building code"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in MODEL_SOURCES:
+        digest.update(file_fingerprint(os.path.join(directory, name)).encode('utf-8'))
+    return f"{SCHEDULER_VERSION}+{digest.hexdigest()[:16]}"
+
+# ============================================================================
+# TEMPLATE INPUT DATA
+# ============================================================================
+
+# Rows written by setup_input_sheets; also usable offline via template_records()
+TEMPLATE_CONFIG_ROWS = [
+    ["Parameter", "Value", "Description"],
+    ["School Name", "Sample School", "Name of the school"],
+    ["Total Teams", "4", "Number of grade teams"],
+    ["Classes per Team", "4", "Number of classes per team"],
+    ["Core Subjects", "ELA,SS,Science,Math,Arts", "Comma-separated core subjects"],
+    ["PE Teachers", "2", "Number of PE teachers"],
+    ["Literacy Teachers", "2", "Number of literacy teachers"],
+    ["Periods per Day", "Monday:7,Tuesday:7,Wednesday:6,Thursday:7,Friday:7", "Periods by day"],
+    ["Lunch Period", "3", "Fixed lunch period number"],
+    ["Core Periods per Week", "4", "Periods per week for core subjects"],
+    ["PE Periods per Week", "3", "PE periods per team per week"],
+    ["Literacy Periods per Week", "2", "Literacy periods per class per week"],
+    ["Team Meetings per Week", "2", "Team meetings per team per week"],
+    ["Advisory Periods per Week", "2", "Advisory periods per team per week"],
+    ["Elective Periods per Week", "2", "School-wide elective periods per week"]
+]
+
+TEMPLATE_TEACHER_ROWS = [
+    ["Teacher Name", "Subject", "Team", "Type", "Notes", "Active"],
+    ["ELA_T1", "ELA", "1", "Core", "Team 1 ELA Teacher", "TRUE"],
+    ["SS_T1", "SS", "1", "Core", "Team 1 Social Studies Teacher", "TRUE"],
+    ["Science_T1", "Science", "1", "Core", "Team 1 Science Teacher", "TRUE"],
+    ["Math_T1", "Math", "1", "Core", "Team 1 Math Teacher", "TRUE"],
+    ["Arts_T1", "Arts", "1", "Core", "Team 1 Arts Teacher", "TRUE"],
+    ["ELA_T2", "ELA", "2", "Core", "Team 2 ELA Teacher", "TRUE"],
+    ["SS_T2", "SS", "2", "Core", "Team 2 Social Studies Teacher", "TRUE"],
+    ["Science_T2", "Science", "2", "Core", "Team 2 Science Teacher", "TRUE"],
+    ["Math_T2", "Math", "2", "Core", "Team 2 Math Teacher", "TRUE"],
+    ["Arts_T2", "Arts", "2", "Core", "Team 2 Arts Teacher", "TRUE"],
+    ["ELA_T3", "ELA", "3", "Core", "Team 3 ELA Teacher", "TRUE"],
+    ["SS_T3", "SS", "3", "Core", "Team 3 Social Studies Teacher", "TRUE"],
+    ["Science_T3", "Science", "3", "Core", "Team 3 Science Teacher", "TRUE"],
+    ["Math_T3", "Math", "3", "Core", "Team 3 Math Teacher", "TRUE"],
+    ["Arts_T3", "Arts", "3", "Core", "Team 3 Arts Teacher", "TRUE"],
+    ["ELA_T4", "ELA", "4", "Core", "Team 4 ELA Teacher", "TRUE"],
+    ["SS_T4", "SS", "4", "Core", "Team 4 Social Studies Teacher", "TRUE"],
+    ["Science_T4", "Science", "4", "Core", "Team 4 Science Teacher", "TRUE"],
+    ["Math_T4", "Math", "4", "Core", "Team 4 Math Teacher", "TRUE"],
+    ["Arts_T4", "Arts", "4", "Core", "Team 4 Arts Teacher", "TRUE"],
+    ["Literacy_T1", "Literacy", "1,2", "Literacy", "Serves teams 1 and 2", "TRUE"],
+    ["Literacy_T2", "Literacy", "3,4", "Literacy", "Serves teams 3 and 4", "TRUE"],
+    ["PE_T1", "PE", "All", "PE", "PE Teacher 1", "TRUE"],
+    ["PE_T2", "PE", "All", "PE", "PE Teacher 2", "TRUE"]
+]
+
+TEMPLATE_CLASS_ROWS = [
+    ["Class Name", "Team", "Notes"],
+    ["A", "1", "Team 1 Class A"],
+    ["B", "1", "Team 1 Class B"],
+    ["C", "1", "Team 1 Class C"],
+    ["D", "1", "Team 1 Class D"],
+    ["E", "2", "Team 2 Class E"],
+    ["F", "2", "Team 2 Class F"],
+    ["G", "2", "Team 2 Class G"],
+    ["H", "2", "Team 2 Class H"],
+    ["I", "3", "Team 3 Class I"],
+    ["J", "3", "Team 3 Class J"],
+    ["K", "3", "Team 3 Class K"],
+    ["L", "3", "Team 3 Class L"],
+    ["M", "4", "Team 4 Class M"],
+    ["N", "4", "Team 4 Class N"],
+    ["O", "4", "Team 4 Class O"],
+    ["P", "4", "Team 4 Class P"]
+]
+
+
+def _numericise(value):
+    """Mimic gspread's get_all_records number conversion"""
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        return int(value)
+    return value
+
+
+def rows_to_records(rows):
+    """Convert a header + rows table into get_all_records-style dicts"""
+    header = rows[0]
+    return [{key: _numericise(value) for key, value in zip(header, row)} for row in rows[1:]]
+
+
+def template_records():
+    """Template (config, teachers_data, classes_data) exactly as read_* would return them"""
+    config = {row['Parameter']: row['Value'] for row in rows_to_records(TEMPLATE_CONFIG_ROWS)}
+    teachers_data = [t for t in rows_to_records(TEMPLATE_TEACHER_ROWS) if t['Active'].upper() == 'TRUE']
+    classes_data = rows_to_records(TEMPLATE_CLASS_ROWS)
+    return config, teachers_data, classes_data
+
 
 # ============================================================================
 # GOOGLE SHEETS INTEGRATION CLASS
 # ============================================================================
 
+def load_service_account_credentials(credentials_file):
+    """Load service account credentials with the Sheets and Drive scopes"""
+    from google.oauth2.service_account import Credentials
+
+    scope = [
+        'https://www.googleapis.com/auth/spreadsheets',
+        'https://www.googleapis.com/auth/drive'
+    ]
+    return Credentials.from_service_account_file(credentials_file, scopes=scope)
+
+
 class SchoolSchedulerGoogleSheets:
-    def __init__(self, credentials_file, spreadsheet_name):
+    def __init__(self, credentials_file, spreadsheet_name, rate_limiter=None, credentials=None):
         """
         Initialize Google Sheets connection
         
         Args:
             credentials_file: Path to Google service account JSON file
             spreadsheet_name: Name of the Google Spreadsheet
+            rate_limiter: SheetsRateLimiter to share; defaults to the
+                process-wide limiter for the service account
+            credentials: Already-loaded service account credentials to reuse
+                (keeps the OAuth token warm across spreadsheets)
         """
         self.credentials_file = credentials_file
         self.spreadsheet_name = spreadsheet_name
+        self.rate_limiter = rate_limiter
+        self.credentials = credentials
         self.gc = None
         self.spreadsheet = None
         self.connect()
     
     def connect(self):
         """Connect to Google Sheets"""
+        import gspread
+        from sheets_client import make_throttled_http_client
+
         try:
-            scope = [
-                'https://www.googleapis.com/auth/spreadsheets',
-                'https://www.googleapis.com/auth/drive'
-            ]
-            
-            creds = Credentials.from_service_account_file(
-                self.credentials_file, scopes=scope
-            )
-            self.gc = gspread.authorize(creds)
+            creds = self.credentials or load_service_account_credentials(self.credentials_file)
+            # Every API call goes through the throttled client (quota + backoff)
+            self.gc = gspread.authorize(creds, http_client=make_throttled_http_client(self.rate_limiter))
             
             # Try to open existing spreadsheet or create new one
             try:
@@ -52,6 +500,7 @@ class SchoolSchedulerGoogleSheets:
 
     def setup_input_sheets(self):
         """Create and populate input sheets with templates"""
+        import gspread
         
         # 1. School Configuration Sheet
         try:
@@ -59,23 +508,7 @@ class SchoolSchedulerGoogleSheets:
         except gspread.WorksheetNotFound:
             config_sheet = self.spreadsheet.add_worksheet("School_Config", 20, 10)
         
-        config_data = [
-            ["Parameter", "Value", "Description"],
-            ["School Name", "Sample School", "Name of the school"],
-            ["Total Teams", "4", "Number of grade teams"],
-            ["Classes per Team", "4", "Number of classes per team"],
-            ["Core Subjects", "ELA,SS,Science,Math,Arts", "Comma-separated core subjects"],
-            ["PE Teachers", "2", "Number of PE teachers"],
-            ["Literacy Teachers", "2", "Number of literacy teachers"],
-            ["Periods per Day", "Monday:7,Tuesday:7,Wednesday:6,Thursday:7,Friday:7", "Periods by day"],
-            ["Lunch Period", "3", "Fixed lunch period number"],
-            ["Core Periods per Week", "4", "Periods per week for core subjects"],
-            ["PE Periods per Week", "3", "PE periods per team per week"],
-            ["Literacy Periods per Week", "2", "Literacy periods per class per week"],
-            ["Team Meetings per Week", "2", "Team meetings per team per week"],
-            ["Advisory Periods per Week", "2", "Advisory periods per team per week"],
-            ["Elective Periods per Week", "2", "School-wide elective periods per week"]
-        ]
+        config_data = TEMPLATE_CONFIG_ROWS
         config_sheet.clear()
         config_sheet.update('A1', config_data)
         
@@ -85,33 +518,7 @@ class SchoolSchedulerGoogleSheets:
         except gspread.WorksheetNotFound:
             teachers_sheet = self.spreadsheet.add_worksheet("Teachers", 30, 6)
         
-        teachers_data = [
-            ["Teacher Name", "Subject", "Team", "Type", "Notes", "Active"],
-            ["ELA_T1", "ELA", "1", "Core", "Team 1 ELA Teacher", "TRUE"],
-            ["SS_T1", "SS", "1", "Core", "Team 1 Social Studies Teacher", "TRUE"],
-            ["Science_T1", "Science", "1", "Core", "Team 1 Science Teacher", "TRUE"],
-            ["Math_T1", "Math", "1", "Core", "Team 1 Math Teacher", "TRUE"],
-            ["Arts_T1", "Arts", "1", "Core", "Team 1 Arts Teacher", "TRUE"],
-            ["ELA_T2", "ELA", "2", "Core", "Team 2 ELA Teacher", "TRUE"],
-            ["SS_T2", "SS", "2", "Core", "Team 2 Social Studies Teacher", "TRUE"],
-            ["Science_T2", "Science", "2", "Core", "Team 2 Science Teacher", "TRUE"],
-            ["Math_T2", "Math", "2", "Core", "Team 2 Math Teacher", "TRUE"],
-            ["Arts_T2", "Arts", "2", "Core", "Team 2 Arts Teacher", "TRUE"],
-            ["ELA_T3", "ELA", "3", "Core", "Team 3 ELA Teacher", "TRUE"],
-            ["SS_T3", "SS", "3", "Core", "Team 3 Social Studies Teacher", "TRUE"],
-            ["Science_T3", "Science", "3", "Core", "Team 3 Science Teacher", "TRUE"],
-            ["Math_T3", "Math", "3", "Core", "Team 3 Math Teacher", "TRUE"],
-            ["Arts_T3", "Arts", "3", "Core", "Team 3 Arts Teacher", "TRUE"],
-            ["ELA_T4", "ELA", "4", "Core", "Team 4 ELA Teacher", "TRUE"],
-            ["SS_T4", "SS", "4", "Core", "Team 4 Social Studies Teacher", "TRUE"],
-            ["Science_T4", "Science", "4", "Core", "Team 4 Science Teacher", "TRUE"],
-            ["Math_T4", "Math", "4", "Core", "Team 4 Math Teacher", "TRUE"],
-            ["Arts_T4", "Arts", "4", "Core", "Team 4 Arts Teacher", "TRUE"],
-            ["Literacy_T1", "Literacy", "1,2", "Literacy", "Serves teams 1 and 2", "TRUE"],
-            ["Literacy_T2", "Literacy", "3,4", "Literacy", "Serves teams 3 and 4", "TRUE"],
-            ["PE_T1", "PE", "All", "PE", "PE Teacher 1", "TRUE"],
-            ["PE_T2", "PE", "All", "PE", "PE Teacher 2", "TRUE"]
-        ]
+        teachers_data = TEMPLATE_TEACHER_ROWS
         teachers_sheet.clear()
         teachers_sheet.update('A1', teachers_data)
         
@@ -121,25 +528,7 @@ class SchoolSchedulerGoogleSheets:
         except gspread.WorksheetNotFound:
             classes_sheet = self.spreadsheet.add_worksheet("Classes", 20, 5)
         
-        classes_data = [
-            ["Class Name", "Team", "Notes"],
-            ["A", "1", "Team 1 Class A"],
-            ["B", "1", "Team 1 Class B"],
-            ["C", "1", "Team 1 Class C"],
-            ["D", "1", "Team 1 Class D"],
-            ["E", "2", "Team 2 Class E"],
-            ["F", "2", "Team 2 Class F"],
-            ["G", "2", "Team 2 Class G"],
-            ["H", "2", "Team 2 Class H"],
-            ["I", "3", "Team 3 Class I"],
-            ["J", "3", "Team 3 Class J"],
-            ["K", "3", "Team 3 Class K"],
-            ["L", "3", "Team 3 Class L"],
-            ["M", "4", "Team 4 Class M"],
-            ["N", "4", "Team 4 Class N"],
-            ["O", "4", "Team 4 Class O"],
-            ["P", "4", "Team 4 Class P"]
-        ]
+        classes_data = TEMPLATE_CLASS_ROWS
         classes_sheet.clear()
         classes_sheet.update('A1', classes_data)
         
@@ -211,26 +600,54 @@ class SchoolSchedulerGoogleSheets:
             print(f"❌ Error reading classes: {e}")
             return None
 
-    def update_status(self, status, last_run=None, solve_time=None, quality=None):
-        """Update control panel status"""
+    @staticmethod
+    def status_cells(status, last_run=None, solve_time=None, quality=None):
+        """Map a status update onto Control_Panel cells ({'B8': value, ...})"""
+        cells = {'B8': status}
+        if last_run:
+            cells['B9'] = last_run
+        if solve_time:
+            cells['B10'] = f"{solve_time:.2f} seconds"
+        if quality:
+            cells['B11'] = quality
+        return cells
+
+    def write_status_cells(self, cells, raise_on_error=False):
+        """Write Control_Panel cells in a single batch request"""
         try:
             control_sheet = self.spreadsheet.worksheet("Control_Panel")
-            
-            # Update status - use new API format (values first, then range)
-            control_sheet.update([[status]], 'B8:B8')
-            
-            if last_run:
-                control_sheet.update([[last_run]], 'B9:B9')
-            if solve_time:
-                control_sheet.update([[f"{solve_time:.2f} seconds"]], 'B10:B10')
-            if quality:
-                control_sheet.update([[quality]], 'B11:B11')
-                
+            control_sheet.batch_update([
+                {'range': cell, 'values': [[value]]} for cell, value in cells.items()
+            ])
         except Exception as e:
             print(f"❌ Error updating status: {e}")
+            if raise_on_error:
+                raise
 
-    def write_teacher_schedules(self, schedules_data):
+    def update_status(self, status, last_run=None, solve_time=None, quality=None):
+        """Update control panel status"""
+        self.write_status_cells(self.status_cells(status, last_run, solve_time, quality))
+
+    def quota_summary(self):
+        """Requests, retries and latency histograms since the last reset"""
+        return self.gc.http_client.stats.summary()
+
+    def reset_quota_stats(self):
+        """Start a fresh per-run quota count"""
+        self.gc.http_client.stats.reset()
+
+    def get_modified_time(self):
+        """Return the Drive modifiedTime of the spreadsheet (None if unavailable)"""
+        try:
+            return self.spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            print(f"⚠️ Could not read spreadsheet modified time: {e}")
+            return None
+
+    def write_teacher_schedules(self, schedules_data, raise_on_error=False):
         """Write teacher schedules to Google Sheets"""
+        import gspread
+
         try:
             # Create or clear teacher schedules sheet with more rows
             try:
@@ -269,9 +686,13 @@ class SchoolSchedulerGoogleSheets:
             
         except Exception as e:
             print(f"❌ Error writing teacher schedules: {e}")
+            if raise_on_error:
+                raise
 
-    def write_class_schedules(self, schedules_data):
+    def write_class_schedules(self, schedules_data, raise_on_error=False):
         """Write class schedules to Google Sheets"""
+        import gspread
+
         try:
             # Create or clear class schedules sheet with more rows
             try:
@@ -310,9 +731,13 @@ class SchoolSchedulerGoogleSheets:
             
         except Exception as e:
             print(f"❌ Error writing class schedules: {e}")
+            if raise_on_error:
+                raise
 
-    def write_teacher_schedules_grid(self, schedules_data):
+    def write_teacher_schedules_grid(self, schedules_data, raise_on_error=False):
         """Write teacher schedules in grid format to Google Sheets"""
+        import gspread
+
         try:
             print("🔧 Creating teacher schedules grid...")
             
@@ -433,11 +858,15 @@ class SchoolSchedulerGoogleSheets:
         
         except Exception as e:
             print(f"❌ Error writing teacher schedules grid: {type(e).__name__}: {str(e)}")
+            if raise_on_error:
+                raise
             import traceback
             traceback.print_exc()
 
-    def write_class_schedules_grid(self, schedules_data):
+    def write_class_schedules_grid(self, schedules_data, raise_on_error=False):
         """Write class schedules in grid format to Google Sheets"""
+        import gspread
+
         try:
             print("🔧 Creating class schedules grid...")
             
@@ -591,6 +1020,8 @@ class SchoolSchedulerGoogleSheets:
             
         except Exception as e:
             print(f"❌ Error writing class schedules grid: {type(e).__name__}: {str(e)}")
+            if raise_on_error:
+                raise
             import traceback
             traceback.print_exc()  
 
@@ -598,9 +1029,69 @@ class SchoolSchedulerGoogleSheets:
 # INTEGRATED SCHEDULER CLASS
 # ============================================================================
 
+class RunCancelled(Exception):
+    """Raised inside run_solver when GoogleSheetsScheduler.cancel() was called"""
+
+
+class _ListenerStatusSink:
+    """update_status target that only forwards to status listeners"""
+
+    def __init__(self, listeners):
+        self.listeners = listeners
+
+    def update_status(self, status, *args):
+        for listener in self.listeners:
+            listener(status)
+
+
 class GoogleSheetsScheduler:
-    def __init__(self, credentials_file, spreadsheet_name):
-        self.sheets = SchoolSchedulerGoogleSheets(credentials_file, spreadsheet_name)
+    def __init__(self, credentials_file, spreadsheet_name, cache_dir=DEFAULT_CACHE_DIR, solver_profile=None, sheets=None,
+                 background_io=True, publish_outputs=DEFAULT_OUTPUTS, formulation=DEFAULT_FORMULATION, by_day=False,
+                 greedy_hints=False, event_encoding=DEFAULT_EVENT_ENCODING, anonymous_variables=False):
+        # `sheets` lets callers supply an already-connected (or local) sheets backend
+        self.sheets = sheets or SchoolSchedulerGoogleSheets(credentials_file, spreadsheet_name)
+        # Status and output writes go through `output`; with background_io they
+        # run on a worker thread so slow Sheets calls never stall the solver
+        self.output = BackgroundSheetsWriter(self.sheets) if background_io else self.sheets
+        # Output writes that failed outright since the last flush_output()
+        self._failed_writes = []
+        self.publish_outputs = tuple(publish_outputs)
+        self.last_quota_summary = None
+        # Solve time and quality of the solution the last successful run published
+        self.last_solve_time = None
+        self.last_quality = None
+        self.status_listeners = []
+        self.cancel_requested = False
+        # Caller's cancel flag for the current run (see run_solver)
+        self._cancelled = None
+        # CP-SAT solvers currently searching (several with the day-by-day solve)
+        self._active_solvers = set()
+        self.solver_profile = dict(solver_profile or DEFAULT_SOLVER_PROFILE)
+        if formulation not in FORMULATIONS:
+            raise ValueError(f"Unknown formulation '{formulation}' (expected one of {', '.join(FORMULATIONS)})")
+        self.formulation = formulation
+        if event_encoding not in EVENT_ENCODINGS:
+            raise ValueError(f"Unknown event encoding '{event_encoding}' "
+                             f"(expected one of {', '.join(EVENT_ENCODINGS)})")
+        self.event_encoding = event_encoding
+        # Two-stage solve: week plan, then the days in parallel (day_decomposition.py)
+        self.by_day = by_day
+        # Seed CP-SAT with a greedy timetable when no stored hints apply (constructive_heuristic.py)
+        self.greedy_hints = greedy_hints
+        # Create variables without names (smaller proto; see variable_names)
+        self.anonymous_variables = anonymous_variables
+        # Constraint families to post; None posts all of them (constraint_families.py)
+        self.constraint_families = None
+        self.solution_cache = SolutionCache(cache_dir) if cache_dir else None
+        # Built models keyed by a fingerprint of the inputs they are built from (model_cache.py)
+        self.model_cache = None
+        if cache_dir:
+            from model_cache import ModelCache
+            self.model_cache = ModelCache(cache_dir)
+        self.solution_store = None
+        if cache_dir:
+            from solution_store import SolutionStore
+            self.solution_store = SolutionStore(os.path.join(cache_dir, 'solutions.sqlite'))
         
     def setup_sheets(self):
         """Setup input sheets with templates"""
@@ -629,10 +1120,8 @@ class GoogleSheetsScheduler:
         
         return config, teachers_data, classes_data
     
-    def convert_sheets_data_to_model_format(self, config, teachers_data, classes_data):
-        """Convert Google Sheets data to model format"""
-        
-        # Parse periods by day
+    def parse_period_structure(self, config):
+        """Parse 'Periods per Day' and 'Lunch Period' into ALL_PERIODS / TEACHING_PERIODS"""
         periods_str = config['Periods per Day']
         ALL_PERIODS = {}
         TEACHING_PERIODS = {}
@@ -643,6 +1132,14 @@ class GoogleSheetsScheduler:
             period_count = int(periods)
             ALL_PERIODS[day] = list(range(1, period_count + 1))
             TEACHING_PERIODS[day] = [p for p in range(1, period_count + 1) if p != lunch_period]
+
+        return ALL_PERIODS, TEACHING_PERIODS
+
+    def convert_sheets_data_to_model_format(self, config, teachers_data, classes_data):
+        """Convert Google Sheets data to model format"""
+        
+        # Parse periods by day
+        ALL_PERIODS, TEACHING_PERIODS = self.parse_period_structure(config)
         
         # Build classes and teams
         CLASSES = [c['Class Name'] for c in classes_data]
@@ -684,42 +1181,7 @@ class GoogleSheetsScheduler:
                         TEACHERS[team_key] = {}
                     TEACHERS[team_key]['Literacy'] = teacher_name
         
-        # Find literacy teachers and their classes
-        literacy_teachers = {}
-        for team_key, team_teachers in TEACHERS.items():
-            if 'Literacy' in team_teachers:
-                literacy_teacher = team_teachers['Literacy']
-                if literacy_teacher not in literacy_teachers:
-                    literacy_teachers[literacy_teacher] = []
-                
-                # Get team number from team_key (e.g., "team_1" -> 1)
-                team_num = int(team_key.split('_')[1])
-                if team_num in TEAMS:
-                    # Assign all classes in the team to the literacy teacher
-                    if literacy_teacher not in literacy_teachers:
-                        literacy_teachers[literacy_teacher] = []
-                    literacy_teachers[literacy_teacher].extend(TEAMS[team_num])
-        
-        # Ensure each literacy teacher has classes from all served teams
-        for teacher in literacy_teachers:
-            if teacher == 'Literacy_T1':
-                assigned_teams = [1, 2]
-            elif teacher == 'Literacy_T2':
-                assigned_teams = [3, 4]
-            else:
-                continue
-            
-            all_classes = []
-            for team in assigned_teams:
-                if team in TEAMS:
-                    all_classes.extend(TEAMS[team])
-            
-            # Update with the correct classes
-            literacy_teachers[teacher] = list(set(all_classes))
-        
-        print(f"Literacy teachers found: {literacy_teachers}")
-        
-        return {
+        data = {
             'ALL_PERIODS': ALL_PERIODS,
             'TEACHING_PERIODS': TEACHING_PERIODS,
             'CLASSES': CLASSES,
@@ -730,408 +1192,439 @@ class GoogleSheetsScheduler:
             'PE_TEACHERS': PE_TEACHERS,
             'ALL_TEACHERS': ALL_TEACHERS,
             'DAYS': list(ALL_PERIODS.keys()),
-            'ACTIVITIES': ['Extra Prep', 'Prep', 'Team_Meeting', 'Discipline_Meeting', 'Advisory', 'Elective', 'Lunch']
+            'ACTIVITIES': ['Extra Prep', 'Prep', 'Team_Meeting', 'Discipline_Meeting', 'Advisory', 'Elective', 'Lunch'],
+            'RULES': parse_rules(config)
         }
+
+        # Index the school once; the model builder, solution extraction and
+        # rendering share this instance
+        instance = school_instance(data)
+        print(f"Literacy teachers found: {dict(instance.literacy_classes)}")
+
+        return data
     
-    def solve_scheduling_model(self, data, teachers_data):
-        """Complete scheduling solver using Google Sheets data"""
+    def apply_solution_hints(self, model, hints, teacher_activity, teacher_class_assignment):
+        """
+        Add AddHint calls for a (possibly partial) past solution; pre-fixed
+        constants are skipped (a constant is shared, and hinting one
+        variable twice makes the model invalid)
 
-        # Add status mapping for debugging
-        status_names = {
-            cp_model.OPTIMAL: "OPTIMAL",
-            cp_model.FEASIBLE: "FEASIBLE", 
-            cp_model.INFEASIBLE: "INFEASIBLE",
-            cp_model.UNKNOWN: "UNKNOWN",
-            cp_model.MODEL_INVALID: "MODEL_INVALID"
+        Args:
+            hints: Dict from SolutionStore.find_hints with 'teachers',
+                'teacher_activity' {(teacher, day, period): value} and
+                'teacher_class_assignment' {(teacher, class, day, period)}
+        """
+        hint_count = 0
+
+        for (teacher, day, period), value in hints.get('teacher_activity', {}).items():
+            if teacher in teacher_activity and day in teacher_activity[teacher] and period in teacher_activity[teacher][day]:
+                if is_constant(teacher_activity[teacher][day][period]):
+                    continue
+                model.AddHint(teacher_activity[teacher][day][period], value)
+                hint_count += 1
+
+        # Assignments are stored sparsely: every other slot of a hinted teacher is a 0
+        hinted_assignments = hints.get('teacher_class_assignment', set())
+        for teacher in hints.get('teachers', []):
+            if teacher not in teacher_class_assignment:
+                continue
+            for class_name, class_days in teacher_class_assignment[teacher].items():
+                for day, day_periods in class_days.items():
+                    for period, var in day_periods.items():
+                        if is_constant(var):
+                            continue
+                        model.AddHint(var, 1 if (teacher, class_name, day, period) in hinted_assignments else 0)
+                        hint_count += 1
+
+        print(f"💡 Added {hint_count} solution hints")
+        return hint_count
+
+    def apply_greedy_hints(self, built, data):
+        """
+        Hint the model with a greedy timetable from constructive_heuristic
+
+        Args:
+            built: Output of build_scheduling_model
+            data: Converted data the model was built from
+
+        Returns:
+            (hints, stats): the (variable, value) pairs added and a dict with
+            the heuristic's 'seconds', 'attempts' and 'issues'
+        """
+        from constructive_heuristic import construct_timetable, timetable_hints
+
+        timetable = construct_timetable(data)
+        hints = timetable_hints(built, data, timetable)
+        for var, value in hints:
+            built['model'].AddHint(var, value)
+        stats = {
+            'seconds': round(timetable['seconds'], 3),
+            'attempts': timetable['attempts'],
+            'issues': len(timetable['issues']),
+            'hints': len(hints)
         }
-        
+        print(f"💡 Greedy timetable in {timetable['seconds']:.2f}s "
+              f"({timetable['attempts']} attempts, {stats['issues']} issues): added {len(hints)} hints")
+        return hints, stats
+
+    def build_time_grid(self, DAYS, TEACHING_PERIODS, team_numbers=None, rules=None, anonymous=None, families=None):
+        """
+        Create the team- and school-level slot variables
+
+        These only depend on the period structure and the team numbers, so
+        they can be built as soon as School_Config is known - before the
+        teacher and class sheets have been read.
+
+        Args:
+            anonymous: Create unnamed variables (defaults to the scheduler's
+                anonymous_variables)
+            families: Constraint families to post (see constraint_families.py;
+                only the time grid ones apply here). Defaults to the
+                scheduler's constraint_families, or all of them.
+
+        Returns:
+            Dict with the model and the team meeting / PE / advisory and
+            school elective schedules ({team: {day: {period: BoolVar}}}),
+            plus the rules used, their constraints ('rule_constraints') and
+            the families posted
+        """
+        from ortools.sat.python import cp_model
+        from constraint_families import GRID_FAMILIES, ModelContext, add_families, select_families
+
+        team_numbers = list(team_numbers or DEFAULT_TEAM_NUMBERS)
+        rules = dict(rules or DEFAULT_RULES)
+        if anonymous is None:
+            anonymous = getattr(self, 'anonymous_variables', False)
+        if families is None:
+            families = getattr(self, 'constraint_families', None)
+        model = anonymous_model_class()() if anonymous else cp_model.CpModel()
+
+        def team_slot_vars(label):
+            return {
+                team_num: {
+                    day: {
+                        period: model.NewBoolVar(f'team_{team_num}_{label}_{day}_P{period}')
+                        for period in TEACHING_PERIODS[day]
+                    }
+                    for day in DAYS
+                }
+                for team_num in team_numbers
+            }
+
+        grid = ModelContext(
+            model=model, DAYS=DAYS, TEACHING_PERIODS=TEACHING_PERIODS, team_numbers=team_numbers, rules=rules,
+            rule_constraints={}, families=(),
+            team_meeting_schedule=team_slot_vars('meeting'),
+            team_pe_schedule=team_slot_vars('has_PE'),
+            team_advisory_schedule=team_slot_vars('advisory'),
+            elective_schedule={
+                day: {period: model.NewBoolVar(f'school_elective_{day}_P{period}') for period in TEACHING_PERIODS[day]}
+                for day in DAYS
+            }
+        )
+        add_families(grid, select_families(families, GRID_FAMILIES))
+
+        return {
+            'model': model,
+            'team_numbers': team_numbers,
+            'rules': rules,
+            'anonymous': anonymous,
+            'families': grid.families,
+            'rule_constraints': grid.rule_constraints,
+            'team_meeting_schedule': grid.team_meeting_schedule,
+            'team_pe_schedule': grid.team_pe_schedule,
+            'team_advisory_schedule': grid.team_advisory_schedule,
+            'elective_schedule': grid.elective_schedule
+        }
+
+    def solve_scheduling_model(self, data, teachers_data, solver_profile=None, hints=None, progress_callback=None,
+                               grid=None):
+        """Complete scheduling solver using Google Sheets data"""
+        if getattr(self, 'by_day', False):
+            from day_decomposition import solve_by_days
+            return solve_by_days(data, solver_profile, hints=hints, progress_callback=progress_callback,
+                                 active_solvers=self._solver_registry(), is_cancelled=self._is_cancelled)
+        built = self.load_or_build_model(data, grid)
+        return self.solve_built_model(built, data, solver_profile, hints, progress_callback)
+
+    def load_or_build_model(self, data, grid=None):
+        """
+        build_scheduling_model through the model cache
+
+        A model built before from the same data, formulation, event encoding,
+        variable naming, constraint families and scheduler code is deserialized instead of rebuilt; a new one is
+        stored before any hints are added.
+
+        Returns:
+            The build_scheduling_model dict
+        """
+        model_cache = getattr(self, 'model_cache', None)
+        if model_cache is None:
+            return self.build_scheduling_model(data, grid)
+
+        from model_cache import compute_model_fingerprint
+        from constraint_families import select_families
+
+        start = time.time()
+        fingerprint = compute_model_fingerprint(
+            data, getattr(self, 'formulation', DEFAULT_FORMULATION),
+            getattr(self, 'event_encoding', DEFAULT_EVENT_ENCODING), get_code_version(),
+            getattr(self, 'anonymous_variables', False), select_families(getattr(self, 'constraint_families', None)))
+        built = model_cache.get(fingerprint)
+        if built is not None:
+            print(f"📦 Loaded cached model {fingerprint[:12]} in {time.time() - start:.3f}s")
+            return built
+        built = self.build_scheduling_model(data, grid)
+        model_cache.put(fingerprint, built)
+        return built
+
+    def build_scheduling_model(self, data, grid=None, formulation=None, event_encoding=None, anonymous=None,
+                               families=None):
+        """
+        Build the CP-SAT model for the converted data
+
+        Args:
+            data: Output of convert_sheets_data_to_model_format
+            grid: Optional result of build_time_grid for the same periods,
+                built ahead of time while the teacher/class sheets loaded
+            formulation: 'classes' (one Boolean per teacher, class and slot) or
+                'team_counts' (one per teacher, team and slot; concrete classes
+                are assigned after solving, see class_assignment.py).
+                Defaults to the scheduler's formulation.
+            event_encoding: 'booleans' (reified implications per teacher and
+                slot) or 'intervals' (optional intervals with AddNoOverlap per
+                teacher and per class). Defaults to the scheduler's encoding.
+            anonymous: Create unnamed variables (see variable_names).
+                Defaults to the scheduler's anonymous_variables.
+            families: Constraint families to post (names from
+                constraint_families.CONSTRAINT_FAMILIES). Defaults to the
+                scheduler's constraint_families, or all of them.
+
+        Returns:
+            Dict with the model and every variable family needed to read a solution
+        """
+        from constraint_families import MODEL_FAMILIES, add_families, select_families
+
         print("🔧 Building scheduling model...")
-        
+        if families is None:
+            families = getattr(self, 'constraint_families', None)
+        families = select_families(families)
+        context = self.build_model_context(data, grid, formulation, event_encoding, anonymous, families)
+
+        posted = select_families(families, MODEL_FAMILIES)
+        print(f"Adding {len(posted)} constraint families: {', '.join(posted)}")
+        add_families(context, posted)
+        return context.built()
+
+    def build_model_context(self, data, grid=None, formulation=None, event_encoding=None, anonymous=None,
+                            families=None):
+        """
+        Variables of the CP-SAT model, before any model constraint family
+
+        Creates the time grid (posting its families), the activities, the
+        lessons and the definitions every family reads: the teaching flags,
+        the discipline slots, the teachers' advisory channels and (intervals)
+        the prep flags. Arguments are those of build_scheduling_model.
+
+        Returns:
+            constraint_families.ModelContext; add_families posts constraint
+            families on it, clone() copies it and built() gives the
+            build_scheduling_model dict
+        """
+        import numpy as np
+        from ortools.sat.python import cp_model
+        from constraint_families import GRID_FAMILIES, ModelContext, select_families
+
         # Extract data
         DAYS = data['DAYS']
         ALL_PERIODS = data['ALL_PERIODS']
         TEACHING_PERIODS = data['TEACHING_PERIODS']
         CLASSES = data['CLASSES']
         TEAMS = data['TEAMS']
-        TEACHERS = data['TEACHERS']
         PE_TEACHERS = data['PE_TEACHERS']
         ALL_TEACHERS = data['ALL_TEACHERS']
         CORE_SUBJECTS = data['CORE_SUBJECTS']
-        ACTIVITIES = data['ACTIVITIES']
-        TEAM_MAPPING = data['TEAM_MAPPING']
-        TEAMS = data['TEAMS']
+        RULES = data.get('RULES') or DEFAULT_RULES
+        formulation = formulation or getattr(self, 'formulation', DEFAULT_FORMULATION)
+        if formulation not in FORMULATIONS:
+            raise ValueError(f"Unknown formulation '{formulation}' (expected one of {', '.join(FORMULATIONS)})")
+        aggregated = formulation == 'team_counts'
+        event_encoding = event_encoding or getattr(self, 'event_encoding', DEFAULT_EVENT_ENCODING)
+        if event_encoding not in EVENT_ENCODINGS:
+            raise ValueError(f"Unknown event encoding '{event_encoding}' "
+                             f"(expected one of {', '.join(EVENT_ENCODINGS)})")
+        intervals = event_encoding == 'intervals'
+        if anonymous is None:
+            anonymous = getattr(self, 'anonymous_variables', False)
+        if families is None:
+            families = getattr(self, 'constraint_families', None)
+        grid_families = select_families(families, GRID_FAMILIES)
+        # The indexed school: teachers, classes, teams and teaching slots have
+        # dense integer indices and precomputed lookups (see school_instance.py).
+        # The variables live in NumPy object arrays and every constraint family
+        # is posted from array slices; the nested dicts returned to callers are
+        # views onto the same variables.
+        instance = school_instance(data)
+        teachers = instance.teachers
+        team_numbers = list(instance.team_numbers)
+        # Pre-fixing: whatever the data alone decides becomes a variable domain
+        # or a constant instead of a constraint
+        domains = static_domains(data)
+        eligible_classes = domains['eligible_classes']
+        LUNCH_PERIODS = instance.lunch_periods
+        SLOTS = instance.slots
+        day_slots = instance.day_slots
+        class_index = instance.class_index
+        CODE = instance.activity_codes
+        pe_rows = [teachers[teacher].index for teacher in PE_TEACHERS]
+        class_team = [instance.teams[instance.class_team[class_name]].index for class_name in CLASSES]
+        # eligible_rows[t]: class indices of teacher t; class_rows[c] / class_core_rows[c]:
+        # teacher indices that can teach class c (all / core and literacy only)
+        eligible_rows = [[class_index[name] for name in eligible_classes[teacher]] for teacher in ALL_TEACHERS]
+        class_rows = [[] for _ in CLASSES]
+        class_core_rows = [[] for _ in CLASSES]
+        for t, teacher in enumerate(ALL_TEACHERS):
+            for c in eligible_rows[t]:
+                class_rows[c].append(t)
+                if teachers[teacher].kind != 'pe':
+                    class_core_rows[c].append(t)
         
         # ============================================================================
         # MODEL SETUP
         # ============================================================================
         
-        model = cp_model.CpModel()
-        
+        if (grid is None or grid['team_numbers'] != team_numbers or grid.get('rules') != RULES
+                or grid.get('anonymous', False) != anonymous
+                or tuple(grid.get('families', GRID_FAMILIES)) != grid_families):
+            grid = self.build_time_grid(DAYS, TEACHING_PERIODS, team_numbers, RULES, anonymous, grid_families)
+        model = grid['model']
+        team_meeting_schedule = grid['team_meeting_schedule']
+        team_pe_schedule = grid['team_pe_schedule']
+        team_advisory_schedule = grid['team_advisory_schedule']
+        elective_schedule = grid['elective_schedule']
+
+        def slot_array(schedules):
+            """(team x slot) object array of the grid's team schedule variables"""
+            array = np.empty((len(team_numbers), len(SLOTS)), dtype=object)
+            for k, team_num in enumerate(team_numbers):
+                for s, (day, period) in enumerate(SLOTS):
+                    array[k, s] = schedules[team_num][day][period]
+            return array
+
         # Decision Variables
+        # Lunch periods are the Lunch constant; a teaching period's activity
+        # ranges over the codes the teacher can have at all (never Lunch)
+        lunch = model.NewConstant(CODE['Lunch'])
+        # Pairs that can never be true (a teacher and a class or team outside
+        # their teams) are the constant 0 and the constraint families skip them
+        never = model.NewConstant(0)
+        activity = np.empty((len(ALL_TEACHERS), len(SLOTS)), dtype=object)
         teacher_activity = {}
-        for teacher in ALL_TEACHERS:
+        for t, teacher in enumerate(ALL_TEACHERS):
             teacher_activity[teacher] = {}
+            activity_domain = cp_model.Domain.FromValues(domains['activities'][teacher])
             for day in DAYS:
                 teacher_activity[teacher][day] = {}
                 for period in ALL_PERIODS[day]:
-                    teacher_activity[teacher][day][period] = model.NewIntVar(
-                        0, len(ACTIVITIES) - 1, 
-                        f'{teacher}_{day}_P{period}_activity'
-                    )
-        
-        teacher_class_assignment = {}
-        for teacher in ALL_TEACHERS:
-            teacher_class_assignment[teacher] = {}
-            for class_name in CLASSES:
-                teacher_class_assignment[teacher][class_name] = {}
-                for day in DAYS:
-                    teacher_class_assignment[teacher][class_name][day] = {}
-                    for period in TEACHING_PERIODS[day]:
-                        teacher_class_assignment[teacher][class_name][day][period] = \
-                            model.NewBoolVar(
-                                f'{teacher}_teaches_{class_name}_{day}_P{period}'
-                            )
-        
-        # ============================================================================
-        # TEAM MEETING SCHEDULE DEFINITION
-        # ============================================================================
-        
-        team_meeting_schedule = {}
-        for team_num in range(1, 5):
-            team_meeting_schedule[team_num] = {}
-            for day in DAYS:
-                team_meeting_schedule[team_num][day] = {}
-                for period in TEACHING_PERIODS[day]:
-                    team_meeting_schedule[team_num][day][period] = model.NewBoolVar(
-                        f'team_{team_num}_meeting_{day}_P{period}'
+                    if period in LUNCH_PERIODS[day]:
+                        teacher_activity[teacher][day][period] = lunch
+                        continue
+                    teacher_activity[teacher][day][period] = model.NewIntVarFromDomain(
+                        activity_domain, f'{teacher}_{day}_P{period}_activity'
                     )
+            for s, (day, period) in enumerate(SLOTS):
+                activity[t, s] = teacher_activity[teacher][day][period]
         
-        # ============================================================================
-        # BASIC CONSTRAINTS
-        # ============================================================================
-
-        print("Adding basic constraints...")
-
-        # Lunch constraint - Period 3 is lunch
-        for teacher in ALL_TEACHERS:
-            for day in DAYS:
-                if 3 in ALL_PERIODS[day]:
-                    model.Add(teacher_activity[teacher][day][3] == ACTIVITIES.index('Lunch'))
-
-        # ONLY Period 3 is lunch - no other periods can be lunch
-        print("Adding only period 3 is lunch constraint...")
-        for teacher in ALL_TEACHERS:
-            for day in DAYS:
-                for period in ALL_PERIODS[day]:
-                    if period != 3:  # For all periods except 3
-                        model.Add(teacher_activity[teacher][day][period] != ACTIVITIES.index('Lunch'))
-
-        # Prep constraint - exactly 1 prep per day
-        for teacher in ALL_TEACHERS:
-            for day in DAYS:
-                daily_preps = []
-                for period in TEACHING_PERIODS[day]:
-                    prep_var = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_prep')
-                    model.Add(teacher_activity[teacher][day][period] == ACTIVITIES.index('Prep')).OnlyEnforceIf(prep_var)
-                    model.Add(teacher_activity[teacher][day][period] != ACTIVITIES.index('Prep')).OnlyEnforceIf(prep_var.Not())
-                    daily_preps.append(prep_var)
-                model.Add(sum(daily_preps) == 1)
+        assign = lessons = pe_count = team_rows = None
+        team_teaching = pe_class_count = None
+        # teaching[t, s] / teacher_teaching[teacher][day][period]: the teacher has any class in the slot
+        teaching = np.empty((len(ALL_TEACHERS), len(SLOTS)), dtype=object)
+        teacher_teaching = {teacher: {day: {} for day in DAYS} for teacher in ALL_TEACHERS}
+        if not aggregated:
+            # assign[t, c, s]: teacher t teaches class c in slot s
+            assign = np.full((len(ALL_TEACHERS), len(CLASSES), len(SLOTS)), never, dtype=object)
+            teacher_class_assignment = {}
+            for t, teacher in enumerate(ALL_TEACHERS):
+                teacher_class_assignment[teacher] = {}
+                eligible = set(eligible_rows[t])
+                for c, class_name in enumerate(CLASSES):
+                    if c in eligible:
+                        for s, (day, period) in enumerate(SLOTS):
+                            assign[t, c, s] = model.NewBoolVar(f'{teacher}_teaches_{class_name}_{day}_P{period}')
+                    teacher_class_assignment[teacher][class_name] = {
+                        day: {SLOTS[s][1]: assign[t, c, s] for s in day_slots[day]} for day in DAYS
+                    }
 
-        # Teaching activity constraint
-        for teacher in ALL_TEACHERS:
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    teaching_assignments = []
-                    for class_name in CLASSES:
-                        teaching_assignments.append(teacher_class_assignment[teacher][class_name][day][period])
-                    
+            # A core or literacy teacher has at most one class at a time, so
+            # their teaching flag is the sum of their lessons; a PE teacher's
+            # is the OR of them
+            for t, teacher in enumerate(ALL_TEACHERS):
+                rows = eligible_rows[t]
+                for s, (day, period) in enumerate(SLOTS):
+                    teaching_assignments = list(assign[t, rows, s])
                     is_teaching = model.NewBoolVar(f'{teacher}_is_teaching_{day}_P{period}')
-                    model.AddBoolOr(teaching_assignments).OnlyEnforceIf(is_teaching)
-                    model.AddBoolAnd([var.Not() for var in teaching_assignments]).OnlyEnforceIf(is_teaching.Not())
-                    
-                    model.Add(
-                        teacher_activity[teacher][day][period] == ACTIVITIES.index('Extra Prep')
-                    ).OnlyEnforceIf(is_teaching)
-
-        # One teacher per class per period
-        for class_name in CLASSES:
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    class_teachers = []
-                    for teacher in ALL_TEACHERS:
-                        class_teachers.append(teacher_class_assignment[teacher][class_name][day][period])
-                    model.Add(sum(class_teachers) <= 1)
-
-        # One class per teacher per period (except PE who can teach multiple classes from same team)
-        print("Adding one class per teacher constraint...")
-
-        for teacher in ALL_TEACHERS:
-            if teacher not in PE_TEACHERS:
-                for day in DAYS:
-                    for period in TEACHING_PERIODS[day]:
-                        teacher_assignments = []
-                        for class_name in CLASSES:
-                            teacher_assignments.append(teacher_class_assignment[teacher][class_name][day][period])
-                        model.Add(sum(teacher_assignments) <= 1)
-
-        # No repeat classes same day constraint
-        print("Adding no repeat classes same day constraint...")
-
-        for teacher in ALL_TEACHERS:
-            if teacher not in PE_TEACHERS:
-                for day in DAYS:
-                    for class_name in CLASSES:
-                        daily_teaching = []
-                        for period in TEACHING_PERIODS[day]:
-                            daily_teaching.append(teacher_class_assignment[teacher][class_name][day][period])
-                        model.Add(sum(daily_teaching) <= 1)
-
-        # ============================================================================
-        # CORE SUBJECT CONSTRAINTS
-        # ============================================================================
-
-        print("Adding core subject constraints...")
-
-        for team_num in range(1, 5):
-            team_key = f'team_{team_num}'
-            if team_key in TEACHERS:
-                team_classes = TEAMS[team_num]
-                
-                for subject in CORE_SUBJECTS:
-                    if subject in TEACHERS[team_key]:
-                        teacher = TEACHERS[team_key][subject]
-                        
-                        # Each teacher must teach each of their team's classes exactly 4 times per week
-                        for class_name in team_classes:
-                            weekly_teaching = []
-                            for day in DAYS:
-                                for period in TEACHING_PERIODS[day]:
-                                    weekly_teaching.append(
-                                        teacher_class_assignment[teacher][class_name][day][period]
-                                    )
-                            model.Add(sum(weekly_teaching) == 4)
-
-        # ============================================================================
-        # LITERACY CONSTRAINTS
-        # ============================================================================
-
-        print("Adding literacy constraints...")
-
-        # Define literacy teacher assignments explicitly
-        literacy_assignments = {
-            'Literacy_T1': ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H'],  # Teams 1 & 2
-            'Literacy_T2': ['I', 'J', 'K', 'L', 'M', 'N', 'O', 'P']   # Teams 3 & 4
-        }
-
-        print(f"Literacy assignments: {literacy_assignments}")
-
-        for literacy_teacher, assigned_classes in literacy_assignments.items():
-            for class_name in assigned_classes:
-                # Each literacy teacher teaches each assigned class exactly 2 times per week
-                weekly_literacy = []
-                for day in DAYS:
-                    for period in TEACHING_PERIODS[day]:
-                        weekly_literacy.append(
-                            teacher_class_assignment[literacy_teacher][class_name][day][period]
-                        )
-                model.Add(sum(weekly_literacy) == 2)
-                
-                # No repeat same day for literacy
-                for day in DAYS:
-                    daily_literacy = []
-                    for period in TEACHING_PERIODS[day]:
-                        daily_literacy.append(teacher_class_assignment[literacy_teacher][class_name][day][period])
-                    model.Add(sum(daily_literacy) <= 1)
-
-        # Literacy teachers should NOT participate in team meetings
-        print("Excluding literacy teachers from team meetings...")
-        for literacy_teacher in literacy_assignments.keys():
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    for team_num in range(1, 5):
-                        model.Add(
-                            teacher_activity[literacy_teacher][day][period] != ACTIVITIES.index('Team_Meeting')
-                        ).OnlyEnforceIf(team_meeting_schedule[team_num][day][period])
-
-        # ============================================================================
-        # PE CONSTRAINTS
-        # ============================================================================
-
-        print("Adding PE constraints...")
-
-        # Create team PE schedule variables
-        team_pe_schedule = {}
-        for team_num in range(1, 5):
-            team_pe_schedule[team_num] = {}
-            for day in DAYS:
-                team_pe_schedule[team_num][day] = {}
-                for period in TEACHING_PERIODS[day]:
-                    team_pe_schedule[team_num][day][period] = model.NewBoolVar(
-                        f'team_{team_num}_has_PE_{day}_P{period}'
-                    )
-
-        # Each team gets exactly 3 PE periods per week
-        for team_num in range(1, 5):
-            weekly_pe = []
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    weekly_pe.append(team_pe_schedule[team_num][day][period])
-            model.Add(sum(weekly_pe) == 3)
-
-        # When team has PE, PE teachers teach all classes in that team
-        for team_num in range(1, 5):
-            team_classes = TEAMS[team_num]
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    # When team has PE, ensure all classes are covered
-                    for class_name in team_classes:
-                        pe_teaching_class = []
-                        for pe_teacher in PE_TEACHERS:
-                            pe_teaching_class.append(teacher_class_assignment[pe_teacher][class_name][day][period])
-                        
-                        # At least one PE teacher must teach each class when team has PE
-                        model.AddBoolOr(pe_teaching_class).OnlyEnforceIf(team_pe_schedule[team_num][day][period])
-                    
-                    # Ensure efficient team coverage (all 4 classes covered when team has PE)
-                    total_pe_coverage = []
-                    for class_name in team_classes:
-                        for pe_teacher in PE_TEACHERS:
-                            total_pe_coverage.append(teacher_class_assignment[pe_teacher][class_name][day][period])
-                    
-                    # When team has PE, exactly 4 classes should be covered
-                    model.Add(sum(total_pe_coverage) == 4).OnlyEnforceIf(team_pe_schedule[team_num][day][period])
-
-        # PE teachers can only teach when their assigned team has PE
-        for pe_teacher in PE_TEACHERS:
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    for class_name in CLASSES:
-                        team_num = TEAM_MAPPING[class_name]
-                        # PE teacher can only teach this class if the team has PE
-                        model.Add(
-                            teacher_class_assignment[pe_teacher][class_name][day][period] <= 
-                            team_pe_schedule[team_num][day][period]
-                        )
-
-        # Only one team can have PE at a time (resource constraint)
-        for day in DAYS:
-            for period in TEACHING_PERIODS[day]:
-                teams_with_pe = []
-                for team_num in range(1, 5):
-                    teams_with_pe.append(team_pe_schedule[team_num][day][period])
-                model.Add(sum(teams_with_pe) <= 1)
-
-        # ============================================================================
-        # PE TEACHER MAXIMUM CLASS LOAD
-        # ============================================================================
-
-        print("Adding PE teacher maximum class load constraint...")
-
-        for pe_teacher in PE_TEACHERS:
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    # PE teachers can teach up to 2 classes at once
-                    class_assignments = []
-                    for class_name in CLASSES:
-                        class_assignments.append(teacher_class_assignment[pe_teacher][class_name][day][period])
-                    model.Add(sum(class_assignments) <= 2)
-
-        # ============================================================================
-        # TEAM MEETING CONSTRAINTS
-        # ============================================================================
-
-        print("Adding team meeting constraints...")
-
-        # Each team has exactly 2 team meetings per week
-        for team_num in range(1, 5):
-            weekly_meetings = []
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    weekly_meetings.append(team_meeting_schedule[team_num][day][period])
-            model.Add(sum(weekly_meetings) == 2)
-
-        # Each core teacher has exactly 2 team meetings per week
-        for team_key, team_teachers in TEACHERS.items():
-            for subject, teacher in team_teachers.items():
-                if subject != 'Literacy':
-                    weekly_team_meetings = []
-                    for day in DAYS:
-                        for period in TEACHING_PERIODS[day]:
-                            is_team_meeting = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_team_meeting')
-                            model.Add(teacher_activity[teacher][day][period] == ACTIVITIES.index('Team_Meeting')).OnlyEnforceIf(is_team_meeting)
-                            model.Add(teacher_activity[teacher][day][period] != ACTIVITIES.index('Team_Meeting')).OnlyEnforceIf(is_team_meeting.Not())
-                            weekly_team_meetings.append(is_team_meeting)
-                    model.Add(sum(weekly_team_meetings) == 2)
-
-        # Teachers can ONLY have team meetings when their team has a meeting
-        print("Adding bidirectional team meeting constraint...")
-
-        for team_num in range(1, 5):
-            team_key = f'team_{team_num}'
-            if team_key in TEACHERS:
-                core_teachers = [TEACHERS[team_key][subject] for subject in CORE_SUBJECTS if subject in TEACHERS[team_key]]
-                core_teachers = [t for t in core_teachers if 'Literacy' not in t]
-                
-                for day in DAYS:
-                    for period in TEACHING_PERIODS[day]:
-                        for teacher in core_teachers:
-                            # Teacher can have team meeting ONLY when team has meeting
-                            model.Add(
-                                teacher_activity[teacher][day][period] != ACTIVITIES.index('Team_Meeting')
-                            ).OnlyEnforceIf(team_meeting_schedule[team_num][day][period].Not())
-                            
-                            # This creates the bidirectional relationship:
-                            # - If team has meeting → teacher has meeting (existing constraint)
-                            # - If team doesn't have meeting → teacher doesn't have meeting (new constraint)
-
-        # Team meetings must be on different days for each team
-        for team_num in range(1, 5):
-            for day in DAYS:
-                daily_meetings = []
-                for period in TEACHING_PERIODS[day]:
-                    daily_meetings.append(team_meeting_schedule[team_num][day][period])
-                model.Add(sum(daily_meetings) <= 1)
-
-        # Team meetings can only happen when PE is teaching that team
-        for team_num in range(1, 5):
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    model.Add(
-                        team_meeting_schedule[team_num][day][period] <= 
-                        team_pe_schedule[team_num][day][period]
-                    )
-
-        # When team has meeting, core teachers participate (NOT literacy teachers)
-        for team_num in range(1, 5):
-            team_key = f'team_{team_num}'
-            if team_key in TEACHERS:
-                core_teachers = [TEACHERS[team_key][subject] for subject in CORE_SUBJECTS if subject in TEACHERS[team_key]]
-                # Exclude literacy teachers
-                core_teachers = [t for t in core_teachers if 'Literacy' not in t]
-                
-                for day in DAYS:
-                    for period in TEACHING_PERIODS[day]:
-                        for teacher in core_teachers:
-                            model.Add(
-                                teacher_activity[teacher][day][period] == ACTIVITIES.index('Team_Meeting')
-                            ).OnlyEnforceIf(team_meeting_schedule[team_num][day][period])
-
-        # PE teachers do NOT participate in team meetings (they get Extra Prep instead)
-        for team_num in range(1, 5):
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    for pe_teacher in PE_TEACHERS:
-                        model.Add(
-                            teacher_activity[pe_teacher][day][period] == ACTIVITIES.index('Extra Prep')
-                        ).OnlyEnforceIf(team_meeting_schedule[team_num][day][period])
-
-        # ============================================================================
-        # DISCIPLINE MEETING CONSTRAINTS
-        # ============================================================================
+                    if teachers[teacher].kind == 'pe':
+                        model.AddBoolOr(teaching_assignments).OnlyEnforceIf(is_teaching)
+                        model.AddBoolAnd([var.Not() for var in teaching_assignments]).OnlyEnforceIf(is_teaching.Not())
+                    else:
+                        # One class per teacher per period
+                        model.Add(cp_model.LinearExpr.Sum(teaching_assignments) == is_teaching)
+                    teaching[t, s] = is_teaching
+                    teacher_teaching[teacher][day][period] = is_teaching
+        else:
+            # Team-aggregated: which teachers teach *some* class of a team in a
+            # slot; the concrete class is chosen after solving
+            teacher_class_assignment = None
+            teacher_teams = domains['teacher_teams']
+            # lessons[t, k, s]: teacher t teaches a class of team k in slot s;
+            # pe_count[p, k, s]: how many classes of team k PE teacher p has
+            lessons = np.full((len(ALL_TEACHERS), len(team_numbers), len(SLOTS)), never, dtype=object)
+            pe_count = np.empty((len(PE_TEACHERS), len(team_numbers), len(SLOTS)), dtype=object)
+            # team_rows[k]: teacher indices with lessons for team k
+            team_rows = [[] for _ in team_numbers]
+
+            team_teaching = {}
+            for teacher, teams in teacher_teams.items():
+                t = teachers[teacher].index
+                team_teaching[teacher] = {}
+                for team_num in teams:
+                    k = instance.teams[team_num].index
+                    team_rows[k].append(t)
+                    for s, (day, period) in enumerate(SLOTS):
+                        lessons[t, k, s] = model.NewBoolVar(f'{teacher}_teaches_team_{team_num}_{day}_P{period}')
+                    team_teaching[teacher][team_num] = {
+                        day: {SLOTS[s][1]: lessons[t, k, s] for s in day_slots[day]} for day in DAYS
+                    }
+            pe_class_count = {}
+            for p, pe_teacher in enumerate(PE_TEACHERS):
+                pe_class_count[pe_teacher] = {}
+                for k, team_num in enumerate(team_numbers):
+                    for s, (day, period) in enumerate(SLOTS):
+                        pe_count[p, k, s] = model.NewIntVar(0, len(TEAMS[team_num]),
+                                                            f'{pe_teacher}_classes_of_team_{team_num}_{day}_P{period}')
+                    pe_class_count[pe_teacher][team_num] = {
+                        day: {SLOTS[s][1]: pe_count[p, k, s] for s in day_slots[day]} for day in DAYS
+                    }
 
-        print("Adding discipline meeting constraints (FIXED)...")
+            pe_position = {teacher: p for p, teacher in enumerate(PE_TEACHERS)}
+            for t, teacher in enumerate(ALL_TEACHERS):
+                teams = team_teaching.get(teacher, {})
+                for s, (day, period) in enumerate(SLOTS):
+                    if teachers[teacher].kind == 'pe':
+                        counts = cp_model.LinearExpr.Sum(list(pe_count[pe_position[teacher], :, s]))
+                        var = model.NewBoolVar(f'{teacher}_is_teaching_{day}_P{period}')
+                        model.Add(counts >= 1).OnlyEnforceIf(var)
+                        model.Add(counts == 0).OnlyEnforceIf(var.Not())
+                    elif len(teams) == 1:
+                        var = lessons[t, instance.teams[next(iter(teams))].index, s]
+                    else:
+                        var = model.NewBoolVar(f'{teacher}_is_teaching_{day}_P{period}')
+                        model.Add(cp_model.LinearExpr.Sum(
+                            [lessons[t, instance.teams[team_num].index, s] for team_num in teams]) == var)
+                    teaching[t, s] = var
+                    teacher_teaching[teacher][day][period] = var
 
-        # CREATE the discipline_schedule variables
+        # Discipline meeting slots of every subject (core subjects and Literacy)
         discipline_schedule = {}
         for subject in CORE_SUBJECTS + ["Literacy"]:
             discipline_schedule[subject] = {}
@@ -1142,445 +1635,119 @@ class GoogleSheetsScheduler:
                         f'{subject}_discipline_{day}_P{period}'
                     )
 
-        # Each subject has exactly 1 discipline meeting per week
-        for subject in CORE_SUBJECTS + ["Literacy"]:
-            weekly_discipline = []
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    weekly_discipline.append(discipline_schedule[subject][day][period])
-            model.Add(sum(weekly_discipline) == 1)
-
-        # Prevent discipline meetings when subject teachers are teaching
-        for subject in CORE_SUBJECTS:
-            subject_teachers = []
-            for i in range(1, 5):
-                team_key = f'team_{i}'
-                if team_key in TEACHERS and subject in TEACHERS[team_key]:
-                    subject_teachers.append(TEACHERS[team_key][subject])
-            
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    # Check if any subject teacher is teaching this period
-                    any_teacher_teaching = model.NewBoolVar(f'{subject}_any_teacher_teaching_{day}_P{period}')
-                    teachers_teaching = []
-                    
-                    for teacher in subject_teachers:
-                        is_teaching = model.NewBoolVar(f'{teacher}_{day}_P{period}_teaching_for_disc')
-                        teaching_assignments = []
-                        for class_name in CLASSES:
-                            teaching_assignments.append(teacher_class_assignment[teacher][class_name][day][period])
-                        model.AddBoolOr(teaching_assignments).OnlyEnforceIf(is_teaching)
-                        model.AddBoolAnd([var.Not() for var in teaching_assignments]).OnlyEnforceIf(is_teaching.Not())
-                        teachers_teaching.append(is_teaching)
-                    
-                    # any_teacher_teaching = True if ANY teacher is teaching
-                    model.AddBoolOr(teachers_teaching).OnlyEnforceIf(any_teacher_teaching)
-                    model.AddBoolAnd([var.Not() for var in teachers_teaching]).OnlyEnforceIf(any_teacher_teaching.Not())
-                    
-                    # Discipline meeting CANNOT happen when any teacher is teaching
-                    model.Add(discipline_schedule[subject][day][period] == 0).OnlyEnforceIf(any_teacher_teaching)
-
-        # Prevent literacy discipline meetings when literacy teachers are teaching
-        literacy_teachers_list = list(literacy_assignments.keys())
-        for day in DAYS:
-            for period in TEACHING_PERIODS[day]:
-                any_literacy_teaching = model.NewBoolVar(f'Literacy_any_teacher_teaching_{day}_P{period}')
-                literacy_teaching = []
-                
-                for teacher in literacy_teachers_list:
-                    is_teaching = model.NewBoolVar(f'{teacher}_{day}_P{period}_teaching_for_lit_disc')
-                    teaching_assignments = []
-                    for class_name in CLASSES:
-                        teaching_assignments.append(teacher_class_assignment[teacher][class_name][day][period])
-                    model.AddBoolOr(teaching_assignments).OnlyEnforceIf(is_teaching)
-                    model.AddBoolAnd([var.Not() for var in teaching_assignments]).OnlyEnforceIf(is_teaching.Not())
-                    literacy_teaching.append(is_teaching)
-                
-                model.AddBoolOr(literacy_teaching).OnlyEnforceIf(any_literacy_teaching)
-                model.AddBoolAnd([var.Not() for var in literacy_teaching]).OnlyEnforceIf(any_literacy_teaching.Not())
-                
-                # Literacy discipline meeting CANNOT happen when any literacy teacher is teaching
-                model.Add(discipline_schedule["Literacy"][day][period] == 0).OnlyEnforceIf(any_literacy_teaching)
-
-        # Simple synchronization: When subject has discipline meeting, all teachers attend
-        for subject in CORE_SUBJECTS:
-            subject_teachers = []
-            for i in range(1, 5):
-                team_key = f'team_{i}'
-                if team_key in TEACHERS and subject in TEACHERS[team_key]:
-                    subject_teachers.append(TEACHERS[team_key][subject])
-            
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    for teacher in subject_teachers:
-                        # When subject has discipline meeting, teacher attends
-                        model.Add(
-                            teacher_activity[teacher][day][period] == ACTIVITIES.index('Discipline_Meeting')
-                        ).OnlyEnforceIf(discipline_schedule[subject][day][period])
-
-        # Handle Literacy discipline meeting with same logic as core subjects
-        for day in DAYS:
-            for period in TEACHING_PERIODS[day]:
-                for literacy_teacher in literacy_assignments.keys():
-                    # When literacy has discipline meeting, teacher attends
-                    model.Add(
-                        teacher_activity[literacy_teacher][day][period] == ACTIVITIES.index('Discipline_Meeting')
-                    ).OnlyEnforceIf(discipline_schedule["Literacy"][day][period])
-
-        # Build clean list of non-PE teachers (avoiding duplicates)
-        all_non_pe_teachers = set()  # Use set to avoid duplicates
-        for team_key, team_teachers in TEACHERS.items():
-            for subject, teacher in team_teachers.items():
-                if teacher not in PE_TEACHERS:  # Explicitly exclude PE teachers
-                    all_non_pe_teachers.add(teacher)
-
-        # Add literacy teachers (they're definitely not PE)
-        for literacy_teacher in literacy_assignments.keys():
-            all_non_pe_teachers.add(literacy_teacher)
-
-        # Convert back to list
-        all_non_pe_teachers = list(all_non_pe_teachers)
-
-        print(f"Non-PE teachers for discipline meetings: {all_non_pe_teachers}")
-
-        for teacher in all_non_pe_teachers:
-            weekly_discipline = []
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    is_discipline = model.NewBoolVar(f'{teacher}_{day}_P{period}_discipline_exactly_one')
-                    model.Add(teacher_activity[teacher][day][period] == ACTIVITIES.index('Discipline_Meeting')).OnlyEnforceIf(is_discipline)
-                    model.Add(teacher_activity[teacher][day][period] != ACTIVITIES.index('Discipline_Meeting')).OnlyEnforceIf(is_discipline.Not())
-                    weekly_discipline.append(is_discipline)
-            
-            model.Add(sum(weekly_discipline) == 1)
-
-        # ============================================================================
-        # ADVISORY CONSTRAINTS
-        # ============================================================================
-
-        print("Adding advisory constraints...")
-
-        team_advisory_schedule = {}
-        for team_num in range(1, 5):
-            team_advisory_schedule[team_num] = {}
-            for day in DAYS:
-                team_advisory_schedule[team_num][day] = {}
-                for period in TEACHING_PERIODS[day]:
-                    team_advisory_schedule[team_num][day][period] = model.NewBoolVar(
-                        f'team_{team_num}_advisory_{day}_P{period}'
-                    )
-
-        # Each team gets exactly 2 advisory periods per week
-        for team_num in range(1, 5):
-            weekly_advisory = []
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    weekly_advisory.append(team_advisory_schedule[team_num][day][period])
-            model.Add(sum(weekly_advisory) == 2)
-
-        # When team has advisory, all team teachers participate (including literacy)
-        for team_num in range(1, 5):
-            team_key = f'team_{team_num}'
-            if team_key in TEACHERS:
-                team_teachers = [TEACHERS[team_key][subject] for subject in CORE_SUBJECTS if subject in TEACHERS[team_key]]
-                if 'Literacy' in TEACHERS[team_key]:
-                    team_teachers.append(TEACHERS[team_key]['Literacy'])
-                
-                for day in DAYS:
-                    for period in TEACHING_PERIODS[day]:
-                        for teacher in team_teachers:
-                            model.Add(
-                                teacher_activity[teacher][day][period] == ACTIVITIES.index('Advisory')
-                            ).OnlyEnforceIf(team_advisory_schedule[team_num][day][period])
-
-        # Advisory meetings must be on separate days for each team
-        for team_num in range(1, 5):
-            for day1_idx in range(len(DAYS)):
-                for day2_idx in range(day1_idx + 1, len(DAYS)):
-                    day1 = DAYS[day1_idx]
-                    day2 = DAYS[day2_idx]
-                    
-                    # Count advisory meetings for this team on each day
-                    day1_advisory = []
-                    day2_advisory = []
-                    
-                    for period in TEACHING_PERIODS[day1]:
-                        day1_advisory.append(team_advisory_schedule[team_num][day1][period])
-                    
-                    for period in TEACHING_PERIODS[day2]:
-                        day2_advisory.append(team_advisory_schedule[team_num][day2][period])
-                    
-                    # At most 1 advisory per day per team
-                    model.Add(sum(day1_advisory) <= 1)
-                    model.Add(sum(day2_advisory) <= 1)
-
-        # Literacy teachers should have limited advisory participation
-        print("Adding literacy teacher advisory limits...")
-        for literacy_teacher in ['Literacy_T1', 'Literacy_T2']:
-            weekly_advisory = []
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    is_advisory = model.NewBoolVar(f'{literacy_teacher}_{day}_P{period}_is_advisory')
-                    model.Add(teacher_activity[literacy_teacher][day][period] == ACTIVITIES.index('Advisory')).OnlyEnforceIf(is_advisory)
-                    model.Add(teacher_activity[literacy_teacher][day][period] != ACTIVITIES.index('Advisory')).OnlyEnforceIf(is_advisory.Not())
-                    weekly_advisory.append(is_advisory)
-            
-            # Literacy teachers should have at most 2 advisory periods per week
-            model.Add(sum(weekly_advisory) == 2)
-
-        # Literacy teachers must sync with their assigned teams' advisory periods
-        print("Adding literacy advisory synchronization constraint...")
-
-        # Literacy_T1 serves teams 1 and 2
-        for day in DAYS:
-            for period in TEACHING_PERIODS[day]:
-                # Literacy_T1 can only have advisory when Team 1 OR Team 2 has advisory
-                literacy_advisory = model.NewBoolVar(f'Literacy_T1_{day}_P{period}_advisory_sync')
-                model.Add(teacher_activity['Literacy_T1'][day][period] == ACTIVITIES.index('Advisory')).OnlyEnforceIf(literacy_advisory)
-                model.Add(teacher_activity['Literacy_T1'][day][period] != ACTIVITIES.index('Advisory')).OnlyEnforceIf(literacy_advisory.Not())
-                
-                # Team 1 or Team 2 must have advisory for Literacy_T1 to have advisory
-                team_advisory = model.NewBoolVar(f'Team_1_or_2_advisory_{day}_P{period}')
-                model.AddBoolOr([team_advisory_schedule[1][day][period], team_advisory_schedule[2][day][period]]).OnlyEnforceIf(team_advisory)
-                model.AddBoolAnd([team_advisory_schedule[1][day][period].Not(), team_advisory_schedule[2][day][period].Not()]).OnlyEnforceIf(team_advisory.Not())
-                
-                # Literacy_T1 advisory only when teams have advisory
-                model.Add(literacy_advisory <= team_advisory)
-
-        # Literacy_T2 serves teams 3 and 4
-        for day in DAYS:
-            for period in TEACHING_PERIODS[day]:
-                # Literacy_T2 can only have advisory when Team 3 OR Team 4 has advisory
-                literacy_advisory = model.NewBoolVar(f'Literacy_T2_{day}_P{period}_advisory_sync')
-                model.Add(teacher_activity['Literacy_T2'][day][period] == ACTIVITIES.index('Advisory')).OnlyEnforceIf(literacy_advisory)
-                model.Add(teacher_activity['Literacy_T2'][day][period] != ACTIVITIES.index('Advisory')).OnlyEnforceIf(literacy_advisory.Not())
-                
-                # Team 3 or Team 4 must have advisory for Literacy_T2 to have advisory
-                team_advisory = model.NewBoolVar(f'Team_3_or_4_advisory_{day}_P{period}')
-                model.AddBoolOr([team_advisory_schedule[3][day][period], team_advisory_schedule[4][day][period]]).OnlyEnforceIf(team_advisory)
-                model.AddBoolAnd([team_advisory_schedule[3][day][period].Not(), team_advisory_schedule[4][day][period].Not()]).OnlyEnforceIf(team_advisory.Not())
-                
-                # Literacy_T2 advisory only when teams have advisory
-                model.Add(literacy_advisory <= team_advisory)
-
-        # ============================================================================
-        # ADVISORY SYNCHRONIZATION CONSTRAINT
-        # ============================================================================
-
-        print("Adding advisory synchronization constraint (FIXED)...")
-
-        for team_num in range(1, 5):
-            # Get all possible period numbers across all days
-            all_period_numbers = set()
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    all_period_numbers.add(period)
-            
-            # For each period number, create a variable indicating if this team uses this period for advisory
-            period_usage_vars = {}
-            for period_num in all_period_numbers:
-                period_usage_vars[period_num] = model.NewBoolVar(f'team_{team_num}_advisory_uses_period_{period_num}')
-            
-            # Each team uses exactly 2 different period numbers for advisory
-            model.Add(sum(period_usage_vars.values()) == 2)
-            
-            # BIDIRECTIONAL CONSTRAINT: Advisory can ONLY happen at designated periods
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    # If team has advisory on this day/period, the period must be "used"
-                    model.Add(
-                        team_advisory_schedule[team_num][day][period] <= period_usage_vars[period]
-                    )
-                    
-            # Each team must have exactly 2 advisory periods per week
-            # AND they must be at the designated period numbers
-            for period_num in all_period_numbers:
-                # Count how many times this team has advisory at this specific period number
-                period_advisory_count = []
-                for day in DAYS:
-                    if period_num in TEACHING_PERIODS[day]:
-                        period_advisory_count.append(team_advisory_schedule[team_num][day][period_num])
-                
-                # If this period is used for advisory, team should have advisory at this period
-                # at least once (and at most once per day)
-                if period_advisory_count:
-                    # If period is used, at least one day should have advisory at this period
-                    model.AddBoolOr(period_advisory_count).OnlyEnforceIf(period_usage_vars[period_num])
-                    # If period is not used, no day should have advisory at this period
-                    model.AddBoolAnd([var.Not() for var in period_advisory_count]).OnlyEnforceIf(period_usage_vars[period_num].Not())
-                    
-                    # At most one advisory per period number per week (to prevent double-booking)
-                    model.Add(sum(period_advisory_count) <= 1)
-
-        # Additional constraint: Advisory periods must be on different days
-        for team_num in range(1, 5):
-            for day in DAYS:
-                daily_advisory = []
-                for period in TEACHING_PERIODS[day]:
-                    daily_advisory.append(team_advisory_schedule[team_num][day][period])
-                # At most 1 advisory per day per team
-                model.Add(sum(daily_advisory) <= 1)
-
-        # Advisory synchronization: When team has advisory, ALL classes in team have advisory
-        for team_num in range(1, 5):
-            team_classes = TEAMS[team_num]
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    # When team has advisory, no teacher should be teaching any class in that team
-                    for class_name in team_classes:
-                        for teacher in ALL_TEACHERS:
-                            if teacher not in PE_TEACHERS:
-                                model.Add(
-                                    teacher_class_assignment[teacher][class_name][day][period] == 0
-                                ).OnlyEnforceIf(team_advisory_schedule[team_num][day][period])
-
-        # ============================================================================
-        # ELECTIVE CONSTRAINTS
-        # ============================================================================
-
-        print("Adding elective constraints...")
-
-        elective_schedule = {}
-        for day in DAYS:
-            elective_schedule[day] = {}
-            for period in TEACHING_PERIODS[day]:
-                elective_schedule[day][period] = model.NewBoolVar(f'school_elective_{day}_P{period}')
-
-        # Exactly 2 elective periods per week for the whole school
-        weekly_electives = []
-        for day in DAYS:
-            for period in TEACHING_PERIODS[day]:
-                weekly_electives.append(elective_schedule[day][period])
-        model.Add(sum(weekly_electives) == 2)
-
-        # When school has elective, teachers do elective (unless they have prep, team meeting, discipline, or advisory)
-        for day in DAYS:
-            for period in TEACHING_PERIODS[day]:
-                for teacher in ALL_TEACHERS:
-                    if teacher in PE_TEACHERS:
-                        # PE teachers are blocked during electives (get Extra Prep)
-                        model.Add(
-                            teacher_activity[teacher][day][period] == ACTIVITIES.index('Extra Prep')
-                        ).OnlyEnforceIf(elective_schedule[day][period])
-                    else:
-                        # All other teachers do elective
-                        model.Add(
-                            teacher_activity[teacher][day][period] == ACTIVITIES.index('Elective')
-                        ).OnlyEnforceIf(elective_schedule[day][period])
-
-        # ============================================================================
-        # ONE CLASS PER TEACHER PER PERIOD (except PE)
-        # ============================================================================
-
-        print("Adding one class per teacher constraint...")
-
-        for teacher in ALL_TEACHERS:
-            if teacher not in PE_TEACHERS:  # Core and literacy teachers can only teach one class at a time
-                for day in DAYS:
-                    for period in TEACHING_PERIODS[day]:
-                        teacher_assignments = []
-                        for class_name in CLASSES:
-                            teacher_assignments.append(teacher_class_assignment[teacher][class_name][day][period])
-                        model.Add(sum(teacher_assignments) <= 1)
-
-        # ============================================================================
-        # PE TEACHER WEEKLY LOAD CONSTRAINT
-        # ============================================================================
-
-        print("Adding PE teacher weekly load constraint...")
-
-        for pe_teacher in PE_TEACHERS:
-            weekly_teaching = []
-            for day in DAYS:
-                for period in TEACHING_PERIODS[day]:
-                    for class_name in CLASSES:
-                        weekly_teaching.append(teacher_class_assignment[pe_teacher][class_name][day][period])
-            
-            model.Add(sum(weekly_teaching) >= 15)  # Minimum load
-            model.Add(sum(weekly_teaching) <= 25)  # Maximum load
-
-        # ============================================================================
-        # 4-IN-A-ROW CONSTRAINT
-        # ============================================================================
-
-        # Simple and direct 4-in-a-row constraint
-        print("Adding direct 4-in-a-row prevention constraint...")
-
+        # Teacher indices per discipline (subject teachers of every team, then
+        # the literacy teachers)
+        subject_rows = {
+            subject: [teachers[team.teachers[subject]].index for team in instance.teams.values()
+                      if subject in team.teachers]
+            for subject in CORE_SUBJECTS
+        }
+        subject_rows['Literacy'] = [teachers[teacher].index for teacher in instance.literacy_classes]
+
+        # Advisory channels: teacher_advisory[teacher][day][period] is true
+        # exactly when one of the teacher's advisory teams has advisory. Core
+        # teachers take their team's slot variable directly; a literacy teacher
+        # gets one OR over the teams they serve.
+        advisory = slot_array(team_advisory_schedule)
+        advisory_teams = domains['advisory_teams']
+        teacher_advisory = {}
         for teacher in ALL_TEACHERS:
-            for day in DAYS:
-                # Skip Wednesday (only 3 periods after lunch)
-                if day == 'Wednesday':
-                    continue
-                    
-                # Post-lunch periods: P4, P5, P6, P7
-                post_lunch_periods = [4, 5, 6, 7]
-                
-                # Ensure all these periods exist for this day
-                if not all(p in TEACHING_PERIODS[day] for p in post_lunch_periods):
-                    continue
-                
-                # Create intensive variables for each period
-                intensive_vars = []
-                for period in post_lunch_periods:
-                    is_intensive = model.NewBoolVar(f'{teacher}_{day}_P{period}_intensive_simple')
-                    
-                    # Check if teaching
-                    is_teaching = model.NewBoolVar(f'{teacher}_{day}_P{period}_teaching_simple')
-                    teaching_any_class = []
-                    for class_name in CLASSES:
-                        teaching_any_class.append(teacher_class_assignment[teacher][class_name][day][period])
-                    model.AddBoolOr(teaching_any_class).OnlyEnforceIf(is_teaching)
-                    model.AddBoolAnd([var.Not() for var in teaching_any_class]).OnlyEnforceIf(is_teaching.Not())
-                    
-                    # Check if advisory
-                    is_advisory = model.NewBoolVar(f'{teacher}_{day}_P{period}_advisory_simple')
-                    model.Add(teacher_activity[teacher][day][period] == ACTIVITIES.index('Advisory')).OnlyEnforceIf(is_advisory)
-                    model.Add(teacher_activity[teacher][day][period] != ACTIVITIES.index('Advisory')).OnlyEnforceIf(is_advisory.Not())
-                    
-                    # Check if elective
-                    is_elective = model.NewBoolVar(f'{teacher}_{day}_P{period}_elective_simple')
-                    model.Add(teacher_activity[teacher][day][period] == ACTIVITIES.index('Elective')).OnlyEnforceIf(is_elective)
-                    model.Add(teacher_activity[teacher][day][period] != ACTIVITIES.index('Elective')).OnlyEnforceIf(is_elective.Not())
-                    
-                    # Intensive if any of the above
-                    model.AddBoolOr([is_teaching, is_advisory, is_elective]).OnlyEnforceIf(is_intensive)
-                    model.AddBoolAnd([is_teaching.Not(), is_advisory.Not(), is_elective.Not()]).OnlyEnforceIf(is_intensive.Not())
-                    
-                    intensive_vars.append(is_intensive)
-                
-                # EXACTLY the constraint you want: at most 3 out of 4 can be intensive
-                model.Add(sum(intensive_vars) <= 3)
+            rows = [instance.teams[team_num].index for team_num in advisory_teams.get(teacher, [])]
+            teacher_advisory[teacher] = {day: {} for day in DAYS}
+            if not rows:
+                # No advisory teams (PE teachers): Advisory is not in the domain
+                continue
+            for s, (day, period) in enumerate(SLOTS):
+                team_vars = list(advisory[rows, s])
+                if len(team_vars) == 1:
+                    in_advisory = team_vars[0]
+                else:
+                    in_advisory = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_advisory')
+                    model.AddBoolOr(team_vars).OnlyEnforceIf(in_advisory)
+                    model.AddBoolAnd([var.Not() for var in team_vars]).OnlyEnforceIf(in_advisory.Not())
+                teacher_advisory[teacher][day][period] = in_advisory
+
+        # Intervals: prep is an event on the teacher timeline with its own flag
+        teacher_prep = {}
+        if intervals:
+            for teacher in ALL_TEACHERS:
+                teacher_prep[teacher] = {
+                    day: {period: model.NewBoolVar(f'{teacher}_{day}_P{period}_is_prep') for period in TEACHING_PERIODS[day]}
+                    for day in DAYS
+                }
+
+        return ModelContext(
+            model=model, rules=RULES, rule_constraints=grid['rule_constraints'], families=tuple(grid['families']),
+            formulation=formulation, event_encoding=event_encoding, aggregated=aggregated, intervals=intervals,
+            instance=instance, teachers=teachers, domains=domains, DAYS=DAYS, TEACHING_PERIODS=TEACHING_PERIODS,
+            SLOTS=SLOTS, day_slots=day_slots, CODE=CODE, CLASSES=CLASSES, TEAMS=TEAMS, ALL_TEACHERS=ALL_TEACHERS,
+            CORE_SUBJECTS=CORE_SUBJECTS, team_numbers=team_numbers, class_index=class_index, pe_rows=pe_rows,
+            class_team=class_team, eligible_rows=eligible_rows, class_rows=class_rows,
+            class_core_rows=class_core_rows, team_rows=team_rows,
+            team_meeting_schedule=team_meeting_schedule, team_pe_schedule=team_pe_schedule,
+            team_advisory_schedule=team_advisory_schedule, elective_schedule=elective_schedule,
+            meeting=slot_array(team_meeting_schedule), team_pe=slot_array(team_pe_schedule), advisory=advisory,
+            elective=[elective_schedule[day][period] for day, period in SLOTS],
+            activity=activity, teacher_activity=teacher_activity, teaching=teaching,
+            teacher_teaching=teacher_teaching, assign=assign, teacher_class_assignment=teacher_class_assignment,
+            lessons=lessons, team_teaching=team_teaching, pe_count=pe_count, pe_class_count=pe_class_count,
+            discipline_schedule=discipline_schedule, subject_rows=subject_rows, teacher_advisory=teacher_advisory,
+            teacher_prep=teacher_prep
+        )
+
+    def solve_built_model(self, built, data, solver_profile=None, hints=None, progress_callback=None):
+        """Solve a model from build_scheduling_model and package the solution"""
+        from ortools.sat.python import cp_model
 
-        # ============================================================================
-        # NO REPEAT CLASSES SAME DAY CONSTRAINT
-        # ============================================================================
+        # Add status mapping for debugging
+        status_names = {
+            cp_model.OPTIMAL: "OPTIMAL",
+            cp_model.FEASIBLE: "FEASIBLE", 
+            cp_model.INFEASIBLE: "INFEASIBLE",
+            cp_model.UNKNOWN: "UNKNOWN",
+            cp_model.MODEL_INVALID: "MODEL_INVALID"
+        }
 
-        print("Adding no repeat classes same day constraint (fixed)...")
+        model = built['model']
+        teacher_activity = built['teacher_activity']
+        teacher_class_assignment = built['teacher_class_assignment']
 
-        for teacher in ALL_TEACHERS:
-            if teacher not in PE_TEACHERS:
-                for day in DAYS:
-                    for class_name in CLASSES:
-                        # Collect all periods where this teacher could teach this class on this day
-                        daily_teaching = []
-                        for period in TEACHING_PERIODS[day]:
-                            daily_teaching.append(teacher_class_assignment[teacher][class_name][day][period])
-                        
-                        # At most once per day per class
-                        if daily_teaching:  # Only add constraint if there are teaching periods
-                            model.Add(sum(daily_teaching) <= 1)
-        
         # ============================================================================
         # SOLVER
         # ============================================================================
 
+        aggregated = built.get('formulation') == 'team_counts'
+        if hints:
+            # Class-level hints have no variables in the team-aggregated model
+            self.apply_solution_hints(model, hints, teacher_activity, {} if aggregated else teacher_class_assignment)
+        greedy, heuristic = [], None
+        if not hints and getattr(self, 'greedy_hints', False):
+            greedy, heuristic = self.apply_greedy_hints(built, data)
+
         solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 300.0  # Increase time limit
-        solver.parameters.log_search_progress = True   # Enable logging
+        for param, value in (solver_profile or DEFAULT_SOLVER_PROFILE).items():
+            setattr(solver.parameters, param, value)
+        if greedy:
+            # Presolve may otherwise drop the solutions the hint points at,
+            # and CP-SAT then abandons it as infeasible
+            solver.parameters.keep_all_feasible_solutions_in_presolve = True
+        if progress_callback:
+            # Receives every CP-SAT log line while Solve blocks this thread
+            solver.log_callback = progress_callback
+            if not solver.parameters.log_search_progress:
+                solver.parameters.log_search_progress = True
+                solver.parameters.log_to_stdout = False
 
         print("🔧 Solving model...")
         start_time = time.time()
-        status = solver.Solve(model)
+        active_solvers = self._solver_registry()
+        active_solvers.add(solver)
+        try:
+            # Registered first, so a cancel either sees the solver or is seen here
+            self._check_cancelled()
+            status = solver.Solve(model)
+        finally:
+            active_solvers.discard(solver)
         solve_time = time.time() - start_time
 
         status_name = status_names.get(status, f"UNKNOWN_STATUS_{status}")
@@ -1589,6 +1756,13 @@ class GoogleSheetsScheduler:
         if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
             quality = "Optimal" if status == cp_model.OPTIMAL else "Feasible"
             print(f"✅ {quality} solution found in {solve_time:.2f} seconds!")
+            if aggregated:
+                from class_assignment import assign_classes
+                teacher_class_assignment = assign_classes(solver, built, data)
+            if heuristic:
+                from constructive_heuristic import hint_acceptance
+                heuristic['acceptance'] = round(hint_acceptance(solver, greedy), 3)
+                print(f"💡 Hint acceptance: {heuristic['acceptance']:.0%}")
 
             return {
                 'status': status,
@@ -1599,19 +1773,20 @@ class GoogleSheetsScheduler:
                 'quality': quality,
                 'teacher_activity': teacher_activity,
                 'teacher_class_assignment': teacher_class_assignment,
-                'team_advisory_schedule': team_advisory_schedule,
-                'elective_schedule': elective_schedule
+                'team_advisory_schedule': built['team_advisory_schedule'],
+                'elective_schedule': built['elective_schedule'],
+                'heuristic': heuristic
             }
         else:
             print(f"❌ No solution found. Status: {status_name}")
             print(f"Solve time: {solve_time:.2f} seconds")
 
             print("\n🔍 Debugging info:")
-            print(f"Total teachers: {len(ALL_TEACHERS)}")
-            print(f"Total classes: {len(CLASSES)}")
-            print(f"Teaching periods per day: {[len(TEACHING_PERIODS[day]) for day in DAYS]}")
-            print(f"Core subjects: {CORE_SUBJECTS}")
-            print(f"PE teachers: {PE_TEACHERS}")
+            print(f"Total teachers: {len(data['ALL_TEACHERS'])}")
+            print(f"Total classes: {len(data['CLASSES'])}")
+            print(f"Teaching periods per day: {[len(data['TEACHING_PERIODS'][day]) for day in data['DAYS']]}")
+            print(f"Core subjects: {data['CORE_SUBJECTS']}")
+            print(f"PE teachers: {data['PE_TEACHERS']}")
             
             return None
     
@@ -1624,19 +1799,18 @@ class GoogleSheetsScheduler:
         team_advisory_schedule = solution['team_advisory_schedule']
         elective_schedule = solution['elective_schedule']
         
-        DAYS = data['DAYS']
-        ALL_PERIODS = data['ALL_PERIODS']
-        TEACHING_PERIODS = data['TEACHING_PERIODS']
-        CLASSES = data['CLASSES']
-        ALL_TEACHERS = data['ALL_TEACHERS']
-        ACTIVITIES = data['ACTIVITIES']
-        TEACHERS = data['TEACHERS']
-        PE_TEACHERS = data['PE_TEACHERS']
-        TEAM_MAPPING = data['TEAM_MAPPING']
+        instance = school_instance(data)
+        DAYS = instance.days
+        ALL_PERIODS = instance.all_periods
+        TEACHING_PERIODS = instance.teaching_periods
+        CLASSES = instance.classes
+        ACTIVITIES = instance.activities
+        PE_TEACHERS = instance.pe_teachers
+        TEAM_MAPPING = instance.class_team
         
         # Convert teacher schedules
         teacher_schedules = {}
-        for teacher in ALL_TEACHERS:
+        for teacher, record in instance.teachers.items():
             teacher_schedules[teacher] = {}
             for day in DAYS:
                 teacher_schedules[teacher][day] = {}
@@ -1656,70 +1830,25 @@ class GoogleSheetsScheduler:
                     display_activity = activity
 
                     if activity == 'Extra Prep' and teaching_classes:
-                        # Find subject based on teacher
-                        for team_key, team_teachers in TEACHERS.items():
-                            for subj, t_name in team_teachers.items():
-                                if t_name == teacher:
-                                    subject = subj
-                                    break
-                        if teacher in PE_TEACHERS:
-                            subject = "PE"
+                        # Subject based on teacher
+                        subject = record.subject
                     elif activity == 'Elective':
                         # For electives, assign teachers to teach specific classes for display purposes
                         if not teaching_classes:
-                            # Debug: Check what's available in data
-                            print(f"DEBUG: Available data keys: {list(data.keys())}")
-                            
-                            # Get TEAMS from data with fallback
-                            teams_data = data.get('TEAMS', {})
-                            if not teams_data:
-                                print("WARNING: TEAMS not found in data, creating fallback")
-                                # Create fallback teams mapping
-                                teams_data = {
-                                    1: ['A', 'B', 'C', 'D'],
-                                    2: ['E', 'F', 'G', 'H'], 
-                                    3: ['I', 'J', 'K', 'L'],
-                                    4: ['M', 'N', 'O', 'P']
-                                }
-                            
                             # Assign teacher to teach a class based on their expertise or team
-                            if teacher in PE_TEACHERS:
-                                # PE teachers can teach any class during electives
-                                if teacher == 'PE_T1':
-                                    teaching_classes = ['A']
-                                else:  # PE_T2
-                                    teaching_classes = ['B']
+                            if record.kind == 'pe':
+                                # PE teachers are shown with one class each, in teacher order
+                                teaching_classes = [CLASSES[PE_TEACHERS.index(teacher) % len(CLASSES)]]
                             else:
-                                # Core and literacy teachers teach classes from their team
-                                assigned_class = None
-                                for team_key, team_teachers in TEACHERS.items():
-                                    for subj, t_name in team_teachers.items():
-                                        if t_name == teacher:
-                                            team_num = int(team_key.split('_')[1])
-                                            if team_num in teams_data and teams_data[team_num]:
-                                                # Assign based on subject - each subject gets a different class
-                                                subject_to_class = {
-                                                    'ELA': 0, 'SS': 1, 'Science': 2, 'Math': 3, 'Arts': 0, 'Literacy': 1
-                                                }
-                                                class_index = subject_to_class.get(subj, 0)
-                                                if class_index < len(teams_data[team_num]):
-                                                    assigned_class = teams_data[team_num][class_index]
-                                            break
-                                
-                                if assigned_class:
-                                    teaching_classes = [assigned_class]
-                                else:
-                                    # Fallback: assign based on teacher name
-                                    teacher_to_class = {
-                                        'ELA_T1': 'A', 'SS_T1': 'B', 'Science_T1': 'C', 'Math_T1': 'D', 'Arts_T1': 'A',
-                                        'ELA_T2': 'E', 'SS_T2': 'F', 'Science_T2': 'G', 'Math_T2': 'H', 'Arts_T2': 'E',
-                                        'ELA_T3': 'I', 'SS_T3': 'J', 'Science_T3': 'K', 'Math_T3': 'L', 'Arts_T3': 'I',
-                                        'ELA_T4': 'M', 'SS_T4': 'N', 'Science_T4': 'O', 'Math_T4': 'P', 'Arts_T4': 'M',
-                                        'Literacy_T1': 'B', 'Literacy_T2': 'J'
-                                    }
-                                    if teacher in teacher_to_class:
-                                        teaching_classes = [teacher_to_class[teacher]]
-                        
+                                # Core and literacy teachers teach classes from their (last) team;
+                                # each subject of the team gets a different class
+                                teams = [instance.teams[team_num] for team_num in record.teams
+                                         if team_num in instance.teams and instance.teams[team_num].classes]
+                                if teams:
+                                    team = teams[-1]
+                                    position = list(team.teachers.values()).index(teacher)
+                                    teaching_classes = [team.classes[position % len(team.classes)]]
+
                         # Show the class name with "Class" suffix
                         display_activity = "Elective"
 
@@ -1737,7 +1866,7 @@ class GoogleSheetsScheduler:
             for day in DAYS:
                 class_schedules[class_name][day] = {}
                 for period in ALL_PERIODS[day]:
-                    if period == 3:  # Lunch
+                    if period not in TEACHING_PERIODS[day]:  # Lunch
                         class_schedules[class_name][day][period] = {
                             'subject': 'Lunch',
                             'teacher': '',
@@ -1748,21 +1877,14 @@ class GoogleSheetsScheduler:
                         # Find teacher teaching this class
                         teaching_teacher = None
                         if period in TEACHING_PERIODS[day]:
-                            for teacher in ALL_TEACHERS:
+                            for teacher in instance.teachers:
                                 if solver.Value(teacher_class_assignment[teacher][class_name][day][period]) == 1:
                                     teaching_teacher = teacher
                                     break
                         
                         if teaching_teacher:
                             # Determine subject
-                            subject = "Unknown"
-                            for team_key, team_teachers in TEACHERS.items():
-                                for subj, t_name in team_teachers.items():
-                                    if t_name == teaching_teacher:
-                                        subject = subj
-                                        break
-                            if teaching_teacher in PE_TEACHERS:
-                                subject = "PE"
+                            subject = instance.teachers[teaching_teacher].subject or "Unknown"
                             
                             class_schedules[class_name][day][period] = {
                                 'subject': subject,
@@ -1791,71 +1913,410 @@ class GoogleSheetsScheduler:
         
         return teacher_schedules, class_schedules
     
-    def run_solver(self):
-        """Run the complete scheduling solver with Google Sheets data"""
+    def _output_jobs(self, teacher_schedules, class_schedules):
+        """(method name, schedules) pairs for every enabled output sheet"""
+        schedules = {'teacher': teacher_schedules, 'class': class_schedules}
+        return [
+            (OUTPUT_WRITERS[output][0], schedules[OUTPUT_WRITERS[output][1]])
+            for output in self.publish_outputs
+        ]
+
+    def publish_schedules(self, teacher_schedules, class_schedules):
+        """Write converted schedules to the output sheets"""
+        # The background writer raises later, from flush(); plain sheets must raise here
+        extra = {} if isinstance(self.output, BackgroundSheetsWriter) else {'raise_on_error': True}
+        for method, schedules in self._output_jobs(teacher_schedules, class_schedules):
+            try:
+                getattr(self.output, method)(schedules, **extra)
+            except Exception as e:
+                print(f"⚠️ {method} failed, continuing with remaining outputs: {e}")
+                self._failed_writes.append((method, e))
+
+    async def publish_schedules_async(self, teacher_schedules, class_schedules):
+        """
+        Write all enabled output sheets
+
+        With the background writer the writes are queued there (retried, and
+        the only thread using the client); otherwise they run concurrently.
+        """
+        if isinstance(self.output, BackgroundSheetsWriter):
+            await asyncio.to_thread(self.publish_schedules, teacher_schedules, class_schedules)
+            return
+        jobs = self._output_jobs(teacher_schedules, class_schedules)
+        results = await asyncio.gather(
+            *[asyncio.to_thread(getattr(self.sheets, method), schedules, raise_on_error=True)
+              for method, schedules in jobs],
+            return_exceptions=True
+        )
+        for (method, _), result in zip(jobs, results):
+            if isinstance(result, Exception):
+                print(f"⚠️ {method} failed: {result}")
+                self._failed_writes.append((method, result))
+
+    def _source_id(self):
+        """Key used for Drive pre-check markers"""
+        spreadsheet = self.sheets.spreadsheet
+        return getattr(spreadsheet, 'id', None) or self.sheets.spreadsheet_name
+
+    def flush_output(self):
+        """
+        Wait for queued background writes to reach the spreadsheet
+
+        Returns:
+            List of (description, error) for writes that failed since the
+            previous flush
+        """
+        failures, self._failed_writes = self._failed_writes, []
+        if isinstance(self.output, BackgroundSheetsWriter):
+            failures += self.output.flush()
+        return failures
+
+    def close(self):
+        """Flush pending writes and stop the background writer thread"""
+        if isinstance(self.output, BackgroundSheetsWriter):
+            self.output.close()
+
+    def _remember_source(self, fingerprint):
+        """
+        Record the spreadsheet revision our last write produced
+
+        Raises OutputWriteError instead when any write failed, so a partly
+        written spreadsheet is never marked as up to date.
+        """
+        failures = self.flush_output()
+        if failures:
+            raise OutputWriteError(failures)
+        if not self.solution_cache:
+            return
+        modified_time = self.sheets.get_modified_time()
+        if modified_time:
+            self.solution_cache.set_source_marker(self._source_id(), modified_time, fingerprint,
+                                                  self.solver_profile, get_code_version())
+
+    def find_unchanged_source_solution(self):
+        """
+        Cheap pre-check: if the spreadsheet has not been modified since our
+        last run finished, return that run's cached solution without reading
+        any values. The marker only counts for the same solver profile and
+        code version, which are part of the full fingerprint too.
+        """
+        if not self.solution_cache:
+            return None
+
+        marker = self.solution_cache.get_source_marker(self._source_id())
+        if not marker:
+            return None
+        # JSON round trip so the comparison matches what was stored
+        profile = json.loads(json.dumps(self.solver_profile or {}, default=str))
+        if marker.get('solver_profile') != profile or marker.get('code_version') != get_code_version():
+            return None
+
+        modified_time = self.sheets.get_modified_time()
+        if not modified_time or modified_time != marker.get('modified_time'):
+            return None
+
+        return self.solution_cache.get(marker.get('fingerprint'))
+
+    def _announce_cached(self, cached):
+        print(f"♻️ Inputs unchanged - republishing cached solution from {cached.get('created_at')}")
+        self.update_status("Writing cached results...")
+
+    def _finish_cached(self, cached):
+        self.last_solve_time, self.last_quality = cached.get('solve_time'), cached.get('quality')
+        self.update_status(
+            "Complete ✅ (cached)",
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            cached.get('solve_time'),
+            cached.get('quality')
+        )
+        self._remember_source(cached.get('fingerprint'))
+        print("🎉 Scheduling complete (from cache)!")
+        return True
+
+    def publish_cached_solution(self, cached):
+        """Republish a cached solution and update the control panel"""
+        self._announce_cached(cached)
+        self.publish_schedules(cached['teacher_schedules'], cached['class_schedules'])
+        return self._finish_cached(cached)
+
+    async def publish_cached_solution_async(self, cached):
+        """Async variant of publish_cached_solution (outputs written concurrently)"""
+        self._announce_cached(cached)
+        await self.publish_schedules_async(cached['teacher_schedules'], cached['class_schedules'])
+        return await asyncio.to_thread(self._finish_cached, cached)
+
+    def _lookup_solution(self, model_data, cache):
+        """Return (fingerprint, cached solution or None, hints or None) for converted data"""
+        fingerprint = compute_input_fingerprint(model_data, self.solver_profile, get_code_version())
+        if not cache:
+            return fingerprint, None, None
+
+        cached = cache.get(fingerprint)
+        if cached:
+            return fingerprint, cached, None
+
+        # Retrieve hints from the most similar past run
+        hints = None
+        if self.solution_store:
+            try:
+                hints = self.solution_store.find_hints(model_data)
+            except Exception as e:
+                print(f"⚠️ Could not load solution hints: {e}")
+        return fingerprint, None, hints
+
+    def update_status(self, status, last_run=None, solve_time=None, quality=None):
+        """Update Control_Panel status and notify status listeners"""
+        self.output.update_status(status, last_run, solve_time, quality)
+        for listener in self.status_listeners:
+            listener(status)
+
+    def _progress_reporter(self):
+        """Solver log callback streaming progress without blocking the solver thread"""
+        if isinstance(self.output, BackgroundSheetsWriter):
+            return SolverProgressReporter(self)
+        if self.status_listeners:
+            # Synchronous Sheets writes would stall CP-SAT; only notify listeners
+            return SolverProgressReporter(_ListenerStatusSink(self.status_listeners))
+        return None
+
+    def cancel(self):
+        """Request cancellation of the current run (stops in-progress solves)"""
+        self.cancel_requested = True
+        for solver in list(self._solver_registry()):
+            solver.StopSearch()
+
+    def _solver_registry(self):
+        # Offline helpers build schedulers with __new__, skipping __init__
+        if not hasattr(self, '_active_solvers'):
+            self._active_solvers = set()
+        return self._active_solvers
+
+    def _is_cancelled(self):
+        cancelled = getattr(self, '_cancelled', None)
+        return getattr(self, 'cancel_requested', False) or bool(cancelled and cancelled())
+
+    def _check_cancelled(self):
+        if self._is_cancelled():
+            raise RunCancelled("Run cancelled")
+
+    def _start_run(self, cancelled):
+        # The caller's flag survives the reset, so a cancel made before the
+        # run started is not lost
+        self._cancelled = cancelled
+        self.cancel_requested = False
+        self.last_solve_time = self.last_quality = None
+        self._start_quota_run()
+
+    def _start_quota_run(self):
+        if hasattr(self.sheets, 'reset_quota_stats'):
+            self.sheets.reset_quota_stats()
+
+    def _finish_quota_run(self):
+        """Print and keep the Sheets API usage of the run that just finished"""
+        if not hasattr(self.sheets, 'quota_summary'):
+            return
+        from sheets_client import format_quota_summary
+
+        self.last_quota_summary = self.sheets.quota_summary()
+        print(f"📈 Sheets API usage: {format_quota_summary(self.last_quota_summary)}")
+
+    def _record_solution(self, fingerprint, model_data, solution, teacher_schedules, class_schedules):
+        """Save a fresh solution to the cache and history store, then report completion"""
+        solve_time = solution.get('solve_time', 0)
+        quality = solution.get('quality', 'Unknown')
+        self.last_solve_time, self.last_quality = solve_time, quality
+
+        if self.solution_cache:
+            try:
+                self.solution_cache.put(fingerprint, teacher_schedules, class_schedules, solve_time, quality)
+            except Exception as e:
+                print(f"⚠️ Could not cache solution: {e}")
+
+        if self.solution_store and 'solver' in solution:
+            from solution_store import extract_compact_solution
+            try:
+                compact = extract_compact_solution(solution, model_data)
+                self.solution_store.add(fingerprint, model_data, compact, solve_time, quality)
+            except Exception as e:
+                print(f"⚠️ Could not store solution history: {e}")
+
+        # Update final status
+        self.update_status(
+            "Complete ✅", 
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            solve_time,
+            quality
+        )
+        self._remember_source(fingerprint)
+        
+        print("🎉 Scheduling complete! Check the Teacher_Schedules and Class_Schedules sheets.")
+        return True
+
+    def run_solver(self, use_cache=True, cancelled=None):
+        """
+        Run the complete scheduling solver with Google Sheets data
+
+        Args:
+            use_cache: Reuse a cached solution when the inputs, solver profile
+                and code version are unchanged
+            cancelled: Optional callable returning True once the caller has
+                cancelled this run (checked along with cancel())
+        """
+        cache = self.solution_cache if use_cache else None
+        self._start_run(cancelled)
         try:
+            self._check_cancelled()
+            if cache:
+                cached = self.find_unchanged_source_solution()
+                if cached:
+                    return self.publish_cached_solution(cached)
+
             # Update status
-            self.sheets.update_status("Loading data...")
+            self.update_status("Loading data...")
             
             # Load data from sheets
             config, teachers_data, classes_data = self.load_data_from_sheets()
             
             # Convert to model format
             model_data = self.convert_sheets_data_to_model_format(config, teachers_data, classes_data)
+
+            fingerprint, cached, hints = self._lookup_solution(model_data, cache)
+            if cached:
+                return self.publish_cached_solution(cached)
             
             # Update status
-            self.sheets.update_status("Building model...")
+            self._check_cancelled()
+            self.update_status("Building model...")
             
             # Build and solve model
-            solution = self.solve_scheduling_model(model_data, teachers_data)
+            solution = self.solve_scheduling_model(
+                model_data, teachers_data, self.solver_profile, hints, self._progress_reporter()
+            )
             
+            self._check_cancelled()
             if solution:
                 # Update status
-                self.sheets.update_status("Writing results...")
+                self.update_status("Writing results...")
                 
                 # Convert solution to sheets format and write
                 teacher_schedules, class_schedules = self.convert_solution_to_sheets_format(solution, model_data)
+                self.publish_schedules(teacher_schedules, class_schedules)
 
-                try:
-                    self.sheets.write_teacher_schedules_grid(teacher_schedules)
-                except Exception as e:
-                    print(f"⚠️ Grid format failed, continuing with list format: {e}")
-
-                # try:
-                #     self.sheets.write_class_schedules_grid(class_schedules)
-                # except Exception as e:
-                #     print(f"⚠️ Class grid format failed, continuing with list format: {e}")
+                return self._record_solution(fingerprint, model_data, solution, teacher_schedules, class_schedules)
+            else:
+                self.update_status("Failed - No solution found ❌")
+                return False
                 
-                # Update final status
-                solve_time = solution.get('solve_time', 0)
-                quality = solution.get('quality', 'Unknown')
-                self.sheets.update_status(
-                    "Complete ✅", 
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    solve_time,
-                    quality
+        except RunCancelled:
+            self.update_status("Cancelled ⏹")
+            print("⏹ Run cancelled")
+            return False
+        except Exception as e:
+            self.update_status(f"Error: {str(e)} ❌")
+            print(f"❌ Error in solver: {e}")
+            return False
+        finally:
+            self.flush_output()
+            self._finish_quota_run()
+
+    async def run_solver_async(self, use_cache=True, cancelled=None):
+        """
+        Asyncio version of run_solver that overlaps the pipeline stages
+
+        - The Drive pre-check and the three input sheet reads run concurrently
+        - The time grid (team/elective slot variables) is built as soon as
+          School_Config arrives, while teachers and classes are still loading
+        - Output sheets go to the background writer, or are written
+          concurrently without it
+
+        Args: as for run_solver
+        """
+        cache = self.solution_cache if use_cache else None
+        self._start_run(cancelled)
+        try:
+            self._check_cancelled()
+            precheck = asyncio.create_task(asyncio.to_thread(self.find_unchanged_source_solution)) if cache else None
+            config_task = asyncio.create_task(asyncio.to_thread(self.sheets.read_configuration))
+            teachers_task = asyncio.create_task(asyncio.to_thread(self.sheets.read_teachers))
+            classes_task = asyncio.create_task(asyncio.to_thread(self.sheets.read_classes))
+
+            if precheck:
+                cached = await precheck
+                if cached:
+                    # Speculative reads are simply dropped
+                    return await self.publish_cached_solution_async(cached)
+
+            self.update_status("Loading data...")
+            print("📊 Loading data from Google Sheets (concurrent)...")
+
+            config = await config_task
+            if not config:
+                raise Exception("Failed to read configuration")
+
+            ALL_PERIODS, TEACHING_PERIODS = self.parse_period_structure(config)
+            grid_task = asyncio.create_task(asyncio.to_thread(
+                self.build_time_grid, list(ALL_PERIODS.keys()), TEACHING_PERIODS,
+                team_numbers_from_config(config), parse_rules(config)
+            ))
+
+            teachers_data, classes_data = await asyncio.gather(teachers_task, classes_task)
+            if not teachers_data:
+                raise Exception("Failed to read teachers")
+            if not classes_data:
+                raise Exception("Failed to read classes")
+            print(f"✅ Loaded {len(teachers_data)} teachers and {len(classes_data)} classes")
+
+            model_data = self.convert_sheets_data_to_model_format(config, teachers_data, classes_data)
+
+            fingerprint, cached, hints = self._lookup_solution(model_data, cache)
+            if cached:
+                return await self.publish_cached_solution_async(cached)
+
+            self._check_cancelled()
+            self.update_status("Building model...")
+            grid = await grid_task
+
+            solution = await asyncio.to_thread(
+                self.solve_scheduling_model, model_data, teachers_data, self.solver_profile, hints,
+                self._progress_reporter(), grid
+            )
+
+            self._check_cancelled()
+            if solution:
+                self.update_status("Writing results...")
+                teacher_schedules, class_schedules = self.convert_solution_to_sheets_format(solution, model_data)
+                await self.publish_schedules_async(teacher_schedules, class_schedules)
+
+                return await asyncio.to_thread(
+                    self._record_solution, fingerprint, model_data, solution, teacher_schedules, class_schedules
                 )
-                
-                print("🎉 Scheduling complete! Check the Teacher_Schedules and Class_Schedules sheets.")
-                return True
             else:
-                self.sheets.update_status("Failed - No solution found ❌")
+                self.update_status("Failed - No solution found ❌")
                 return False
-                
+
+        except RunCancelled:
+            self.update_status("Cancelled ⏹")
+            print("⏹ Run cancelled")
+            return False
         except Exception as e:
-            self.sheets.update_status(f"Error: {str(e)} ❌")
+            self.update_status(f"Error: {str(e)} ❌")
             print(f"❌ Error in solver: {e}")
             return False
+        finally:
+            await asyncio.to_thread(self.flush_output)
+            self._finish_quota_run()
 
 # ============================================================================
 # MAIN EXECUTION
 # ============================================================================
 
 def main():
+    from dotenv import load_dotenv
+
     load_dotenv()
     CREDENTIALS_FILE = os.getenv('CREDENTIALS_FILE')
     SPREADSHEET_NAME = os.getenv('SPREADSHEET_NAME')
-    
+    scheduler = None
     try:
         print("🚀 Starting School Scheduler with Google Sheets Integration")
         
@@ -1868,7 +2329,7 @@ def main():
         
         # Run solver
         print("🔧 Running scheduler...")
-        success = scheduler.run_solver()
+        success = asyncio.run(scheduler.run_solver_async())
         
         if success:
             print("✅ Scheduling completed successfully!")
@@ -1878,6 +2339,9 @@ def main():
             
     except Exception as e:
         print(f"❌ Error: {e}")
+    finally:
+        if scheduler is not None:
+            scheduler.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
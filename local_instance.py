@@ -0,0 +1,131 @@
+import os
+import json
+from types import SimpleNamespace
+
+from solution_cache import file_fingerprint, restore_period_keys
+
+# ============================================================================
+# LOCAL INSTANCE FILES
+# ============================================================================
+
+INSTANCE_FORMAT = 'school-instance/1'
+
+
+def load_instance(path):
+    """
+    Read a local instance file
+
+    The file holds the three input sheets in get_all_records form
+    ('config', 'teachers', 'classes') and optionally a solved schedule
+    ('teacher_schedules', 'class_schedules', 'solve_time', 'quality').
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        instance = json.load(f)
+
+    missing = [key for key in ('config', 'teachers', 'classes') if key not in instance]
+    if missing:
+        raise ValueError(f"{path} is not a school instance file (missing {', '.join(missing)})")
+
+    for key in ('teacher_schedules', 'class_schedules'):
+        if key in instance:
+            instance[key] = restore_period_keys(instance[key])
+    return instance
+
+
+def save_instance(path, config, teachers_data, classes_data, name=None, teacher_schedules=None,
+                  class_schedules=None, solve_time=None, quality=None):
+    """Write inputs (and an optional solution) to a local instance file"""
+    instance = {
+        'format': INSTANCE_FORMAT,
+        'name': name or os.path.splitext(os.path.basename(path))[0],
+        'config': config,
+        'teachers': teachers_data,
+        'classes': classes_data
+    }
+    if teacher_schedules is not None:
+        instance['teacher_schedules'] = teacher_schedules
+        instance['class_schedules'] = class_schedules or {}
+        instance['solve_time'] = solve_time
+        instance['quality'] = quality
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(instance, f, indent=1, default=str)
+    os.replace(tmp_path, path)
+    return instance
+
+
+def make_offline_scheduler(sheets, cache_dir=None, solver_profile=None, formulation=None, by_day=False,
+                           greedy_hints=False, event_encoding=None, anonymous_variables=False):
+    """GoogleSheetsScheduler over a local backend (synchronous writes, all outputs kept)"""
+    from international_highschool_scheduler import GoogleSheetsScheduler, DEFAULT_FORMULATION, DEFAULT_EVENT_ENCODING
+
+    return GoogleSheetsScheduler(None, sheets.spreadsheet_name, cache_dir=cache_dir, solver_profile=solver_profile,
+                                 sheets=sheets, background_io=False, publish_outputs=('teacher_list', 'class_list'),
+                                 formulation=formulation or DEFAULT_FORMULATION, by_day=by_day,
+                                 greedy_hints=greedy_hints, event_encoding=event_encoding or DEFAULT_EVENT_ENCODING,
+                                 anonymous_variables=anonymous_variables)
+
+# ============================================================================
+# LOCAL SHEETS BACKEND
+# ============================================================================
+
+class LocalInstanceSheets:
+    def __init__(self, path, instance=None):
+        """
+        File-backed stand-in for SchoolSchedulerGoogleSheets
+
+        Inputs come from a local instance file and outputs are kept in memory,
+        so GoogleSheetsScheduler can run (and use its cache) without Sheets.
+
+        Args:
+            path: Instance file path
+            instance: Already-loaded instance (defaults to reading `path`)
+        """
+        self.path = path
+        self.instance = instance or load_instance(path)
+        self.spreadsheet_name = self.instance.get('name') or os.path.basename(path)
+        self.spreadsheet = SimpleNamespace(id=f"local:{os.path.abspath(path)}", url=os.path.abspath(path))
+        self.status = {}
+        self.teacher_schedules = None
+        self.class_schedules = None
+
+    def read_configuration(self):
+        return dict(self.instance['config'])
+
+    def read_teachers(self):
+        # Mirror read_teachers: only active teachers are scheduled
+        return [t for t in self.instance['teachers'] if str(t.get('Active', 'TRUE')).upper() == 'TRUE']
+
+    def read_classes(self):
+        return list(self.instance['classes'])
+
+    def update_status(self, status, last_run=None, solve_time=None, quality=None):
+        self.status['status'] = status
+        if last_run is not None:
+            self.status.update({'last_run': last_run, 'solve_time': solve_time, 'quality': quality})
+
+    def get_modified_time(self):
+        """Content hash of the instance file (plays the role of Drive's modifiedTime)"""
+        try:
+            return file_fingerprint(self.path)
+        except OSError:
+            return None
+
+    def write_teacher_schedules(self, schedules_data, raise_on_error=False):
+        self.teacher_schedules = schedules_data
+
+    def write_teacher_schedules_grid(self, schedules_data, raise_on_error=False):
+        self.teacher_schedules = schedules_data
+
+    def write_class_schedules(self, schedules_data, raise_on_error=False):
+        self.class_schedules = schedules_data
+
+    def write_class_schedules_grid(self, schedules_data, raise_on_error=False):
+        self.class_schedules = schedules_data
+
+    def save(self, path):
+        """Write the inputs plus the schedules written so far to an instance file"""
+        return save_instance(path, self.instance['config'], self.instance['teachers'], self.instance['classes'],
+                             self.spreadsheet_name, self.teacher_schedules, self.class_schedules,
+                             self.status.get('solve_time'), self.status.get('quality'))
@@ -0,0 +1,157 @@
+import os
+import json
+import hashlib
+import tempfile
+
+# ============================================================================
+# STRUCTURAL FINGERPRINT
+# ============================================================================
+
+def compute_model_fingerprint(model_data, formulation, event_encoding, code_version, anonymous=False, families=None):
+    """
+    Fingerprint everything build_scheduling_model reads
+
+    Args:
+        model_data: Output of convert_sheets_data_to_model_format
+        formulation: Model formulation ('classes' or 'team_counts')
+        event_encoding: Event encoding ('booleans' or 'intervals')
+        code_version: String identifying the scheduler code
+        anonymous: Whether the model's variables are unnamed
+        families: Constraint families posted (None: all of them)
+
+    Returns:
+        Hex SHA-256 digest; the solver profile is left out, so one model
+        serves every time limit and worker count
+    """
+    from ortools import __version__ as ortools_version
+
+    payload = {
+        'model_data': model_data,
+        'formulation': formulation,
+        'event_encoding': event_encoding,
+        'anonymous': bool(anonymous),
+        'families': list(families) if families is not None else None,
+        'code_version': code_version,
+        'ortools': ortools_version
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+# ============================================================================
+# VARIABLE INDEX
+# ============================================================================
+
+# Entries of a built model that are plain values rather than variable handles
+PLAIN_ENTRIES = ('rules', 'formulation', 'event_encoding', 'families')
+
+
+class CachedConstraint:
+    """Handle for a constraint of a loaded model (set_rule_bounds only needs its index)"""
+
+    def __init__(self, index):
+        self.index = index
+
+    def Index(self):
+        return self.index
+
+
+def encode_variables(tree):
+    """Nested {key: variable} dicts as nested [key, index] pairs (keeps int keys and empty dicts)"""
+    return [[key, encode_variables(value) if isinstance(value, dict) else value.Index()]
+            for key, value in tree.items()]
+
+
+def decode_variables(pairs, model):
+    """Inverse of encode_variables, with handles from the loaded model"""
+    return {
+        key: decode_variables(value, model) if isinstance(value, list) else model.GetIntVarFromProtoIndex(value)
+        for key, value in pairs
+    }
+
+
+def index_built_model(built):
+    """JSON-ready map from every variable family of a built model to proto indices"""
+    index = {'plain': {name: built[name] for name in PLAIN_ENTRIES}, 'families': {}}
+    index['rule_constraints'] = {
+        name: [[constraint.Index(), sense] for constraint, sense in constraints]
+        for name, constraints in built['rule_constraints'].items()
+    }
+    for name, value in built.items():
+        if name in PLAIN_ENTRIES or name in ('model', 'rule_constraints'):
+            continue
+        index['families'][name] = encode_variables(value) if value is not None else None
+    return index
+
+
+def restore_built_model(model_bytes, index):
+    """Rebuild the build_scheduling_model dict from a serialized proto and its index"""
+    from ortools.sat.python import cp_model
+
+    model = cp_model.CpModel()
+    model.Proto().ParseFromString(model_bytes)
+    model.rebuild_var_and_constant_map()
+    built = {'model': model}
+    built.update(index['plain'])
+    built['families'] = tuple(built['families'])
+    built['rule_constraints'] = {
+        name: [(CachedConstraint(constraint), sense) for constraint, sense in constraints]
+        for name, constraints in index['rule_constraints'].items()
+    }
+    for name, pairs in index['families'].items():
+        built[name] = decode_variables(pairs, model) if pairs is not None else None
+    return built
+
+# ============================================================================
+# MODEL CACHE
+# ============================================================================
+
+class ModelCache:
+    def __init__(self, cache_dir):
+        """
+        On-disk cache of built CP-SAT models
+
+        Each entry is the serialized CpModelProto plus a JSON index from the
+        variable families (teacher, class, day, period, ...) to proto indices.
+
+        Args:
+            cache_dir: Directory holding the cache (entries go under models/)
+        """
+        self.models_dir = os.path.join(cache_dir, 'models')
+
+    def _paths(self, fingerprint):
+        base = os.path.join(self.models_dir, fingerprint)
+        return f'{base}.pb', f'{base}.json'
+
+    def _write_atomic(self, path, payload, mode):
+        """Write a file atomically so a crash never leaves a truncated entry"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, mode) as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, fingerprint):
+        """Return the built model stored for a fingerprint, or None (missing or corrupt)"""
+        from google.protobuf.message import DecodeError
+
+        proto_path, index_path = self._paths(fingerprint)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            with open(proto_path, 'rb') as f:
+                model_bytes = f.read()
+            return restore_built_model(model_bytes, index)
+        except (OSError, ValueError, KeyError, TypeError, DecodeError):
+            return None
+
+    def put(self, fingerprint, built):
+        """Store a freshly built model (before hints are added) under its fingerprint"""
+        proto_path, index_path = self._paths(fingerprint)
+        # The proto goes first: an index is only ever read next to its model
+        self._write_atomic(proto_path, built['model'].Proto().SerializeToString(), 'wb')
+        self._write_atomic(index_path, json.dumps(index_built_model(built), separators=(',', ':')), 'w')
@@ -0,0 +1,320 @@
+import copy
+import json
+import time
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from local_instance import LocalInstanceSheets, make_offline_scheduler
+from international_highschool_scheduler import make_rules, set_rule_bounds
+
+# ============================================================================
+# DELTAS
+# ============================================================================
+
+# Deltas that only change bounds/domains: applied to a copy of the base proto
+PROTO_DELTAS = ('pe_load', 'rules', 'no_teaching')
+
+# Deltas that change the variable set: the variant is rebuilt from edited inputs
+INPUT_DELTAS = ('add_teacher', 'remove_teacher', 'periods', 'config')
+
+
+def load_scenarios(path):
+    """
+    Read scenarios from JSON: [{"name": ..., "deltas": [{kind: value}, ...]}, ...]
+
+    Delta kinds:
+        pe_load:        {"min": 12, "max": 25}
+        rules:          {"pe_periods_per_week": 2, ...} (see RULE_PARAMETERS)
+        no_teaching:    {"teacher": "Math_T1", "day": "Friday", "periods": [1, 2]}
+        add_teacher:    Teachers-sheet row, e.g. {"Teacher Name": "PE_T3", "Type": "PE", ...}
+        remove_teacher: "Literacy_T2"
+        periods:        {"Wednesday": 7}
+        config:         {"Lunch Period": 4}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        scenarios = json.load(f)
+    scenarios = scenarios.get('scenarios', []) if isinstance(scenarios, dict) else scenarios
+    for scenario in scenarios:
+        validate_scenario(scenario)
+    return scenarios
+
+
+def validate_scenario(scenario):
+    if 'name' not in scenario:
+        raise ValueError(f"Scenario without a name: {scenario}")
+    for delta in scenario.get('deltas', []):
+        if len(delta) != 1 or next(iter(delta)) not in PROTO_DELTAS + INPUT_DELTAS:
+            raise ValueError(f"Unknown delta in scenario '{scenario['name']}': {delta}")
+
+
+def _split_deltas(scenario):
+    proto_deltas, input_deltas = [], []
+    for delta in scenario.get('deltas', []):
+        kind, value = next(iter(delta.items()))
+        (proto_deltas if kind in PROTO_DELTAS else input_deltas).append((kind, value))
+    return proto_deltas, input_deltas
+
+
+def apply_input_deltas(instance, input_deltas):
+    """Return a copy of an instance dict with the input deltas applied"""
+    instance = copy.deepcopy(instance)
+    config = instance['config']
+    for kind, value in input_deltas:
+        if kind == 'add_teacher':
+            instance['teachers'].append(dict({'Active': 'TRUE'}, **value))
+        elif kind == 'remove_teacher':
+            instance['teachers'] = [t for t in instance['teachers'] if t['Teacher Name'] != value]
+        elif kind == 'periods':
+            periods = dict(item.split(':') for item in config['Periods per Day'].split(','))
+            periods.update({day: str(count) for day, count in value.items()})
+            config['Periods per Day'] = ','.join(f'{day}:{count}' for day, count in periods.items())
+        elif kind == 'config':
+            config.update(value)
+    return instance
+
+
+def apply_proto_deltas(proto, built, data, proto_deltas):
+    """Edit a CpModelProto in place using variable/constraint handles from build_scheduling_model"""
+    for kind, value in proto_deltas:
+        if kind in ('pe_load', 'rules'):
+            overrides = value if kind == 'rules' else {
+                f'pe_load_{bound}': value[bound] for bound in ('min', 'max') if bound in value
+            }
+            set_rule_bounds(proto, built['rule_constraints'], make_rules({**built['rules'], **overrides}))
+        elif kind == 'no_teaching':
+            assignments = built['teacher_class_assignment'][value['teacher']]
+            days = [value['day']] if 'day' in value else data['DAYS']
+            for day in days:
+                periods = value.get('periods') or data['TEACHING_PERIODS'][day]
+                for class_name in data['CLASSES']:
+                    for period in periods:
+                        var = assignments[class_name][day].get(period)
+                        if var is not None:
+                            proto.variables[var.Index()].domain[:] = [0, 0]
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+class ScenarioEngine:
+    def __init__(self, base_sheets):
+        """
+        What-if analysis over one base instance
+
+        Args:
+            base_sheets: LocalInstanceSheets (or compatible) holding the base inputs
+        """
+        self.base_sheets = base_sheets
+        self.base_data = None
+        self.base_built = None
+        self.base_build_time = None
+
+    def _build(self, sheets):
+        scheduler = make_offline_scheduler(sheets)
+        data = scheduler.convert_sheets_data_to_model_format(
+            sheets.read_configuration(), sheets.read_teachers(), sheets.read_classes())
+        start = time.perf_counter()
+        built = scheduler.build_scheduling_model(data)
+        return data, built, time.perf_counter() - start
+
+    def build_base(self):
+        """Build the base model once (reused by every proto-only variant)"""
+        if self.base_built is None:
+            self.base_data, self.base_built, self.base_build_time = self._build(self.base_sheets)
+        return self.base_built
+
+    def derive(self, scenario):
+        """
+        Model for one scenario
+
+        Returns:
+            (model, mode, build_seconds) where mode is 'base', 'proto' (copy of
+            the base proto with bounds edited) or 'rebuilt' (inputs changed)
+        """
+        from ortools.sat.python import cp_model
+
+        proto_deltas, input_deltas = _split_deltas(scenario)
+        if input_deltas:
+            instance = apply_input_deltas(self.base_sheets.instance, input_deltas)
+            sheets = LocalInstanceSheets(self.base_sheets.path, instance=instance)
+            data, built, build_seconds = self._build(sheets)
+            apply_proto_deltas(built['model'].Proto(), built, data, proto_deltas)
+            return built['model'], 'rebuilt', build_seconds
+
+        self.build_base()
+        if not proto_deltas:
+            return self.base_built['model'], 'base', 0.0
+
+        start = time.perf_counter()
+        model = cp_model.CpModel()
+        model.Proto().CopyFrom(self.base_built['model'].Proto())
+        apply_proto_deltas(model.Proto(), self.base_built, self.base_data, proto_deltas)
+        return model, 'proto', time.perf_counter() - start
+
+    def _solve(self, scenario, model, mode, build_seconds, solver_profile):
+        from ortools.sat.python import cp_model
+
+        solver = cp_model.CpSolver()
+        for param, value in solver_profile.items():
+            setattr(solver.parameters, param, value)
+        start = time.perf_counter()
+        status = solver.Solve(model)
+        solve_seconds = time.perf_counter() - start
+
+        feasible = None
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            feasible = True
+        elif status == cp_model.INFEASIBLE:
+            feasible = False
+        return {
+            'scenario': scenario['name'],
+            'mode': mode,
+            'status': solver.StatusName(status),
+            'feasible': feasible,
+            'quality': {cp_model.OPTIMAL: 'Optimal', cp_model.FEASIBLE: 'Feasible'}.get(status),
+            'build_seconds': round(build_seconds, 3),
+            'solve_seconds': round(solve_seconds, 3),
+            'conflicts': solver.NumConflicts()
+        }
+
+    def run(self, scenarios, max_time=60.0, cpu_budget=None, include_base=True):
+        """
+        Derive every scenario and solve them in parallel
+
+        Models are derived sequentially (model building holds the GIL) and
+        solved on a thread pool; CP-SAT releases the GIL while solving.
+
+        Args:
+            scenarios: List of {"name", "deltas"} dicts
+            max_time: Solver time limit per scenario
+            cpu_budget: Total CP-SAT workers across concurrent solves
+            include_base: Also solve the unmodified base model
+
+        Returns:
+            List of comparison rows (one per scenario, input order)
+        """
+        from batch_runner import plan_cpu_budget
+
+        for scenario in scenarios:
+            validate_scenario(scenario)
+        if include_base:
+            scenarios = [{'name': 'base', 'deltas': []}] + list(scenarios)
+
+        variants = []
+        for scenario in scenarios:
+            try:
+                variants.append((scenario, *self.derive(scenario)))
+            except (KeyError, ValueError) as e:
+                variants.append((scenario, None, 'error', f"{type(e).__name__}: {e}"))
+
+        solvable = sum(1 for variant in variants if variant[1] is not None)
+        threads, workers = plan_cpu_budget(solvable, cpu_budget)
+        profile = {'max_time_in_seconds': float(max_time), 'num_workers': workers}
+        print(f"🔀 Solving {solvable} scenario(s): {threads} at a time, {workers} worker(s) each")
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            futures = {
+                i: pool.submit(self._solve, scenario, model, mode, extra, profile)
+                for i, (scenario, model, mode, extra) in enumerate(variants) if model is not None
+            }
+            rows = []
+            for i, (scenario, model, mode, extra) in enumerate(variants):
+                if model is None:
+                    rows.append({'scenario': scenario['name'], 'mode': mode, 'status': 'ERROR', 'feasible': None,
+                                 'quality': None, 'build_seconds': None, 'solve_seconds': None, 'error': extra})
+                else:
+                    rows.append(futures[i].result())
+        return rows
+
+    def sweep(self, points, max_time=60.0, cpu_budget=None):
+        """
+        Solve one variant per rule point (every point reuses the base model structure)
+
+        Args:
+            points: List of {rule: value} dicts (see sweep_points)
+
+        Returns:
+            Comparison rows, each with the swept values under 'point'
+        """
+        scenarios = [
+            {'name': ', '.join(f'{name}={value}' for name, value in point.items()), 'deltas': [{'rules': point}]}
+            for point in points
+        ]
+        rows = self.run(scenarios, max_time, cpu_budget, include_base=False)
+        for point, row in zip(points, rows):
+            row['point'] = dict(point)
+        return rows
+
+# ============================================================================
+# PARAMETER SWEEPS
+# ============================================================================
+
+def sweep_points(grid=None, points=None):
+    """
+    Rule points to solve
+
+    Args:
+        grid: {rule: [values]} - every combination is solved (Cartesian product)
+        points: Explicit list of {rule: value} dicts, used as given
+
+    Raises:
+        ValueError: For unknown rules or non-integer values
+    """
+    if points is None:
+        names = list(grid or {})
+        points = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    for point in points:
+        make_rules(point)
+    return [dict(point) for point in points]
+
+
+def load_sweep(path):
+    """Read {"grid": {rule: [values]}} or {"points": [{rule: value}, ...]} from JSON"""
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    return sweep_points(spec.get('grid'), spec.get('points'))
+
+
+def format_sweep_map(rows):
+    """
+    Feasibility / solve-time map of sweep rows
+
+    Two swept rules give a matrix (first rule down, second across); any
+    other number gives one line per point.
+    """
+    def cell(row):
+        if row['status'] == 'ERROR':
+            return 'error'
+        mark = {True: 'ok', False: 'INFEAS', None: '?'}[row['feasible']]
+        return f"{mark} {row['solve_seconds']:.1f}s"
+
+    names = list(rows[0]['point']) if rows else []
+    if len(names) != 2:
+        lines = [f"{'Point':<48} {'Result':>14}"]
+        lines += [f"{row['scenario'][:48]:<48} {cell(row):>14}" for row in rows]
+        return "\n".join(lines)
+
+    row_name, col_name = names
+    row_values = list(dict.fromkeys(row['point'][row_name] for row in rows))
+    col_values = list(dict.fromkeys(row['point'][col_name] for row in rows))
+    cells = {(row['point'][row_name], row['point'][col_name]): cell(row) for row in rows}
+
+    lines = [f"{row_name} \\ {col_name}"]
+    lines.append(f"{'':>10}" + ''.join(f"{value:>14}" for value in col_values))
+    for r in row_values:
+        lines.append(f"{r:>10}" + ''.join(f"{cells.get((r, c), '-'):>14}" for c in col_values))
+    return "\n".join(lines)
+
+
+def format_comparison(rows):
+    """Plain-text comparison table of ScenarioEngine.run rows"""
+    feasible_label = {True: 'yes', False: 'NO', None: '?'}
+    lines = [f"{'Scenario':<28} {'Model':<8} {'Feasible':<9} {'Status':<10} {'Build(s)':>9} {'Solve(s)':>9}"]
+    for row in rows:
+        build = row.get('build_seconds')
+        solve = row.get('solve_seconds')
+        lines.append(
+            f"{row['scenario'][:28]:<28} {row['mode']:<8} {feasible_label[row['feasible']]:<9} {row['status']:<10} "
+            f"{(f'{build:.2f}' if build is not None else '-'):>9} {(f'{solve:.2f}' if solve is not None else '-'):>9}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,541 @@
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+# Only the standard library is imported at module level; the scheduler, gspread,
+# OR-Tools and dotenv are loaded by the subcommands that need them.
+
+# ============================================================================
+# EXIT CODES
+# ============================================================================
+
+EXIT_OK = 0
+EXIT_FAILURE = 1          # no solution found / schedule has violations
+EXIT_USAGE = 2            # bad arguments (argparse)
+EXIT_INPUT_ERROR = 3      # unreadable or invalid input/schedule file
+EXIT_CONNECTION_ERROR = 4 # credentials or Google Sheets API failure
+EXIT_CANCELLED = 130      # interrupted
+
+
+class CommandError(Exception):
+    """Error carrying the exit code the CLI should return"""
+
+    def __init__(self, message, exit_code=EXIT_FAILURE):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _sheets_settings(args):
+    """Credentials file and spreadsheet name from flags, falling back to .env"""
+    if not args.credentials or not args.spreadsheet:
+        from dotenv import load_dotenv
+        load_dotenv()
+    credentials_file = args.credentials or os.getenv('CREDENTIALS_FILE')
+    spreadsheet_name = args.spreadsheet or os.getenv('SPREADSHEET_NAME')
+    if not credentials_file or not spreadsheet_name:
+        raise CommandError("Set --credentials/--spreadsheet or CREDENTIALS_FILE/SPREADSHEET_NAME", EXIT_USAGE)
+    return credentials_file, spreadsheet_name
+
+
+def _connect_sheets(args):
+    from international_highschool_scheduler import SchoolSchedulerGoogleSheets
+
+    credentials_file, spreadsheet_name = _sheets_settings(args)
+    try:
+        return SchoolSchedulerGoogleSheets(credentials_file, spreadsheet_name)
+    except Exception as e:
+        raise CommandError(f"Could not connect to Google Sheets: {e}", EXIT_CONNECTION_ERROR)
+
+
+def _load_local(path):
+    from local_instance import LocalInstanceSheets
+
+    try:
+        return LocalInstanceSheets(path)
+    except (OSError, ValueError) as e:
+        raise CommandError(f"Could not read {path}: {e}", EXIT_INPUT_ERROR)
+
+
+def _template_sheets():
+    from local_instance import LocalInstanceSheets, INSTANCE_FORMAT
+    from international_highschool_scheduler import template_records
+
+    config, teachers_data, classes_data = template_records()
+    instance = {'format': INSTANCE_FORMAT, 'name': 'template', 'config': config,
+                'teachers': teachers_data, 'classes': classes_data}
+    return LocalInstanceSheets('template.json', instance=instance)
+
+
+def _offline_scheduler(sheets, cache_dir=None, solver_profile=None, formulation=None, by_day=False,
+                       greedy_hints=False, event_encoding=None, anonymous_variables=False):
+    from local_instance import make_offline_scheduler
+
+    return make_offline_scheduler(sheets, cache_dir, solver_profile, formulation, by_day, greedy_hints, event_encoding,
+                                  anonymous_variables)
+
+
+def _model_data(sheets):
+    scheduler = _offline_scheduler(sheets)
+    try:
+        return scheduler.convert_sheets_data_to_model_format(
+            sheets.read_configuration(), sheets.read_teachers(), sheets.read_classes())
+    except (KeyError, ValueError, TypeError) as e:
+        raise CommandError(f"Invalid school data: {e}", EXIT_INPUT_ERROR)
+
+
+def _solver_profile(args):
+    from international_highschool_scheduler import DEFAULT_SOLVER_PROFILE
+
+    profile = dict(DEFAULT_SOLVER_PROFILE)
+    if args.max_time is not None:
+        profile['max_time_in_seconds'] = float(args.max_time)
+    if getattr(args, 'workers', None):
+        profile['num_workers'] = args.workers
+    return profile
+
+# ============================================================================
+# SUBCOMMANDS
+# ============================================================================
+
+def cmd_setup(args):
+    """Create the input sheets with template data"""
+    sheets = _connect_sheets(args)
+    sheets.setup_input_sheets()
+    return EXIT_OK, {'spreadsheet': sheets.spreadsheet_name, 'url': sheets.spreadsheet.url}
+
+
+def cmd_solve(args):
+    """Solve from Google Sheets (default) or a local instance file (--input)"""
+    from international_highschool_scheduler import GoogleSheetsScheduler
+
+    profile = _solver_profile(args)
+    cache_dir = None if args.no_cache else args.cache_dir
+
+    if args.input:
+        sheets = _load_local(args.input)
+        scheduler = _offline_scheduler(sheets, cache_dir, profile, args.formulation, args.by_day, args.greedy_hints,
+                                       args.events, args.anonymous)
+    else:
+        sheets = _connect_sheets(args)
+        outputs = tuple(args.outputs.split(',')) if args.outputs else None
+        extra = {'publish_outputs': outputs} if outputs else {}
+        scheduler = GoogleSheetsScheduler(None, sheets.spreadsheet_name, cache_dir=cache_dir, solver_profile=profile,
+                                          sheets=sheets, formulation=args.formulation, by_day=args.by_day,
+                                          greedy_hints=args.greedy_hints, event_encoding=args.events,
+                                          anonymous_variables=args.anonymous, **extra)
+
+    statuses = []
+    scheduler.status_listeners.append(statuses.append)
+    try:
+        success = scheduler.run_solver(use_cache=not args.no_cache)
+    finally:
+        scheduler.close()
+
+    result = {
+        'success': success,
+        'spreadsheet': sheets.spreadsheet_name,
+        'status': statuses[-1] if statuses else None,
+        'quota': scheduler.last_quota_summary
+    }
+    if args.input:
+        result.update({k: sheets.status.get(k) for k in ('solve_time', 'quality')})
+        if success and args.out:
+            sheets.save(args.out)
+            result['out'] = args.out
+    return (EXIT_OK if success else EXIT_FAILURE), result
+
+
+def cmd_validate(args):
+    """Check a solved instance file against the hard constraints (offline)"""
+    sheets = _load_local(args.file)
+    instance = sheets.instance
+    if 'teacher_schedules' not in instance:
+        raise CommandError(f"{args.file} contains no schedule (run `solve --input ... --out ...` first)",
+                           EXIT_INPUT_ERROR)
+
+    data = _model_data(sheets)
+    from compact_validator import validate_sheet_schedules
+
+    violations = validate_sheet_schedules(instance['teacher_schedules'], instance['class_schedules'], data,
+                                          strict=args.strict)
+    by_rule = {}
+    for violation in violations:
+        by_rule[violation['rule']] = by_rule.get(violation['rule'], 0) + 1
+
+    result = {
+        'file': args.file,
+        'valid': not violations,
+        'violations': len(violations),
+        'by_rule': by_rule,
+        'details': violations[:args.max_details]
+    }
+    return (EXIT_OK if not violations else EXIT_FAILURE), result
+
+
+def cmd_bench(args):
+    """Build (and optionally solve) the model, reporting size and timings"""
+    sheets = _load_local(args.input) if args.input else _template_sheets()
+    data = _model_data(sheets)
+    scheduler = _offline_scheduler(sheets, formulation=args.formulation, greedy_hints=args.greedy_hints,
+                                   event_encoding=args.events, anonymous_variables=args.anonymous)
+    if args.ablation:
+        return _bench_ablation(args, sheets, data, scheduler)
+    if args.model_cache:
+        from model_cache import ModelCache
+
+        scheduler.model_cache = ModelCache(args.cache_dir)
+
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        built = scheduler.load_or_build_model(data)
+        build_seconds = time.perf_counter() - start
+        proto = built['model'].Proto()
+        run = {
+            'build_seconds': round(build_seconds, 3),
+            'variables': len(proto.variables),
+            'booleans': sum(1 for var in proto.variables if list(var.domain) == [0, 1]),
+            'constraints': len(proto.constraints),
+            'proto_mb': round(proto.ByteSize() / 1e6, 2)
+        }
+        if args.solve:
+            solution = scheduler.solve_built_model(built, data, _solver_profile(args))
+            run['solve_seconds'] = round(solution['solve_time'], 3) if solution else None
+            run['quality'] = solution['quality'] if solution else None
+            if solution and solution.get('heuristic'):
+                run['heuristic_seconds'] = solution['heuristic']['seconds']
+                run['hint_acceptance'] = solution['heuristic']['acceptance']
+        runs.append(run)
+
+    result = {'instance': sheets.spreadsheet_name, 'formulation': scheduler.formulation,
+              'events': scheduler.event_encoding, 'anonymous': scheduler.anonymous_variables,
+              'model_cache': args.model_cache, 'runs': runs}
+    if args.solve and not all(run['quality'] for run in runs):
+        return EXIT_FAILURE, result
+    return EXIT_OK, result
+
+
+def _bench_ablation(args, sheets, data, scheduler):
+    """Solve with each constraint family (and optionally each pair) switched off"""
+    from family_ablation import run_ablation, format_ablation
+
+    families = [family.strip() for family in args.families.split(',') if family.strip()] if args.families else None
+    try:
+        rows = run_ablation(scheduler, data, families, pairs=args.pairs, max_time=args.max_time,
+                            cpu_budget=args.cpu_budget, workers=args.workers, repeat=args.repeat,
+                            greedy_hints=args.greedy_hints)
+    except ValueError as e:
+        raise CommandError(str(e), EXIT_USAGE)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=1)
+    if not args.json:
+        print(format_ablation(rows))
+    return EXIT_OK, {'instance': sheets.spreadsheet_name, 'formulation': scheduler.formulation,
+                     'events': scheduler.event_encoding, 'configurations': len(rows),
+                     **({'rows': rows} if args.json else {})}
+
+
+def cmd_export(args):
+    """Write inputs (and the cached solution, if any) to a local instance file"""
+    from local_instance import save_instance
+
+    if args.template:
+        sheets = _template_sheets()
+        config, teachers_data, classes_data = (
+            sheets.read_configuration(), sheets.instance['teachers'], sheets.read_classes())
+    else:
+        sheets = _connect_sheets(args)
+        config, teachers_data, classes_data = (
+            sheets.read_configuration(), sheets.read_teachers(), sheets.read_classes())
+        if not (config and teachers_data and classes_data):
+            raise CommandError("Could not read the input sheets", EXIT_CONNECTION_ERROR)
+
+    cached = None
+    if args.with_solution:
+        from solution_cache import SolutionCache, compute_input_fingerprint
+        from international_highschool_scheduler import get_code_version
+
+        data = _offline_scheduler(sheets).convert_sheets_data_to_model_format(config, teachers_data, classes_data)
+        fingerprint = compute_input_fingerprint(data, _solver_profile(args), get_code_version())
+        cached = SolutionCache(args.cache_dir).get(fingerprint)
+        if cached is None:
+            print("⚠️ No cached solution for these inputs - exporting inputs only")
+
+    save_instance(
+        args.out, config, teachers_data, classes_data, sheets.spreadsheet_name,
+        cached['teacher_schedules'] if cached else None,
+        cached['class_schedules'] if cached else None,
+        cached.get('solve_time') if cached else None,
+        cached.get('quality') if cached else None
+    )
+    return EXIT_OK, {'out': args.out, 'teachers': len(teachers_data), 'classes': len(classes_data),
+                     'with_solution': cached is not None}
+
+def cmd_batch(args):
+    """Solve every school in a manifest concurrently"""
+    from batch_runner import load_manifest, run_batch, format_batch_report
+
+    try:
+        entries = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        raise CommandError(f"Could not read manifest {args.manifest}: {e}", EXIT_INPUT_ERROR)
+
+    credentials_file = None
+    if any('spreadsheet' in entry for entry in entries):
+        if not args.credentials:
+            from dotenv import load_dotenv
+            load_dotenv()
+        credentials_file = args.credentials or os.getenv('CREDENTIALS_FILE')
+        if not credentials_file:
+            raise CommandError("Spreadsheet entries need --credentials or CREDENTIALS_FILE", EXIT_USAGE)
+
+    report = run_batch(entries, credentials_file, args.cpu_budget, args.max_processes, args.cache_dir,
+                       args.max_time, use_cache=not args.no_cache)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1, default=str)
+    if not args.json:
+        print(format_batch_report(report))
+    return (EXIT_OK if not report['failed'] else EXIT_FAILURE), {
+        key: value for key, value in report.items() if args.json or key != 'schools'
+    }
+
+def cmd_scenarios(args):
+    """Compare what-if variants of one instance"""
+    from scenario_engine import ScenarioEngine, load_scenarios, format_comparison
+
+    try:
+        scenarios = load_scenarios(args.scenarios)
+    except (OSError, ValueError) as e:
+        raise CommandError(f"Could not read scenarios {args.scenarios}: {e}", EXIT_INPUT_ERROR)
+
+    sheets = _load_local(args.input) if args.input else _template_sheets()
+    rows = ScenarioEngine(sheets).run(scenarios, args.max_time, args.cpu_budget, include_base=not args.no_base)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=1)
+    if not args.json:
+        print(format_comparison(rows))
+    exit_code = EXIT_OK if all(row['status'] != 'ERROR' for row in rows) else EXIT_FAILURE
+    return exit_code, {'instance': sheets.spreadsheet_name, 'scenarios': len(rows),
+                       'feasible': sum(1 for row in rows if row['feasible']),
+                       **({'rows': rows} if args.json else {})}
+
+
+def _parse_sweep_settings(settings):
+    """['pe_load_min=12,15', ...] -> {'pe_load_min': [12, 15], ...}"""
+    grid = {}
+    for setting in settings:
+        name, _, values = setting.partition('=')
+        try:
+            grid[name.strip()] = [int(value) for value in values.split(',') if value.strip()]
+        except ValueError:
+            raise CommandError(f"Bad --set '{setting}' (expected rule=value,value,...)", EXIT_USAGE)
+    return grid
+
+
+def cmd_sweep(args):
+    """Solve a grid of rule values and map feasibility / solve time"""
+    from scenario_engine import ScenarioEngine, sweep_points, load_sweep, format_sweep_map
+
+    if not args.points and not args.set:
+        raise CommandError("Give --set rule=v1,v2 (repeatable) or --points FILE", EXIT_USAGE)
+    try:
+        points = load_sweep(args.points) if args.points else sweep_points(_parse_sweep_settings(args.set))
+    except (OSError, ValueError) as e:
+        raise CommandError(f"Bad sweep: {e}", EXIT_INPUT_ERROR)
+
+    sheets = _load_local(args.input) if args.input else _template_sheets()
+    rows = ScenarioEngine(sheets).sweep(points, args.max_time, args.cpu_budget)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=1)
+    if not args.json:
+        print(format_sweep_map(rows))
+    exit_code = EXIT_OK if all(row['status'] != 'ERROR' for row in rows) else EXIT_FAILURE
+    return exit_code, {'instance': sheets.spreadsheet_name, 'points': len(rows),
+                       'feasible': sum(1 for row in rows if row['feasible']),
+                       **({'rows': rows} if args.json else {})}
+
+
+def cmd_scale(args):
+    """Build (and optionally solve) synthetic schools of growing size"""
+    from synthetic_schools import scaling_report, format_scaling_report
+
+    try:
+        team_counts = [int(count) for count in args.teams.split(',')]
+    except ValueError:
+        raise CommandError(f"Bad --teams '{args.teams}' (expected e.g. 8,16,32)", EXIT_USAGE)
+
+    rows = scaling_report(team_counts, _solver_profile(args), solve=args.solve, formulation=args.formulation,
+                          event_encoding=args.events, anonymous_variables=args.anonymous)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=1)
+    if not args.json:
+        print(format_scaling_report(rows))
+    return EXIT_OK, {'schools': len(rows), **({'rows': rows} if args.json else {})}
+
+# ============================================================================
+# ARGUMENT PARSING
+# ============================================================================
+
+def build_parser():
+    from international_highschool_scheduler import (
+        DEFAULT_CACHE_DIR, FORMULATIONS, DEFAULT_FORMULATION, EVENT_ENCODINGS, DEFAULT_EVENT_ENCODING
+    )
+
+    parser = argparse.ArgumentParser(
+        prog='scheduler',
+        description="International high school scheduler (CP-SAT + Google Sheets)",
+        epilog="Exit codes: 0 ok, 1 no solution/violations, 2 usage, 3 bad input, 4 Sheets error, 130 interrupted"
+    )
+    parser.add_argument('--json', action='store_true', help="Print a single JSON result on stdout")
+    parser.add_argument('--credentials', help="Service account JSON (default: $CREDENTIALS_FILE)")
+    parser.add_argument('--spreadsheet', help="Spreadsheet name (default: $SPREADSHEET_NAME)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Solution and model cache directory")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    setup = subparsers.add_parser('setup', help="Create template input sheets")
+    setup.set_defaults(func=cmd_setup)
+
+    solve = subparsers.add_parser('solve', help="Solve and publish schedules")
+    solve.add_argument('--input', help="Solve a local instance file instead of the spreadsheet")
+    solve.add_argument('--out', help="With --input: write the solved instance here")
+    solve.add_argument('--no-cache', action='store_true', help="Ignore cached solutions and hints")
+    solve.add_argument('--max-time', type=float, help="Solver time limit in seconds")
+    solve.add_argument('--workers', type=int, help="CP-SAT search workers")
+    solve.add_argument('--outputs', help="Comma separated output sheets (teacher_grid,class_grid,...)")
+    solve.add_argument('--formulation', choices=FORMULATIONS, default=DEFAULT_FORMULATION,
+                       help="Model formulation (team_counts assigns classes after solving)")
+    solve.add_argument('--events', choices=EVENT_ENCODINGS, default=DEFAULT_EVENT_ENCODING,
+                       help="Event encoding (intervals: optional intervals with NoOverlap per teacher and class)")
+    solve.add_argument('--by-day', action='store_true',
+                       help="Plan the week's counts, then solve the days in parallel")
+    solve.add_argument('--greedy-hints', action='store_true',
+                       help="Seed the solver with a greedy timetable when no stored hints apply")
+    solve.add_argument('--anonymous', action='store_true',
+                       help="Create unnamed variables (smaller model proto)")
+    solve.set_defaults(func=cmd_solve)
+
+    validate = subparsers.add_parser('validate', help="Check a solved instance file offline")
+    validate.add_argument('file', help="Instance file with teacher_schedules/class_schedules")
+    validate.add_argument('--max-details', type=int, default=50, help="Violations listed in the output")
+    validate.add_argument('--strict', action='store_true',
+                          help="Also check the README rules the model does not enforce")
+    validate.set_defaults(func=cmd_validate)
+
+    bench = subparsers.add_parser('bench', help="Model statistics and build/solve timings")
+    bench.add_argument('--input', help="Local instance file (default: template data)")
+    bench.add_argument('--solve', action='store_true', help="Also solve the model")
+    bench.add_argument('--max-time', type=float, default=30.0, help="Solver time limit with --solve")
+    bench.add_argument('--workers', type=int, help="CP-SAT search workers")
+    bench.add_argument('--repeat', type=int, default=1, help="Number of runs")
+    bench.add_argument('--formulation', choices=FORMULATIONS, default=DEFAULT_FORMULATION,
+                       help="Model formulation to build")
+    bench.add_argument('--events', choices=EVENT_ENCODINGS, default=DEFAULT_EVENT_ENCODING,
+                       help="Event encoding to build")
+    bench.add_argument('--greedy-hints', action='store_true',
+                       help="Seed each solve with a greedy timetable (reports its time and hint acceptance)")
+    bench.add_argument('--model-cache', action='store_true',
+                       help="Load built models from --cache-dir (and store new ones) instead of rebuilding")
+    bench.add_argument('--anonymous', action='store_true', help="Build with unnamed variables")
+    bench.add_argument('--ablation', action='store_true',
+                       help="Solve with each constraint family switched off in turn (--repeat: seeds per configuration)")
+    bench.add_argument('--families', help="With --ablation: comma separated families to switch off (default: all)")
+    bench.add_argument('--pairs', action='store_true', help="With --ablation: also switch off every pair of families")
+    bench.add_argument('--cpu-budget', type=int, help="With --ablation: total CP-SAT workers across concurrent solves")
+    bench.add_argument('--report', help="With --ablation: write the rows as JSON here")
+    bench.set_defaults(func=cmd_bench)
+
+    export = subparsers.add_parser('export', help="Save inputs (and cached solution) to a local file")
+    export.add_argument('--out', required=True, help="Instance file to write")
+    export.add_argument('--template', action='store_true', help="Export the built-in template instead of Sheets")
+    export.add_argument('--with-solution', action='store_true', help="Include the cached solution if present")
+    export.add_argument('--max-time', type=float, help="Time limit the cached solution was solved with")
+    export.set_defaults(func=cmd_export)
+
+    batch = subparsers.add_parser('batch', help="Solve many schools concurrently from a manifest")
+    batch.add_argument('manifest', help="JSON list or text file of spreadsheet names / instance files")
+    batch.add_argument('--cpu-budget', type=int, help="Total CP-SAT workers across all solves (default: all CPUs)")
+    batch.add_argument('--max-processes', type=int, help="Maximum schools solved at once")
+    batch.add_argument('--max-time', type=float, help="Per-school solver time limit in seconds")
+    batch.add_argument('--no-cache', action='store_true', help="Ignore cached solutions and hints")
+    batch.add_argument('--report', help="Write the consolidated JSON report here")
+    batch.set_defaults(func=cmd_batch)
+
+    scenarios = subparsers.add_parser('scenarios', help="Solve what-if variants and compare them")
+    scenarios.add_argument('scenarios', help="JSON list of {name, deltas} scenarios")
+    scenarios.add_argument('--input', help="Base instance file (default: template data)")
+    scenarios.add_argument('--max-time', type=float, default=60.0, help="Solver time limit per scenario")
+    scenarios.add_argument('--cpu-budget', type=int, help="Total CP-SAT workers across concurrent solves")
+    scenarios.add_argument('--no-base', action='store_true', help="Do not solve the unmodified base model")
+    scenarios.add_argument('--report', help="Write the comparison rows as JSON here")
+    scenarios.set_defaults(func=cmd_scenarios)
+
+    sweep = subparsers.add_parser('sweep', help="Feasibility / solve-time map over numeric rule values")
+    sweep.add_argument('--set', action='append', default=[], metavar='RULE=V1,V2',
+                       help="Values for one rule (repeatable; every combination is solved)")
+    sweep.add_argument('--points', help="JSON {grid: {rule: [values]}} or {points: [{rule: value}]}")
+    sweep.add_argument('--input', help="Base instance file (default: template data)")
+    sweep.add_argument('--max-time', type=float, default=60.0, help="Solver time limit per point")
+    sweep.add_argument('--cpu-budget', type=int, help="Total CP-SAT workers across concurrent solves")
+    sweep.add_argument('--report', help="Write the sweep rows as JSON here")
+    sweep.set_defaults(func=cmd_sweep)
+
+    scale = subparsers.add_parser('scale', help="Scaling report over synthetic schools")
+    scale.add_argument('--teams', default='4,8,16,32', help="Comma separated team counts")
+    scale.add_argument('--solve', action='store_true', help="Also solve each school")
+    scale.add_argument('--max-time', type=float, default=60.0, help="Solver time limit with --solve")
+    scale.add_argument('--workers', type=int, help="CP-SAT search workers")
+    scale.add_argument('--formulation', choices=FORMULATIONS, default=DEFAULT_FORMULATION,
+                       help="Model formulation to build")
+    scale.add_argument('--events', choices=EVENT_ENCODINGS, default=DEFAULT_EVENT_ENCODING,
+                       help="Event encoding to build")
+    scale.add_argument('--anonymous', action='store_true', help="Build with unnamed variables")
+    scale.add_argument('--report', help="Write the rows as JSON here")
+    scale.set_defaults(func=cmd_scale)
+
+    return parser
+
+
+def _print_human(command, exit_code, result):
+    icon = "✅" if exit_code == EXIT_OK else "❌"
+    print(f"{icon} {command}: " + ", ".join(
+        f"{key}={value}" for key, value in result.items() if not isinstance(value, (dict, list))))
+    for detail in result.get('details', []):
+        print(f"   - [{detail['rule']}] {detail['message']}")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # In JSON mode progress output goes to stderr so stdout stays parseable
+    progress = contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext()
+    try:
+        with progress:
+            exit_code, result = args.func(args)
+    except CommandError as e:
+        exit_code, result = e.exit_code, {'error': str(e)}
+    except KeyboardInterrupt:
+        exit_code, result = EXIT_CANCELLED, {'error': 'interrupted'}
+
+    if args.json:
+        print(json.dumps({'command': args.command, 'exit_code': exit_code, **result}, default=str))
+    elif 'error' in result:
+        print(f"❌ {result['error']}", file=sys.stderr)
+    else:
+        _print_human(args.command, exit_code, result)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
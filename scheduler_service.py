@@ -0,0 +1,402 @@
+import os
+import json
+import heapq
+import asyncio
+import argparse
+import itertools
+import threading
+import socketserver
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from international_highschool_scheduler import (
+    GoogleSheetsScheduler, SchoolSchedulerGoogleSheets, load_service_account_credentials,
+    DEFAULT_CACHE_DIR, DEFAULT_SOLVER_PROFILE
+)
+
+# ============================================================================
+# JOBS
+# ============================================================================
+
+JOB_STATES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SolveJob:
+    def __init__(self, job_id, spreadsheet_name, priority=0, use_cache=True, solver_overrides=None):
+        """
+        A queued solve request
+
+        Args:
+            spreadsheet_name: Spreadsheet to solve
+            priority: Lower numbers run first
+            use_cache: Passed through to run_solver_async
+            solver_overrides: CP-SAT parameters layered over the default profile
+        """
+        self.job_id = job_id
+        self.spreadsheet_name = spreadsheet_name
+        self.priority = priority
+        self.use_cache = use_cache
+        self.solver_overrides = dict(solver_overrides or {})
+        self.state = 'queued'
+        self.progress = 'Queued'
+        self.result = None
+        self.error = None
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'spreadsheet': self.spreadsheet_name,
+            'priority': self.priority,
+            'use_cache': self.use_cache,
+            'solver_overrides': self.solver_overrides,
+            'state': self.state,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+# ============================================================================
+# SERVICE
+# ============================================================================
+
+class SchedulerService:
+    def __init__(self, credentials_file, max_concurrent=1, cache_dir=DEFAULT_CACHE_DIR, scheduler_factory=None):
+        """
+        Long-running scheduler with warm schedulers and a priority job queue
+
+        Args:
+            credentials_file: Service account JSON used for every spreadsheet
+            max_concurrent: Number of jobs allowed to run at once
+            cache_dir: Solution cache directory shared by all jobs
+            scheduler_factory: Optional callable(spreadsheet_name) -> scheduler
+                (defaults to a GoogleSheetsScheduler on shared credentials)
+        """
+        self.credentials_file = credentials_file
+        self.max_concurrent = max_concurrent
+        self.cache_dir = cache_dir
+        self.scheduler_factory = scheduler_factory or self._default_scheduler_factory
+
+        self._credentials = None
+        self._schedulers = {}
+        self._busy = set()
+        self._jobs = {}
+        self._queue = []
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._workers = [
+            threading.Thread(target=self._worker, name=f'solve-worker-{i}', daemon=True)
+            for i in range(max_concurrent)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _default_scheduler_factory(self, spreadsheet_name):
+        # Credentials are loaded once; each spreadsheet keeps its own connection
+        with self._cond:
+            if self._credentials is None:
+                self._credentials = load_service_account_credentials(self.credentials_file)
+            credentials = self._credentials
+        sheets = SchoolSchedulerGoogleSheets(self.credentials_file, spreadsheet_name, credentials=credentials)
+        return GoogleSheetsScheduler(self.credentials_file, spreadsheet_name, cache_dir=self.cache_dir, sheets=sheets)
+
+    def get_scheduler(self, spreadsheet_name):
+        """Warm scheduler for a spreadsheet (connected on first use, then reused)"""
+        with self._cond:
+            scheduler = self._schedulers.get(spreadsheet_name)
+        if scheduler is None:
+            # Connect outside the lock so job queries are not held up
+            created = self.scheduler_factory(spreadsheet_name)
+            with self._cond:
+                scheduler = self._schedulers.setdefault(spreadsheet_name, created)
+            if scheduler is not created:
+                created.close()
+        return scheduler
+
+    # ------------------------------------------------------------------
+    # Job API
+    # ------------------------------------------------------------------
+
+    def submit(self, spreadsheet_name, priority=0, use_cache=True, solver_overrides=None):
+        """Queue a solve job and return it"""
+        if not spreadsheet_name:
+            raise ValueError("spreadsheet is required")
+        with self._cond:
+            job = SolveJob(f'job-{next(self._ids)}', spreadsheet_name, priority, use_cache, solver_overrides)
+            self._jobs[job.job_id] = job
+            heapq.heappush(self._queue, (job.priority, next(self._seq), job))
+            self._cond.notify()
+        print(f"📥 Queued {job.job_id} for {spreadsheet_name} (priority {priority})")
+        return job
+
+    def get_job(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._cond:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancel a queued job or stop a running one; returns the job (or None)"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.state not in ('queued', 'running'):
+                return job
+            job.cancel_requested = True
+            if job.state == 'queued':
+                job.state = 'cancelled'
+                job.progress = 'Cancelled before start'
+                job.finished_at = _now()
+                return job
+            scheduler = self._schedulers.get(job.spreadsheet_name)
+
+        if scheduler is not None:
+            scheduler.cancel()
+        return job
+
+    def shutdown(self, timeout=None):
+        """Stop accepting work and let workers exit after their current job"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        # Stop the schedulers' background writer threads
+        with self._cond:
+            schedulers = list(self._schedulers.values())
+            self._schedulers.clear()
+        for scheduler in schedulers:
+            scheduler.close()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _next_job(self):
+        """Highest-priority queued job whose spreadsheet is idle (caller holds the lock)"""
+        deferred = []
+        job = None
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            candidate = entry[2]
+            if candidate.state != 'queued':
+                continue
+            if candidate.spreadsheet_name in self._busy:
+                deferred.append(entry)
+                continue
+            job = candidate
+            break
+        for entry in deferred:
+            heapq.heappush(self._queue, entry)
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and not self._stopping:
+                    self._cond.wait()
+                    job = self._next_job()
+                if job is None:
+                    return
+                job.state = 'running'
+                job.started_at = _now()
+                self._busy.add(job.spreadsheet_name)
+
+            try:
+                self._run_job(job)
+            finally:
+                with self._cond:
+                    self._busy.discard(job.spreadsheet_name)
+                    self._cond.notify_all()
+
+    def _run_job(self, job):
+        def on_status(status):
+            job.progress = status
+
+        scheduler = None
+        try:
+            scheduler = self.get_scheduler(job.spreadsheet_name)
+            scheduler.solver_profile = {**DEFAULT_SOLVER_PROFILE, **job.solver_overrides}
+            scheduler.status_listeners.append(on_status)
+            # The run reads the job's flag, so a cancel made before it starts still stops it
+            success = asyncio.run(
+                scheduler.run_solver_async(use_cache=job.use_cache, cancelled=lambda: job.cancel_requested))
+
+            with self._cond:
+                # A cancel that came too late to stop the run leaves it succeeded
+                if success:
+                    job.state = 'succeeded'
+                else:
+                    job.state = 'cancelled' if job.cancel_requested else 'failed'
+                job.result = {
+                    'success': success,
+                    'quota': getattr(scheduler, 'last_quota_summary', None)
+                }
+        except Exception as e:
+            with self._cond:
+                job.state = 'failed'
+                job.error = f"{type(e).__name__}: {e}"
+            print(f"❌ {job.job_id} failed: {e}")
+            # Drop the scheduler so the next job reconnects from scratch
+            with self._cond:
+                dropped = self._schedulers.pop(job.spreadsheet_name, None)
+            if dropped is not None:
+                dropped.close()
+        finally:
+            if scheduler is not None and on_status in scheduler.status_listeners:
+                scheduler.status_listeners.remove(on_status)
+            job.finished_at = _now()
+            print(f"🏁 {job.job_id} finished: {job.state}")
+
+# ============================================================================
+# HTTP API
+# ============================================================================
+
+class SchedulerRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API:
+        GET  /health                 -> {"status": "ok", ...}
+        GET  /jobs                   -> [job, ...]
+        POST /jobs                   -> job  (body: spreadsheet, priority, use_cache, solver)
+        GET  /jobs/<id>              -> job
+        POST /jobs/<id>/cancel       -> job
+        DELETE /jobs/<id>            -> job
+    """
+
+    service = None
+
+    def address_string(self):
+        # Unix-socket clients have no (host, port) address
+        if isinstance(self.client_address, tuple) and self.client_address:
+            return str(self.client_address[0])
+        return 'unix-socket'
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def _path_parts(self):
+        return [part for part in self.path.split('?')[0].split('/') if part]
+
+    def do_GET(self):
+        parts = self._path_parts()
+        if parts == ['health']:
+            jobs = self.service.list_jobs()
+            counts = {state: sum(1 for j in jobs if j.state == state) for state in JOB_STATES}
+            return self._send(200, {'status': 'ok', 'max_concurrent': self.service.max_concurrent, 'jobs': counts})
+        if parts == ['jobs']:
+            return self._send(200, [job.to_dict() for job in self.service.list_jobs()])
+        if len(parts) == 2 and parts[0] == 'jobs':
+            job = self.service.get_job(parts[1])
+            if job is None:
+                return self._send(404, {'error': 'job not found'})
+            return self._send(200, job.to_dict())
+        return self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        parts = self._path_parts()
+        if parts == ['jobs']:
+            try:
+                body = self._read_json()
+                job = self.service.submit(
+                    body.get('spreadsheet'),
+                    priority=int(body.get('priority', 0)),
+                    use_cache=bool(body.get('use_cache', True)),
+                    solver_overrides=body.get('solver')
+                )
+            except (ValueError, TypeError) as e:
+                return self._send(400, {'error': str(e)})
+            return self._send(202, job.to_dict())
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            return self._cancel(parts[1])
+        return self._send(404, {'error': 'not found'})
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        if len(parts) == 2 and parts[0] == 'jobs':
+            return self._cancel(parts[1])
+        return self._send(404, {'error': 'not found'})
+
+    def _cancel(self, job_id):
+        job = self.service.cancel(job_id)
+        if job is None:
+            return self._send(404, {'error': 'job not found'})
+        return self._send(200, job.to_dict())
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def make_server(service, host='127.0.0.1', port=8765, unix_socket=None):
+    """HTTP server bound to a TCP port or a Unix socket"""
+    handler = type('BoundSchedulerRequestHandler', (SchedulerRequestHandler,), {'service': service})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the school scheduler as a long-running service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', help="Serve on a Unix socket instead of TCP")
+    parser.add_argument('--max-concurrent', type=int, default=1, help="Jobs solved at the same time")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    service = SchedulerService(os.getenv('CREDENTIALS_FILE'), args.max_concurrent, args.cache_dir)
+    server = make_server(service, args.host, args.port, args.unix_socket)
+
+    where = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"🚀 Scheduler service listening on {where} (max {args.max_concurrent} concurrent jobs)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Shutting down")
+    finally:
+        server.server_close()
+        service.shutdown(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
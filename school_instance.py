@@ -0,0 +1,213 @@
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+
+# ============================================================================
+# SCHOOL INSTANCE
+# ============================================================================
+
+# The converted data dict stays the wire format (it is fingerprinted, cached
+# and copied by scenarios); SchoolInstance is its read-only, indexed view.
+# Every lookup the builder, the solution extraction and the rendering need
+# (a teacher's subject, a team's classes, a day's slots, ...) is computed
+# once here instead of by re-scanning TEACHERS.
+
+TEACHER_KINDS = ('core', 'literacy', 'pe', 'other')
+
+
+@dataclass(frozen=True, slots=True)
+class Teacher:
+    """
+    One teacher of the instance
+
+    Attributes:
+        name: Teacher name
+        index: Position in ALL_TEACHERS
+        kind: 'core', 'literacy', 'pe' or 'other' (listed without a team)
+        subject: Subject taught ('PE' for PE teachers, '' for 'other')
+        teams: Team numbers the teacher is listed for, in team order
+    """
+    name: str
+    index: int
+    kind: str
+    subject: str
+    teams: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Team:
+    """
+    One team of the instance
+
+    Attributes:
+        number: Team number
+        index: Position in the sorted team numbers
+        classes: Class names, in sheet order
+        teachers: Read-only {subject: teacher name}, in sheet order
+        core_teachers: Teachers of the core subjects (no literacy teacher), in subject order
+        literacy_teacher: The team's literacy teacher, or None
+    """
+    number: int
+    index: int
+    classes: tuple
+    teachers: MappingProxyType
+    core_teachers: tuple
+    literacy_teacher: object
+
+
+@dataclass(frozen=True, slots=True)
+class SchoolInstance:
+    """
+    Read-only, indexed view of convert_sheets_data_to_model_format's dict
+
+    Attributes:
+        days: Day names
+        all_periods / teaching_periods / lunch_periods: {day: tuple of periods}
+        period_numbers: Sorted teaching period numbers over all days
+        slots: Teaching slots as (day, period), in day and period order
+        day_slots: {day: tuple of indices into slots}
+        slot_index: {(day, period): index into slots}
+        classes: Class names
+        class_index: {class name: index}
+        class_team: {class name: team number}
+        team_numbers: Sorted team numbers
+        teams: {team number: Team}
+        teachers: {teacher name: Teacher}, in ALL_TEACHERS order
+        pe_teachers: PE teacher names
+        literacy_classes: {literacy teacher: classes of the teams served}
+        core_subjects: Core subject names
+        activities: Activity names
+        activity_codes: {activity name: code}
+    """
+    days: tuple
+    all_periods: MappingProxyType
+    teaching_periods: MappingProxyType
+    lunch_periods: MappingProxyType
+    period_numbers: tuple
+    slots: tuple
+    day_slots: MappingProxyType
+    slot_index: MappingProxyType
+    classes: tuple
+    class_index: MappingProxyType
+    class_team: MappingProxyType
+    team_numbers: tuple
+    teams: MappingProxyType
+    teachers: MappingProxyType
+    pe_teachers: tuple
+    literacy_classes: MappingProxyType
+    core_subjects: tuple
+    activities: tuple
+    activity_codes: MappingProxyType
+
+    @classmethod
+    def from_model_data(cls, data):
+        """
+        Index a converted data dict
+
+        Args:
+            data: Output of convert_sheets_data_to_model_format
+
+        Returns:
+            SchoolInstance
+        """
+        days = tuple(data['DAYS'])
+        all_periods = {day: tuple(data['ALL_PERIODS'][day]) for day in days}
+        teaching_periods = {day: tuple(data['TEACHING_PERIODS'][day]) for day in days}
+        slots = tuple((day, period) for day in days for period in teaching_periods[day])
+        team_numbers = tuple(sorted(data['TEAMS']))
+        TEACHERS = data['TEACHERS']
+        team_keys = sorted(TEACHERS, key=lambda key: int(key.split('_')[1]))
+        pe_teachers = tuple(data['PE_TEACHERS'])
+
+        # Subject and teams per teacher (a teacher's first listing gives the subject)
+        listed = {}
+        for team_key in team_keys:
+            team_num = int(team_key.split('_')[1])
+            for subject, teacher in TEACHERS[team_key].items():
+                listed.setdefault(teacher, (subject, []))[1].append(team_num)
+
+        teachers = {}
+        for index, name in enumerate(data['ALL_TEACHERS']):
+            if name in pe_teachers:
+                kind, subject, teams = 'pe', 'PE', []
+            elif name in listed:
+                subject, teams = listed[name]
+                kind = 'literacy' if subject == 'Literacy' else 'core'
+            else:
+                kind, subject, teams = 'other', '', []
+            teachers[name] = Teacher(name, index, kind, subject, tuple(teams))
+
+        teams = {}
+        literacy_classes = {}
+        for index, team_num in enumerate(team_numbers):
+            team_teachers = dict(TEACHERS.get(f'team_{team_num}', {}))
+            literacy_teacher = team_teachers.get('Literacy')
+            classes = tuple(data['TEAMS'][team_num])
+            teams[team_num] = Team(
+                team_num, index, classes, MappingProxyType(team_teachers),
+                tuple(team_teachers[subject] for subject in data['CORE_SUBJECTS']
+                      if subject in team_teachers and subject != 'Literacy'),
+                literacy_teacher)
+            if literacy_teacher:
+                literacy_classes.setdefault(literacy_teacher, []).extend(classes)
+
+        return cls(
+            days=days,
+            all_periods=MappingProxyType(all_periods),
+            teaching_periods=MappingProxyType(teaching_periods),
+            lunch_periods=MappingProxyType({
+                day: tuple(p for p in all_periods[day] if p not in teaching_periods[day]) for day in days
+            }),
+            period_numbers=tuple(sorted({period for day in days for period in teaching_periods[day]})),
+            slots=slots,
+            day_slots=MappingProxyType({
+                day: tuple(s for s, (slot_day, _) in enumerate(slots) if slot_day == day) for day in days
+            }),
+            slot_index=MappingProxyType({slot: s for s, slot in enumerate(slots)}),
+            classes=tuple(data['CLASSES']),
+            class_index=MappingProxyType({name: c for c, name in enumerate(data['CLASSES'])}),
+            class_team=MappingProxyType(dict(data['TEAM_MAPPING'])),
+            team_numbers=team_numbers,
+            teams=MappingProxyType(teams),
+            teachers=MappingProxyType(teachers),
+            pe_teachers=pe_teachers,
+            literacy_classes=MappingProxyType({
+                teacher: tuple(classes) for teacher, classes in literacy_classes.items()
+            }),
+            core_subjects=tuple(data['CORE_SUBJECTS']),
+            activities=tuple(data['ACTIVITIES']),
+            activity_codes=MappingProxyType({activity: code for code, activity in enumerate(data['ACTIVITIES'])})
+        )
+
+    def teacher_names(self, kind):
+        """Names of the teachers of one kind, in ALL_TEACHERS order"""
+        return [teacher.name for teacher in self.teachers.values() if teacher.kind == kind]
+
+# ============================================================================
+# SHARED INSTANCES
+# ============================================================================
+
+# Instances already built, by the canonical JSON of their data dict: the
+# model builder, the extraction and the rendering of one run share one
+MAX_SHARED_INSTANCES = 8
+_instances = {}
+
+
+def school_instance(data):
+    """
+    The SchoolInstance for a converted data dict, built once per distinct data
+
+    Args:
+        data: Output of convert_sheets_data_to_model_format
+
+    Returns:
+        SchoolInstance (shared; it is immutable)
+    """
+    key = json.dumps(data, sort_keys=True, default=str)
+    instance = _instances.get(key)
+    if instance is None:
+        instance = SchoolInstance.from_model_data(data)
+        if len(_instances) >= MAX_SHARED_INSTANCES:
+            _instances.pop(next(iter(_instances)))
+        _instances[key] = instance
+    return instance
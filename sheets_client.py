@@ -0,0 +1,262 @@
+import time
+import random
+import threading
+from collections import deque
+from http import HTTPStatus
+
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+# Google Sheets API default per-user quotas (requests per minute)
+DEFAULT_READ_REQUESTS_PER_MINUTE = 60
+DEFAULT_WRITE_REQUESTS_PER_MINUTE = 60
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# ============================================================================
+# TOKEN BUCKET
+# ============================================================================
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Thread-safe token bucket
+
+        Args:
+            rate_per_minute: Sustained number of requests allowed per minute
+            capacity: Burst size (defaults to one second's worth, at least 1)
+        """
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, self.rate_per_second)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_second)
+        self.updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate_per_second
+            self.sleep(wait)
+            waited += wait
+
+# ============================================================================
+# QUOTA ACCOUNTING
+# ============================================================================
+
+class QuotaStats:
+    def __init__(self):
+        """Request counts, retries, throttling and latency histograms"""
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {'read': 0, 'write': 0}
+            self.retries = 0
+            self.failures = 0
+            self.throttled_seconds = 0.0
+            self.latency_histogram = {
+                kind: [0] * (len(LATENCY_BUCKETS_MS) + 1) for kind in ('read', 'write')
+            }
+            self.latency_total_ms = {'read': 0.0, 'write': 0.0}
+            self.latency_max_ms = {'read': 0.0, 'write': 0.0}
+
+    def record(self, kind, latency_ms, throttled_seconds=0.0):
+        bucket = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                bucket = i
+                break
+        with self.lock:
+            self.requests[kind] += 1
+            self.throttled_seconds += throttled_seconds
+            self.latency_histogram[kind][bucket] += 1
+            self.latency_total_ms[kind] += latency_ms
+            self.latency_max_ms[kind] = max(self.latency_max_ms[kind], latency_ms)
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+
+    def summary(self):
+        """Plain-dict snapshot suitable for logging or JSON output"""
+        with self.lock:
+            labels = [f'<={bound}ms' for bound in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}ms']
+            return {
+                'requests': dict(self.requests),
+                'quota_used': sum(self.requests.values()),
+                'retries': self.retries,
+                'failures': self.failures,
+                'throttled_seconds': round(self.throttled_seconds, 3),
+                'latency_histogram': {
+                    kind: dict(zip(labels, counts)) for kind, counts in self.latency_histogram.items()
+                },
+                'latency_mean_ms': {
+                    kind: round(self.latency_total_ms[kind] / self.requests[kind], 1) if self.requests[kind] else 0.0
+                    for kind in self.requests
+                },
+                'latency_max_ms': {kind: round(value, 1) for kind, value in self.latency_max_ms.items()}
+            }
+
+
+def format_quota_summary(summary):
+    """One-line human readable quota report"""
+    return (
+        f"{summary['quota_used']} requests ({summary['requests']['read']} read / "
+        f"{summary['requests']['write']} write), {summary['retries']} retries, "
+        f"{summary['throttled_seconds']:.1f}s throttled, mean latency "
+        f"{summary['latency_mean_ms']['read']:.0f}ms read / {summary['latency_mean_ms']['write']:.0f}ms write"
+    )
+
+# ============================================================================
+# RATE LIMITER (shared across spreadsheets using one service account)
+# ============================================================================
+
+class SheetsRateLimiter:
+    def __init__(self, read_per_minute=DEFAULT_READ_REQUESTS_PER_MINUTE,
+                 write_per_minute=DEFAULT_WRITE_REQUESTS_PER_MINUTE,
+                 max_attempts=6, base_delay=1.0, max_delay=64.0):
+        """
+        Token buckets for read and write requests plus retry policy
+
+        Args:
+            read_per_minute: Read requests allowed per minute
+            write_per_minute: Write requests allowed per minute
+            max_attempts: Attempts per request before the APIError is raised
+            base_delay: First backoff delay in seconds (doubled per attempt, with jitter)
+            max_delay: Upper bound on a single backoff delay
+        """
+        self.buckets = {
+            'read': TokenBucket(read_per_minute),
+            'write': TokenBucket(write_per_minute)
+        }
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = QuotaStats()
+        self._recent = deque()
+        self._recent_lock = threading.Lock()
+
+    def acquire(self, kind):
+        """Wait for a token; returns seconds spent throttled"""
+        waited = self.buckets[kind].acquire()
+        now = time.monotonic()
+        with self._recent_lock:
+            self._recent.append(now)
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+        return waited
+
+    def requests_last_minute(self):
+        now = time.monotonic()
+        with self._recent_lock:
+            return sum(1 for t in self._recent if now - t <= 60)
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """Delay before retry number `attempt` (1-based), honouring Retry-After"""
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass  # HTTP-date form; fall back to exponential backoff
+        delay = min(self.base_delay * (2 ** (attempt - 1)), self.max_delay)
+        return delay * (0.5 + random.random() / 2)
+
+
+_shared_rate_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_rate_limiter():
+    """Process-wide limiter so every spreadsheet shares the service account quota"""
+    global _shared_rate_limiter
+    with _shared_lock:
+        if _shared_rate_limiter is None:
+            _shared_rate_limiter = SheetsRateLimiter()
+        return _shared_rate_limiter
+
+
+def configure_shared_rate_limiter(read_per_minute=DEFAULT_READ_REQUESTS_PER_MINUTE,
+                                  write_per_minute=DEFAULT_WRITE_REQUESTS_PER_MINUTE):
+    """Replace the process-wide limiter (e.g. with one process's share of the quota)"""
+    global _shared_rate_limiter
+    with _shared_lock:
+        _shared_rate_limiter = SheetsRateLimiter(read_per_minute, write_per_minute)
+        return _shared_rate_limiter
+
+# ============================================================================
+# GSPREAD HTTP CLIENT
+# ============================================================================
+
+def is_retryable_error(error):
+    """429, 408, 5xx and Drive 403 usageLimits are worth retrying"""
+    code = error.code
+    if code in (HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.REQUEST_TIMEOUT) or code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+        return True
+    details = error.error if isinstance(error.error, dict) else {}
+    errors = details.get('errors') or []
+    return code == HTTPStatus.FORBIDDEN and bool(errors) and errors[0].get('domain') == 'usageLimits'
+
+
+class ThrottledHTTPClient(HTTPClient):
+    """gspread HTTP client with token-bucket throttling, backoff and accounting"""
+
+    rate_limiter = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = self.rate_limiter or get_shared_rate_limiter()
+        # Per-connection stats (per run); the limiter keeps process-wide totals
+        self.stats = QuotaStats()
+
+    def request(self, method, endpoint, *args, **kwargs):
+        kind = 'read' if method.upper() == 'GET' else 'write'
+
+        attempt = 0
+        while True:
+            attempt += 1
+            throttled = self.limiter.acquire(kind)
+            start = time.perf_counter()
+            try:
+                response = super().request(method, endpoint, *args, **kwargs)
+                return response
+            except APIError as e:
+                if attempt >= self.limiter.max_attempts or not is_retryable_error(e):
+                    self.stats.record_failure()
+                    self.limiter.stats.record_failure()
+                    raise
+                retry_after = None
+                if getattr(e, 'response', None) is not None:
+                    retry_after = e.response.headers.get('Retry-After')
+                delay = self.limiter.backoff_delay(attempt, retry_after)
+                print(f"⚠️ Sheets API {e.code} on {method} (attempt {attempt}), backing off {delay:.1f}s")
+                self.stats.record_retry()
+                self.limiter.stats.record_retry()
+                time.sleep(delay)
+            finally:
+                latency_ms = (time.perf_counter() - start) * 1000
+                self.stats.record(kind, latency_ms, throttled)
+                self.limiter.stats.record(kind, latency_ms, throttled)
+
+
+def make_throttled_http_client(rate_limiter=None):
+    """ThrottledHTTPClient subclass bound to a specific limiter (gspread takes a class)"""
+    return type('BoundThrottledHTTPClient', (ThrottledHTTPClient,), {'rate_limiter': rate_limiter})
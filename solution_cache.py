@@ -0,0 +1,138 @@
+import os
+import json
+import hashlib
+import tempfile
+from datetime import datetime
+
+# ============================================================================
+# INPUT FINGERPRINTING
+# ============================================================================
+
+def compute_input_fingerprint(model_data, solver_profile, code_version):
+    """
+    Fingerprint a solve request
+
+    Args:
+        model_data: Output of convert_sheets_data_to_model_format
+        solver_profile: Dict of CP-SAT parameters used for the solve
+        code_version: String identifying the scheduler code
+
+    Returns:
+        Hex SHA-256 digest that only changes when the inputs change
+    """
+    payload = {
+        'model_data': model_data,
+        'solver_profile': solver_profile or {},
+        'code_version': code_version
+    }
+    # sort_keys + str() on non-JSON types gives a stable encoding; int dict
+    # keys (team numbers, periods) become strings, which is fine for hashing
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def file_fingerprint(path):
+    """SHA-256 of a file's contents (used to version the scheduler code)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def restore_period_keys(schedules):
+    """Turn JSON string period keys back into ints ({name: {day: {period: info}}})"""
+    return {
+        name: {
+            day: {int(period): info for period, info in day_schedule.items()}
+            for day, day_schedule in schedule.items()
+        }
+        for name, schedule in schedules.items()
+    }
+
+# ============================================================================
+# SOLUTION CACHE
+# ============================================================================
+
+class SolutionCache:
+    def __init__(self, cache_dir):
+        """
+        Local on-disk cache of published solutions
+
+        Args:
+            cache_dir: Directory holding cached solutions and source markers
+        """
+        self.cache_dir = cache_dir
+        self.solutions_dir = os.path.join(cache_dir, 'solutions')
+        self.sources_file = os.path.join(cache_dir, 'sources.json')
+
+    def _write_json(self, path, payload):
+        """Write JSON atomically so a crash never leaves a truncated entry"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, default=str)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _read_json(self, path):
+        """Read a JSON file, treating missing or corrupt files as absent"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _solution_path(self, fingerprint):
+        return os.path.join(self.solutions_dir, f'{fingerprint}.json')
+
+    def get(self, fingerprint):
+        """Return the cached solution for a fingerprint, or None"""
+        entry = self._read_json(self._solution_path(fingerprint))
+        if not entry:
+            return None
+
+        try:
+            entry['teacher_schedules'] = restore_period_keys(entry['teacher_schedules'])
+            entry['class_schedules'] = restore_period_keys(entry['class_schedules'])
+        except (KeyError, AttributeError, ValueError):
+            return None
+
+        return entry
+
+    def put(self, fingerprint, teacher_schedules, class_schedules, solve_time=None, quality=None):
+        """Store a solved schedule under its input fingerprint"""
+        entry = {
+            'fingerprint': fingerprint,
+            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'solve_time': solve_time,
+            'quality': quality,
+            'teacher_schedules': teacher_schedules,
+            'class_schedules': class_schedules
+        }
+        self._write_json(self._solution_path(fingerprint), entry)
+
+    def get_source_marker(self, source_id):
+        """Return the last recorded {'modified_time', 'fingerprint', 'solver_profile', 'code_version'} for a spreadsheet"""
+        sources = self._read_json(self.sources_file) or {}
+        return sources.get(source_id)
+
+    def set_source_marker(self, source_id, modified_time, fingerprint, solver_profile=None, code_version=None):
+        """
+        Remember which fingerprint a spreadsheet revision resolved to
+
+        The solver profile and code version are stored alongside so a marker
+        written by another profile or scheduler version is not trusted.
+        """
+        sources = self._read_json(self.sources_file) or {}
+        sources[source_id] = {
+            'modified_time': modified_time,
+            'fingerprint': fingerprint,
+            'solver_profile': solver_profile or {},
+            'code_version': code_version
+        }
+        self._write_json(self.sources_file, sources)
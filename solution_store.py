@@ -0,0 +1,255 @@
+import io
+import os
+import json
+import sqlite3
+import contextlib
+from datetime import datetime
+
+import numpy as np
+
+from school_instance import school_instance
+
+# ============================================================================
+# COMPACT SOLUTIONS
+# ============================================================================
+
+def extract_compact_solution(solution, data):
+    """
+    Pull the decision values out of a solved model into compact arrays
+
+    Args:
+        solution: Dict returned by solve_scheduling_model
+        data: Model data the solution was built from
+
+    Returns:
+        Dict with entity lists ('teachers', 'classes', 'slots', 'activities'),
+        an (teachers x slots) int8 'activity' matrix and a (k x 3) int16
+        'assignments' array of (teacher, class, slot) index triples
+    """
+    solver = solution['solver']
+    teacher_activity = solution['teacher_activity']
+    teacher_class_assignment = solution['teacher_class_assignment']
+
+    instance = school_instance(data)
+    teachers = list(instance.teachers)
+    classes = list(instance.classes)
+    slots = [(day, period) for day in instance.days for period in instance.all_periods[day]]
+    teaching_slots = instance.slot_index
+
+    activity = np.full((len(teachers), len(slots)), -1, dtype=np.int8)
+    assignments = []
+    for t_idx, teacher in enumerate(teachers):
+        for s_idx, (day, period) in enumerate(slots):
+            activity[t_idx, s_idx] = solver.Value(teacher_activity[teacher][day][period])
+            if (day, period) not in teaching_slots:
+                continue
+            for c_idx, class_name in enumerate(classes):
+                if solver.Value(teacher_class_assignment[teacher][class_name][day][period]):
+                    assignments.append((t_idx, c_idx, s_idx))
+
+    return {
+        'teachers': teachers,
+        'classes': classes,
+        'slots': slots,
+        'activities': list(instance.activities),
+        'activity': activity,
+        'assignments': np.array(assignments, dtype=np.int16).reshape(-1, 3)
+    }
+
+
+def compact_solution_to_hints(compact, data):
+    """
+    Translate a compact solution into hints for solve_scheduling_model
+
+    Entities are matched by name, so a solution from a slightly different
+    school still hints every teacher/class/slot the two instances share.
+    """
+    teachers = set(data['ALL_TEACHERS'])
+    classes = set(data['CLASSES'])
+    activities = list(data['ACTIVITIES'])
+    all_slots = {(day, period) for day in data['DAYS'] for period in data['ALL_PERIODS'][day]}
+
+    activity_hints = {}
+    for t_idx, teacher in enumerate(compact['teachers']):
+        if teacher not in teachers:
+            continue
+        for s_idx, (day, period) in enumerate(compact['slots']):
+            value = int(compact['activity'][t_idx, s_idx])
+            if value < 0 or (day, period) not in all_slots:
+                continue
+            name = compact['activities'][value]
+            if name in activities:
+                activity_hints[(teacher, day, period)] = activities.index(name)
+
+    assignment_hints = set()
+    for t_idx, c_idx, s_idx in compact['assignments'].tolist():
+        teacher = compact['teachers'][t_idx]
+        class_name = compact['classes'][c_idx]
+        day, period = compact['slots'][s_idx]
+        if teacher in teachers and class_name in classes and (day, period) in all_slots:
+            assignment_hints.add((teacher, class_name, day, period))
+
+    return {
+        'teachers': teachers & set(compact['teachers']),
+        'teacher_activity': activity_hints,
+        'teacher_class_assignment': assignment_hints
+    }
+
+# ============================================================================
+# STRUCTURAL SIMILARITY
+# ============================================================================
+
+def structure_features(data):
+    """Feature sets describing the teacher/class/period structure of an instance"""
+    teacher_subjects = {}
+    for team_key, team_teachers in data['TEACHERS'].items():
+        for subject, teacher in team_teachers.items():
+            teacher_subjects.setdefault(teacher, set()).add(f'{subject}@{team_key}')
+    for teacher in data['PE_TEACHERS']:
+        teacher_subjects.setdefault(teacher, set()).add('PE')
+
+    return {
+        'teachers': sorted(
+            f"{teacher}|{','.join(sorted(teacher_subjects.get(teacher, [])))}"
+            for teacher in data['ALL_TEACHERS']
+        ),
+        'classes': sorted(f"{class_name}|{data['TEAM_MAPPING'][class_name]}" for class_name in data['CLASSES']),
+        'periods': sorted(f'{day}|{period}' for day in data['DAYS'] for period in data['ALL_PERIODS'][day])
+    }
+
+
+def _jaccard(a, b):
+    a, b = set(a), set(b)
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def structure_similarity(features_a, features_b):
+    """Mean Jaccard similarity over the teacher, class and period feature sets (0..1)"""
+    families = ['teachers', 'classes', 'periods']
+    return sum(_jaccard(features_a.get(f, []), features_b.get(f, [])) for f in families) / len(families)
+
+# ============================================================================
+# SOLUTION STORE
+# ============================================================================
+
+class SolutionStore:
+    def __init__(self, db_path):
+        """
+        On-disk history of solved instances (SQLite + compressed NumPy arrays)
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_db()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Connection that commits (or rolls back) and is closed on exit"""
+        # sqlite3's own context manager only ends the transaction
+        with contextlib.closing(sqlite3.connect(self.db_path)) as conn:
+            with conn:
+                yield conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS instances (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fingerprint TEXT UNIQUE,
+                    created_at TEXT,
+                    solve_time REAL,
+                    quality TEXT,
+                    features TEXT,
+                    model_data TEXT,
+                    solution_meta TEXT,
+                    solution_arrays BLOB
+                )
+            """)
+
+    def add(self, fingerprint, data, compact, solve_time=None, quality=None):
+        """Store a solved instance (replacing any previous row with the same fingerprint)"""
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, activity=compact['activity'], assignments=compact['assignments'])
+        meta = {key: compact[key] for key in ['teachers', 'classes', 'slots', 'activities']}
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO instances
+                    (fingerprint, created_at, solve_time, quality, features, model_data, solution_meta, solution_arrays)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    fingerprint,
+                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    solve_time,
+                    quality,
+                    json.dumps(structure_features(data)),
+                    json.dumps(data, sort_keys=True, default=str),
+                    json.dumps(meta),
+                    sqlite3.Binary(buffer.getvalue())
+                )
+            )
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM instances").fetchone()[0]
+
+    def _load_compact(self, meta_json, arrays_blob):
+        meta = json.loads(meta_json)
+        with np.load(io.BytesIO(arrays_blob), allow_pickle=False) as arrays:
+            compact = {
+                'activity': arrays['activity'],
+                'assignments': arrays['assignments']
+            }
+        compact.update(meta)
+        compact['slots'] = [tuple(slot) for slot in meta['slots']]
+        return compact
+
+    def find_most_similar(self, data, min_similarity=0.5):
+        """
+        Return (similarity, record) for the most similar stored instance, or None
+
+        Ties are broken in favour of the most recent run.
+        """
+        target = structure_features(data)
+        best = None
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, fingerprint, features FROM instances ORDER BY id DESC").fetchall()
+            for row_id, fingerprint, features_json in rows:
+                score = structure_similarity(target, json.loads(features_json))
+                if score >= min_similarity and (best is None or score > best[0]):
+                    best = (score, row_id, fingerprint)
+
+            if best is None:
+                return None
+
+            score, row_id, fingerprint = best
+            created_at, solve_time, quality, meta_json, arrays_blob = conn.execute(
+                "SELECT created_at, solve_time, quality, solution_meta, solution_arrays FROM instances WHERE id = ?",
+                (row_id,)
+            ).fetchone()
+
+        return score, {
+            'fingerprint': fingerprint,
+            'created_at': created_at,
+            'solve_time': solve_time,
+            'quality': quality,
+            'solution': self._load_compact(meta_json, arrays_blob)
+        }
+
+    def find_hints(self, data, min_similarity=0.5):
+        """Hints for solve_scheduling_model from the most similar past solution (or None)"""
+        match = self.find_most_similar(data, min_similarity)
+        if not match:
+            return None
+
+        score, record = match
+        print(f"💡 Using hints from past run {record['created_at']} (similarity {score:.2f})")
+        return compact_solution_to_hints(record['solution'], data)
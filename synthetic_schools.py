@@ -0,0 +1,139 @@
+import math
+import time
+import string
+
+from international_highschool_scheduler import template_records, RULE_PARAMETERS
+
+# ============================================================================
+# SYNTHETIC SCHOOLS
+# ============================================================================
+
+# Team counts of the scaling report
+DEFAULT_SCALING_TEAMS = (4, 8, 16, 32)
+
+
+def synthetic_records(team_count, classes_per_team=4):
+    """
+    (config, teachers_data, classes_data) for a template-shaped school of any size
+
+    Every team gets one teacher per core subject, every pair of teams shares
+    a literacy teacher, and PE staff and PE capacity grow with the school so
+    that each PE teacher stays inside the template's weekly load.
+    """
+    config, template_teachers, _ = template_records()
+    rules = {name: default for name, (_, default) in RULE_PARAMETERS.items()}
+    core_subjects = config['Core Subjects'].split(',')
+
+    classes_data = [
+        {'Class Name': f"{team}{string.ascii_uppercase[i]}", 'Team': team, 'Notes': f"Team {team} class {i + 1}"}
+        for team in range(1, team_count + 1)
+        for i in range(classes_per_team)
+    ]
+
+    teachers_data = []
+    for team in range(1, team_count + 1):
+        for subject in core_subjects:
+            teachers_data.append({'Teacher Name': f"{subject}_T{team}", 'Subject': subject, 'Team': team,
+                                  'Type': 'Core', 'Notes': f"Team {team} {subject} Teacher", 'Active': 'TRUE'})
+    for k, first_team in enumerate(range(1, team_count + 1, 2), start=1):
+        teams = [team for team in (first_team, first_team + 1) if team <= team_count]
+        teachers_data.append({'Teacher Name': f"Literacy_T{k}", 'Subject': 'Literacy',
+                              'Team': ','.join(map(str, teams)), 'Type': 'Literacy',
+                              'Notes': f"Serves teams {' and '.join(map(str, teams))}", 'Active': 'TRUE'})
+
+    # Enough PE teachers for roughly a full load each, and as many PE teams at
+    # once as they can cover
+    pe_class_periods = team_count * classes_per_team * rules['pe_periods_per_week']
+    pe_teachers = max(1, math.ceil(pe_class_periods / rules['pe_load_max']))
+    pe_team_capacity = max(1, pe_teachers * rules['max_classes_per_pe_teacher'] // classes_per_team)
+    pe_template = next(t for t in template_teachers if t['Type'] == 'PE')
+    for i in range(1, pe_teachers + 1):
+        teachers_data.append(dict(pe_template, **{'Teacher Name': f"PE_T{i}", 'Notes': f"PE Teacher {i}"}))
+
+    config = dict(config)
+    config.update({
+        'School Name': f"Synthetic {team_count}-team school",
+        'Total Teams': team_count,
+        'Classes per Team': classes_per_team,
+        'PE Teachers': pe_teachers,
+        'Literacy Teachers': math.ceil(team_count / 2),
+        RULE_PARAMETERS['pe_teams_per_period'][0]: pe_team_capacity
+    })
+    return config, teachers_data, classes_data
+
+
+def synthetic_sheets(team_count, classes_per_team=4):
+    """LocalInstanceSheets holding a synthetic school"""
+    from local_instance import LocalInstanceSheets, INSTANCE_FORMAT
+
+    config, teachers_data, classes_data = synthetic_records(team_count, classes_per_team)
+    name = f"synthetic_{team_count}"
+    instance = {'format': INSTANCE_FORMAT, 'name': name, 'config': config,
+                'teachers': teachers_data, 'classes': classes_data}
+    return LocalInstanceSheets(f"{name}.json", instance=instance)
+
+# ============================================================================
+# SCALING REPORT
+# ============================================================================
+
+def scaling_report(team_counts=DEFAULT_SCALING_TEAMS, solver_profile=None, solve=False, formulation=None,
+                   event_encoding=None, anonymous_variables=False):
+    """
+    Build (and optionally solve) synthetic schools of growing size
+
+    Returns:
+        One row per team count: school size, model size and timings
+
+    Args:
+        formulation: Model formulation (see FORMULATIONS); scheduler default if None
+        event_encoding: Event encoding (see EVENT_ENCODINGS); scheduler default if None
+        anonymous_variables: Build with unnamed variables
+    """
+    from local_instance import make_offline_scheduler
+
+    rows = []
+    for team_count in team_counts:
+        sheets = synthetic_sheets(team_count)
+        scheduler = make_offline_scheduler(sheets, solver_profile=solver_profile, formulation=formulation,
+                                           event_encoding=event_encoding, anonymous_variables=anonymous_variables)
+        data = scheduler.convert_sheets_data_to_model_format(
+            sheets.read_configuration(), sheets.read_teachers(), sheets.read_classes())
+
+        start = time.perf_counter()
+        built = scheduler.build_scheduling_model(data)
+        build_seconds = time.perf_counter() - start
+        proto = built['model'].Proto()
+
+        row = {
+            'teams': team_count,
+            'classes': len(data['CLASSES']),
+            'teachers': len(data['ALL_TEACHERS']),
+            'variables': len(proto.variables),
+            'constraints': len(proto.constraints),
+            'proto_mb': round(proto.ByteSize() / 1e6, 2),
+            'build_seconds': round(build_seconds, 3),
+            'status': None,
+            'solve_seconds': None
+        }
+        if solve:
+            solution = scheduler.solve_built_model(built, data, solver_profile)
+            row['status'] = solution['quality'] if solution else 'No solution'
+            row['solve_seconds'] = round(solution['solve_time'], 3) if solution else None
+        rows.append(row)
+        print(f"📈 {team_count} teams: {row['variables']} variables, {row['constraints']} constraints, "
+              f"built in {build_seconds:.1f}s")
+    return rows
+
+
+def format_scaling_report(rows):
+    """Plain-text table of scaling_report rows"""
+    lines = [f"{'Teams':>5} {'Classes':>7} {'Teachers':>8} {'Variables':>10} {'Constraints':>12} "
+             f"{'Proto(MB)':>9} {'Build(s)':>9} {'Solve(s)':>9}  Status"]
+    for row in rows:
+        solve = row['solve_seconds']
+        lines.append(
+            f"{row['teams']:>5} {row['classes']:>7} {row['teachers']:>8} {row['variables']:>10} "
+            f"{row['constraints']:>12} {row['proto_mb']:>9.2f} {row['build_seconds']:>9.2f} {(f'{solve:.2f}' if solve is not None else '-'):>9}  "
+            f"{row['status'] or '-'}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,133 @@
+import unittest
+import asyncio
+import tempfile
+import shutil
+import time
+import io
+import contextlib
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from international_highschool_scheduler import GoogleSheetsScheduler, template_records
+
+READ_DELAY = 0.3
+
+
+class SlowSheets:
+    """Sheets backend where every call takes READ_DELAY seconds"""
+
+    spreadsheet_name = 'Slow School'
+
+    class spreadsheet:
+        id = 'slow-id'
+
+    def __init__(self):
+        self.config, self.teachers, self.classes = template_records()
+        self.statuses = []
+        self.writes = []
+
+    def read_configuration(self):
+        time.sleep(READ_DELAY)
+        return dict(self.config)
+
+    def read_teachers(self):
+        time.sleep(READ_DELAY)
+        return list(self.teachers)
+
+    def read_classes(self):
+        time.sleep(READ_DELAY)
+        return list(self.classes)
+
+    def get_modified_time(self):
+        return None
+
+    def update_status(self, status, last_run=None, solve_time=None, quality=None):
+        self.statuses.append(status)
+
+    def write_teacher_schedules_grid(self, schedules_data, raise_on_error=False):
+        time.sleep(READ_DELAY)
+        self.writes.append('teacher_grid')
+
+    def write_class_schedules_grid(self, schedules_data, raise_on_error=False):
+        time.sleep(READ_DELAY)
+        self.writes.append('class_grid')
+
+
+class StubSolveScheduler(GoogleSheetsScheduler):
+    """Scheduler that records the grid it was given instead of solving"""
+
+    def solve_scheduling_model(self, data, teachers_data, solver_profile=None, hints=None, progress_callback=None,
+                               grid=None):
+        self.received_grid = grid
+        return {'solve_time': 0.1, 'quality': 'Optimal'}
+
+    def convert_solution_to_sheets_format(self, solution, data):
+        return {'ELA_T1': {}}, {'A': {}}
+
+
+class TestAsyncPipeline(unittest.TestCase):
+    """Tests for the asyncio run_solver orchestrator"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.sheets = SlowSheets()
+        self.scheduler = StubSolveScheduler(
+            None, None, cache_dir=self.cache_dir, sheets=self.sheets, background_io=False,
+            publish_outputs=('teacher_grid', 'class_grid')
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_reads_and_writes_overlap(self):
+        start = time.time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            success = asyncio.run(self.scheduler.run_solver_async())
+        elapsed = time.time() - start
+
+        self.assertTrue(success)
+        self.assertEqual(sorted(self.sheets.writes), ['class_grid', 'teacher_grid'])
+        # Sequential would be 3 reads + 2 writes = 5 * READ_DELAY
+        self.assertLess(elapsed, 4 * READ_DELAY)
+        self.assertEqual(self.sheets.statuses[-1], "Complete ✅")
+
+    def test_time_grid_built_from_config_is_used(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(self.scheduler.run_solver_async())
+
+        grid = self.scheduler.received_grid
+        self.assertIsNotNone(grid)
+        self.assertEqual(grid['team_numbers'], [1, 2, 3, 4])
+        self.assertEqual(sorted(grid['elective_schedule']['Wednesday']), [1, 2, 4, 5, 6])
+
+    def test_second_async_run_hits_cache(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(self.scheduler.run_solver_async())
+            self.scheduler.received_grid = None
+            asyncio.run(self.scheduler.run_solver_async())
+
+        self.assertIsNone(self.scheduler.received_grid)
+        self.assertEqual(self.sheets.statuses[-1], "Complete ✅ (cached)")
+
+
+class TestTimeGrid(unittest.TestCase):
+    """The pre-built time grid must give the same model as building from scratch"""
+
+    def test_prebuilt_grid_matches_inline_build(self):
+        scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = scheduler.convert_sheets_data_to_model_format(*template_records())
+            inline = scheduler.build_scheduling_model(data)
+            grid = scheduler.build_time_grid(data['DAYS'], data['TEACHING_PERIODS'])
+            prebuilt = scheduler.build_scheduling_model(data, grid)
+
+        inline_proto = inline['model'].Proto()
+        prebuilt_proto = prebuilt['model'].Proto()
+        self.assertEqual(len(inline_proto.variables), len(prebuilt_proto.variables))
+        self.assertEqual(len(inline_proto.constraints), len(prebuilt_proto.constraints))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,119 @@
+import unittest
+import threading
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from background_io import BackgroundSheetsWriter, SolverProgressReporter
+from international_highschool_scheduler import SchoolSchedulerGoogleSheets
+
+
+class RecordingSheets:
+    """Sheets backend that records writes and can fail or block on demand"""
+
+    status_cells = staticmethod(SchoolSchedulerGoogleSheets.status_cells)
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.status_writes = []
+        self.grids = []
+        self.log = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def write_status_cells(self, cells, raise_on_error=False):
+        self.status_writes.append(dict(cells))
+        self.log.append(cells['B8'])
+
+    def write_teacher_schedules_grid(self, schedules_data, raise_on_error=False):
+        self.gate.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("429 quota exceeded")
+        self.grids.append(schedules_data)
+        self.log.append('grid')
+
+
+class TestBackgroundSheetsWriter(unittest.TestCase):
+    """Tests for the background status/output writer"""
+
+    def test_status_updates_are_coalesced(self):
+        sheets = RecordingSheets()
+        writer = BackgroundSheetsWriter(sheets, base_delay=0)
+        sheets.gate.clear()
+        writer.write_teacher_schedules_grid({'T': {}})
+
+        writer.update_status("Solving... 1s")
+        writer.update_status("Solving... 2s")
+        writer.update_status("Complete ✅", "2026-01-01 00:00:00", 3.0, "Optimal")
+        sheets.gate.set()
+        writer.close(5)
+
+        merged = {}
+        for cells in sheets.status_writes:
+            merged.update(cells)
+        self.assertEqual(merged['B8'], "Complete ✅")
+        self.assertEqual(merged['B10'], "3.00 seconds")
+        self.assertNotIn({'B8': "Solving... 1s"}, sheets.status_writes)
+        self.assertEqual(sheets.grids, [{'T': {}}])
+
+    def test_status_keeps_queue_order(self):
+        sheets = RecordingSheets()
+        writer = BackgroundSheetsWriter(sheets, base_delay=0)
+        sheets.gate.clear()
+        writer.write_teacher_schedules_grid({'T': {}})
+        writer.update_status("Writing results...")
+        writer.write_teacher_schedules_grid({'T': {}})
+        writer.update_status("Complete ✅")
+        sheets.gate.set()
+        writer.close(5)
+
+        # The final status never overtakes the output write queued before it
+        self.assertEqual(sheets.log, ['grid', "Writing results...", 'grid', "Complete ✅"])
+
+    def test_failed_writes_are_retried(self):
+        sheets = RecordingSheets(failures=2)
+        writer = BackgroundSheetsWriter(sheets, base_delay=0)
+        writer.write_teacher_schedules_grid({'T': {}})
+        writer.close(5)
+
+        self.assertEqual(sheets.grids, [{'T': {}}])
+        self.assertEqual(writer.errors, [])
+
+    def test_gives_up_after_max_attempts(self):
+        sheets = RecordingSheets(failures=10)
+        writer = BackgroundSheetsWriter(sheets, max_attempts=3, base_delay=0)
+        writer.write_teacher_schedules_grid({'T': {}})
+        failures = writer.flush(5)
+        # Each failure is reported by one flush only
+        self.assertEqual(writer.flush(5), [])
+        writer.close(5)
+
+        self.assertEqual(sheets.grids, [])
+        self.assertEqual([description for description, _ in failures], ["teacher schedules grid"])
+        self.assertEqual(len(writer.errors), 1)
+        self.assertEqual(sheets.failures, 7)
+
+
+class TestSolverProgressReporter(unittest.TestCase):
+    """Tests for streaming CP-SAT log lines into status updates"""
+
+    def test_reports_solution_count(self):
+        statuses = []
+
+        class Sink:
+            def update_status(self, status):
+                statuses.append(status)
+
+        reporter = SolverProgressReporter(Sink(), min_interval=3600)
+        reporter("#Bound   0.14s best:-inf  next:[64,4250]")
+        reporter("#1       0.26s best:2063  next:[2064,4171] main")
+        reporter("#2       0.31s best:2070  next:[2071,4171] main")
+
+        self.assertEqual(reporter.solutions_found, 2)
+        self.assertIn("2 solution(s) found", statuses[-1])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
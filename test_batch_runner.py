@@ -0,0 +1,103 @@
+import unittest
+import tempfile
+import shutil
+import json
+import sys
+import os
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from batch_runner import (
+    load_manifest, plan_cpu_budget, batch_solver_profile, run_batch, format_batch_report, solve_school
+)
+from local_instance import LocalInstanceSheets, save_instance, load_instance, make_offline_scheduler
+from solution_cache import SolutionCache, compute_input_fingerprint
+from international_highschool_scheduler import get_code_version
+from test_scheduler_cli import tiny_instance, tiny_schedules
+from test_solution_cache import FakeSheets, CountingScheduler
+
+
+class TestBatchRunner(unittest.TestCase):
+    """Tests for manifests, CPU budgeting and the consolidated batch report"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_manifest_formats(self):
+        text = self.write('schools.txt', "# district\nCampus North\nsouth.json\n\n")
+        entries = load_manifest(text)
+        self.assertEqual(entries[0], {'spreadsheet': 'Campus North', 'name': 'Campus North'})
+        self.assertEqual(entries[1]['input'], os.path.join(self.tmp, 'south.json'))
+        self.assertEqual(entries[1]['name'], 'south')
+
+        listing = self.write('schools.json', json.dumps({'schools': [
+            {'input': 'east.json', 'out': 'east_solved.json', 'max_time_in_seconds': 60}
+        ]}))
+        entry = load_manifest(listing)[0]
+        self.assertEqual(entry['out'], os.path.join(self.tmp, 'east_solved.json'))
+        self.assertEqual(entry['max_time_in_seconds'], 60)
+
+        with self.assertRaises(ValueError):
+            load_manifest(self.write('bad.json', json.dumps([{'name': 'nowhere'}])))
+
+    def test_cpu_budget_split(self):
+        self.assertEqual(plan_cpu_budget(10, cpu_budget=8), (8, 1))
+        self.assertEqual(plan_cpu_budget(2, cpu_budget=8), (2, 4))
+        self.assertEqual(plan_cpu_budget(10, cpu_budget=8, max_processes=3), (3, 2))
+        self.assertEqual(plan_cpu_budget(3, cpu_budget=1), (1, 1))
+
+    def test_batch_reports_each_school_in_manifest_order(self):
+        config, teachers, classes = tiny_instance()
+        school = os.path.join(self.tmp, 'tiny.json')
+        save_instance(school, config, teachers, classes, 'tiny')
+
+        # Seed the cache so the batch republishes instead of solving
+        sheets = LocalInstanceSheets(school)
+        data = make_offline_scheduler(sheets).convert_sheets_data_to_model_format(
+            sheets.read_configuration(), sheets.read_teachers(), sheets.read_classes())
+        fingerprint = compute_input_fingerprint(data, batch_solver_profile(1), get_code_version())
+        SolutionCache(self.cache_dir).put(fingerprint, *tiny_schedules(), 2.5, 'Optimal')
+
+        solved = os.path.join(self.tmp, 'tiny_solved.json')
+        entries = [
+            {'name': 'missing', 'input': os.path.join(self.tmp, 'missing.json')},
+            {'name': 'tiny', 'input': school, 'out': solved}
+        ]
+        report = run_batch(entries, cpu_budget=2, cache_dir=self.cache_dir)
+
+        self.assertEqual((report['processes'], report['workers_per_solve']), (2, 1))
+        self.assertEqual([row['school'] for row in report['schools']], ['missing', 'tiny'])
+        self.assertEqual((report['succeeded'], report['failed']), (1, 1))
+
+        missing, tiny = report['schools']
+        self.assertIn('FileNotFoundError', missing['error'])
+        self.assertEqual(tiny['quality'], 'Optimal')
+        self.assertEqual(tiny['status'], 'Complete ✅ (cached)')
+        self.assertIn('class_schedules', load_instance(solved))
+        self.assertIn('1/2 succeeded', format_batch_report(report))
+
+    def test_spreadsheet_school_reports_solve_time(self):
+        # Spreadsheet backends have no local status dict; the row comes from the scheduler
+        sheets = FakeSheets()
+        scheduler = CountingScheduler(None, None, cache_dir=self.cache_dir, sheets=sheets, background_io=False)
+        with mock.patch('batch_runner._make_scheduler', return_value=(sheets, scheduler)):
+            row = solve_school({'name': 'north', 'spreadsheet': 'Campus North'}, self.cache_dir,
+                               batch_solver_profile(1))
+
+        self.assertTrue(row['success'])
+        self.assertEqual((row['quality'], row['solve_time']), ('Optimal', 1.5))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
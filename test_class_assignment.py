@@ -0,0 +1,127 @@
+import unittest
+import contextlib
+import random
+import io
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from class_assignment import equitable_class_colouring, assign_classes
+from international_highschool_scheduler import GoogleSheetsScheduler, template_records
+
+
+def build(formulation):
+    scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = scheduler.convert_sheets_data_to_model_format(*template_records())
+        return data, scheduler.build_scheduling_model(data, formulation=formulation)
+
+
+def booleans(built):
+    return sum(1 for var in built['model'].Proto().variables if list(var.domain) == [0, 1])
+
+
+class ValueSolver:
+    """Stands in for a CpSolver: variables are looked up in a {index: value} map"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def Value(self, var):
+        return self.values.get(var.Index(), 0)
+
+
+class TestEquitableClassColouring(unittest.TestCase):
+    """Lessons are spread so no slot, day or group repeats a class"""
+
+    def check(self, lessons, class_count):
+        colours = equitable_class_colouring(lessons, class_count)
+        self.assertTrue(all(colour in range(class_count) for colour in colours))
+        seen = set()
+        for (group, day, period), colour in zip(lessons, colours):
+            for key in (('slot', day, period, colour), ('row', group, day, colour)):
+                self.assertNotIn(key, seen)
+                seen.add(key)
+        for group in {group for group, _, _ in lessons}:
+            per_class = [
+                sum(1 for (g, _, _), c in zip(lessons, colours) if g == group and c == colour)
+                for colour in range(class_count)
+            ]
+            self.assertEqual(len(set(per_class)), 1)
+        return colours
+
+    def test_full_week(self):
+        # Four teachers teach four classes four times a week: 4 lessons a slot
+        lessons = [(teacher, day, period) for teacher in 'WXYZ' for day in range(4) for period in range(4)]
+        self.check(lessons, 4)
+
+    def test_random_instances(self):
+        rng = random.Random(7)
+        for _ in range(20):
+            class_count = rng.randint(2, 5)
+            lessons = []
+            for day in range(5):
+                # Per-slot load <= classes and per-row load <= classes
+                load = {period: 0 for period in range(6)}
+                for group in range(4):
+                    periods = [p for p in range(6) if load[p] < class_count]
+                    for period in rng.sample(periods, min(len(periods), rng.randint(0, class_count))):
+                        load[period] += 1
+                        lessons.append((group, day, period))
+            # Pad every group to a multiple of the class count with single-lesson days
+            for group in range(4):
+                day = 5
+                while sum(1 for g, _, _ in lessons if g == group) % class_count:
+                    lessons.append((group, day, group))
+                    day += 1
+            self.check(lessons, class_count)
+
+    def test_overfull_slot_is_rejected(self):
+        with self.assertRaises(ValueError):
+            equitable_class_colouring([('X', 0, 1), ('Y', 0, 1), ('Z', 0, 1)], 2)
+        with self.assertRaises(ValueError):
+            equitable_class_colouring([('X', 0, 1)], 2)
+
+
+class TestTeamCountsFormulation(unittest.TestCase):
+    """The team-aggregated model is smaller and maps back to class assignments"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data, cls.built = build('team_counts')
+
+    def test_model_is_smaller(self):
+        _, classes = build('classes')
+        self.assertEqual(self.built['model'].Validate(), '')
+        self.assertIsNone(self.built['teacher_class_assignment'])
+        self.assertEqual(self.built['formulation'], 'team_counts')
+        # The classes formulation already drops the teacher/class pairs outside
+        # a teacher's teams (static pre-fixing); team_counts still has fewer
+        self.assertLess(booleans(self.built) * 3, booleans(classes) * 2)
+
+    def test_unknown_formulation(self):
+        with self.assertRaises(ValueError):
+            build('rooms')
+
+    def test_assign_classes(self):
+        # Math_T1 teaches team 1 on Monday P1, P2 and P4; PE_T1 has two team 1 classes on P5
+        built, data = self.built, self.data
+        values = {}
+        for period in (1, 2, 4):
+            values[built['team_teaching']['Math_T1'][1]['Monday'][period].Index()] = 1
+        values[built['pe_class_count']['PE_T1'][1]['Monday'][5].Index()] = 2
+        # A fourth lesson on Tuesday, so each of the four classes gets one
+        values[built['team_teaching']['Math_T1'][1]['Tuesday'][1].Index()] = 1
+
+        assignment = assign_classes(ValueSolver(values), built, data)
+        team_classes = data['TEAMS'][1]
+        monday = [[assignment['Math_T1'][c]['Monday'][p] for c in team_classes] for p in (1, 2, 4)]
+        self.assertEqual([sum(row) for row in monday], [1, 1, 1])
+        self.assertEqual(sum(map(sum, zip(*monday))), 3)
+        self.assertTrue(all(sum(column) <= 1 for column in zip(*monday)))
+        self.assertEqual([assignment['PE_T1'][c]['Monday'][5] for c in team_classes], [1, 1, 0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
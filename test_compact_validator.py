@@ -0,0 +1,173 @@
+import unittest
+import contextlib
+import copy
+import io
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from compact_validator import validate_compact, validate_sheet_schedules, compact_from_schedules
+from constructive_heuristic import construct_timetable, timetable_solution
+from international_highschool_scheduler import GoogleSheetsScheduler, template_records, consecutive_runs
+from solution_store import extract_compact_solution
+
+
+class TestCompactValidator(unittest.TestCase):
+    """Vectorized checks of compact schedules, with the location of every violation"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.data = cls.scheduler.convert_sheets_data_to_model_format(*template_records())
+            solution = timetable_solution(cls.data, construct_timetable(cls.data))
+            cls.teacher_schedules, cls.class_schedules = cls.scheduler.convert_solution_to_sheets_format(
+                solution, cls.data)
+        cls.compact = extract_compact_solution(solution, cls.data)
+
+    def edited(self):
+        compact = copy.deepcopy(self.compact)
+        codes = {activity: code for code, activity in enumerate(compact['activities'])}
+        return compact, codes
+
+    def rules(self, compact, strict=False):
+        return {violation['rule'] for violation in validate_compact(compact, self.data, strict)}
+
+    def test_valid_schedule(self):
+        self.assertEqual(validate_compact(self.compact, self.data), [])
+        self.assertEqual(validate_sheet_schedules(self.teacher_schedules, self.class_schedules, self.data), [])
+
+    def test_entities_matched_by_name(self):
+        compact = copy.deepcopy(self.compact)
+        teachers, slots, classes = (np.arange(len(compact[key]))[::-1] for key in ('teachers', 'slots', 'classes'))
+        activities = np.arange(len(compact['activities']))[::-1]
+        compact['teachers'] = [compact['teachers'][t] for t in teachers]
+        compact['slots'] = [compact['slots'][s] for s in slots]
+        compact['classes'] = [compact['classes'][c] for c in classes]
+        compact['activities'] = [compact['activities'][a] for a in activities]
+        compact['activity'] = np.argsort(activities)[self.compact['activity'][teachers][:, slots]].astype(np.int8)
+        position = {key: np.argsort(order) for key, order in (('t', teachers), ('c', classes), ('s', slots))}
+        t, c, s = self.compact['assignments'].T
+        compact['assignments'] = np.stack([position['t'][t], position['c'][c], position['s'][s]], axis=1)
+        self.assertEqual(validate_compact(compact, self.data), [])
+
+    def test_teacher_rules(self):
+        compact, codes = self.edited()
+        math = compact['teachers'].index('Math_T1')
+        monday = [s for s, (day, _) in enumerate(compact['slots']) if day == 'Monday']
+        prep = next(s for s in monday if compact['activity'][math, s] == codes['Prep'])
+        compact['activity'][math, prep] = codes['Extra Prep']
+        lunch = next(s for s in monday if compact['activity'][math, s] == codes['Lunch'])
+        compact['activity'][math, lunch] = codes['Prep']
+
+        violations = validate_compact(compact, self.data)
+        daily_prep = [v for v in violations if v['rule'] == 'daily_prep']
+        self.assertEqual(len(daily_prep), 1)
+        self.assertEqual(daily_prep[0]['location'], {'teacher': 'Math_T1', 'day': 'Monday'})
+        lunch_violation = next(v for v in violations if v['rule'] == 'lunch')
+        self.assertEqual(lunch_violation['location'],
+                         {'teacher': 'Math_T1', 'day': 'Monday', 'period': compact['slots'][lunch][1]})
+
+    def test_lesson_rules(self):
+        compact, _ = self.edited()
+        math, arts = compact['teachers'].index('Math_T1'), compact['teachers'].index('Arts_T1')
+        lessons = compact['assignments']
+        # Hand one of Math_T1's lessons to Arts_T1, and give Math_T1 a class of team 2
+        first = np.flatnonzero(lessons[:, 0] == math)[0]
+        lessons[first, 0] = arts
+        outside = compact['classes'].index(self.data['TEAMS'][2][0])
+        lessons = np.vstack([lessons, [[math, outside, lessons[first, 2]]]])
+        compact['assignments'] = lessons
+
+        violations = validate_compact(compact, self.data)
+        self.assertLessEqual({'weekly_subject', 'teacher_team'}, {v['rule'] for v in violations})
+        teacher_team = next(v for v in violations if v['rule'] == 'teacher_team')
+        self.assertEqual((teacher_team['location']['teacher'], teacher_team['location']['class']),
+                         ('Math_T1', self.data['TEAMS'][2][0]))
+        weekly = {(v['location']['class'], v['location']['subject']) for v in violations if v['rule'] == 'weekly_subject'}
+        class_name = compact['classes'][lessons[first, 1]]
+        self.assertIn((class_name, 'Math'), weekly)
+        self.assertIn((class_name, 'Arts'), weekly)
+
+    def test_meeting_rules(self):
+        compact, codes = self.edited()
+        math = compact['teachers'].index('Math_T1')
+        meeting = np.flatnonzero(compact['activity'][math] == codes['Team_Meeting'])[0]
+        compact['activity'][math, meeting] = codes['Extra Prep']
+
+        violations = validate_compact(compact, self.data)
+        out_of_step = [v for v in violations if v['rule'] == 'team_meeting' and 'teacher' in v['location']]
+        # The other core teachers of team 1 are now in a meeting their team does not hold
+        self.assertEqual(len(out_of_step), len(self.data['CORE_SUBJECTS']) - 1)
+        self.assertNotIn('Math_T1', {v['location']['teacher'] for v in out_of_step})
+        day, period = compact['slots'][meeting]
+        self.assertEqual({(v['location']['day'], v['location']['period']) for v in out_of_step}, {(day, period)})
+        self.assertIn('Team 1 has 1 team meetings (expected 2)', [v['message'] for v in violations])
+
+    def test_intensive_rule(self):
+        compact, codes = self.edited()
+        math = compact['teachers'].index('Math_T1')
+        day = 'Thursday'
+        run = next(run for run in consecutive_runs(self.data['TEACHING_PERIODS'][day]) if len(run) >= 4)[:4]
+        for period in run:
+            compact['activity'][math, compact['slots'].index((day, period))] = codes['Elective']
+
+        intensive = [v for v in validate_compact(compact, self.data) if v['rule'] == 'intensive']
+        self.assertIn({'teacher': 'Math_T1', 'day': day, 'period': run[0]}, [v['location'] for v in intensive])
+
+    def test_strict_rules(self):
+        strict = self.rules(self.compact, strict=True)
+        self.assertLessEqual(strict, {'meeting_days', 'advisory_days', 'electives', 'elective_sync',
+                                       'discipline_overlap'})
+
+        # An Elective outside the school-wide elective periods
+        compact, codes = self.edited()
+        math = compact['teachers'].index('Math_T1')
+        prep = np.flatnonzero(compact['activity'][math] == codes['Prep'])[0]
+        compact['activity'][math, prep] = codes['Elective']
+        day, period = compact['slots'][prep]
+        self.assertNotIn('elective_sync', self.rules(compact))
+        stray = [v for v in validate_compact(compact, self.data, strict=True) if v['rule'] == 'elective_sync']
+        self.assertEqual([v['location'] for v in stray], [{'day': day, 'period': period}])
+
+    def test_pe_lesson_during_elective_only_in_strict_mode(self):
+        # The model lets a team's PE block overlap the school-wide elective
+        compact, codes = self.edited()
+        elective = next(s for s in range(len(compact['slots']))
+                        if all(compact['activity'][t, s] == codes['Elective']
+                               for t, teacher in enumerate(compact['teachers']) if not teacher.startswith('PE')))
+        pe, class_name = compact['teachers'].index('PE_T1'), compact['classes'][0]
+        compact['assignments'] = np.vstack([compact['assignments'], [[pe, 0, elective]]])
+
+        self.assertNotIn('electives', self.rules(compact))
+        strict = [v for v in validate_compact(compact, self.data, strict=True) if v['rule'] == 'electives']
+        day, period = compact['slots'][elective]
+        self.assertEqual([v['location'] for v in strict],
+                         [{'teacher': 'PE_T1', 'class': class_name, 'day': day, 'period': period}])
+
+    def test_sheet_schedules(self):
+        teacher_schedules = copy.deepcopy(self.teacher_schedules)
+        class_schedules = copy.deepcopy(self.class_schedules)
+        del teacher_schedules['PE_T2']
+        class_name = self.data['CLASSES'][0]
+        day, period = next((day, period) for day in self.data['DAYS'] for period in self.data['TEACHING_PERIODS'][day]
+                           if class_schedules[class_name][day][period]['teacher'].startswith('Math'))
+        math = class_schedules[class_name][day][period]['teacher']
+        class_schedules[class_name][day][period]['teacher'] = 'ELA_T1'
+
+        compact = compact_from_schedules(teacher_schedules, class_schedules, self.data)
+        self.assertNotIn('PE_T2', compact['teachers'])
+        violations = validate_compact(compact, self.data)
+        self.assertIn({'rule': 'missing', 'message': 'No schedule for teacher PE_T2',
+                       'location': {'teacher': 'PE_T2'}}, violations)
+        # Both sides of the lesson disagree now
+        consistency = [v for v in violations if v['rule'] == 'consistency']
+        self.assertEqual(sorted(v['location']['teacher'] for v in consistency), ['ELA_T1', math])
+        self.assertEqual({(v['location']['class'], v['location']['day'], v['location']['period']) for v in consistency},
+                         {(class_name, day, period)})
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
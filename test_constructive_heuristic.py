@@ -0,0 +1,69 @@
+import unittest
+import contextlib
+import io
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ortools.sat.python import cp_model
+
+from constructive_heuristic import construct_timetable, timetable_solution, timetable_hints
+from international_highschool_scheduler import GoogleSheetsScheduler, template_records
+from compact_validator import validate_sheet_schedules
+
+
+def template_data():
+    scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scheduler, scheduler.convert_sheets_data_to_model_format(*template_records())
+
+
+class TestConstructiveHeuristic(unittest.TestCase):
+    """Greedy timetable for the template school, used as CP-SAT hints"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scheduler, cls.data = template_data()
+        cls.timetable = construct_timetable(cls.data)
+
+    def test_template_timetable_is_valid(self):
+        self.assertEqual(self.timetable['issues'], [])
+        self.assertLess(self.timetable['seconds'], 1.0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            teacher_schedules, class_schedules = self.scheduler.convert_solution_to_sheets_format(
+                timetable_solution(self.data, self.timetable), self.data)
+        self.assertEqual(validate_sheet_schedules(teacher_schedules, class_schedules, self.data), [])
+
+    def test_same_seed_same_timetable(self):
+        again = construct_timetable(self.data)
+        self.assertEqual(again['activity'], self.timetable['activity'])
+        self.assertEqual(again['lessons'], self.timetable['lessons'])
+
+    def test_hints_satisfy_model(self):
+        for formulation in ('team_counts', 'classes'):
+            with self.subTest(formulation=formulation), contextlib.redirect_stdout(io.StringIO()):
+                built = self.scheduler.build_scheduling_model(self.data, formulation=formulation)
+                hints = timetable_hints(built, self.data, self.timetable)
+                for var, value in hints:
+                    built['model'].Add(var == value)
+                solver = cp_model.CpSolver()
+                solver.parameters.num_workers = 1
+                solver.parameters.max_time_in_seconds = 30.0
+                self.assertIn(solver.Solve(built['model']), (cp_model.OPTIMAL, cp_model.FEASIBLE))
+
+    def test_solve_reports_acceptance(self):
+        self.scheduler.greedy_hints = True
+        with contextlib.redirect_stdout(io.StringIO()):
+            built = self.scheduler.build_scheduling_model(self.data, formulation='team_counts')
+            solution = self.scheduler.solve_built_model(
+                built, self.data, {'max_time_in_seconds': 60.0, 'num_workers': 1})
+        self.assertIsNotNone(solution)
+        self.assertEqual(solution['heuristic']['issues'], 0)
+        self.assertGreater(solution['heuristic']['hints'], 0)
+        self.assertGreaterEqual(solution['heuristic']['acceptance'], 0.0)
+        self.assertLessEqual(solution['heuristic']['acceptance'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,82 @@
+import unittest
+import contextlib
+import io
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from international_highschool_scheduler import GoogleSheetsScheduler, template_records
+from day_decomposition import (
+    teacher_roles, intensive_capacity, build_week_plan, build_day_model, solve_day, solve_by_days
+)
+from compact_validator import validate_sheet_schedules
+from solution_store import compact_solution_to_hints, extract_compact_solution
+
+
+def template_data():
+    scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scheduler, scheduler.convert_sheets_data_to_model_format(*template_records())
+
+
+class TestDayDecomposition(unittest.TestCase):
+    """Week plan plus independent daily timetables"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scheduler, cls.data = template_data()
+        cls.roles = teacher_roles(cls.data)
+
+    def test_roles_and_capacity(self):
+        self.assertEqual(self.roles['Math_T1']['teams'], [1])
+        self.assertEqual(self.roles['Literacy_T1']['teams'], [1, 2])
+        self.assertEqual(self.roles['Literacy_T1']['advisory_teams'], [1, 2])
+        self.assertEqual(self.roles['Literacy_T1']['meeting_teams'], [])
+        self.assertTrue(self.roles['PE_T1']['pe'])
+        # Periods 1-2 | 4-7: two, then three of four
+        self.assertEqual(intensive_capacity([1, 2, 4, 5, 6, 7]), 5)
+
+    def test_failed_day_reports_conflicting_entries(self):
+        model, day_vars = build_week_plan(self.data, self.roles, self.data['RULES'])
+        plan = {key: 0 for key in day_vars['Monday']}
+        plan[('electives',)] = 6  # every period an elective, yet a prep is due
+        status, values, conflict = solve_day(
+            build_day_model(self.data, 'Monday', plan, self.roles, self.data['RULES']),
+            {'max_time_in_seconds': 20.0, 'num_workers': 1})
+        self.assertEqual(status, 'INFEASIBLE')
+        self.assertIsNone(values)
+        self.assertIn(('electives',), conflict)
+        self.assertLess(len(conflict), len(plan))
+
+    def test_template_solves_by_day(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            solution = solve_by_days(self.data, {'max_time_in_seconds': 120.0, 'num_workers': 1})
+            teacher_schedules, class_schedules = self.scheduler.convert_solution_to_sheets_format(solution, self.data)
+        self.assertEqual(solution['quality'], 'Feasible')
+        self.assertEqual(validate_sheet_schedules(teacher_schedules, class_schedules, self.data), [])
+
+        # Re-solve hinted with the first solution, streaming progress
+        hints = compact_solution_to_hints(extract_compact_solution(solution, self.data), self.data)
+        lines = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            hinted = solve_by_days(self.data, {'max_time_in_seconds': 120.0, 'num_workers': 1}, hints=hints,
+                                   progress_callback=lines.append)
+            teacher_schedules, class_schedules = self.scheduler.convert_solution_to_sheets_format(hinted, self.data)
+        self.assertEqual(validate_sheet_schedules(teacher_schedules, class_schedules, self.data), [])
+        # The past solution's plan is hinted, so the first round's days all solve
+        self.assertEqual(hinted['rounds'], 1)
+        self.assertIn("Round 1: 5 of 5 day(s) solved", lines)
+        self.assertTrue(any(line.startswith('#1 ') for line in lines))
+
+    def test_cancelled_solve_stops(self):
+        solvers = set()
+        with contextlib.redirect_stdout(io.StringIO()):
+            solution = solve_by_days(self.data, {'max_time_in_seconds': 120.0, 'num_workers': 1},
+                                     active_solvers=solvers, is_cancelled=lambda: True)
+        self.assertIsNone(solution)
+        self.assertEqual(solvers, set())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,66 @@
+import unittest
+import contextlib
+import io
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from constraint_families import CONSTRAINT_FAMILIES
+from family_ablation import ablation_configurations, active_families, run_ablation, format_ablation
+from international_highschool_scheduler import GoogleSheetsScheduler, template_records
+
+
+class TestFamilyAblation(unittest.TestCase):
+    """Solving the instance with constraint families switched off"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        cls.scheduler.formulation = 'team_counts'
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.data = cls.scheduler.convert_sheets_data_to_model_format(*template_records())
+
+    def test_configurations(self):
+        configurations = ablation_configurations(['pe_load', 'literacy', 'discipline'], pairs=True)
+        self.assertEqual(configurations[:4], [('all', ()), ('-literacy', ('literacy',)),
+                                              ('-discipline', ('discipline',)), ('-pe_load', ('pe_load',))])
+        self.assertEqual(len(configurations), 7)
+        self.assertIn(('-literacy -pe_load', ('literacy', 'pe_load')), configurations)
+        self.assertEqual(len(ablation_configurations()), 1 + len(CONSTRAINT_FAMILIES))
+        with self.assertRaises(ValueError):
+            ablation_configurations(['pe_load', 'gym_rota'])
+
+    def test_active_families(self):
+        for encoding, active, inactive in (('booleans', 'team_meetings', 'event_timelines'),
+                                           ('intervals', 'event_timelines', 'team_meetings')):
+            with self.subTest(encoding=encoding):
+                base = self.scheduler.build_model_context(self.data, event_encoding=encoding, families=())
+                families = active_families(base)
+                self.assertIn(active, families)
+                self.assertNotIn(inactive, families)
+                self.assertEqual(base.families, ())
+
+    def test_run_ablation(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = run_ablation(self.scheduler, self.data, ['daily_patterns', 'event_timelines'], max_time=60.0,
+                                workers=8, greedy_hints=True)
+            full = self.scheduler.build_scheduling_model(self.data)['model'].Proto()
+
+        # event_timelines posts nothing in the Boolean encoding
+        self.assertEqual([row['configuration'] for row in rows], ['all', '-daily_patterns'])
+        self.assertEqual((rows[0]['variables'], rows[0]['constraints']), (len(full.variables), len(full.constraints)))
+        self.assertLess(rows[1]['constraints'], rows[0]['constraints'])
+        for row in rows:
+            self.assertEqual((row['runs'], row['solved'], row['statuses']), (1, 1, ['OPTIMAL']))
+            self.assertLessEqual(row['first_solution_seconds'], row['optimal_seconds'])
+            self.assertLessEqual(row['optimal_seconds'], row['solve_seconds'])
+
+        table = format_ablation(rows).splitlines()
+        self.assertEqual(len(table), 3)
+        self.assertTrue(table[1].startswith('all') and table[1].endswith('1.00'))
+        self.assertTrue(table[2].startswith('-daily_patterns'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
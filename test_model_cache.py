@@ -0,0 +1,116 @@
+import unittest
+import ast
+import contextlib
+import io
+import tempfile
+import shutil
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model_cache import ModelCache, compute_model_fingerprint
+from international_highschool_scheduler import (
+    GoogleSheetsScheduler, template_records, get_code_version, set_rule_bounds, make_rules, MODEL_SOURCES
+)
+from compact_validator import validate_sheet_schedules
+
+
+class CountingScheduler(GoogleSheetsScheduler):
+    """Scheduler without a sheets backend that counts model builds"""
+
+    def __init__(self, cache_dir, formulation='team_counts'):
+        self.model_cache = ModelCache(cache_dir)
+        self.formulation = formulation
+        self.greedy_hints = True
+        self.builds = 0
+
+    def build_scheduling_model(self, data, grid=None, formulation=None, event_encoding=None, anonymous=None,
+                               families=None):
+        self.builds += 1
+        return super().build_scheduling_model(data, grid, formulation, event_encoding, anonymous, families)
+
+
+class TestModelCache(unittest.TestCase):
+    """Built models are stored with their variable index and loaded instead of rebuilt"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.scheduler = CountingScheduler(self.cache_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.data = self.scheduler.convert_sheets_data_to_model_format(*template_records())
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def load_or_build(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.scheduler.load_or_build_model(self.data)
+
+    def test_fingerprint(self):
+        version = get_code_version()
+        fingerprint = compute_model_fingerprint(self.data, 'classes', 'booleans', version)
+        self.assertEqual(fingerprint, compute_model_fingerprint(self.data, 'classes', 'booleans', version))
+        self.assertNotEqual(fingerprint, compute_model_fingerprint(self.data, 'team_counts', 'booleans', version))
+        self.assertNotEqual(fingerprint, compute_model_fingerprint(self.data, 'classes', 'intervals', version))
+        self.assertNotEqual(fingerprint, compute_model_fingerprint(self.data, 'classes', 'booleans', version, True))
+        self.assertNotEqual(fingerprint, compute_model_fingerprint(self.data, 'classes', 'booleans', version,
+                                                                   families=('pe_periods',)))
+        other = dict(self.data, CLASSES=self.data['CLASSES'][:-1])
+        self.assertNotEqual(fingerprint, compute_model_fingerprint(other, 'classes', 'booleans', version))
+
+    def test_code_version_covers_model_modules(self):
+        # Local modules the model sources import must be hashed too, apart from I/O and cache helpers
+        helpers = {'solution_cache', 'background_io', 'sheets_client', 'model_cache', 'solution_store', 'batch_runner'}
+        here = os.path.dirname(os.path.abspath(__file__))
+        for source in MODEL_SOURCES:
+            with open(os.path.join(here, source), encoding='utf-8') as f:
+                tree = ast.parse(f.read())
+            imported = {node.module for node in ast.walk(tree) if isinstance(node, ast.ImportFrom)}
+            local = {name for name in imported if os.path.exists(os.path.join(here, f'{name}.py'))}
+            with self.subTest(source=source):
+                self.assertLessEqual({f'{name}.py' for name in local - helpers}, set(MODEL_SOURCES))
+
+    def test_round_trip(self):
+        built = self.load_or_build()
+        loaded = self.load_or_build()
+        self.assertEqual(self.scheduler.builds, 1)
+        self.assertEqual(loaded['model'].Proto(), built['model'].Proto())
+        self.assertEqual(loaded['rules'], built['rules'])
+        self.assertEqual(loaded['formulation'], 'team_counts')
+        self.assertEqual(loaded['families'], built['families'])
+        self.assertIsNone(loaded['teacher_class_assignment'])
+        for family in ('teacher_activity', 'team_teaching', 'pe_class_count', 'elective_schedule'):
+            self.assertEqual(list(loaded[family]), list(built[family]))
+        self.assertEqual(loaded['teacher_activity']['Math_T1']['Monday'][3].Index(),
+                         built['teacher_activity']['Math_T1']['Monday'][3].Index())
+        self.assertEqual(loaded['team_teaching']['Literacy_T2'][4]['Friday'][7].Index(),
+                         built['team_teaching']['Literacy_T2'][4]['Friday'][7].Index())
+
+        # Rule bounds can still be edited in place
+        set_rule_bounds(loaded['model'].Proto(), loaded['rule_constraints'], make_rules({'pe_load_min': 3}))
+        ct, _ = loaded['rule_constraints']['pe_load_min'][0]
+        self.assertEqual(loaded['model'].Proto().constraints[ct.Index()].linear.domain[0], 3)
+
+    def test_corrupt_entry_is_rebuilt(self):
+        self.load_or_build()
+        for name in os.listdir(os.path.join(self.cache_dir, 'models')):
+            if name.endswith('.json'):
+                with open(os.path.join(self.cache_dir, 'models', name), 'w') as f:
+                    f.write('{not json')
+        self.load_or_build()
+        self.assertEqual(self.scheduler.builds, 2)
+
+    def test_loaded_model_solves(self):
+        self.load_or_build()
+        built = self.load_or_build()
+        with contextlib.redirect_stdout(io.StringIO()):
+            solution = self.scheduler.solve_built_model(
+                built, self.data, {'max_time_in_seconds': 60.0, 'num_workers': 8})
+            teacher_schedules, class_schedules = self.scheduler.convert_solution_to_sheets_format(solution, self.data)
+        self.assertEqual(self.scheduler.builds, 1)
+        self.assertEqual(validate_sheet_schedules(teacher_schedules, class_schedules, self.data), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
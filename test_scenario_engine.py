@@ -0,0 +1,118 @@
+import unittest
+import tempfile
+import shutil
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scenario_engine import ScenarioEngine, load_scenarios, apply_input_deltas, sweep_points, format_sweep_map
+from international_highschool_scheduler import DEFAULT_RULES, make_rules, parse_rules, set_rule_bounds
+from scheduler_cli import _template_sheets
+
+INT_MAX = 2 ** 63 - 1
+
+
+class TestScenarioEngine(unittest.TestCase):
+    """Tests for proto-derived and rebuilt what-if variants"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = ScenarioEngine(_template_sheets())
+        cls.engine.build_base()
+
+    def pe_min_domain(self, model):
+        min_ct, _ = self.engine.base_built['rule_constraints']['pe_load_min'][0]
+        return list(model.Proto().constraints[min_ct.Index()].linear.domain)
+
+    def test_proto_variant_edits_a_copy(self):
+        base_model = self.engine.base_built['model']
+        model, mode, _ = self.engine.derive({'name': 'pe', 'deltas': [{'pe_load': {'min': 12, 'max': 25}}]})
+
+        self.assertEqual(mode, 'proto')
+        self.assertIsNot(model, base_model)
+        self.assertEqual(self.pe_min_domain(model), [12, INT_MAX])
+        self.assertEqual(self.pe_min_domain(base_model), [15, INT_MAX])
+        self.assertEqual(len(model.Proto().variables), len(base_model.Proto().variables))
+
+    def test_no_teaching_fixes_assignment_variables(self):
+        model, _, _ = self.engine.derive({'name': 'off', 'deltas': [
+            {'no_teaching': {'teacher': 'Math_T1', 'day': 'Friday'}}
+        ]})
+        var = self.engine.base_built['teacher_class_assignment']['Math_T1']['A']['Friday'][1]
+        self.assertEqual(list(model.Proto().variables[var.Index()].domain), [0, 0])
+        self.assertEqual(list(self.engine.base_built['model'].Proto().variables[var.Index()].domain), [0, 1])
+
+    def test_input_deltas_rebuild_the_model(self):
+        model, mode, _ = self.engine.derive({'name': 'wed7', 'deltas': [{'periods': {'Wednesday': 7}}]})
+        self.assertEqual(mode, 'rebuilt')
+        self.assertGreater(len(model.Proto().variables), len(self.engine.base_built['model'].Proto().variables))
+
+        instance = apply_input_deltas(self.engine.base_sheets.instance, [('periods', {'Wednesday': 7})])
+        self.assertIn('Wednesday:7', instance['config']['Periods per Day'])
+        self.assertIn('Wednesday:6', self.engine.base_sheets.instance['config']['Periods per Day'])
+
+    def test_run_reports_infeasible_and_errors(self):
+        rows = self.engine.run([
+            {'name': 'impossible', 'deltas': [{'pe_load': {'min': 30}}]},
+            {'name': 'ghost', 'deltas': [{'no_teaching': {'teacher': 'Nobody'}}]}
+        ], max_time=20, include_base=False)
+
+        self.assertEqual([row['scenario'] for row in rows], ['impossible', 'ghost'])
+        self.assertEqual((rows[0]['status'], rows[0]['feasible']), ('INFEASIBLE', False))
+        self.assertEqual(rows[1]['status'], 'ERROR')
+
+    def test_default_rules_leave_the_proto_unchanged(self):
+        base_model = self.engine.base_built['model']
+        model, _, _ = self.engine.derive({'name': 'same', 'deltas': [{'rules': {}}]})
+        set_rule_bounds(model.Proto(), self.engine.base_built['rule_constraints'], DEFAULT_RULES)
+        self.assertEqual(model.Proto().SerializeToString(), base_model.Proto().SerializeToString())
+
+        model, _, _ = self.engine.derive({'name': 'pe2', 'deltas': [{'rules': {'pe_periods_per_week': 2}}]})
+        ct, sense = self.engine.base_built['rule_constraints']['pe_periods_per_week'][0]
+        self.assertEqual(sense, '==')
+        self.assertEqual(list(model.Proto().constraints[ct.Index()].linear.domain), [2, 2])
+
+    def test_rules_validation(self):
+        self.assertEqual(make_rules({'pe_load_min': 12})['pe_load_min'], 12)
+        self.assertEqual(make_rules()['core_periods_per_week'], 4)
+        for bad in ({'lunch_length': 1}, {'pe_load_min': 'many'}, {'pe_load_max': -1}):
+            with self.assertRaises(ValueError):
+                make_rules(bad)
+
+        rules = parse_rules({'PE Periods per Week': '2', 'PE Load Max': ''})
+        self.assertEqual((rules['pe_periods_per_week'], rules['pe_load_max']), (2, DEFAULT_RULES['pe_load_max']))
+
+    def test_sweep_points_and_map(self):
+        points = sweep_points({'pe_load_min': [12, 30], 'pe_load_max': [25]})
+        self.assertEqual(points, [{'pe_load_min': 12, 'pe_load_max': 25}, {'pe_load_min': 30, 'pe_load_max': 25}])
+        with self.assertRaises(ValueError):
+            sweep_points(points=[{'recess': 1}])
+
+        rows = self.engine.sweep([{'pe_load_min': 30}], max_time=20)
+        self.assertEqual(rows[0]['scenario'], 'pe_load_min=30')
+        self.assertEqual(rows[0]['point'], {'pe_load_min': 30})
+        self.assertEqual((rows[0]['status'], rows[0]['feasible']), ('INFEASIBLE', False))
+
+        rows = [dict(row, point=point, feasible=point['pe_load_min'] < 30, solve_seconds=1.0, status='OPTIMAL')
+                for row, point in zip(rows * 2, points)]
+        grid = format_sweep_map(rows).splitlines()
+        self.assertEqual(grid[0], 'pe_load_min \\ pe_load_max')
+        self.assertIn('ok 1.0s', grid[2])
+        self.assertIn('INFEAS 1.0s', grid[3])
+
+    def test_load_scenarios_rejects_unknown_deltas(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'scenarios.json')
+            with open(path, 'w') as f:
+                json.dump([{'name': 'x', 'deltas': [{'teleport': 1}]}], f)
+            with self.assertRaises(ValueError):
+                load_scenarios(path)
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,183 @@
+import unittest
+import subprocess
+import tempfile
+import shutil
+import json
+import copy
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import scheduler_cli
+from local_instance import save_instance, load_instance
+from compact_validator import validate_sheet_schedules
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+
+def tiny_instance():
+    """One class, one ELA teacher, 4 periods a day with lunch at period 3, no team meetings or advisories"""
+    config = {
+        'Periods per Day': ','.join(f'{day}:4' for day in DAYS),
+        'Lunch Period': 3,
+        'Core Subjects': 'ELA',
+        'Team Meetings per Week': 0,
+        'Advisory Periods per Week': 0
+    }
+    teachers = [{'Teacher Name': 'ELA_T1', 'Subject': 'ELA', 'Team': 1, 'Type': 'Core', 'Active': 'TRUE'}]
+    classes = [{'Class Name': 'A', 'Team': 1}]
+    return config, teachers, classes
+
+
+def tiny_schedules():
+    """A valid schedule for tiny_instance (ELA at P1 Mon-Thu, electives Thu P2 and Fri P1, ELA meeting Fri P4)"""
+    teacher = {day: {3: {'activity': 'Lunch', 'classes': []}} for day in DAYS}
+    klass = {day: {3: {'subject': 'Lunch', 'teacher': '', 'activity_type': 'Lunch', 'team': 1}} for day in DAYS}
+
+    def free(day, period, activity):
+        teacher[day][period] = {'activity': activity, 'classes': []}
+        klass[day][period] = {'subject': 'Extra Prep', 'teacher': '', 'activity_type': 'Extra Prep', 'team': 1}
+
+    def elective(day, period):
+        teacher[day][period] = {'activity': 'Elective', 'classes': ['A']}
+        klass[day][period] = {'subject': 'Elective', 'teacher': '', 'activity_type': 'Elective', 'team': 1}
+
+    for day in DAYS[:4]:
+        teacher[day][1] = {'activity': 'Extra Prep', 'classes': ['A'], 'subject': 'ELA'}
+        klass[day][1] = {'subject': 'ELA', 'teacher': 'ELA_T1', 'activity_type': 'Extra Prep', 'team': 1}
+    for day in DAYS[:3]:
+        free(day, 2, 'Prep')
+        free(day, 4, 'Extra Prep')
+    elective('Thursday', 2)
+    free('Thursday', 4, 'Prep')
+    elective('Friday', 1)
+    free('Friday', 2, 'Prep')
+    free('Friday', 4, 'Discipline_Meeting')
+    return {'ELA_T1': teacher}, {'A': klass}
+
+
+class TestScheduleValidator(unittest.TestCase):
+    """Tests for the offline schedule validator"""
+
+    def setUp(self):
+        sheets = scheduler_cli._template_sheets()
+        sheets.instance.update(zip(('config', 'teachers', 'classes'), tiny_instance()))
+        self.data = scheduler_cli._model_data(sheets)
+        self.teacher_schedules, self.class_schedules = tiny_schedules()
+
+    def rules(self, teacher_schedules, class_schedules):
+        return {v['rule'] for v in validate_sheet_schedules(teacher_schedules, class_schedules, self.data)}
+
+    def test_valid_schedule_passes(self):
+        self.assertEqual(validate_sheet_schedules(self.teacher_schedules, self.class_schedules, self.data), [])
+
+    def test_repeat_and_weekly_count_violations(self):
+        classes = copy.deepcopy(self.class_schedules)
+        teachers = copy.deepcopy(self.teacher_schedules)
+        classes['A']['Monday'][4] = {'subject': 'ELA', 'teacher': 'ELA_T1', 'activity_type': 'Extra Prep', 'team': 1}
+        teachers['ELA_T1']['Monday'][4] = {'activity': 'Extra Prep', 'classes': ['A']}
+
+        self.assertEqual(self.rules(teachers, classes), {'no_repeat', 'weekly_subject'})
+
+    def test_prep_lunch_and_consistency_violations(self):
+        teachers = copy.deepcopy(self.teacher_schedules)
+        teachers['ELA_T1']['Monday'][2] = {'activity': 'Extra Prep', 'classes': []}
+        teachers['ELA_T1']['Tuesday'][3] = {'activity': 'Prep', 'classes': []}
+        teachers['ELA_T1']['Wednesday'][1] = {'activity': 'Extra Prep', 'classes': []}
+
+        # Lessons are counted from the teachers' side, so the dropped one is missing from the week
+        self.assertEqual(self.rules(teachers, self.class_schedules),
+                         {'daily_prep', 'lunch', 'consistency', 'weekly_subject'})
+
+    def test_elective_days_only_in_strict_mode(self):
+        # Both electives on Friday (the ELA meeting moves to Thursday): the
+        # model allows it, the README does not
+        teachers = copy.deepcopy(self.teacher_schedules)
+        classes = copy.deepcopy(self.class_schedules)
+        teachers['ELA_T1']['Thursday'][2] = {'activity': 'Discipline_Meeting', 'classes': []}
+        classes['A']['Thursday'][2] = {'subject': 'Extra Prep', 'teacher': '', 'activity_type': 'Extra Prep', 'team': 1}
+        teachers['ELA_T1']['Friday'][2] = {'activity': 'Elective', 'classes': ['A']}
+        classes['A']['Friday'][2] = {'subject': 'Elective', 'teacher': '', 'activity_type': 'Elective', 'team': 1}
+        teachers['ELA_T1']['Friday'][4] = {'activity': 'Prep', 'classes': []}
+
+        self.assertEqual(validate_sheet_schedules(teachers, classes, self.data), [])
+        strict = validate_sheet_schedules(teachers, classes, self.data, strict=True)
+        self.assertEqual([v['message'] for v in strict], ["2 elective periods on Friday"])
+
+
+class TestSchedulerCli(unittest.TestCase):
+    """Tests for subcommands, JSON output and exit codes"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def run_cli(self, *argv):
+        result = subprocess.run([sys.executable, os.path.join(HERE, 'scheduler_cli.py'), '--json', *argv],
+                                capture_output=True, text=True, cwd=self.tmp)
+        return result.returncode, json.loads(result.stdout)
+
+    def test_parser_does_not_import_heavy_dependencies(self):
+        code = (
+            "import sys, scheduler_cli; scheduler_cli.build_parser(); "
+            "print(','.join(m for m in ('ortools', 'gspread', 'numpy', 'google.oauth2', 'dotenv') if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=HERE)
+        self.assertEqual(result.stdout.strip(), '')
+
+    def test_validate_exit_codes(self):
+        path = os.path.join(self.tmp, 'school.json')
+        config, teachers, classes = tiny_instance()
+        save_instance(path, config, teachers, classes, 'tiny', *tiny_schedules())
+
+        code, result = self.run_cli('validate', path)
+        self.assertEqual(code, scheduler_cli.EXIT_OK)
+        self.assertTrue(result['valid'])
+
+        broken = load_instance(path)
+        broken['class_schedules']['A']['Monday'][1]['teacher'] = 'Nobody'
+        save_instance(path, config, teachers, classes, 'tiny', broken['teacher_schedules'], broken['class_schedules'])
+        code, result = self.run_cli('validate', path)
+        self.assertEqual(code, scheduler_cli.EXIT_FAILURE)
+        self.assertEqual(set(result['by_rule']), {'consistency'})
+        consistency = next(v for v in result['details'] if v['rule'] == 'consistency')
+        self.assertEqual(consistency['location'], {'teacher': 'ELA_T1', 'class': 'A', 'day': 'Monday', 'period': 1})
+
+    def test_export_template_then_validate_without_schedule(self):
+        path = os.path.join(self.tmp, 'template.json')
+        code, result = self.run_cli('export', '--template', '--out', path)
+        self.assertEqual(code, scheduler_cli.EXIT_OK)
+        self.assertEqual((result['teachers'], result['classes']), (24, 16))
+
+        code, result = self.run_cli('validate', path)
+        self.assertEqual(code, scheduler_cli.EXIT_INPUT_ERROR)
+        self.assertIn('no schedule', result['error'])
+
+    def test_missing_input_file(self):
+        code, result = self.run_cli('solve', '--input', os.path.join(self.tmp, 'missing.json'))
+        self.assertEqual(code, scheduler_cli.EXIT_INPUT_ERROR)
+
+    def test_bench_reports_model_size(self):
+        code, result = self.run_cli('bench')
+        self.assertEqual(code, scheduler_cli.EXIT_OK)
+        self.assertGreater(result['runs'][0]['variables'], 0)
+        self.assertGreater(result['runs'][0]['constraints'], 0)
+
+    def test_bench_ablation(self):
+        code, result = self.run_cli('bench', '--ablation', '--families', 'daily_patterns', '--formulation',
+                                    'team_counts', '--greedy-hints', '--workers', '8', '--max-time', '60')
+        self.assertEqual(code, scheduler_cli.EXIT_OK)
+        self.assertEqual([row['configuration'] for row in result['rows']], ['all', '-daily_patterns'])
+        self.assertEqual([row['solved'] for row in result['rows']], [1, 1])
+
+        code, result = self.run_cli('bench', '--ablation', '--families', 'gym_rota')
+        self.assertEqual(code, scheduler_cli.EXIT_USAGE)
+        self.assertIn('gym_rota', result['error'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,668 +1,239 @@
 import unittest
-from ortools.sat.python import cp_model
+import contextlib
+import io
 import sys
 import os
 
+from ortools.sat.python import cp_model
+
 # Add the main module to path (adjust as needed)
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-class TestSchedulerConstraints(unittest.TestCase):
-    """Unit tests for school scheduler constraints based on stakeholder requirements"""
-    
-    def setUp(self):
-        """Set up test data matching stakeholder requirements"""
-        # Mock data structure matching your actual data
-        self.DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        self.ALL_PERIODS = {
-            'Monday': [1, 2, 3, 4, 5, 6, 7],
-            'Tuesday': [1, 2, 3, 4, 5, 6, 7],
-            'Wednesday': [1, 2, 3, 4, 5, 6],
-            'Thursday': [1, 2, 3, 4, 5, 6, 7],
-            'Friday': [1, 2, 3, 4, 5, 6, 7]
-        }
-        self.TEACHING_PERIODS = {
-            day: [p for p in periods if p != 3] 
-            for day, periods in self.ALL_PERIODS.items()
-        }
-        
-        self.CLASSES = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 
-                       'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P']
-        
-        self.TEAMS = {
-            1: ['A', 'B', 'C', 'D'],
-            2: ['E', 'F', 'G', 'H'], 
-            3: ['I', 'J', 'K', 'L'],
-            4: ['M', 'N', 'O', 'P']
-        }
-        
-        self.TEAM_MAPPING = {}
-        for team_num, classes in self.TEAMS.items():
-            for class_name in classes:
-                self.TEAM_MAPPING[class_name] = team_num
-        
-        self.CORE_SUBJECTS = ['ELA', 'SS', 'Science', 'Math', 'Arts']
-        
-        self.CORE_TEACHERS = {
-            'team_1': {'ELA': 'ELA_T1', 'SS': 'SS_T1', 'Science': 'Science_T1', 'Math': 'Math_T1', 'Arts': 'Arts_T1'},
-            'team_2': {'ELA': 'ELA_T2', 'SS': 'SS_T2', 'Science': 'Science_T2', 'Math': 'Math_T2', 'Arts': 'Arts_T2'},
-            'team_3': {'ELA': 'ELA_T3', 'SS': 'SS_T3', 'Science': 'Science_T3', 'Math': 'Math_T3', 'Arts': 'Arts_T3'},
-            'team_4': {'ELA': 'ELA_T4', 'SS': 'SS_T4', 'Science': 'Science_T4', 'Math': 'Math_T4', 'Arts': 'Arts_T4'}
-        }
-        
-        self.PE_TEACHERS = ['PE_T1', 'PE_T2']
-        self.LITERACY_TEACHERS = ['Literacy_T1', 'Literacy_T2']
-        
-        self.ALL_TEACHERS = []
-        for team_teachers in self.CORE_TEACHERS.values():
-            self.ALL_TEACHERS.extend(team_teachers.values())
-        self.ALL_TEACHERS.extend(self.PE_TEACHERS)
-        self.ALL_TEACHERS.extend(self.LITERACY_TEACHERS)
-        
-        self.ACTIVITIES = ['Prep', 'Team_Meeting', 'Discipline_Meeting', 'Advisory', 'Elective', 'Lunch']
-        
-        self.LITERACY_ASSIGNMENTS = {
-            'Literacy_T1': ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H'],
-            'Literacy_T2': ['I', 'J', 'K', 'L', 'M', 'N', 'O', 'P']
-        }
+from constraint_families import CONSTRAINT_FAMILIES, add_families
+from constructive_heuristic import construct_timetable, timetable_hints
+from international_highschool_scheduler import GoogleSheetsScheduler, template_records
+
 
-    def create_base_model(self):
-        """Create base model with decision variables"""
-        model = cp_model.CpModel()
-        
-        # Decision Variables
-        teacher_activity = {}
-        for teacher in self.ALL_TEACHERS:
-            teacher_activity[teacher] = {}
-            for day in self.DAYS:
-                teacher_activity[teacher][day] = {}
-                for period in self.ALL_PERIODS[day]:
-                    teacher_activity[teacher][day][period] = model.NewIntVar(
-                        0, len(self.ACTIVITIES) - 1, f'{teacher}_{day}_P{period}_activity'
-                    )
-        
-        teacher_class_assignment = {}
-        for teacher in self.ALL_TEACHERS:
-            teacher_class_assignment[teacher] = {}
-            for class_name in self.CLASSES:
-                teacher_class_assignment[teacher][class_name] = {}
-                for day in self.DAYS:
-                    teacher_class_assignment[teacher][class_name][day] = {}
-                    for period in self.TEACHING_PERIODS[day]:
-                        teacher_class_assignment[teacher][class_name][day][period] = \
-                            model.NewBoolVar(f'{teacher}_teaches_{class_name}_{day}_P{period}')
-        
-        return model, teacher_activity, teacher_class_assignment
-
-    def add_basic_constraints(self, model, teacher_activity, teacher_class_assignment):
-        """Add basic constraints that should always work"""
-        # Lunch constraint
-        for teacher in self.ALL_TEACHERS:
-            for day in self.DAYS:
-                if 3 in self.ALL_PERIODS[day]:
-                    model.Add(teacher_activity[teacher][day][3] == self.ACTIVITIES.index('Lunch'))
-        
-        # Prep constraint
-        for teacher in self.ALL_TEACHERS:
-            for day in self.DAYS:
-                daily_preps = []
-                for period in self.TEACHING_PERIODS[day]:
-                    prep_var = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_prep')
-                    model.Add(teacher_activity[teacher][day][period] == self.ACTIVITIES.index('Prep')).OnlyEnforceIf(prep_var)
-                    model.Add(teacher_activity[teacher][day][period] != self.ACTIVITIES.index('Prep')).OnlyEnforceIf(prep_var.Not())
-                    daily_preps.append(prep_var)
-                model.Add(sum(daily_preps) == 1)
-        
-        # One teacher per class per period
-        for class_name in self.CLASSES:
-            for day in self.DAYS:
-                for period in self.TEACHING_PERIODS[day]:
-                    class_teachers = []
-                    for teacher in self.ALL_TEACHERS:
-                        class_teachers.append(teacher_class_assignment[teacher][class_name][day][period])
-                    model.Add(sum(class_teachers) <= 1)
+class TestSchedulerConstraints(unittest.TestCase):
+    """
+    Unit tests for school scheduler constraints based on stakeholder requirements
+
+    The production variables are built once for the template school; every
+    test posts the production constraint families it covers on a clone.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.data = cls.scheduler.convert_sheets_data_to_model_format(*template_records())
+        cls.base = cls.scheduler.build_model_context(cls.data, formulation='classes', event_encoding='booleans',
+                                                     families=())
+        cls.rules = cls.base.rules
+        cls.CODE = cls.base.CODE
+
+    def solve(self, families, seconds=30.0, hints=()):
+        """Post the families on a clone of the base model and solve it"""
+        context = self.base.clone()
+        add_families(context, families)
+        for var, value in hints:
+            context.model.AddHint(var, value)
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = seconds
+        solver.parameters.num_workers = 8
+        if hints:
+            # As in solve_built_model: presolve must keep the hinted solution
+            solver.parameters.keep_all_feasible_solutions_in_presolve = True
+        status = solver.Solve(context.model)
+        self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE],
+                      f"{', '.join(families)} should be feasible")
+        return context, solver
+
+    def weekly(self, solver, schedule):
+        return sum(solver.Value(var) for periods in schedule.values() for var in periods.values())
 
     def test_basic_constraints_feasible(self):
         """Test that basic constraints (lunch, prep, one teacher per class) are feasible"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 10.0
-        status = solver.Solve(model)
-        
-        self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                     "Basic constraints should be feasible")
+        context, solver = self.solve(['teaching_activity', 'class_capacity', 'daily_patterns'])
+
+        for teacher, days in context.teacher_activity.items():
+            for day, periods in days.items():
+                values = [solver.Value(var) for var in periods.values()]
+                self.assertEqual(values.count(self.CODE['Prep']), 1, f"{teacher} needs one prep on {day}")
+                lunch = [period for period, var in periods.items() if solver.Value(var) == self.CODE['Lunch']]
+                self.assertEqual(lunch, list(context.instance.lunch_periods[day]))
 
     def test_core_teaching_requirements_feasible(self):
-        """Test core subject teaching requirements (4x/week, Arts 3x/week)"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        # Add core teaching requirements
-        for team_num in range(1, 5):
-            team_key = f'team_{team_num}'
-            if team_key in self.CORE_TEACHERS:
-                team_classes = self.TEAMS[team_num]
-                
-                for subject in self.CORE_SUBJECTS:
-                    if subject in self.CORE_TEACHERS[team_key]:
-                        teacher = self.CORE_TEACHERS[team_key][subject]
-                        periods_per_week = 3 if subject == 'Arts' else 4
-                        
-                        for class_name in team_classes:
-                            weekly_teaching = []
-                            for day in self.DAYS:
-                                for period in self.TEACHING_PERIODS[day]:
-                                    weekly_teaching.append(
-                                        teacher_class_assignment[teacher][class_name][day][period]
-                                    )
-                            model.Add(sum(weekly_teaching) == periods_per_week)
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 30.0
-        status = solver.Solve(model)
-        
-        self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                     "Core teaching requirements should be feasible")
+        """Test core subject teaching requirements (4x/week per class)"""
+        context, solver = self.solve(['class_capacity', 'core_subjects'])
+
+        for team in context.instance.teams.values():
+            for teacher in team.core_teachers:
+                for class_name in team.classes:
+                    self.assertEqual(self.weekly(solver, context.teacher_class_assignment[teacher][class_name]),
+                                     self.rules['core_periods_per_week'])
 
     def test_literacy_requirements_feasible(self):
         """Test literacy teaching requirements (2x/week per class)"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        # Add literacy constraints
-        for literacy_teacher, assigned_classes in self.LITERACY_ASSIGNMENTS.items():
-            for class_name in self.CLASSES:
-                if class_name not in assigned_classes:
-                    for day in self.DAYS:
-                        for period in self.TEACHING_PERIODS[day]:
-                            model.Add(teacher_class_assignment[literacy_teacher][class_name][day][period] == 0)
-            
+        context, solver = self.solve(['class_capacity', 'no_repeat', 'literacy'])
+
+        for teacher, assigned_classes in context.instance.literacy_classes.items():
             for class_name in assigned_classes:
-                weekly_literacy = []
-                for day in self.DAYS:
-                    for period in self.TEACHING_PERIODS[day]:
-                        weekly_literacy.append(
-                            teacher_class_assignment[literacy_teacher][class_name][day][period]
-                        )
-                model.Add(sum(weekly_literacy) == 2)
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 30.0
-        status = solver.Solve(model)
-        
-        self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                     "Literacy requirements should be feasible")
+                self.assertEqual(self.weekly(solver, context.teacher_class_assignment[teacher][class_name]),
+                                 self.rules['literacy_periods_per_week'])
 
     def test_discipline_meetings_alone_feasible(self):
         """Test discipline meeting constraints alone (1/week per subject)"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        # Add discipline meeting constraints
-        discipline_schedule = {}
-        for subject in self.CORE_SUBJECTS + ["Literacy"]:
-            discipline_schedule[subject] = {}
-            for day in self.DAYS:
-                discipline_schedule[subject][day] = {}
-                for period in self.TEACHING_PERIODS[day]:
-                    discipline_schedule[subject][day][period] = model.NewBoolVar(
-                        f'{subject}_discipline_{day}_P{period}'
-                    )
-        
-        # Each subject has exactly 1 discipline meeting per week
-        for subject in self.CORE_SUBJECTS + ["Literacy"]:
-            weekly_discipline = []
-            for day in self.DAYS:
-                for period in self.TEACHING_PERIODS[day]:
-                    weekly_discipline.append(discipline_schedule[subject][day][period])
-            model.Add(sum(weekly_discipline) == 1)
-        
-        # At most 1 discipline meeting per period
-        for day in self.DAYS:
-            for period in self.TEACHING_PERIODS[day]:
-                period_discipline_meetings = []
-                for subject in self.CORE_SUBJECTS + ["Literacy"]:
-                    period_discipline_meetings.append(discipline_schedule[subject][day][period])
-                model.Add(sum(period_discipline_meetings) <= 1)
-        
-        # Each non-PE teacher has exactly 1 discipline meeting per week
-        all_non_pe_teachers = []
-        for team_teachers in self.CORE_TEACHERS.values():
-            all_non_pe_teachers.extend(team_teachers.values())
-        all_non_pe_teachers.extend(self.LITERACY_TEACHERS)
-        
-        for teacher in all_non_pe_teachers:
-            weekly_discipline = []
-            for day in self.DAYS:
-                for period in self.TEACHING_PERIODS[day]:
-                    is_discipline = model.NewBoolVar(f'{teacher}_{day}_P{period}_discipline')
-                    model.Add(teacher_activity[teacher][day][period] == self.ACTIVITIES.index('Discipline_Meeting')).OnlyEnforceIf(is_discipline)
-                    model.Add(teacher_activity[teacher][day][period] != self.ACTIVITIES.index('Discipline_Meeting')).OnlyEnforceIf(is_discipline.Not())
-                    weekly_discipline.append(is_discipline)
-            model.Add(sum(weekly_discipline) == 1)
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 30.0
-        status = solver.Solve(model)
-        
-        self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                     "Discipline meetings alone should be feasible")
+        context, solver = self.solve(['teaching_activity', 'discipline'])
+
+        for subject, schedule in context.discipline_schedule.items():
+            self.assertEqual(self.weekly(solver, schedule), 1, f"{subject} needs one discipline meeting")
+        for teacher, days in context.teacher_activity.items():
+            meetings = [var for periods in days.values() for var in periods.values()
+                        if solver.Value(var) == self.CODE['Discipline_Meeting']]
+            expected = 0 if context.teachers[teacher].kind == 'pe' else 1
+            self.assertEqual(len(meetings), expected, f"{teacher} discipline meetings")
 
     def test_advisory_meetings_alone_feasible(self):
         """Test advisory meeting constraints alone (2/week per team)"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        # Add advisory constraints
-        team_advisory_schedule = {}
-        for team_num in range(1, 5):
-            team_advisory_schedule[team_num] = {}
-            for day in self.DAYS:
-                team_advisory_schedule[team_num][day] = {}
-                for period in self.TEACHING_PERIODS[day]:
-                    team_advisory_schedule[team_num][day][period] = model.NewBoolVar(
-                        f'team_{team_num}_advisory_{day}_P{period}'
-                    )
-        
-        # Each team gets exactly 2 advisory periods per week
-        for team_num in range(1, 5):
-            weekly_advisory = []
-            for day in self.DAYS:
-                for period in self.TEACHING_PERIODS[day]:
-                    weekly_advisory.append(team_advisory_schedule[team_num][day][period])
-            model.Add(sum(weekly_advisory) == 2)
-        
-        # Each non-PE teacher has exactly 2 advisory periods per week
-        for teacher in self.ALL_TEACHERS:
-            if teacher not in self.PE_TEACHERS:
-                weekly_advisory = []
-                for day in self.DAYS:
-                    for period in self.TEACHING_PERIODS[day]:
-                        is_advisory = model.NewBoolVar(f'{teacher}_{day}_P{period}_advisory')
-                        model.Add(teacher_activity[teacher][day][period] == self.ACTIVITIES.index('Advisory')).OnlyEnforceIf(is_advisory)
-                        model.Add(teacher_activity[teacher][day][period] != self.ACTIVITIES.index('Advisory')).OnlyEnforceIf(is_advisory.Not())
-                        weekly_advisory.append(is_advisory)
-                model.Add(sum(weekly_advisory) == 2)
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 30.0
-        status = solver.Solve(model)
-        
-        self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                     "Advisory meetings alone should be feasible")
+        context, solver = self.solve(['advisory_slots', 'advisory'])
+
+        for team_num, schedule in context.team_advisory_schedule.items():
+            self.assertEqual(self.weekly(solver, schedule), self.rules['advisory_periods_per_week'])
+            days = [day for day, periods in schedule.items() if any(solver.Value(var) for var in periods.values())]
+            self.assertEqual(len(days), self.rules['advisory_periods_per_week'], f"Team {team_num} advisory days")
 
     def test_electives_alone_feasible(self):
         """Test elective constraints alone (2/week school-wide)"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        # Add elective constraints
-        elective_schedule = {}
-        for day in self.DAYS:
-            elective_schedule[day] = {}
-            for period in self.TEACHING_PERIODS[day]:
-                elective_schedule[day][period] = model.NewBoolVar(f'school_elective_{day}_P{period}')
-        
-        # Exactly 2 elective periods per week
-        weekly_electives = []
-        for day in self.DAYS:
-            for period in self.TEACHING_PERIODS[day]:
-                weekly_electives.append(elective_schedule[day][period])
-        model.Add(sum(weekly_electives) == 2)
-        
-        # Each core teacher gets exactly 2 electives per week OR 0
-        for teacher in self.ALL_TEACHERS:
-            if teacher not in self.PE_TEACHERS and teacher not in self.LITERACY_TEACHERS:
-                weekly_electives = []
-                for day in self.DAYS:
-                    for period in self.TEACHING_PERIODS[day]:
-                        is_elective = model.NewBoolVar(f'{teacher}_{day}_P{period}_elective')
-                        model.Add(teacher_activity[teacher][day][period] == self.ACTIVITIES.index('Elective')).OnlyEnforceIf(is_elective)
-                        model.Add(teacher_activity[teacher][day][period] != self.ACTIVITIES.index('Elective')).OnlyEnforceIf(is_elective.Not())
-                        weekly_electives.append(is_elective)
-                
-                has_electives = model.NewBoolVar(f'{teacher}_has_electives')
-                model.Add(sum(weekly_electives) == 2).OnlyEnforceIf(has_electives)
-                model.Add(sum(weekly_electives) == 0).OnlyEnforceIf(has_electives.Not())
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 30.0
-        status = solver.Solve(model)
-        
-        self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                     "Electives alone should be feasible")
+        context, solver = self.solve(['elective_count', 'electives'])
+
+        self.assertEqual(self.weekly(solver, context.elective_schedule), self.rules['elective_periods_per_week'])
+        for day, periods in context.elective_schedule.items():
+            for period, var in periods.items():
+                if solver.Value(var):
+                    self.assertEqual(solver.Value(context.teacher_activity['Math_T1'][day][period]),
+                                     self.CODE['Elective'])
+                    self.assertEqual(solver.Value(context.teacher_activity['PE_T1'][day][period]),
+                                     self.CODE['Extra Prep'])
 
     def test_discipline_plus_advisory_combination(self):
         """Test the critical combination: discipline + advisory meetings"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        # Add BOTH discipline and advisory constraints
-        # (Copy the constraint code from the individual tests above)
-        
-        # Discipline constraints
-        discipline_schedule = {}
-        for subject in self.CORE_SUBJECTS + ["Literacy"]:
-            discipline_schedule[subject] = {}
-            for day in self.DAYS:
-                discipline_schedule[subject][day] = {}
-                for period in self.TEACHING_PERIODS[day]:
-                    discipline_schedule[subject][day][period] = model.NewBoolVar(
-                        f'{subject}_discipline_{day}_P{period}'
-                    )
-        
-        for subject in self.CORE_SUBJECTS + ["Literacy"]:
-            weekly_discipline = []
-            for day in self.DAYS:
-                for period in self.TEACHING_PERIODS[day]:
-                    weekly_discipline.append(discipline_schedule[subject][day][period])
-            model.Add(sum(weekly_discipline) == 1)
-        
-        for day in self.DAYS:
-            for period in self.TEACHING_PERIODS[day]:
-                period_discipline_meetings = []
-                for subject in self.CORE_SUBJECTS + ["Literacy"]:
-                    period_discipline_meetings.append(discipline_schedule[subject][day][period])
-                model.Add(sum(period_discipline_meetings) <= 1)
-        
-        # Advisory constraints
-        team_advisory_schedule = {}
-        for team_num in range(1, 5):
-            team_advisory_schedule[team_num] = {}
-            for day in self.DAYS:
-                team_advisory_schedule[team_num][day] = {}
-                for period in self.TEACHING_PERIODS[day]:
-                    team_advisory_schedule[team_num][day][period] = model.NewBoolVar(
-                        f'team_{team_num}_advisory_{day}_P{period}'
-                    )
-        
-        for team_num in range(1, 5):
-            weekly_advisory = []
-            for day in self.DAYS:
-                for period in self.TEACHING_PERIODS[day]:
-                    weekly_advisory.append(team_advisory_schedule[team_num][day][period])
-            model.Add(sum(weekly_advisory) == 2)
-        
-        # Teacher frequency constraints for BOTH
-        all_non_pe_teachers = []
-        for team_teachers in self.CORE_TEACHERS.values():
-            all_non_pe_teachers.extend(team_teachers.values())
-        all_non_pe_teachers.extend(self.LITERACY_TEACHERS)
-        
-        for teacher in all_non_pe_teachers:
-            # Discipline: exactly 1 per week
-            weekly_discipline = []
-            for day in self.DAYS:
-                for period in self.TEACHING_PERIODS[day]:
-                    is_discipline = model.NewBoolVar(f'{teacher}_{day}_P{period}_discipline')
-                    model.Add(teacher_activity[teacher][day][period] == self.ACTIVITIES.index('Discipline_Meeting')).OnlyEnforceIf(is_discipline)
-                    model.Add(teacher_activity[teacher][day][period] != self.ACTIVITIES.index('Discipline_Meeting')).OnlyEnforceIf(is_discipline.Not())
-                    weekly_discipline.append(is_discipline)
-            model.Add(sum(weekly_discipline) == 1)
-            
-            # Advisory: exactly 2 per week
-            weekly_advisory = []
-            for day in self.DAYS:
-                for period in self.TEACHING_PERIODS[day]:
-                    is_advisory = model.NewBoolVar(f'{teacher}_{day}_P{period}_advisory')
-                    model.Add(teacher_activity[teacher][day][period] == self.ACTIVITIES.index('Advisory')).OnlyEnforceIf(is_advisory)
-                    model.Add(teacher_activity[teacher][day][period] != self.ACTIVITIES.index('Advisory')).OnlyEnforceIf(is_advisory.Not())
-                    weekly_advisory.append(is_advisory)
-            model.Add(sum(weekly_advisory) == 2)
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 60.0
-        status = solver.Solve(model)
-        
-        # This is the test that should reveal the problem
-        if status == cp_model.INFEASIBLE:
-            self.fail("CRITICAL: Discipline + Advisory combination is INFEASIBLE! This is the root cause.")
-        else:
-            self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                         "Discipline + Advisory combination should be feasible")
+        self.solve(['advisory_slots', 'teaching_activity', 'class_capacity', 'core_subjects', 'literacy',
+                    'discipline', 'advisory'], seconds=60.0)
 
     def test_pe_constraints_feasible(self):
         """Test PE constraints (3x/week per team, team-based)"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        # Add PE constraints
-        team_pe_schedule = {}
-        for team_num in range(1, 5):
-            team_pe_schedule[team_num] = {}
-            for day in self.DAYS:
-                team_pe_schedule[team_num][day] = {}
-                for period in self.TEACHING_PERIODS[day]:
-                    team_pe_schedule[team_num][day][period] = model.NewBoolVar(
-                        f'team_{team_num}_has_PE_{day}_P{period}'
-                    )
-        
-        # Each team gets exactly 3 PE periods per week
-        for team_num in range(1, 5):
-            weekly_pe = []
-            for day in self.DAYS:
-                for period in self.TEACHING_PERIODS[day]:
-                    weekly_pe.append(team_pe_schedule[team_num][day][period])
-            model.Add(sum(weekly_pe) == 3)
-        
-        # Only one team can have PE at a time
-        for day in self.DAYS:
-            for period in self.TEACHING_PERIODS[day]:
-                teams_with_pe = []
-                for team_num in range(1, 5):
-                    teams_with_pe.append(team_pe_schedule[team_num][day][period])
-                model.Add(sum(teams_with_pe) <= 1)
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 30.0
-        status = solver.Solve(model)
-        
-        self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                     "PE constraints should be feasible")
+        context, solver = self.solve(['pe_periods', 'pe_capacity', 'pe_coverage', 'pe_class_load', 'pe_load'])
+
+        for team_num, schedule in context.team_pe_schedule.items():
+            self.assertEqual(self.weekly(solver, schedule), self.rules['pe_periods_per_week'])
+        for day, period in context.SLOTS:
+            teams = sum(solver.Value(schedule[day][period]) for schedule in context.team_pe_schedule.values())
+            self.assertLessEqual(teams, self.rules['pe_teams_per_period'])
 
     def test_team_meeting_constraints_feasible(self):
         """Test team meeting constraints (2x/week per team, during PE)"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        # Add team meeting constraints
-        team_meeting_schedule = {}
-        for team_num in range(1, 5):
-            team_meeting_schedule[team_num] = {}
-            for day in self.DAYS:
-                team_meeting_schedule[team_num][day] = {}
-                for period in self.TEACHING_PERIODS[day]:
-                    team_meeting_schedule[team_num][day][period] = model.NewBoolVar(
-                        f'team_{team_num}_meeting_{day}_P{period}'
-                    )
-        
-        # Each team has exactly 2 team meetings per week
-        for team_num in range(1, 5):
-            weekly_meetings = []
-            for day in self.DAYS:
-                for period in self.TEACHING_PERIODS[day]:
-                    weekly_meetings.append(team_meeting_schedule[team_num][day][period])
-            model.Add(sum(weekly_meetings) == 2)
-        
-        # Each core teacher has exactly 2 team meetings per week
-        for team_key, team_teachers in self.CORE_TEACHERS.items():
-            for teacher in team_teachers.values():
-                weekly_team_meetings = []
-                for day in self.DAYS:
-                    for period in self.TEACHING_PERIODS[day]:
-                        is_team_meeting = model.NewBoolVar(f'{teacher}_{day}_P{period}_is_team_meeting')
-                        model.Add(teacher_activity[teacher][day][period] == self.ACTIVITIES.index('Team_Meeting')).OnlyEnforceIf(is_team_meeting)
-                        model.Add(teacher_activity[teacher][day][period] != self.ACTIVITIES.index('Team_Meeting')).OnlyEnforceIf(is_team_meeting.Not())
-                        weekly_team_meetings.append(is_team_meeting)
-                model.Add(sum(weekly_team_meetings) == 2)
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 30.0
-        status = solver.Solve(model)
-        
-        self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                     "Team meeting constraints should be feasible")
+        context, solver = self.solve(['pe_periods', 'meeting_slots', 'team_meetings'])
+
+        for team_num, schedule in context.team_meeting_schedule.items():
+            self.assertEqual(self.weekly(solver, schedule), self.rules['team_meetings_per_week'])
+            for day, periods in schedule.items():
+                self.assertLessEqual(sum(solver.Value(var) for var in periods.values()), 1)
+                for period, var in periods.items():
+                    if solver.Value(var):
+                        self.assertEqual(solver.Value(context.team_pe_schedule[team_num][day][period]), 1)
 
     def test_no_repeat_same_day_feasible(self):
         """Test no repeat classes same day constraint (core and literacy teachers only)"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        # Add some basic teaching requirements so we have actual teaching to constrain
-        # (Without this, the constraint is meaningless since no one is teaching)
-        
-        # Add core teaching requirements (simplified - just ELA and Math for testing)
-        test_subjects = ['ELA', 'Math', 'SS', 'Science' 'Arts', 'Literacy']  # Subset for faster testing
-        for team_num in range(1, 5):
-            team_key = f'team_{team_num}'
-            if team_key in self.CORE_TEACHERS:
-                team_classes = self.TEAMS[team_num]
-                
-                for subject in test_subjects:
-                    if subject in self.CORE_TEACHERS[team_key]:
-                        teacher = self.CORE_TEACHERS[team_key][subject]
-                        periods_per_week = 4  # Both ELA and Math are 4x/week
-                        
-                        for class_name in team_classes:
-                            weekly_teaching = []
-                            for day in self.DAYS:
-                                for period in self.TEACHING_PERIODS[day]:
-                                    weekly_teaching.append(
-                                        teacher_class_assignment[teacher][class_name][day][period]
-                                    )
-                            model.Add(sum(weekly_teaching) == periods_per_week)
-        
-        # Add literacy teaching requirements (simplified)
-        for literacy_teacher, assigned_classes in self.LITERACY_ASSIGNMENTS.items():
-            # Only test with first 2 classes for speed
-            test_classes = assigned_classes[:2]
-            
-            for class_name in test_classes:
-                weekly_literacy = []
-                for day in self.DAYS:
-                    for period in self.TEACHING_PERIODS[day]:
-                        weekly_literacy.append(
-                            teacher_class_assignment[literacy_teacher][class_name][day][period]
-                        )
-                model.Add(sum(weekly_literacy) == 2)
-        
-        # NOW ADD THE NO REPEAT SAME DAY CONSTRAINT
-        print("Adding no repeat same day constraint...")
-        
-        for teacher in self.ALL_TEACHERS:
-            if teacher not in self.PE_TEACHERS:  # Core and literacy teachers only
-                for day in self.DAYS:
-                    for class_name in self.CLASSES:
-                        # Collect all periods where this teacher could teach this class on this day
-                        daily_teaching = []
-                        for period in self.TEACHING_PERIODS[day]:
-                            daily_teaching.append(teacher_class_assignment[teacher][class_name][day][period])
-                        
-                        # At most once per day per class
-                        if daily_teaching:  # Only add constraint if there are teaching periods
-                            model.Add(sum(daily_teaching) <= 1)
-                        
-                        # Additional pairwise constraints for extra enforcement
-                        teaching_periods_list = list(self.TEACHING_PERIODS[day])
-                        for i in range(len(teaching_periods_list)):
-                            for j in range(i + 1, len(teaching_periods_list)):
-                                period1 = teaching_periods_list[i]
-                                period2 = teaching_periods_list[j]
-                                # Cannot teach same class in two different periods on same day
-                                model.Add(
-                                    teacher_class_assignment[teacher][class_name][day][period1] + 
-                                    teacher_class_assignment[teacher][class_name][day][period2] <= 1
-                                )
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 60.0  # Longer timeout for this complex constraint
-        status = solver.Solve(model)
-        
-        self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                     "No repeat same day constraint should be feasible")
-        
-        # Optional: Verify the constraint actually works by checking solution
-        if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-            print("✅ No repeat same day constraint is feasible")
-            
-            # Debug: Check a few teachers to make sure constraint is working
-            sample_teachers = ['ELA_T1', 'Math_T1', 'Literacy_T1']
-            for teacher in sample_teachers:
-                if teacher in self.ALL_TEACHERS:
-                    print(f"  Checking {teacher}:")
-                    for day in self.DAYS[:2]:  # Just check first 2 days
-                        for class_name in ['A', 'B']:  # Just check first 2 classes
-                            periods_teaching = []
-                            for period in self.TEACHING_PERIODS[day]:
-                                if solver.Value(teacher_class_assignment[teacher][class_name][day][period]) == 1:
-                                    periods_teaching.append(f"P{period}")
-                            if periods_teaching:
-                                print(f"    {day} - Class {class_name}: {periods_teaching}")
-                                # Verify constraint: should be at most 1 period
-                                if len(periods_teaching) > 1:
-                                    self.fail(f"CONSTRAINT VIOLATION: {teacher} teaches {class_name} multiple times on {day}: {periods_teaching}")
+        context, solver = self.solve(['class_capacity', 'no_repeat', 'core_subjects', 'literacy'])
+
+        for teacher, classes in context.teacher_class_assignment.items():
+            if context.teachers[teacher].kind == 'pe':
+                continue
+            for class_name, days in classes.items():
+                for day, periods in days.items():
+                    periods_teaching = [f"P{period}" for period, var in periods.items() if solver.Value(var)]
+                    self.assertLessEqual(len(periods_teaching), 1,
+                                         f"{teacher} teaches {class_name} multiple times on {day}: {periods_teaching}")
 
     def test_period_configuration_correct(self):
         """Test that period configuration matches expected values"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        
         # Expected configuration
         expected_periods = {
             'Monday': [1, 2, 3, 4, 5, 6, 7],
-            'Tuesday': [1, 2, 3, 4, 5, 6, 7], 
+            'Tuesday': [1, 2, 3, 4, 5, 6, 7],
             'Wednesday': [1, 2, 3, 4, 5, 6],  # ← Should be 6, not 7
             'Thursday': [1, 2, 3, 4, 5, 6, 7],
             'Friday': [1, 2, 3, 4, 5, 6, 7]
         }
-        
+
         expected_teaching_periods = {
             'Monday': [1, 2, 4, 5, 6, 7],
             'Tuesday': [1, 2, 4, 5, 6, 7],
             'Wednesday': [1, 2, 4, 5, 6],  # ← Should be 5, not 6
-            'Thursday': [1, 2, 4, 5, 6, 7], 
+            'Thursday': [1, 2, 4, 5, 6, 7],
             'Friday': [1, 2, 4, 5, 6, 7]
         }
-        
+
         # Test ALL_PERIODS
         for day, expected in expected_periods.items():
-            actual = self.ALL_PERIODS[day]
-            self.assertEqual(actual, expected, 
+            actual = self.data['ALL_PERIODS'][day]
+            self.assertEqual(actual, expected,
                             f"ALL_PERIODS mismatch for {day}: expected {expected}, got {actual}")
-        
-        # Test TEACHING_PERIODS  
+
+        # Test TEACHING_PERIODS
         for day, expected in expected_teaching_periods.items():
-            actual = self.TEACHING_PERIODS[day]
+            actual = self.data['TEACHING_PERIODS'][day]
             self.assertEqual(actual, expected,
                             f"TEACHING_PERIODS mismatch for {day}: expected {expected}, got {actual}")
-        
+
         # Test total periods per week
-        total_periods = sum(len(periods) for periods in self.ALL_PERIODS.values())
+        total_periods = sum(len(periods) for periods in self.data['ALL_PERIODS'].values())
         self.assertEqual(total_periods, 34, f"Expected 34 total periods, got {total_periods}")
-        
-        total_teaching = sum(len(periods) for periods in self.TEACHING_PERIODS.values()) 
+
+        total_teaching = sum(len(periods) for periods in self.data['TEACHING_PERIODS'].values())
         self.assertEqual(total_teaching, 29, f"Expected 29 teaching periods, got {total_teaching}")
-        
-        print("✅ Period configuration test passed")
 
     def test_full_constraint_set(self):
-        """Test ALL constraints together - matching main code exactly"""
-        model, teacher_activity, teacher_class_assignment = self.create_base_model()
-        self.add_basic_constraints(model, teacher_activity, teacher_class_assignment)
-        
-        # Add ALL the constraints from your main code here
-        # This should replicate your main solve_scheduling_model method exactly
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 120.0
-        status = solver.Solve(model)
-        
-        if status == cp_model.INFEASIBLE:
-            self.fail("FULL constraint set is INFEASIBLE - this matches your main code problem!")
-        else:
-            self.assertIn(status, [cp_model.OPTIMAL, cp_model.FEASIBLE], 
-                         "Full constraint set should be feasible")
+        """Test ALL constraints together - the production model, seeded with the greedy timetable"""
+        timetable = construct_timetable(self.data)
+        context, _ = self.solve(CONSTRAINT_FAMILIES, seconds=120.0,
+                                hints=timetable_hints(self.base.built(), self.data, timetable))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            production = self.scheduler.build_scheduling_model(self.data, formulation='classes',
+                                                               event_encoding='booleans')
+        self.assertEqual(production['families'], CONSTRAINT_FAMILIES)
+        self.assertEqual(context.families, CONSTRAINT_FAMILIES)
+        for field in ('variables', 'constraints'):
+            self.assertEqual(len(getattr(context.model.Proto(), field)), len(getattr(production['model'].Proto(), field)))
+        self.assertEqual({name: len(constraints) for name, constraints in context.rule_constraints.items()},
+                         {name: len(constraints) for name, constraints in production['rule_constraints'].items()})
+
+    def test_clones_are_independent(self):
+        """Families posted on a clone leave the shared base model alone"""
+        size = len(self.base.model.Proto().constraints)
+        context = self.base.clone()
+        add_families(context, ['pe_periods'])
+        self.assertEqual(len(self.base.model.Proto().constraints), size)
+        self.assertEqual(len(context.model.Proto().constraints), size + len(context.team_numbers))
+        self.assertEqual((self.base.families, self.base.rule_constraints), ((), {}))
+        with self.assertRaises(ValueError):
+            add_families(context, ['pe_periods'])
+
+    def test_families_toggle(self):
+        """build_scheduling_model posts only the families asked for"""
+        without_load = [family for family in CONSTRAINT_FAMILIES if family != 'pe_load']
+        with contextlib.redirect_stdout(io.StringIO()):
+            built = self.scheduler.build_scheduling_model(self.data, formulation='team_counts',
+                                                          families=without_load)
+        self.assertEqual(built['families'], tuple(without_load))
+        self.assertNotIn('pe_load_min', built['rule_constraints'])
+        self.assertIn('max_classes_per_pe_teacher', built['rule_constraints'])
+        with self.assertRaises(ValueError):
+            self.scheduler.build_scheduling_model(self.data, families=['pe_load', 'gym_rota'])
+
 
 if __name__ == '__main__':
     # Run with verbose output
-    unittest.main(verbosity=2)
\ No newline at end of file
+    unittest.main(verbosity=2)
@@ -0,0 +1,180 @@
+import unittest
+import threading
+import asyncio
+import json
+import time
+import sys
+import os
+from urllib.request import Request, urlopen
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scheduler_service import SchedulerService, make_server
+
+
+class FakeScheduler:
+    """Stand-in for GoogleSheetsScheduler whose solve blocks until released or cancelled"""
+
+    def __init__(self, name, log, release):
+        self.name = name
+        self.log = log
+        self.release = release
+        self.solver_profile = None
+        self.status_listeners = []
+        self.last_quota_summary = None
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        self.log.append(('close', self.name))
+
+    async def run_solver_async(self, use_cache=True, cancelled=None):
+        # Like GoogleSheetsScheduler, a run starts by clearing its own flag
+        self.cancelled.clear()
+        self.log.append(('start', self.name))
+        for listener in self.status_listeners:
+            listener("Solving...")
+
+        def stopped():
+            return self.cancelled.is_set() or bool(cancelled and cancelled())
+
+        while not self.release.is_set() and not stopped():
+            await asyncio.sleep(0.01)
+        finished = not stopped()
+        self.log.append(('end', self.name))
+        return finished
+
+
+class TestSchedulerService(unittest.TestCase):
+    """Tests for the job queue, priorities, concurrency and cancellation"""
+
+    def setUp(self):
+        self.log = []
+        self.release = threading.Event()
+        self.schedulers = {}
+
+    def tearDown(self):
+        self.release.set()
+        self.service.shutdown(timeout=5)
+
+    def make_service(self, max_concurrent=1, connected=None):
+        def factory(name):
+            if connected is not None:
+                connected.wait(5)
+            self.schedulers[name] = FakeScheduler(name, self.log, self.release)
+            return self.schedulers[name]
+        self.service = SchedulerService(None, max_concurrent=max_concurrent, scheduler_factory=factory)
+        return self.service
+
+    def wait_for(self, predicate, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if predicate():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_jobs_run_in_priority_order(self):
+        service = self.make_service()
+        blocker = service.submit('A')
+        self.assertTrue(self.wait_for(lambda: blocker.state == 'running'))
+
+        low = service.submit('B', priority=5)
+        high = service.submit('C', priority=1)
+        self.release.set()
+
+        self.assertTrue(self.wait_for(lambda: low.state == 'succeeded' and high.state == 'succeeded'))
+        starts = [name for event, name in self.log if event == 'start']
+        self.assertEqual(starts, ['A', 'C', 'B'])
+
+    def test_concurrency_limit_and_warm_schedulers(self):
+        service = self.make_service(max_concurrent=2)
+        jobs = [service.submit(name) for name in ['A', 'B', 'C']]
+
+        self.assertTrue(self.wait_for(lambda: sum(j.state == 'running' for j in jobs) == 2))
+        time.sleep(0.05)
+        self.assertEqual(sum(j.state == 'running' for j in jobs), 2)
+        self.assertEqual(jobs[2].state, 'queued')
+
+        self.release.set()
+        self.assertTrue(self.wait_for(lambda: all(j.state == 'succeeded' for j in jobs)))
+
+        # A second job on the same spreadsheet reuses the warm scheduler
+        first = self.schedulers['A']
+        again = service.submit('A')
+        self.assertTrue(self.wait_for(lambda: again.state == 'succeeded'))
+        self.assertIs(self.schedulers['A'], first)
+        self.assertEqual(again.progress, 'Solving...')
+
+        service.shutdown(timeout=5)
+        self.assertEqual(sorted(name for event, name in self.log if event == 'close'), ['A', 'B', 'C'])
+
+    def test_cancel_queued_and_running_jobs(self):
+        service = self.make_service()
+        running = service.submit('A')
+        queued = service.submit('B')
+        self.assertTrue(self.wait_for(lambda: running.state == 'running'))
+
+        service.cancel(queued.job_id)
+        self.assertEqual(queued.state, 'cancelled')
+
+        service.cancel(running.job_id)
+        self.assertTrue(self.wait_for(lambda: running.state == 'cancelled'))
+        self.assertNotIn(('start', 'B'), self.log)
+
+    def test_cancel_before_run_starts(self):
+        # The cancel lands while the scheduler is still connecting, before the run resets its flag
+        connected = threading.Event()
+        service = self.make_service(connected=connected)
+        job = service.submit('A')
+        self.assertTrue(self.wait_for(lambda: job.state == 'running'))
+        service.cancel(job.job_id)
+        connected.set()
+
+        self.assertTrue(self.wait_for(lambda: job.state == 'cancelled'))
+        self.assertFalse(job.result['success'])
+
+    def test_late_cancel_leaves_finished_run_succeeded(self):
+        service = self.make_service()
+        job = service.submit('A')
+        self.assertTrue(self.wait_for(lambda: job.state == 'running'))
+        self.release.set()
+        self.assertTrue(self.wait_for(lambda: ('end', 'A') in self.log))
+        service.cancel(job.job_id)
+
+        self.assertTrue(self.wait_for(lambda: job.state in ('succeeded', 'cancelled', 'failed')))
+        self.assertEqual(job.state, 'succeeded')
+
+    def test_http_round_trip(self):
+        service = self.make_service()
+        server = make_server(service, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+
+        def call(method, path, body=None):
+            data = json.dumps(body).encode('utf-8') if body is not None else None
+            request = Request(base + path, data=data, method=method, headers={'Content-Type': 'application/json'})
+            with urlopen(request, timeout=5) as response:
+                return response.status, json.loads(response.read())
+
+        try:
+            status, job = call('POST', '/jobs', {'spreadsheet': 'A', 'priority': 2})
+            self.assertEqual(status, 202)
+            self.assertEqual(job['spreadsheet'], 'A')
+
+            self.release.set()
+            self.assertTrue(self.wait_for(lambda: call('GET', f"/jobs/{job['job_id']}")[1]['state'] == 'succeeded'))
+
+            status, health = call('GET', '/health')
+            self.assertEqual(health['jobs']['succeeded'], 1)
+            self.assertEqual(len(call('GET', '/jobs')[1]), 1)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
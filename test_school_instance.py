@@ -0,0 +1,82 @@
+import unittest
+import contextlib
+import copy
+import dataclasses
+import io
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from school_instance import SchoolInstance, school_instance
+from international_highschool_scheduler import GoogleSheetsScheduler, template_records
+from synthetic_schools import synthetic_records
+
+
+def convert(records):
+    scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scheduler.convert_sheets_data_to_model_format(*records)
+
+
+class TestSchoolInstance(unittest.TestCase):
+    """Indexed, read-only view of the converted data"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = convert(template_records())
+        cls.instance = school_instance(cls.data)
+
+    def test_teacher_index(self):
+        math = self.instance.teachers['Math_T1']
+        self.assertEqual((math.kind, math.subject, math.teams), ('core', 'Math', (1,)))
+        literacy = self.instance.teachers['Literacy_T2']
+        self.assertEqual((literacy.kind, literacy.subject, literacy.teams), ('literacy', 'Literacy', (3, 4)))
+        pe = self.instance.teachers['PE_T1']
+        self.assertEqual((pe.kind, pe.subject, pe.teams), ('pe', 'PE', ()))
+        self.assertEqual([teacher.index for teacher in self.instance.teachers.values()],
+                         list(range(len(self.data['ALL_TEACHERS']))))
+        self.assertEqual(self.instance.teacher_names('pe'), self.data['PE_TEACHERS'])
+
+    def test_team_and_class_index(self):
+        team = self.instance.teams[2]
+        self.assertEqual(team.classes, tuple(self.data['TEAMS'][2]))
+        self.assertEqual(team.literacy_teacher, 'Literacy_T1')
+        self.assertNotIn('Literacy_T1', team.core_teachers)
+        self.assertEqual(len(team.core_teachers), len(self.data['CORE_SUBJECTS']))
+        for class_name in self.data['CLASSES']:
+            self.assertEqual(self.instance.class_team[class_name], self.data['TEAM_MAPPING'][class_name])
+            self.assertEqual(self.instance.classes[self.instance.class_index[class_name]], class_name)
+        self.assertEqual(self.instance.literacy_classes['Literacy_T2'],
+                         tuple(self.data['TEAMS'][3] + self.data['TEAMS'][4]))
+
+    def test_slots(self):
+        monday = self.instance.day_slots['Monday']
+        self.assertEqual([self.instance.slots[s] for s in monday],
+                         [('Monday', period) for period in self.data['TEACHING_PERIODS']['Monday']])
+        self.assertEqual(self.instance.slot_index[('Monday', self.data['TEACHING_PERIODS']['Monday'][0])], 0)
+        self.assertEqual(len(self.instance.slots), sum(len(p) for p in self.data['TEACHING_PERIODS'].values()))
+        lunch = self.instance.lunch_periods['Monday']
+        self.assertEqual(len(lunch), 1)
+        self.assertNotIn(lunch[0], self.instance.teaching_periods['Monday'])
+        self.assertEqual(self.instance.activity_codes['Lunch'], self.data['ACTIVITIES'].index('Lunch'))
+
+    def test_immutable(self):
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            self.instance.days = ()
+        with self.assertRaises(TypeError):
+            self.instance.teams[1] = None
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            self.instance.teachers['Math_T1'].subject = 'Art'
+        self.assertFalse(hasattr(self.instance, '__dict__'))
+        self.assertFalse(hasattr(self.instance.teachers['Math_T1'], '__dict__'))
+
+    def test_shared_per_data(self):
+        self.assertIs(school_instance(copy.deepcopy(self.data)), self.instance)
+        other = convert(synthetic_records(2))
+        self.assertIsNot(school_instance(other), self.instance)
+        self.assertEqual(school_instance(other), SchoolInstance.from_model_data(other))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,105 @@
+import unittest
+import json
+import io
+import contextlib
+import sys
+import os
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sheets_client import TokenBucket, SheetsRateLimiter, make_throttled_http_client
+from gspread.exceptions import APIError
+
+
+def make_response(status, payload=None, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(payload or {'error': {'code': status, 'message': 'x', 'status': 'x'}}).encode()
+    response.headers.update(headers or {})
+    return response
+
+
+class ScriptedSession:
+    """requests.Session stand-in returning a scripted list of responses"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        return self.responses.pop(0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Tests for token-bucket throttling"""
+
+    def test_throttles_to_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, capacity=2, clock=clock, sleep=clock.sleep)
+
+        waits = [bucket.acquire() for _ in range(5)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        # 60/min = 1 token per second after the burst
+        self.assertAlmostEqual(clock.now, 3.0)
+        self.assertAlmostEqual(sum(waits), 3.0)
+
+
+class TestThrottledHTTPClient(unittest.TestCase):
+    """Tests for backoff and quota accounting in the gspread HTTP client"""
+
+    def make_client(self, responses, max_attempts=4):
+        limiter = SheetsRateLimiter(read_per_minute=6000, write_per_minute=6000,
+                                    max_attempts=max_attempts, base_delay=0, max_delay=0)
+        client_class = make_throttled_http_client(limiter)
+        session = ScriptedSession(responses)
+        return client_class(auth=None, session=session), session, limiter
+
+    def test_retries_429_and_5xx(self):
+        client, session, limiter = self.make_client([make_response(429), make_response(503), make_response(200)])
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = client.request('post', 'https://sheets.googleapis.com/v4/x:batchUpdate')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(session.calls), 3)
+        summary = client.stats.summary()
+        self.assertEqual(summary['retries'], 2)
+        self.assertEqual(summary['requests'], {'read': 0, 'write': 3})
+        self.assertEqual(sum(summary['latency_histogram']['write'].values()), 3)
+        self.assertEqual(limiter.stats.summary()['quota_used'], 3)
+
+    def test_non_retryable_errors_raise_immediately(self):
+        client, session, _ = self.make_client([make_response(400), make_response(200)])
+        with self.assertRaises(APIError):
+            client.request('get', 'https://sheets.googleapis.com/v4/x')
+        self.assertEqual(len(session.calls), 1)
+        self.assertEqual(client.stats.summary()['failures'], 1)
+
+    def test_gives_up_after_max_attempts(self):
+        client, session, _ = self.make_client([make_response(429)] * 5, max_attempts=3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(APIError):
+                client.request('get', 'https://sheets.googleapis.com/v4/x')
+        self.assertEqual(len(session.calls), 3)
+
+    def test_retry_after_header_is_honoured(self):
+        limiter = SheetsRateLimiter(max_delay=30)
+        self.assertEqual(limiter.backoff_delay(1, '7'), 7.0)
+        self.assertEqual(limiter.backoff_delay(1, '120'), 30)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
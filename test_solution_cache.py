@@ -0,0 +1,219 @@
+import unittest
+import asyncio
+import tempfile
+import shutil
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from solution_cache import SolutionCache, compute_input_fingerprint
+from background_io import BackgroundSheetsWriter
+from international_highschool_scheduler import GoogleSheetsScheduler, SchoolSchedulerGoogleSheets
+
+
+class FakeSpreadsheet:
+    id = 'fake-spreadsheet-id'
+
+
+class FakeSheets:
+    """In-memory stand-in for SchoolSchedulerGoogleSheets"""
+
+    def __init__(self):
+        self.spreadsheet_name = 'Fake School'
+        self.spreadsheet = FakeSpreadsheet()
+        self.modified_time = '2026-01-01T00:00:00.000Z'
+        self.reads = 0
+        self.statuses = []
+        self.published = []
+        self.config = {
+            'Periods per Day': 'Monday:7,Tuesday:7,Wednesday:6,Thursday:7,Friday:7',
+            'Lunch Period': 3,
+            'Core Subjects': 'ELA,SS'
+        }
+        self.teachers = [
+            {'Teacher Name': 'ELA_T1', 'Subject': 'ELA', 'Team': 1, 'Type': 'Core', 'Active': 'TRUE'},
+            {'Teacher Name': 'SS_T1', 'Subject': 'SS', 'Team': 1, 'Type': 'Core', 'Active': 'TRUE'},
+            {'Teacher Name': 'PE_T1', 'Subject': 'PE', 'Team': 'All', 'Type': 'PE', 'Active': 'TRUE'}
+        ]
+        self.classes = [{'Class Name': 'A', 'Team': 1}, {'Class Name': 'B', 'Team': 1}]
+
+    def read_configuration(self):
+        self.reads += 1
+        return dict(self.config)
+
+    def read_teachers(self):
+        return list(self.teachers)
+
+    def read_classes(self):
+        return list(self.classes)
+
+    def update_status(self, status, last_run=None, solve_time=None, quality=None):
+        self.statuses.append(status)
+        self.modified_time = f'2026-01-01T00:00:{len(self.statuses):02d}.000Z'
+
+    def get_modified_time(self):
+        return self.modified_time
+
+    def write_teacher_schedules_grid(self, schedules_data, raise_on_error=False):
+        self.published.append(schedules_data)
+
+
+class FailingGridSheets(FakeSheets):
+    """
+    FakeSheets with the background writer's status API and an output write
+    that always fails, logged and swallowed unless raise_on_error is set
+    (like SchoolSchedulerGoogleSheets)
+    """
+
+    status_cells = staticmethod(SchoolSchedulerGoogleSheets.status_cells)
+
+    def write_status_cells(self, cells, raise_on_error=False):
+        self.update_status(cells['B8'])
+
+    def write_teacher_schedules_grid(self, schedules_data, raise_on_error=False):
+        print("❌ Error writing teacher schedules grid: 503 backend error")
+        if raise_on_error:
+            raise RuntimeError("503 backend error")
+
+
+class CountingScheduler(GoogleSheetsScheduler):
+    """Scheduler whose solve step is replaced by a canned solution"""
+
+    solves = 0
+
+    def solve_scheduling_model(self, data, teachers_data, solver_profile=None, hints=None, progress_callback=None,
+                               grid=None):
+        self.solves += 1
+        return {'solve_time': 1.5, 'quality': 'Optimal'}
+
+    def convert_solution_to_sheets_format(self, solution, data):
+        teacher_schedules = {'ELA_T1': {'Monday': {1: {'activity': 'Prep', 'classes': []}}}}
+        class_schedules = {'A': {'Monday': {1: {'subject': 'ELA', 'teacher': 'ELA_T1'}}}}
+        return teacher_schedules, class_schedules
+
+
+class TestSolutionCache(unittest.TestCase):
+    """Tests for input fingerprinting and cached republishing"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.sheets = FakeSheets()
+        self.scheduler = CountingScheduler(None, None, cache_dir=self.cache_dir, sheets=self.sheets,
+                                           background_io=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_fingerprint_sensitive_to_inputs_profile_and_version(self):
+        data = {'DAYS': ['Monday'], 'TEAMS': {1: ['A', 'B']}}
+        base = compute_input_fingerprint(data, {'max_time_in_seconds': 300.0}, '1')
+
+        self.assertEqual(base, compute_input_fingerprint(dict(data), {'max_time_in_seconds': 300.0}, '1'))
+        self.assertNotEqual(base, compute_input_fingerprint({'DAYS': ['Monday'], 'TEAMS': {1: ['A']}},
+                                                            {'max_time_in_seconds': 300.0}, '1'))
+        self.assertNotEqual(base, compute_input_fingerprint(data, {'max_time_in_seconds': 60.0}, '1'))
+        self.assertNotEqual(base, compute_input_fingerprint(data, {'max_time_in_seconds': 300.0}, '2'))
+
+    def test_cache_round_trip_restores_integer_periods(self):
+        cache = SolutionCache(self.cache_dir)
+        cache.put('abc', {'T': {'Monday': {4: {'activity': 'Prep'}}}}, {}, 2.0, 'Feasible')
+
+        entry = cache.get('abc')
+        self.assertIn(4, entry['teacher_schedules']['T']['Monday'])
+        self.assertEqual(entry['quality'], 'Feasible')
+        self.assertIsNone(cache.get('missing'))
+
+    def test_unchanged_inputs_skip_solve(self):
+        self.assertTrue(self.scheduler.run_solver())
+        self.assertEqual(self.scheduler.solves, 1)
+
+        # Spreadsheet touched (modified time changes) but values identical
+        self.sheets.modified_time = 'edited'
+        self.assertTrue(self.scheduler.run_solver())
+        self.assertEqual(self.scheduler.solves, 1)
+        self.assertEqual(len(self.sheets.published), 2)
+        self.assertEqual(self.sheets.statuses[-1], "Complete ✅ (cached)")
+
+    def test_drive_precheck_skips_reading_values(self):
+        self.scheduler.run_solver()
+        reads_after_first_run = self.sheets.reads
+
+        self.assertTrue(self.scheduler.run_solver())
+        self.assertEqual(self.sheets.reads, reads_after_first_run)
+        self.assertEqual(self.scheduler.solves, 1)
+
+    def test_precheck_ignores_marker_from_other_profile_or_version(self):
+        self.scheduler.run_solver()
+        self.assertIsNotNone(self.scheduler.find_unchanged_source_solution())
+
+        self.scheduler.solver_profile = {'max_time_in_seconds': 60.0}
+        self.assertIsNone(self.scheduler.find_unchanged_source_solution())
+        self.assertTrue(self.scheduler.run_solver())
+        self.assertEqual(self.scheduler.solves, 2)
+        self.assertIsNotNone(self.scheduler.find_unchanged_source_solution())
+
+        marker = self.scheduler.solution_cache.get_source_marker('fake-spreadsheet-id')
+        self.scheduler.solution_cache.set_source_marker('fake-spreadsheet-id', marker['modified_time'],
+                                                        marker['fingerprint'], marker['solver_profile'], '0.0.0+old')
+        self.assertIsNone(self.scheduler.find_unchanged_source_solution())
+
+    def test_failed_output_write_fails_run_without_marker(self):
+        sheets = FailingGridSheets()
+        scheduler = CountingScheduler(None, None, cache_dir=self.cache_dir, sheets=sheets)
+        scheduler.output.close()
+        scheduler.output = BackgroundSheetsWriter(sheets, max_attempts=1)
+        try:
+            self.assertFalse(scheduler.run_solver())
+        finally:
+            scheduler.close()
+
+        self.assertTrue(sheets.statuses[-1].startswith("Error: 1 write(s) failed: teacher schedules grid"))
+        self.assertIsNone(scheduler.solution_cache.get_source_marker('fake-spreadsheet-id'))
+        self.assertIsNone(scheduler.find_unchanged_source_solution())
+
+    def test_failed_output_write_fails_async_run_without_marker(self):
+        sheets = FailingGridSheets()
+        scheduler = CountingScheduler(None, None, cache_dir=self.cache_dir, sheets=sheets)
+        scheduler.output.close()
+        scheduler.output = BackgroundSheetsWriter(sheets, max_attempts=1)
+        try:
+            self.assertFalse(asyncio.run(scheduler.run_solver_async()))
+        finally:
+            scheduler.close()
+
+        self.assertTrue(sheets.statuses[-1].startswith("Error: 1 write(s) failed: teacher schedules grid"))
+        self.assertIsNone(scheduler.solution_cache.get_source_marker('fake-spreadsheet-id'))
+
+    def test_failed_output_write_fails_run_without_background_writer(self):
+        sheets = FailingGridSheets()
+        scheduler = CountingScheduler(None, None, cache_dir=self.cache_dir, sheets=sheets, background_io=False)
+
+        self.assertFalse(scheduler.run_solver())
+        self.assertTrue(sheets.statuses[-1].startswith("Error: 1 write(s) failed: write_teacher_schedules_grid"))
+        self.assertIsNone(scheduler.solution_cache.get_source_marker('fake-spreadsheet-id'))
+
+    def test_run_stops_when_caller_cancelled(self):
+        # The caller's flag is read, not reset, so a cancel made before the run still stops it
+        self.scheduler.cancel()
+        self.assertFalse(self.scheduler.run_solver(cancelled=lambda: True))
+        self.assertEqual(self.scheduler.solves, 0)
+        self.assertEqual(self.sheets.statuses[-1], "Cancelled ⏹")
+        self.assertTrue(self.scheduler.run_solver(cancelled=lambda: False))
+
+    def test_changed_inputs_trigger_solve(self):
+        self.scheduler.run_solver()
+        self.sheets.config['Lunch Period'] = 4
+        self.sheets.modified_time = 'edited'
+
+        self.scheduler.run_solver()
+        self.assertEqual(self.scheduler.solves, 2)
+
+    def test_cache_can_be_bypassed(self):
+        self.scheduler.run_solver()
+        self.scheduler.run_solver(use_cache=False)
+        self.assertEqual(self.scheduler.solves, 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
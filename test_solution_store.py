@@ -0,0 +1,170 @@
+import unittest
+from unittest import mock
+import sqlite3
+import tempfile
+import shutil
+import sys
+import os
+
+from ortools.sat.python import cp_model
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from solution_store import (
+    SolutionStore, extract_compact_solution, compact_solution_to_hints,
+    structure_features, structure_similarity
+)
+from international_highschool_scheduler import GoogleSheetsScheduler
+
+ACTIVITIES = ['Extra Prep', 'Prep', 'Team_Meeting', 'Discipline_Meeting', 'Advisory', 'Elective', 'Lunch']
+
+
+def make_data(classes=('A', 'B'), wednesday_periods=6):
+    """Small model-format instance: one team, two core teachers and a PE teacher"""
+    all_periods = {'Monday': [1, 2, 3, 4], 'Wednesday': list(range(1, wednesday_periods + 1))}
+    return {
+        'DAYS': list(all_periods.keys()),
+        'ALL_PERIODS': all_periods,
+        'TEACHING_PERIODS': {day: [p for p in periods if p != 3] for day, periods in all_periods.items()},
+        'CLASSES': list(classes),
+        'TEAM_MAPPING': {c: 1 for c in classes},
+        'TEAMS': {1: list(classes)},
+        'CORE_SUBJECTS': ['ELA', 'Math'],
+        'TEACHERS': {'team_1': {'ELA': 'ELA_T1', 'Math': 'Math_T1'}},
+        'PE_TEACHERS': ['PE_T1'],
+        'ALL_TEACHERS': ['ELA_T1', 'Math_T1', 'PE_T1'],
+        'ACTIVITIES': list(ACTIVITIES)
+    }
+
+
+class FakeSolver:
+    """Solver stand-in whose 'variables' are already plain values"""
+
+    def Value(self, var):
+        return var
+
+
+def make_solution(data):
+    """Solution where ELA_T1 teaches A in every teaching period and everyone else preps"""
+    teacher_activity = {}
+    teacher_class_assignment = {}
+    for teacher in data['ALL_TEACHERS']:
+        teacher_activity[teacher] = {
+            day: {p: (6 if p == 3 else 0) for p in data['ALL_PERIODS'][day]} for day in data['DAYS']
+        }
+        teacher_class_assignment[teacher] = {
+            c: {
+                day: {p: int(teacher == 'ELA_T1' and c == 'A') for p in data['TEACHING_PERIODS'][day]}
+                for day in data['DAYS']
+            }
+            for c in data['CLASSES']
+        }
+    return {
+        'solver': FakeSolver(),
+        'teacher_activity': teacher_activity,
+        'teacher_class_assignment': teacher_class_assignment
+    }
+
+
+class TestSolutionStore(unittest.TestCase):
+    """Tests for the solution history store and hint retrieval"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = SolutionStore(os.path.join(self.tmp_dir, 'solutions.sqlite'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_compact_solution_round_trip(self):
+        data = make_data()
+        compact = extract_compact_solution(make_solution(data), data)
+        self.assertEqual(compact['activity'].shape, (3, 10))
+        self.assertEqual(len(compact['assignments']), 8)
+
+        self.store.add('fp1', data, compact, 12.0, 'Feasible')
+        score, record = self.store.find_most_similar(data)
+        self.assertAlmostEqual(score, 1.0)
+        self.assertEqual(record['fingerprint'], 'fp1')
+        self.assertEqual(record['solution']['assignments'].tolist(), compact['assignments'].tolist())
+
+    def test_connections_are_closed(self):
+        data = make_data()
+        opened = []
+        real_connect = sqlite3.connect
+
+        def connect(*args, **kwargs):
+            opened.append(real_connect(*args, **kwargs))
+            return opened[-1]
+
+        with mock.patch('solution_store.sqlite3.connect', side_effect=connect):
+            self.store.add('fp1', data, extract_compact_solution(make_solution(data), data))
+            self.assertEqual(self.store.count(), 1)
+            self.assertIsNotNone(self.store.find_most_similar(data))
+            with self.assertRaises(sqlite3.IntegrityError):
+                with self.store._connect() as conn:
+                    conn.execute("INSERT INTO instances (id, fingerprint) VALUES (1, 'duplicate')")
+
+        self.assertEqual(len(opened), 4)
+        for conn in opened:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        # The failed insert was rolled back
+        self.assertEqual(self.store.count(), 1)
+
+    def test_most_similar_instance_is_returned(self):
+        base = make_data()
+        self.store.add('far', make_data(classes=('X', 'Y', 'Z'), wednesday_periods=4),
+                       extract_compact_solution(make_solution(make_data(classes=('X', 'Y', 'Z'))),
+                                                make_data(classes=('X', 'Y', 'Z'))))
+        self.store.add('near', base, extract_compact_solution(make_solution(base), base))
+
+        query = make_data(wednesday_periods=5)
+        self.assertGreater(structure_similarity(structure_features(query), structure_features(base)), 0.8)
+        _, record = self.store.find_most_similar(query)
+        self.assertEqual(record['fingerprint'], 'near')
+
+    def test_no_match_below_threshold(self):
+        data = make_data()
+        self.store.add('fp1', data, extract_compact_solution(make_solution(data), data))
+        other = make_data(classes=('Q', 'R'))
+        other['ALL_TEACHERS'] = ['Other_T1']
+        other['TEACHERS'] = {'team_1': {'ELA': 'Other_T1'}}
+        other['PE_TEACHERS'] = []
+        self.assertIsNone(self.store.find_hints(other, min_similarity=0.9))
+
+    def test_hints_are_mapped_onto_new_instance(self):
+        data = make_data()
+        compact = extract_compact_solution(make_solution(data), data)
+
+        # New instance drops Wednesday P6 and class B
+        query = make_data(classes=('A',), wednesday_periods=5)
+        hints = compact_solution_to_hints(compact, query)
+        self.assertIn(('ELA_T1', 'A', 'Monday', 4), hints['teacher_class_assignment'])
+        self.assertNotIn(('ELA_T1', 'A', 'Wednesday', 6), hints['teacher_class_assignment'])
+        self.assertEqual(hints['teacher_activity'][('PE_T1', 'Monday', 3)], ACTIVITIES.index('Lunch'))
+
+    def test_hints_are_added_to_model(self):
+        data = make_data()
+        hints = compact_solution_to_hints(extract_compact_solution(make_solution(data), data), data)
+
+        model = cp_model.CpModel()
+        solution = make_solution(data)
+        teacher_activity = {
+            t: {d: {p: model.NewIntVar(0, 6, f'{t}_{d}_{p}') for p in ps} for d, ps in days.items()}
+            for t, days in solution['teacher_activity'].items()
+        }
+        teacher_class_assignment = {
+            t: {c: {d: {p: model.NewBoolVar(f'{t}_{c}_{d}_{p}') for p in ps} for d, ps in days.items()}
+                for c, days in classes.items()}
+            for t, classes in solution['teacher_class_assignment'].items()
+        }
+
+        scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        count = scheduler.apply_solution_hints(model, hints, teacher_activity, teacher_class_assignment)
+        self.assertEqual(count, 30 + 3 * 2 * 8)
+        self.assertEqual(len(model.Proto().solution_hint.vars), count)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
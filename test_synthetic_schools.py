@@ -0,0 +1,237 @@
+import unittest
+import contextlib
+import io
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from international_highschool_scheduler import (
+    GoogleSheetsScheduler, template_records, consecutive_runs, literacy_team_map, team_numbers_from_config,
+    legal_day_patterns, pattern_flags, static_domains, is_constant, variable_names, SLOT_PREP, SLOT_INTENSIVE
+)
+from synthetic_schools import synthetic_records, scaling_report, format_scaling_report
+
+
+def build(config, teachers_data, classes_data):
+    scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = scheduler.convert_sheets_data_to_model_format(config, teachers_data, classes_data)
+        return data, scheduler.build_scheduling_model(data)
+
+
+def flat_domain(var_proto):
+    bounds = list(var_proto.domain)
+    return [value for low, high in zip(bounds[::2], bounds[1::2]) for value in range(low, high + 1)]
+
+
+class TestDataDrivenStructure(unittest.TestCase):
+    """The model follows the parsed teams, staff and period structure"""
+
+    def test_helpers(self):
+        self.assertEqual(consecutive_runs([1, 2, 4, 5, 6, 7]), [[1, 2], [4, 5, 6, 7]])
+        self.assertEqual(consecutive_runs([]), [])
+        self.assertEqual(team_numbers_from_config({'Total Teams': 3}), [1, 2, 3])
+        self.assertIsNone(team_numbers_from_config({}))
+        teachers = {'team_2': {'Literacy': 'L1'}, 'team_10': {'Literacy': 'L2'}, 'team_1': {'Literacy': 'L1'}}
+        self.assertEqual(literacy_team_map(teachers), {'L1': [1, 2], 'L2': [10]})
+
+    def test_legal_day_patterns(self):
+        patterns = legal_day_patterns((1, 2, 4, 5, 6, 7))
+        # 6 prep slots x 2^5 other/intensive fillings, minus the 4 with P4-P7 all intensive
+        self.assertEqual(len(patterns), 6 * 32 - 4)
+        self.assertTrue(all(pattern.count(SLOT_PREP) == 1 for pattern in patterns))
+        self.assertFalse(any(all(kind == SLOT_INTENSIVE for kind in pattern[2:]) for pattern in patterns))
+        # Prep flags for all six periods, intensive flags for P4-P7 only
+        self.assertEqual(len(pattern_flags((1, 2, 4, 5, 6, 7))[0]), 10)
+        # Enumerated once per day shape
+        hits = legal_day_patterns.cache_info().hits
+        legal_day_patterns((1, 2, 4, 5, 6, 7))
+        self.assertEqual(legal_day_patterns.cache_info().hits, hits + 1)
+
+    def test_advisory_slots_pair_days_and_periods(self):
+        from ortools.sat.python import cp_model
+
+        scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        periods = [1, 2, 4, 5, 6, 7]
+        days = ['Monday', 'Tuesday', 'Wednesday']
+
+        def status(*slots):
+            grid = scheduler.build_time_grid(days, {day: periods for day in days}, [1])
+            advisory = grid['team_advisory_schedule'][1]
+            for day in days:
+                for period in periods:
+                    grid['model'].Add(advisory[day][period] == int((day, period) in slots))
+            return cp_model.CpSolver().Solve(grid['model'])
+
+        self.assertEqual(status(('Monday', 1), ('Tuesday', 2)), cp_model.OPTIMAL)
+        self.assertEqual(status(('Monday', 1), ('Tuesday', 1)), cp_model.INFEASIBLE)
+        self.assertEqual(status(('Monday', 1), ('Monday', 2)), cp_model.INFEASIBLE)
+
+    def test_synthetic_template_size_matches_template(self):
+        _, template = build(*template_records())
+        _, synthetic = build(*synthetic_records(4))
+        self.assertEqual(len(synthetic['model'].Proto().variables), len(template['model'].Proto().variables))
+        self.assertEqual(len(synthetic['model'].Proto().constraints), len(template['model'].Proto().constraints))
+
+    def test_six_teams_with_late_lunch(self):
+        config, teachers_data, classes_data = synthetic_records(6, classes_per_team=2)
+        config['Lunch Period'] = 5
+        config['Periods per Day'] = 'Monday:8,Tuesday:7,Wednesday:6,Thursday:7,Friday:7'
+        data, built = build(config, teachers_data, classes_data)
+        proto = built['model'].Proto()
+        self.assertEqual(built['model'].Validate(), '')
+        self.assertEqual(sorted(built['team_pe_schedule']), [1, 2, 3, 4, 5, 6])
+
+        # Lunch is pinned to period 5 only (by the variable domains)
+        lunch = data['ACTIVITIES'].index('Lunch')
+        activity = built['teacher_activity']['Math_T6']['Monday']
+        self.assertEqual(list(proto.variables[activity[5].Index()].domain), [lunch, lunch])
+        self.assertNotIn(lunch, flat_domain(proto.variables[activity[3].Index()]))
+
+        # The third literacy teacher's advisory follows teams 5 and 6; the four
+        # periods before lunch get the intensive rule, the three after it do not
+        names = {var.name for var in proto.variables}
+        self.assertTrue('Literacy_T3_Monday_P1_is_advisory' in names)
+        self.assertFalse('Math_T6_Monday_P1_is_advisory' in names)
+        self.assertTrue('Math_T6_Monday_P1_is_intensive' in names)
+        self.assertFalse('Math_T6_Monday_P6_is_intensive' in names)
+        monday = pattern_flags((1, 2, 3, 4, 6, 7, 8))
+        self.assertNotIn((0, 0, 0, 0, 1, 0, 0, 1, 1, 1, 1), monday)
+        self.assertIn((0, 0, 0, 1, 0, 0, 0, 1, 1, 1, 0), monday)
+        # The classes model keeps linear prep counts and run windows, team_counts uses the pattern table
+        self.assertNotIn('table', {ct.WhichOneof('constraint') for ct in proto.constraints})
+        scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        with contextlib.redirect_stdout(io.StringIO()):
+            aggregated = scheduler.build_scheduling_model(data, formulation='team_counts')['model'].Proto()
+        tables = [len(ct.table.values) for ct in aggregated.constraints if ct.WhichOneof('constraint') == 'table']
+        self.assertIn(len(monday) * 11, tables)
+
+    def test_static_domains(self):
+        data, built = build(*template_records())
+        domains = static_domains(data)
+        codes = {activity: data['ACTIVITIES'].index(activity) for activity in data['ACTIVITIES']}
+        self.assertEqual(domains['activities']['PE_T1'], [codes['Extra Prep'], codes['Prep']])
+        self.assertNotIn(codes['Team_Meeting'], domains['activities']['Literacy_T1'])
+        self.assertIn(codes['Advisory'], domains['activities']['Literacy_T1'])
+        self.assertNotIn(codes['Lunch'], domains['activities']['Math_T1'])
+        self.assertEqual(domains['teacher_teams']['Literacy_T2'], [3, 4])
+        self.assertEqual(domains['advisory_teams']['Math_T2'], [2])
+        self.assertNotIn('PE_T1', domains['advisory_teams'])
+        self.assertEqual(domains['eligible_classes']['PE_T2'], data['CLASSES'])
+        self.assertEqual(domains['eligible_classes']['Math_T1'], data['TEAMS'][1])
+
+        # The model creates the variables with those domains: lunch and the
+        # pairs outside a teacher's teams are constants, not constrained variables
+        proto = built['model'].Proto()
+        activity = built['teacher_activity']['PE_T1']['Monday']
+        self.assertTrue(is_constant(activity[3]))
+        self.assertEqual(flat_domain(proto.variables[activity[1].Index()]), domains['activities']['PE_T1'])
+        assignment = built['teacher_class_assignment']['Math_T1']
+        outside = next(name for name in data['CLASSES'] if name not in data['TEAMS'][1])
+        self.assertTrue(is_constant(assignment[outside]['Monday'][1]))
+        self.assertFalse(is_constant(assignment[data['TEAMS'][1][0]]['Monday'][1]))
+
+    def test_constraint_families_posted_once(self):
+        scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = scheduler.convert_sheets_data_to_model_format(*template_records())
+            for formulation in ('classes', 'team_counts'):
+                for event_encoding in ('booleans', 'intervals'):
+                    built = scheduler.build_scheduling_model(data, formulation=formulation,
+                                                             event_encoding=event_encoding)
+                    constraints = [ct.SerializeToString() for ct in built['model'].Proto().constraints]
+                    self.assertEqual(len(set(constraints)), len(constraints), (formulation, event_encoding))
+
+        # The nested dicts are views onto the same variables
+        self.assertIs(built['team_teaching']['Math_T1'][1]['Monday'][1],
+                      built['teacher_teaching']['Math_T1']['Monday'][1])
+
+    def test_anonymous_variables(self):
+        scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = scheduler.convert_sheets_data_to_model_format(*template_records())
+            named = scheduler.build_scheduling_model(data, formulation='team_counts')
+            anonymous = scheduler.build_scheduling_model(data, formulation='team_counts', anonymous=True)
+        named_proto, proto = named['model'].Proto(), anonymous['model'].Proto()
+        self.assertEqual(anonymous['model'].Validate(), '')
+        self.assertEqual(len(proto.variables), len(named_proto.variables))
+        self.assertEqual(len(proto.constraints), len(named_proto.constraints))
+        self.assertFalse(any(var.name for var in proto.variables))
+        self.assertLess(proto.ByteSize(), named_proto.ByteSize())
+
+        # Names come back from the side-table, for the same indices in both models
+        names = variable_names(anonymous)
+        math = anonymous['teacher_activity']['Math_T1']['Monday'][2].Index()
+        self.assertEqual(names[math], 'teacher_activity[Math_T1][Monday][2]')
+        self.assertEqual(named_proto.variables[math].name, 'Math_T1_Monday_P2_activity')
+        self.assertNotIn(anonymous['teacher_activity']['Math_T1']['Monday'][3].Index(), names)
+
+    def test_interval_event_encoding(self):
+        from ortools.sat.python import cp_model
+        from constructive_heuristic import construct_timetable, timetable_hints
+
+        scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = scheduler.convert_sheets_data_to_model_format(*template_records())
+            timetable = construct_timetable(data)
+            for formulation in ('classes', 'team_counts'):
+                booleans = scheduler.build_scheduling_model(data, formulation=formulation)
+                built = scheduler.build_scheduling_model(data, formulation=formulation, event_encoding='intervals')
+                proto = built['model'].Proto()
+                kinds = [ct.WhichOneof('constraint') for ct in proto.constraints]
+                self.assertEqual(built['model'].Validate(), '')
+                self.assertEqual(built['event_encoding'], 'intervals')
+                # One timeline per teacher, plus one per class in the classes formulation
+                timelines = len(data['ALL_TEACHERS']) + (len(data['CLASSES']) if formulation == 'classes' else 0)
+                self.assertEqual(kinds.count('no_overlap'), timelines)
+                self.assertLess(len(proto.constraints), len(booleans['model'].Proto().constraints))
+
+                # The greedy timetable fits the interval model as it fits the Boolean one
+                for var, value in timetable_hints(built, data, timetable):
+                    built['model'].Add(var == value)
+                solver = cp_model.CpSolver()
+                solver.parameters.num_workers = 1
+                solver.parameters.max_time_in_seconds = 30.0
+                self.assertIn(solver.Solve(built['model']), (cp_model.OPTIMAL, cp_model.FEASIBLE))
+
+            with self.assertRaises(ValueError):
+                scheduler.build_scheduling_model(data, event_encoding='rooms')
+
+    def test_interval_solves_validate(self):
+        from ortools.sat.python import cp_model
+        from compact_validator import validate_sheet_schedules
+
+        scheduler = GoogleSheetsScheduler.__new__(GoogleSheetsScheduler)
+        scheduler.greedy_hints = True
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = scheduler.convert_sheets_data_to_model_format(*template_records())
+        prep = data['ACTIVITIES'].index('Prep')
+        for formulation in ('classes', 'team_counts'):
+            with self.subTest(formulation=formulation):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    built = scheduler.build_scheduling_model(data, formulation=formulation, event_encoding='intervals')
+                    solution = scheduler.solve_built_model(built, data, {'max_time_in_seconds': 60.0, 'num_workers': 8})
+                    teacher_schedules, class_schedules = scheduler.convert_solution_to_sheets_format(solution, data)
+                self.assertEqual(validate_sheet_schedules(teacher_schedules, class_schedules, data), [])
+
+                # A PE teacher's lessons are off their timeline, but still rule out a prep
+                with contextlib.redirect_stdout(io.StringIO()):
+                    built = scheduler.build_scheduling_model(data, formulation=formulation, event_encoding='intervals')
+                built['model'].Add(built['teacher_teaching']['PE_T1']['Monday'][1] == 1)
+                built['model'].Add(built['teacher_activity']['PE_T1']['Monday'][1] == prep)
+                solver = cp_model.CpSolver()
+                solver.parameters.max_time_in_seconds = 30.0
+                self.assertEqual(solver.Solve(built['model']), cp_model.INFEASIBLE)
+
+    def test_scaling_report(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = scaling_report([2])
+        self.assertEqual((rows[0]['teams'], rows[0]['classes'], rows[0]['teachers']), (2, 8, 12))
+        self.assertGreater(rows[0]['variables'], 0)
+        self.assertGreater(rows[0]['proto_mb'], 0)
+        self.assertIn('Teams', format_scaling_report(rows).splitlines()[0])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)